@@ -0,0 +1,86 @@
+# benchmarks/bench_clipping.py
+# Этап 2 C++ (проекция и отсечение по пирамиде видимости): миллионы исходных треугольников в секунду в трех сценах -
+# меш целиком в кадре, камера внутри карты (много треугольников пересекают плоскости) и меш целиком вне кадра.
+# Меш регистрируется без BVH, а отсечение задних граней выключено, чтобы все треугольники доходили до отсечения;
+# камера каждый кадр чуть поворачивается (кэш L1 промахивается, L2 с мировыми координатами попадает).
+# Каждая сцена измеряется с отсечением по пирамиде и с защитной полосой (set_guard_band_clipping_cpp); кроме
+# скорости выводится число треугольников на выходе (отсечение дробит треугольники на краях экрана).
+# Запуск из корня проекта: python -m benchmarks.bench_clipping [--frames F] [--guard-band 4.0]
+# Нужен собранный cpp_renderer_core (он создает окно SDL).
+
+import sys
+import time
+
+import glm
+import numpy as np
+
+from meshes.mesh import load_mesh_buffers
+from settings import FOV_DEG, NEAR, FAR, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, L1_CACHE_BYTES, L2_CACHE_BYTES
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+WIDTH, HEIGHT = 1280, 720
+
+
+def mesh_views(vertex_data_np) -> tuple:
+    """(eye, target) для трех сцен по AABB меша и дальняя плоскость, за которую меш не выходит."""
+    positions = vertex_data_np.reshape(-1, VERTEX_DATA_STRIDE)[:, :3]
+    lo, hi = positions.min(axis=0), positions.max(axis=0)
+    center, radius = (lo + hi) / 2, float(np.linalg.norm(hi - lo)) / 2
+    front = center + np.array([0.0, 0.0, 3.0 * radius])
+    inside = lo + np.array([0.5, 0.35, 0.5]) * (hi - lo)
+    return ({'в кадре': (front, center), 'внутри': (inside, inside + np.array([1.0, -0.05, 0.3])),
+             'вне кадра': (front, front + np.array([0.0, 0.0, 1.0]))}, max(FAR, 5.0 * radius))
+
+
+def run(num_frames: int, guard_band: float):
+    import cpp_renderer_core as cpp
+
+    format_info = {'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE, 'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS}
+    cpp.initialize_cpp_renderer(WIDTH, HEIGHT, False, "bench_clipping", L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                np.array([0, 0, 0], dtype=np.uint8))
+    transform = np.array([[0, 0, 0, 0, 0, 0, 1, 1, 1]], dtype=np.float32)
+    try:
+        # Свой id объекта на меш: кэш L2 хранит мировые координаты треугольников по id.
+        for object_id, mesh_filename in enumerate(('assets/Dragon_8K.obj', 'assets/de_dust2.obj'), start=1):
+            vertex_data_np, index_data_np, _, _ = load_mesh_buffers(mesh_filename, DEFAULT_COLOR, format_info)
+            num_source = (index_data_np.size if index_data_np is not None
+                          else vertex_data_np.size // VERTEX_DATA_STRIDE) // 3
+            handle = cpp.register_mesh_cpp(vertex_data_np, index_data_np, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS)
+            print(f"'{mesh_filename}': {num_source} треугольников")
+            views, far = mesh_views(vertex_data_np)
+            projection = np.array(glm.perspective(glm.radians(FOV_DEG), WIDTH / HEIGHT, NEAR, far),
+                                  dtype=np.float32).flatten(order='F')
+            for name, (eye, target) in views.items():
+                for mode, band in (('пирамида', None), ('полоса', guard_band)):
+                    cpp.set_guard_band_clipping_cpp(band is not None, band or 1.0)
+                    total, output = 0.0, 0
+                    for frame in range(num_frames + 1):
+                        view = glm.lookAt(glm.vec3(*eye), glm.vec3(*target), glm.vec3(0, 1, 0))
+                        view = glm.rotate(glm.mat4(1.0), glm.radians(0.01 * frame), glm.vec3(0, 1, 0)) * view
+                        cpp.set_frame_parameters_cpp(np.array(view, dtype=np.float32).flatten(order='F'), projection,
+                                                     np.array(eye, dtype=np.float32), True, False, True, False,
+                                                     np.array([255, 0, 255], dtype=np.uint8), True, 0.0)
+                        start = time.perf_counter()
+                        cpp.submit_batch_cpp(np.array([object_id], dtype=np.uint64), transform,
+                                             np.array([handle], dtype=np.int64))
+                        elapsed = time.perf_counter() - start
+                        cpp.render_accumulated_triangles_cpp()
+                        if frame == 0:
+                            continue # Первый кадр заполняет кэш L2
+                        total += elapsed
+                        output += cpp.get_depth_sort_stats_cpp()['triangles']
+                    print(f"  {name:10s} {mode:8s}: {num_source * num_frames / total / 1e6:7.2f} млн треугольников/с "
+                          f"({total / num_frames * 1000:6.2f} мс/кадр), на выходе {output // num_frames} треугольников")
+            cpp.unregister_mesh_cpp(handle)
+    finally:
+        cpp.set_guard_band_clipping_cpp(False)
+        cpp.cleanup_cpp_renderer()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--frames': '20', '--guard-band': '4.0'}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    run(int(options['--frames']), float(options['--guard-band']))
@@ -0,0 +1,42 @@
+# benchmarks/bench_depth_sort.py
+# Сортировка треугольников по глубине для алгоритма художника (render_accumulated_triangles_cpp при SORT):
+# прежний std::sort структур CppScreenTriangle против LSD radix sort пар (ключ глубины, индекс) в C++.
+# Глубины - средние view_z треугольников сцены: от -FAR_DEPTH до -NEAR, гуще у камеры.
+# Запуск из корня проекта: python -m benchmarks.bench_depth_sort [--sizes 100000,500000,1000000] [--repeats R]
+# Нужен собранный cpp_renderer_core.
+
+import os
+import sys
+
+import numpy as np
+
+from settings import NEAR
+
+FAR_DEPTH = 500.0
+
+
+def scene_depths(num_triangles: int, rng) -> np.ndarray:
+    """Глубины с экспоненциальным спадом: большая часть треугольников ближе FAR_DEPTH / 5."""
+    distances = NEAR + rng.exponential(FAR_DEPTH / 5.0, num_triangles)
+    return -np.minimum(distances, FAR_DEPTH).astype(np.float32)
+
+
+def run(sizes: list, repeats: int):
+    import cpp_renderer_core as cpp
+
+    rng = np.random.default_rng(0)
+    print(f"Лучшее из {repeats} повторов, ядер: {os.cpu_count()}")
+    for num_triangles in sizes:
+        result = cpp.benchmark_depth_sort_cpp(scene_depths(num_triangles, rng), repeats)
+        print(f"{num_triangles:9d} треугольников: std::sort {result['std_sort_ms']:8.2f} мс, "
+              f"radix {result['radix_sort_ms']:7.2f} мс, ускорение {result['std_sort_ms'] / result['radix_sort_ms']:5.1f}x"
+              f"{'' if result['matches'] else ' (ПОРЯДОК НЕ СОВПАЛ)'}")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--sizes': '100000,500000,1000000', '--repeats': '5'}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    run([int(size) for size in options['--sizes'].split(',')], int(options['--repeats']))
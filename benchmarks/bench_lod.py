@@ -0,0 +1,116 @@
+# benchmarks/bench_lod.py
+# Уровни детализации (meshes/mesh_lod.py): построение уровней меша, выбранный уровень и число треугольников
+# для объекта на разных расстояниях и время кадра для ряда объектов, уходящего от камеры.
+# Запуск из корня проекта: python -m benchmarks.bench_lod [--mesh assets/Dragon_8K.obj] [--objects N] [--frames F]
+# Время кадра в C++ измеряется, только если собран cpp_renderer_core (он создает окно SDL).
+
+import sys
+import time
+
+import glm
+import numpy as np
+
+from classes.spatial_index import transform_aabbs
+from meshes.mesh import load_mesh_buffers
+from meshes.mesh_lod import LOD_OBJECT_ID_SHIFT, build_mesh_lods, projected_sizes, select_lod_levels
+from settings import (FOV_DEG, NEAR, FAR, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, LOD_LEVELS, LOD_TRIANGLE_RATIO,
+                      L1_CACHE_BYTES, L2_CACHE_BYTES)
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+DISTANCES = [2, 5, 10, 25, 50, 100, 250, 500]
+MAX_DISTANCE = 500.0
+ASPECT = 16 / 9
+
+
+def count_triangles(vertex_data_np, index_data_np) -> int:
+    if index_data_np is not None:
+        return index_data_np.size // 3
+    return vertex_data_np.size // (VERTEX_DATA_STRIDE * 3)
+
+
+def object_levels(local_bounds, transforms, projection, current_levels, max_levels) -> np.ndarray:
+    """Тот же выбор уровня, что в Renderer._select_lod_levels; камера в начале координат."""
+    world_bounds = transform_aabbs(np.tile(local_bounds, (len(transforms), 1)), transforms)
+    centers = (world_bounds[:, :3] + world_bounds[:, 3:]) * 0.5
+    radii = np.linalg.norm(local_bounds[3:] - local_bounds[:3]) * 0.5 * np.abs(transforms[:, 6:9]).max(axis=1)
+    sizes = projected_sizes(centers, radii, (0.0, 0.0, 0.0), projection[1][1])
+    return select_lod_levels(current_levels, sizes, max_levels=max_levels)
+
+
+def run(mesh_filename: str, num_objects: int, num_frames: int):
+    format_info = {'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE, 'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS}
+    vertex_data_np, index_data_np, bvh, _ = load_mesh_buffers(mesh_filename, DEFAULT_COLOR, format_info)
+    start = time.perf_counter()
+    lods = build_mesh_lods(vertex_data_np, index_data_np, levels=LOD_LEVELS, ratio=LOD_TRIANGLE_RATIO)
+    levels = [(vertex_data_np, index_data_np)] + lods
+    counts = [count_triangles(*level) for level in levels]
+    print(f"'{mesh_filename}': уровни {' / '.join(map(str, counts))} треугольников, "
+          f"построение {time.perf_counter() - start:.2f} с")
+
+    local_bounds = bvh[0][0].astype(np.float64) if bvh is not None else np.concatenate((
+        vertex_data_np.reshape(-1, VERTEX_DATA_STRIDE)[:, :3].min(axis=0),
+        vertex_data_np.reshape(-1, VERTEX_DATA_STRIDE)[:, :3].max(axis=0)))
+    projection = glm.perspective(glm.radians(FOV_DEG), ASPECT, NEAR, FAR)
+    transforms = np.zeros((len(DISTANCES), 9), dtype=np.float32)
+    transforms[:, 2] = -np.array(DISTANCES, dtype=np.float32)
+    transforms[:, 6:9] = 1.0
+    chosen = object_levels(local_bounds, transforms, projection, np.zeros(len(DISTANCES), dtype=np.int64), len(lods))
+    for distance, level in zip(DISTANCES, chosen.tolist()):
+        print(f"  расстояние {distance:5d}: уровень {level}, {counts[level]:7d} треугольников")
+
+    # Ряд объектов от камеры до MAX_DISTANCE.
+    transforms = np.zeros((num_objects, 9), dtype=np.float32)
+    transforms[:, 0] = np.tile([-3.0, 3.0], num_objects)[:num_objects]
+    transforms[:, 2] = -np.linspace(2.0, MAX_DISTANCE, num_objects)
+    transforms[:, 6:9] = 1.0
+    row_levels = object_levels(local_bounds, transforms, projection, np.zeros(num_objects, dtype=np.int64), len(lods))
+    total_full = counts[0] * num_objects
+    total_lod = int(sum(counts[level] for level in row_levels.tolist()))
+    print(f"Ряд из {num_objects} объектов до {MAX_DISTANCE:.0f}: {total_full} треугольников без LOD, "
+          f"{total_lod} с LOD ({total_full / max(1, total_lod):.1f}x меньше)")
+
+    try:
+        import cpp_renderer_core as cpp
+    except ImportError:
+        print("cpp_renderer_core не собран - время кадра не измеряется.")
+        return
+    cpp.initialize_cpp_renderer(1280, 720, False, "bench_lod", L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                np.array([0, 0, 0], dtype=np.uint8))
+    try:
+        handles = [cpp.register_mesh_cpp(vertices, indices, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS)
+                   for vertices, indices in levels]
+        view = glm.lookAt(glm.vec3(0, 0, 0), glm.vec3(0, 0, -1), glm.vec3(0, 1, 0))
+        object_ids = np.arange(1, num_objects + 1, dtype=np.uint64)
+        results = {}
+        lod_object_ids = object_ids ^ (row_levels.astype(np.uint64) << np.uint64(LOD_OBJECT_ID_SHIFT))
+        for name, ids, mesh_handles in (('без LOD', object_ids, np.full(num_objects, handles[0], dtype=np.int64)),
+                                        ('с LOD', lod_object_ids, np.array(handles, dtype=np.int64)[row_levels])):
+            total = 0.0
+            for frame in range(num_frames):
+                # Камера слегка покачивается, чтобы кэш L1 (по матрицам вида) не отдавал готовые треугольники.
+                sway = glm.rotate(glm.mat4(1.0), glm.radians(0.5 * np.sin(frame)), glm.vec3(0, 1, 0))
+                start = time.perf_counter()
+                cpp.set_frame_parameters_cpp(np.array(view * sway, dtype=np.float32).flatten(order='F'),
+                                             np.array(projection, dtype=np.float32).flatten(order='F'),
+                                             np.zeros(3, dtype=np.float32), True, True, True, False,
+                                             np.array([255, 0, 255], dtype=np.uint8), True, 0.0)
+                cpp.submit_batch_cpp(ids, transforms, mesh_handles)
+                cpp.render_accumulated_triangles_cpp()
+                total += time.perf_counter() - start
+            results[name] = total / num_frames * 1000
+        for handle in handles:
+            cpp.unregister_mesh_cpp(handle)
+    finally:
+        cpp.cleanup_cpp_renderer()
+    for name, frame_ms in results.items():
+        print(f"Кадр {name:8s}: {frame_ms:8.2f} мс")
+    print(f"Ускорение: {results['без LOD'] / results['с LOD']:.1f}x")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--mesh': 'assets/Dragon_8K.obj', '--objects': '200', '--frames': '30'}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    run(options['--mesh'], int(options['--objects']), int(options['--frames']))
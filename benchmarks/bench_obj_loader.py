@@ -0,0 +1,56 @@
+# benchmarks/bench_obj_loader.py
+# Сравнение построчного (legacy), векторизованного и нативного (C++, если собран) загрузчиков .obj.
+# Запуск из корня проекта: python -m benchmarks.bench_obj_loader [файлы...]
+
+import sys
+import time
+
+import numpy as np
+
+from meshes.obj_loader import load_obj_file_streaming, _load_obj_cpp
+from tests.obj_loader_legacy import load_obj_file_legacy
+
+DEFAULT_ASSETS = [
+    'assets/pawn.obj',
+    'assets/Dragon_8K.obj',
+    'assets/de_dust2.obj',
+    'assets/de_dust2_2.obj',
+]
+NUM_REPEATS = 5
+
+
+def best_time(func, *args) -> float:
+    """Минимальное время из NUM_REPEATS запусков (секунды)."""
+    best = float('inf')
+    for _ in range(NUM_REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_native(path):
+    return _load_obj_cpp(path, [0.5, 0.5, 0.5], True, False)
+
+
+def run(paths):
+    print(f"{'файл':28s} {'треуг.':>8s} {'legacy, мс':>11s} {'numpy, мс':>10s} {'ускорение':>10s} "
+          f"{'C++, мс':>8s} {'ускорение':>10s}  совпадает")
+    for path in paths:
+        reference = load_obj_file_legacy(path)
+        # load_obj_file_streaming - всегда NumPy-путь, даже если собран нативный загрузчик.
+        vectorized = load_obj_file_streaming(path)
+        t_legacy = best_time(load_obj_file_legacy, path)
+        t_vectorized = best_time(load_obj_file_streaming, path)
+        same = np.array_equal(reference, vectorized)
+        native_columns = f"{'-':>8s} {'-':>10s}"
+        if _load_obj_cpp is not None:
+            same = same and np.array_equal(reference, load_native(path))
+            t_native = best_time(load_native, path)
+            native_columns = f"{t_native * 1000:8.2f} {t_legacy / t_native:9.2f}x"
+        print(f"{path:28s} {vectorized.size // 27:8d} {t_legacy * 1000:11.2f} {t_vectorized * 1000:10.2f} "
+              f"{t_legacy / t_vectorized:9.2f}x {native_columns}  {'да' if same else 'НЕТ'}")
+
+
+if __name__ == '__main__':
+    run(sys.argv[1:] or DEFAULT_ASSETS)
@@ -0,0 +1,75 @@
+# benchmarks/bench_obj_parallel.py
+# Масштабирование параллельного разбора .obj по числу процессов.
+# Запуск из корня проекта: python -m benchmarks.bench_obj_parallel [--repeat N] [файлы...]
+# --repeat N склеивает файл N раз во временный .obj, чтобы накладные расходы пула процессов не доминировали.
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from meshes.obj_loader import load_obj_file_streaming, load_obj_file_parallel
+
+DEFAULT_ASSETS = [
+    'assets/Dragon_8K.obj',
+    'assets/de_dust2.obj',
+]
+NUM_REPEATS = 3
+
+
+def best_time(func, *args, **kwargs) -> float:
+    """Минимальное время из NUM_REPEATS запусков (секунды)."""
+    best = float('inf')
+    for _ in range(NUM_REPEATS):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def worker_counts():
+    counts = [1, 2, 4, 8, 16]
+    cpu_count = os.cpu_count() or 1
+    return [n for n in counts if n <= cpu_count] or [1]
+
+
+def make_repeated_copy(path: str, repeat: int, tmp_dir: str) -> str:
+    """Склеивает .obj repeat раз (абсолютные индексы копий ссылаются на вершины первой - это валидный OBJ)."""
+    with open(path, 'r') as f:
+        text = f.read()
+    if not text.endswith('\n'):
+        text += '\n'
+    out_path = os.path.join(tmp_dir, f"x{repeat}_" + os.path.basename(path))
+    with open(out_path, 'w') as f:
+        for _ in range(repeat):
+            f.write(text)
+    return out_path
+
+
+def run(paths, repeat):
+    print(f"CPU: {os.cpu_count()}")
+    print(f"{'файл':32s} {'МБ':>6s} {'процессы':>9s} {'время, мс':>10s} {'ускорение':>10s}  совпадает")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for path in paths:
+            source = make_repeated_copy(path, repeat, tmp_dir) if repeat > 1 else path
+            size_mb = os.path.getsize(source) / (1024 * 1024)
+            reference = load_obj_file_streaming(source)
+            t_serial = best_time(load_obj_file_streaming, source)
+            print(f"{path:32s} {size_mb:6.1f} {'serial':>9s} {t_serial * 1000:10.1f} {1.0:9.2f}x  да")
+            for workers in worker_counts():
+                result = load_obj_file_parallel(source, workers=workers)
+                t_parallel = best_time(load_obj_file_parallel, source, workers=workers)
+                same = np.array_equal(reference, result)
+                print(f"{'':32s} {'':6s} {workers:9d} {t_parallel * 1000:10.1f} "
+                      f"{t_serial / t_parallel:9.2f}x  {'да' if same else 'НЕТ'}")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    repeat = 1
+    if args[:1] == ['--repeat']:
+        repeat = int(args[1])
+        args = args[2:]
+    run(args or DEFAULT_ASSETS, repeat)
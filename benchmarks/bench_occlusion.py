@@ -0,0 +1,112 @@
+# benchmarks/bench_occlusion.py
+# Отсечение окклюзией (OCCLUSION_CULLING_ENABLED, set_occlusion_parameters_cpp): время кадра и число треугольников
+# с отсечением и без. Сцена - карта (ее ближайшие кластеры - окклюдеры) и объекты, расставленные по ней случайно;
+# кадры рисуются с нескольких точек обзора внутри карты.
+# Строки: "камера стоит" - объекты вращаются (промах L1 у каждого объекта, буфер окклюзии строится один раз
+# на точку обзора), "камера идет" - камера сдвигается каждый кадр (промах L1 у всего и перестройка буфера).
+# Запуск из корня проекта: python -m benchmarks.bench_occlusion [--map assets/de_dust2.obj]
+#                          [--object assets/Dragon_8K.obj] [--objects N] [--frames F]
+# Нужен собранный cpp_renderer_core (он создает окно SDL).
+
+import sys
+import time
+
+import glm
+import numpy as np
+
+from meshes.mesh import load_mesh_buffers
+from settings import (FOV_DEG, NEAR, FAR, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, L1_CACHE_BYTES, L2_CACHE_BYTES,
+                      OCCLUSION_BUFFER_WIDTH, OCCLUSION_BUFFER_HEIGHT, OCCLUSION_MAX_OCCLUDER_TRIANGLES)
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+WIDTH, HEIGHT = 1280, 720
+NUM_VIEWS = 8
+EYE_HEIGHT = 0.35    # Доля высоты AABB карты
+OBJECT_HEIGHT = 0.3  # Объекты стоят на этой доле высоты AABB карты
+OBJECT_SCALE = 0.02  # Размер объекта относительно диагонали AABB карты
+OBJECT_SPIN = 3.0    # Поворот объекта за кадр в строке "камера стоит", градусов
+CAMERA_STEP = 0.002  # Шаг камеры за кадр в строке "камера идет", доля диагонали AABB карты
+
+
+def scene_layout(map_vertex_data_np, object_bounds: np.ndarray, num_objects: int) -> tuple:
+    """Точки обзора (eye, direction) и преобразования объектов (N, 9) внутри AABB карты (повторяемо)."""
+    positions = map_vertex_data_np.reshape(-1, VERTEX_DATA_STRIDE)[:, :3]
+    lo, hi = positions.min(axis=0), positions.max(axis=0)
+    rng = np.random.default_rng(2)
+    views = []
+    for _ in range(NUM_VIEWS):
+        eye = lo + rng.uniform(0.1, 0.9, 3) * (hi - lo)
+        eye[1] = lo[1] + EYE_HEIGHT * (hi[1] - lo[1])
+        yaw = rng.uniform(0.0, 2.0 * np.pi)
+        views.append((eye, np.array([np.cos(yaw), -0.05, np.sin(yaw)])))
+    scale = OBJECT_SCALE * np.linalg.norm(hi - lo) / np.linalg.norm(object_bounds[3:] - object_bounds[:3])
+    transforms = np.zeros((num_objects, 9), dtype=np.float32)
+    transforms[:, 0:3] = lo + rng.uniform(0.05, 0.95, (num_objects, 3)) * (hi - lo)
+    transforms[:, 1] = lo[1] + OBJECT_HEIGHT * (hi[1] - lo[1])
+    transforms[:, 4] = rng.uniform(0.0, 360.0, num_objects)
+    transforms[:, 6:9] = scale
+    return views, transforms, np.linalg.norm(hi - lo)
+
+
+def run(map_filename: str, object_filename: str, num_objects: int, num_frames: int):
+    import cpp_renderer_core as cpp
+
+    format_info = {'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE, 'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS}
+    map_vertices, map_indices, map_bvh, _ = load_mesh_buffers(map_filename, DEFAULT_COLOR, format_info)
+    object_vertices, object_indices, object_bvh, _ = load_mesh_buffers(object_filename, DEFAULT_COLOR, format_info)
+    if map_bvh is None or len(map_bvh) < 5 or object_bvh is None:
+        sys.exit("Нужны MESH_BVH_ENABLED и MESH_CLUSTERS_ENABLED: окклюдеры - кластеры карты.")
+    views, object_transforms, map_size = scene_layout(map_vertices, object_bvh[0][0], num_objects)
+    cpp.initialize_cpp_renderer(WIDTH, HEIGHT, False, "bench_occlusion", L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                np.array([0, 0, 0], dtype=np.uint8))
+    try:
+        map_handle = cpp.register_mesh_cpp(map_vertices, map_indices, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS,
+                                           *map_bvh[:5])
+        object_handle = cpp.register_mesh_cpp(object_vertices, object_indices, VERTEX_DATA_STRIDE,
+                                              USE_VERTEX_NORMALS, *object_bvh[:3])
+        handles = np.array([map_handle] + [object_handle] * num_objects, dtype=np.int64)
+        object_ids = np.arange(1, num_objects + 2, dtype=np.uint64)
+        projection = np.array(glm.perspective(glm.radians(FOV_DEG), WIDTH / HEIGHT, NEAR, FAR),
+                              dtype=np.float32).flatten(order='F')
+        print(f"'{map_filename}' + {num_objects} x '{object_filename}', {WIDTH}x{HEIGHT}, {len(views)} точек обзора "
+              f"x {num_frames} кадров, буфер {OCCLUSION_BUFFER_WIDTH}x{OCCLUSION_BUFFER_HEIGHT}, "
+              f"окклюдеров до {OCCLUSION_MAX_OCCLUDER_TRIANGLES}")
+        for row, (spin, step) in {'камера стоит': (OBJECT_SPIN, 0.0), 'камера идет': (0.0, CAMERA_STEP)}.items():
+            line = f"{row}:"
+            for occlusion in (False, True):
+                cpp.set_occlusion_parameters_cpp(occlusion, OCCLUSION_BUFFER_WIDTH, OCCLUSION_BUFFER_HEIGHT,
+                                                 OCCLUSION_MAX_OCCLUDER_TRIANGLES)
+                transforms = np.vstack(([0, 0, 0, 0, 0, 0, 1, 1, 1], object_transforms)).astype(np.float32)
+                frame_ms, triangles = 0.0, 0
+                for eye, direction in views:
+                    for frame in range(num_frames + 1):
+                        transforms[1:, 4] += spin
+                        camera = eye + direction * (step * map_size * frame)
+                        view = glm.lookAt(glm.vec3(*camera), glm.vec3(*(camera + direction)), glm.vec3(0, 1, 0))
+                        start = time.perf_counter()
+                        cpp.set_frame_parameters_cpp(np.array(view, dtype=np.float32).flatten(order='F'), projection,
+                                                     camera.astype(np.float32), True, True, True, False,
+                                                     np.array([255, 0, 255], dtype=np.uint8), True, 0.0)
+                        cpp.submit_batch_cpp(object_ids, transforms, handles)
+                        cpp.render_accumulated_triangles_cpp()
+                        if frame == 0:
+                            continue # Первый кадр с точки обзора: буфер окклюзии и кэши еще пусты
+                        frame_ms += time.perf_counter() - start
+                        triangles += cpp.get_depth_sort_stats_cpp()['triangles']
+                num_measured = len(views) * num_frames
+                line += (f"  {'с окклюзией' if occlusion else 'без'} {frame_ms / num_measured * 1000:6.2f} мс/кадр "
+                         f"({triangles // num_measured} треугольников)")
+            print(line)
+        cpp.unregister_mesh_cpp(map_handle)
+        cpp.unregister_mesh_cpp(object_handle)
+    finally:
+        cpp.cleanup_cpp_renderer()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--map': 'assets/de_dust2.obj', '--object': 'assets/Dragon_8K.obj', '--objects': '64', '--frames': '10'}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    run(options['--map'], options['--object'], int(options['--objects']), int(options['--frames']))
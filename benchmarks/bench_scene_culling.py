@@ -0,0 +1,131 @@
+# benchmarks/bench_scene_culling.py
+# Отсечение объектов сцены пространственной сеткой (classes/spatial_index.py):
+# сколько объектов уходит в рендерер и во сколько обходится кадр с отсечением и без.
+# Запуск из корня проекта: python -m benchmarks.bench_scene_culling [--objects N] [--frames F]
+# Время кадра в C++ измеряется, только если собран cpp_renderer_core (он создает окно SDL).
+
+import sys
+import time
+from types import SimpleNamespace
+
+import glm
+import numpy as np
+
+from classes.GameObject import GameObject
+from classes.spatial_index import SceneSpatialIndex
+from classes.transform_store import TransformStore
+from settings import FOV_DEG, NEAR, FAR, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, L1_CACHE_BYTES, L2_CACHE_BYTES
+
+ASSETS = ['assets/cube2.obj', 'assets/pawn.obj']
+AREA_SIZE = 2000.0   # Объекты разбросаны по квадрату AREA_SIZE x AREA_SIZE
+CAMERA_HEIGHT = 20.0
+ASPECT = 16 / 9
+
+
+def build_scene(num_objects: int):
+    app = SimpleNamespace()
+    store = TransformStore(capacity=num_objects)
+    rng = np.random.default_rng(0)
+    half = AREA_SIZE / 2
+    objects = []
+    for i in range(num_objects):
+        position = glm.vec3(rng.uniform(-half, half), rng.uniform(0, 10), rng.uniform(-half, half))
+        rotation = glm.vec3(0, rng.uniform(0, 360), 0)
+        scale = glm.vec3(float(rng.uniform(1, 3)))
+        objects.append(GameObject(app, ASSETS[i % len(ASSETS)], position=position, rotation=rotation,
+                                  scale=scale, transform_store=store))
+    return store, objects
+
+
+def camera_matrices(frame: int, num_frames: int):
+    """Камера в центре сцены, поворачивается на 360 градусов за num_frames кадров."""
+    yaw = 2 * np.pi * frame / num_frames
+    eye = glm.vec3(0, CAMERA_HEIGHT, 0)
+    view = glm.lookAt(eye, eye + glm.vec3(np.sin(yaw), -0.1, -np.cos(yaw)), glm.vec3(0, 1, 0))
+    projection = glm.perspective(glm.radians(FOV_DEG), ASPECT, NEAR, FAR)
+    return eye, view, projection
+
+
+def run_cpp_frames(cpp, store, objects, index, num_frames: int, cull: bool) -> float:
+    """Среднее время кадра (мс): запрос к индексу + submit_batch_cpp + render_accumulated_triangles_cpp."""
+    handles = {}
+    mesh_handles = np.empty(len(objects), dtype=np.int64)
+    for row, game_object in enumerate(store.objects):
+        mesh = game_object.mesh
+        if id(mesh) not in handles:
+            bvh = mesh.bvh if mesh.bvh is not None else (None, None, None)
+            handles[id(mesh)] = cpp.register_mesh_cpp(mesh.vertex_data_np, mesh.index_data_np,
+                                                      VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, *bvh)
+        mesh_handles[row] = handles[id(mesh)]
+    total = 0.0
+    for frame in range(num_frames):
+        eye, view, projection = camera_matrices(frame, num_frames)
+        start = time.perf_counter()
+        cpp.set_frame_parameters_cpp(np.array(view, dtype=np.float32).flatten(order='F'),
+                                     np.array(projection, dtype=np.float32).flatten(order='F'),
+                                     np.array(eye, dtype=np.float32), True, True, True, False,
+                                     np.array([255, 0, 255], dtype=np.uint8), True, 0.0)
+        if cull:
+            rows = index.query_frustum(projection * view)
+            cpp.submit_batch_cpp(store.object_ids[rows], store.array[rows], mesh_handles[rows])
+        else:
+            cpp.submit_batch_cpp(store.object_ids, store.array, mesh_handles)
+        cpp.render_accumulated_triangles_cpp()
+        total += time.perf_counter() - start
+    for handle in handles.values():
+        cpp.unregister_mesh_cpp(handle)
+    return total / num_frames * 1000
+
+
+def run(num_objects: int, num_frames: int):
+    start = time.perf_counter()
+    store, objects = build_scene(num_objects)
+    print(f"Сцена: {num_objects} объектов ({', '.join(ASSETS)}) на площади {AREA_SIZE:.0f}x{AREA_SIZE:.0f}, "
+          f"создание {time.perf_counter() - start:.2f} с")
+
+    index = SceneSpatialIndex(store)
+    start = time.perf_counter()
+    index.sync()
+    print(f"Построение индекса: {(time.perf_counter() - start) * 1000:.1f} мс, ячеек: {len(index._cells)}")
+
+    moved = np.arange(0, num_objects, 10)
+    store.translate((1.0, 0.0, 0.0), rows=moved)
+    start = time.perf_counter()
+    index.sync()
+    print(f"Обновление после сдвига {moved.size} объектов: {(time.perf_counter() - start) * 1000:.1f} мс")
+
+    visible_counts, query_time = [], 0.0
+    for frame in range(num_frames):
+        _, view, projection = camera_matrices(frame, num_frames)
+        start = time.perf_counter()
+        rows = index.query_frustum(projection * view)
+        query_time += time.perf_counter() - start
+        visible_counts.append(rows.size)
+    mean_visible = float(np.mean(visible_counts))
+    print(f"Запрос к индексу: {query_time / num_frames * 1000:.2f} мс/кадр, видимо в среднем "
+          f"{mean_visible:.0f} из {num_objects} ({mean_visible / num_objects * 100:.1f}%), "
+          f"отсечено {num_objects - mean_visible:.0f}")
+
+    try:
+        import cpp_renderer_core as cpp
+    except ImportError:
+        print("cpp_renderer_core не собран - время кадра не измеряется.")
+        return
+    cpp.initialize_cpp_renderer(1280, 720, False, "bench_scene_culling", L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                np.array([0, 0, 0], dtype=np.uint8))
+    try:
+        t_all = run_cpp_frames(cpp, store, objects, index, num_frames, cull=False)
+        t_culled = run_cpp_frames(cpp, store, objects, index, num_frames, cull=True)
+    finally:
+        cpp.cleanup_cpp_renderer()
+    print(f"Кадр без отсечения: {t_all:8.2f} мс")
+    print(f"Кадр с отсечением:  {t_culled:8.2f} мс  ({t_all / t_culled:.1f}x)")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--objects': 5000, '--frames': 60}
+    for name in options:
+        if name in args:
+            options[name] = int(args[args.index(name) + 1])
+    run(options['--objects'], options['--frames'])
@@ -0,0 +1,91 @@
+# benchmarks/bench_simd_transform.py
+# Пакетные ядра трансформации вершин cpp_renderer_core (cpp_src/simd_transform_cpp.hpp) на каждом уровне,
+# который поддерживает процессор (scalar, sse2, avx2):
+#  - ядра отдельно, в один поток: миллионы вершин в секунду для этапа 1 (локальные -> мировые координаты)
+#    и этапа 2 (мировые -> clip-координаты и глубина вида, затем деление на w и перевод в пиксели экрана);
+#  - этапы 1 и 2 целиком (submit_batch_cpp): объект каждый кадр чуть поворачивается, поэтому кэши L1 и L2 промахиваются.
+# Запуск из корня проекта: python -m benchmarks.bench_simd_transform [--mesh assets/Dragon_80K.obj] [--frames F]
+#                          [--repeats R]
+# Нужен собранный cpp_renderer_core (он создает окно SDL).
+
+import os
+import sys
+import time
+
+import glm
+import numpy as np
+
+from meshes.mesh import load_mesh_buffers
+from settings import FOV_DEG, NEAR, FAR, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, L1_CACHE_BYTES, L2_CACHE_BYTES
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+FALLBACK_MESH = 'assets/Dragon_8K.obj'
+WIDTH, HEIGHT = 1280, 720
+
+
+def run(mesh_filename: str, num_frames: int, repeats: int):
+    import cpp_renderer_core as cpp
+
+    if not os.path.exists(mesh_filename):
+        print(f"'{mesh_filename}' не найден, используется '{FALLBACK_MESH}'")
+        mesh_filename = FALLBACK_MESH
+    format_info = {'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE, 'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS}
+    vertex_data_np, index_data_np, _, _ = load_mesh_buffers(mesh_filename, DEFAULT_COLOR, format_info)
+    num_vertices = vertex_data_np.size // VERTEX_DATA_STRIDE
+    num_triangles = (index_data_np.size if index_data_np is not None else num_vertices) // 3
+    info = cpp.get_simd_transform_info_cpp()
+    print(f"'{mesh_filename}': {num_vertices} вершин, {num_triangles} треугольников; "
+          f"лучший уровень процессора: {info['supported']}")
+
+    kernels = cpp.benchmark_vertex_transform_cpp(vertex_data_np, VERTEX_DATA_STRIDE, repeats)
+    print("Ядра (один поток, млн вершин/с):")
+    for level, result in kernels.items():
+        print(f"  {level:6s}: этап 1 {num_vertices / result['world_ms'] / 1000:8.1f}, "
+              f"этап 2 {num_vertices / result['clip_ms'] / 1000:8.1f} "
+              f"(отличие от scalar {result['max_error']:.1e})")
+
+    cpp.initialize_cpp_renderer(WIDTH, HEIGHT, False, "bench_simd_transform", L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                np.array([0, 0, 0], dtype=np.uint8))
+    try:
+        # Без BVH: этап 2 обрабатывает все треугольники.
+        handle = cpp.register_mesh_cpp(vertex_data_np, index_data_np, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS)
+        positions = vertex_data_np.reshape(-1, VERTEX_DATA_STRIDE)[:, :3]
+        lo, hi = positions.min(axis=0), positions.max(axis=0)
+        radius = float(np.linalg.norm(hi - lo)) / 2
+        view = np.array(glm.lookAt(glm.vec3(0, 0, 2.5 * radius), glm.vec3(0, 0, 0), glm.vec3(0, 1, 0)),
+                        dtype=np.float32).flatten(order='F')
+        projection = np.array(glm.perspective(glm.radians(FOV_DEG), WIDTH / HEIGHT, NEAR, FAR),
+                              dtype=np.float32).flatten(order='F')
+        center = -(lo + hi) / 2
+        results = {}
+        for i_level, level in enumerate(kernels):
+            cpp.set_simd_transform_cpp(level)
+            total = 0.0
+            for frame in range(num_frames):
+                # Свой угол на каждый кадр каждого уровня: ни L1, ни L2 не отдают готовые треугольники.
+                angle = 0.01 * (i_level * num_frames + frame)
+                transform = np.array([[*center, 0, angle, 0, 1, 1, 1]], dtype=np.float32)
+                cpp.set_frame_parameters_cpp(view, projection, np.array([0, 0, 2.5 * radius], dtype=np.float32),
+                                             True, True, True, False, np.array([255, 0, 255], dtype=np.uint8), True, 0.0)
+                start = time.perf_counter()
+                cpp.submit_batch_cpp(np.array([1], dtype=np.uint64), transform, np.array([handle], dtype=np.int64))
+                total += time.perf_counter() - start
+                cpp.render_accumulated_triangles_cpp()
+            results[level] = total / num_frames * 1000
+        cpp.unregister_mesh_cpp(handle)
+    finally:
+        cpp.set_simd_transform_cpp('auto')
+        cpp.cleanup_cpp_renderer()
+
+    print("Этапы 1 и 2 (submit_batch_cpp, все потоки OpenMP):")
+    for level, frame_ms in results.items():
+        print(f"  {level:6s}: {frame_ms:7.2f} мс/кадр, ускорение {results['scalar'] / frame_ms:4.2f}x")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--mesh': 'assets/Dragon_80K.obj', '--frames': '30', '--repeats': '20'}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    run(options['--mesh'], int(options['--frames']), int(options['--repeats']))
@@ -0,0 +1,110 @@
+# benchmarks/bench_software_raster.py
+# Программный растеризатор cpp_renderer_core (SOFTWARE_RASTERIZER): скорость заполнения (fill rate) тайловой
+# растеризации в зависимости от числа потоков OpenMP при 1280x720 и 1920x1080.
+# Сцена - карта с нескольких фиксированных точек обзора; fill rate - покрытые пиксели до теста глубины
+# (get_software_raster_stats_cpp()['fragments']) за время растеризации (raster_ms: подготовка треугольников,
+# раскладка по тайлам, растеризация и копирование тайлов в кадр), без проекции и вывода текстуры.
+# Запуск из корня проекта: python -m benchmarks.bench_software_raster [--mesh assets/de_dust2.obj] [--frames F]
+#                          [--threads 1,2,4,8] [--tile 64]
+# Нужен собранный cpp_renderer_core (он создает окно SDL).
+
+import os
+import sys
+
+import glm
+import numpy as np
+
+from meshes.mesh import load_mesh_buffers
+from settings import FOV_DEG, NEAR, FAR, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, L1_CACHE_BYTES, L2_CACHE_BYTES
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+RESOLUTIONS = [(1280, 720), (1920, 1080)]
+NUM_VIEWS = 6
+EYE_HEIGHT = 0.35 # Доля высоты AABB карты
+
+
+def default_thread_counts() -> list:
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != (os.cpu_count() or 1):
+        counts.append(os.cpu_count())
+    return counts
+
+
+def camera_views(vertex_data_np) -> list:
+    """Точки обзора внутри AABB меша на высоте EYE_HEIGHT со случайным (но повторяемым) направлением."""
+    positions = vertex_data_np.reshape(-1, VERTEX_DATA_STRIDE)[:, :3]
+    lo, hi = positions.min(axis=0), positions.max(axis=0)
+    rng = np.random.default_rng(1)
+    views = []
+    for _ in range(NUM_VIEWS):
+        eye = lo + rng.uniform(0.1, 0.9, 3) * (hi - lo)
+        eye[1] = lo[1] + EYE_HEIGHT * (hi[1] - lo[1])
+        yaw = rng.uniform(0.0, 2.0 * np.pi)
+        target = eye + np.array([np.cos(yaw), -0.05, np.sin(yaw)]) * 100.0
+        view = glm.lookAt(glm.vec3(*eye), glm.vec3(*target), glm.vec3(0, 1, 0))
+        views.append((np.array(view, dtype=np.float32).flatten(order='F'), eye.astype(np.float32)))
+    return views
+
+
+def run(mesh_filename: str, num_frames: int, thread_counts: list, tile_size: int):
+    import cpp_renderer_core as cpp
+
+    format_info = {'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE, 'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS}
+    vertex_data_np, index_data_np, _, _ = load_mesh_buffers(mesh_filename, DEFAULT_COLOR, format_info)
+    views = camera_views(vertex_data_np)
+    transform = np.array([[0, 0, 0, 0, 0, 0, 1, 1, 1]], dtype=np.float32)
+    print(f"'{mesh_filename}', {len(views)} точек обзора x {num_frames} кадров, тайлы {tile_size}x{tile_size}, "
+          f"ядер: {os.cpu_count()}")
+
+    for width, height in RESOLUTIONS:
+        cpp.initialize_cpp_renderer(width, height, False, "bench_software_raster",
+                                    L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                    np.array([0, 0, 0], dtype=np.uint8))
+        try:
+            handle = cpp.register_mesh_cpp(vertex_data_np, index_data_np, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS)
+            projection = np.array(glm.perspective(glm.radians(FOV_DEG), width / height, NEAR, FAR),
+                                  dtype=np.float32).flatten(order='F')
+            results = []
+            for num_threads in thread_counts:
+                cpp.set_software_rasterizer_cpp(True, tile_size, num_threads)
+                fragments, raster_ms, triangles = 0, 0.0, 0
+                for view, eye in views:
+                    for frame in range(num_frames + 1):
+                        cpp.set_frame_parameters_cpp(view, projection, eye, True, True, True, False,
+                                                     np.array([255, 0, 255], dtype=np.uint8), False, 0.0)
+                        cpp.submit_batch_cpp(np.array([1], dtype=np.uint64), transform,
+                                             np.array([handle], dtype=np.int64))
+                        cpp.render_accumulated_triangles_cpp()
+                        if frame == 0:
+                            continue # Первый кадр с точки обзора заполняет кэши треугольников
+                        stats = cpp.get_software_raster_stats_cpp()
+                        fragments += stats['fragments']
+                        raster_ms += stats['raster_ms']
+                        triangles += stats['triangles']
+                num_measured = len(views) * num_frames
+                results.append((num_threads, raster_ms / num_measured, fragments / raster_ms / 1000.0,
+                                triangles // num_measured, fragments / num_measured / (width * height)))
+            cpp.unregister_mesh_cpp(handle)
+            cpp.set_software_rasterizer_cpp(False)
+        finally:
+            cpp.cleanup_cpp_renderer()
+
+        print(f"{width}x{height}:")
+        base_ms = results[0][1]
+        for num_threads, frame_ms, fill_rate, triangles, fragments_per_pixel in results:
+            print(f"  потоков {num_threads:3d}: {frame_ms:7.2f} мс/кадр, {fill_rate:8.1f} Мпикс/с, "
+                  f"ускорение {base_ms / frame_ms:5.2f}x ({triangles} треугольников, "
+                  f"{fragments_per_pixel:.2f} фрагмента на пиксель)")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--mesh': 'assets/de_dust2.obj', '--frames': '10', '--tile': '64',
+               '--threads': ','.join(map(str, default_thread_counts()))}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    run(options['--mesh'], int(options['--frames']), [int(n) for n in options['--threads'].split(',')],
+        int(options['--tile']))
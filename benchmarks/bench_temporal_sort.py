@@ -0,0 +1,96 @@
+# benchmarks/bench_temporal_sort.py
+# Временная сортировка по глубине (set_temporal_depth_sort_cpp): время сортировки кадра в зависимости от того,
+# какая доля объектов изменилась с прошлого кадра, против radix sort с нуля каждый кадр.
+# Сцена - сетка объектов вокруг неподвижной камеры; каждый кадр поворачивается доля случайных объектов (--moving),
+# в двух последних строках движется камера (пересчитываются все объекты): идет вперед со смещением вбок и поворачивается.
+# Запуск из корня проекта: python -m benchmarks.bench_temporal_sort [--mesh assets/Dragon_8K.obj] [--objects N]
+#                          [--frames F] [--moving 0,0.01,0.1,0.5]
+# Нужен собранный cpp_renderer_core (он создает окно SDL).
+
+import sys
+
+import glm
+import numpy as np
+
+from meshes.mesh import load_mesh_buffers
+from settings import FOV_DEG, NEAR, FAR, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, L1_CACHE_BYTES, L2_CACHE_BYTES
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+GRID_SPACING = 8.0
+OBJECT_SPIN = 3.0 # Поворот движущегося объекта за кадр, градусов
+CAMERA_STEP = (0.03, 0.0, -0.1) # Смещение камеры за кадр в строке "камера идет"
+CAMERA_TURN = 0.5 # Поворот камеры за кадр в строке "камера поворачивается", градусов
+CAMERA_ROWS = {'идет': (1.0, 0.0), 'поворачивается': (0.0, 1.0)} # Множители смещения и поворота камеры
+
+
+def grid_transforms(num_objects: int) -> np.ndarray:
+    """Квадратная сетка объектов в плоскости XZ с центром в начале координат, повороты разные."""
+    side = int(np.ceil(np.sqrt(num_objects)))
+    cells = np.arange(num_objects)
+    transforms = np.zeros((num_objects, 9), dtype=np.float32)
+    transforms[:, 0] = (cells % side - (side - 1) / 2) * GRID_SPACING
+    transforms[:, 1] = -2.0
+    transforms[:, 2] = (cells // side - (side - 1) / 2) * GRID_SPACING
+    transforms[:, 4] = cells * 37 % 360
+    transforms[:, 6:9] = 1.0
+    return transforms
+
+
+def run(mesh_filename: str, num_objects: int, num_frames: int, moving_fractions: list):
+    import cpp_renderer_core as cpp
+
+    format_info = {'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE, 'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS}
+    vertex_data_np, index_data_np, _, _ = load_mesh_buffers(mesh_filename, DEFAULT_COLOR, format_info)
+    object_ids = np.arange(1, num_objects + 1, dtype=np.uint64)
+    cpp.initialize_cpp_renderer(1280, 720, False, "bench_temporal_sort", L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                np.array([0, 0, 0], dtype=np.uint8))
+    try:
+        handle = cpp.register_mesh_cpp(vertex_data_np, index_data_np, VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS)
+        handles = np.full(num_objects, handle, dtype=np.int64)
+        projection = np.array(glm.perspective(glm.radians(FOV_DEG), 1280 / 720, NEAR, FAR),
+                              dtype=np.float32).flatten(order='F')
+        print(f"'{mesh_filename}' x {num_objects}, {num_frames} кадров на строку")
+        for moving in moving_fractions + list(CAMERA_ROWS):
+            camera_row = isinstance(moving, str)
+            line = f"камера {moving:14}:" if camera_row else f"движется {moving:4.0%} объектов:  "
+            for temporal in (False, True):
+                cpp.set_temporal_depth_sort_cpp(temporal)
+                transforms = grid_transforms(num_objects)
+                num_moving = 0 if camera_row else int(round(num_objects * moving))
+                step_scale, turn_scale = CAMERA_ROWS[moving] if camera_row else (0.0, 0.0)
+                moving_objects = np.random.default_rng(0).permutation(num_objects)[:num_moving]
+                sort_ms, triangles, reused = 0.0, 0, 0
+                for frame in range(num_frames + 1):
+                    transforms[moving_objects, 4] += OBJECT_SPIN
+                    camera_pos = glm.vec3(*CAMERA_STEP) * (step_scale * frame)
+                    view = glm.rotate(glm.mat4(1.0), glm.radians(CAMERA_TURN * turn_scale * frame), glm.vec3(0, 1, 0))
+                    view = glm.translate(view, -camera_pos)
+                    cpp.set_frame_parameters_cpp(np.array(view, dtype=np.float32).flatten(order='F'), projection,
+                                                 np.array(camera_pos, dtype=np.float32), True, True, True, False,
+                                                 np.array([255, 0, 255], dtype=np.uint8), True, 0.0)
+                    cpp.submit_batch_cpp(object_ids, transforms, handles)
+                    cpp.render_accumulated_triangles_cpp()
+                    if frame == 0:
+                        continue # Первый кадр: прошлого порядка еще нет
+                    stats = cpp.get_depth_sort_stats_cpp()
+                    sort_ms += stats['sort_ms']
+                    triangles += stats['triangles']
+                    reused += stats['reused']
+                if temporal:
+                    line += f" временная {sort_ms / num_frames:6.2f} мс (из прошлого кадра {reused / triangles:4.0%})"
+                else:
+                    line += f" radix {sort_ms / num_frames:6.2f} мс ({triangles // num_frames} треугольников),"
+            print(line)
+        cpp.unregister_mesh_cpp(handle)
+    finally:
+        cpp.cleanup_cpp_renderer()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--mesh': 'assets/Dragon_8K.obj', '--objects': '100', '--frames': '20', '--moving': '0,0.01,0.1,0.5'}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    run(options['--mesh'], int(options['--objects']), int(options['--frames']),
+        [float(fraction) for fraction in options['--moving'].split(',')])
@@ -9,9 +9,16 @@ import glm
 # from mesh import Mesh
 # Если mesh.py в подпапке 'meshes':
 from meshes.mesh import Mesh
+from meshes.mesh_registry import get_mesh_registry
+from classes.transform_store import (TransformStore, Vec3View, get_transform_store,
+                                     POSITION_OFFSET, ROTATION_OFFSET, SCALE_OFFSET)
 # Если структура проекта другая, скорректируй импорт.
 
 class GameObject:
+    # Трансформация хранится не в объекте, а в строке transform_row общего TransformStore сцены.
+    # Дочерние классы без своих __slots__ получают обычный __dict__ и могут добавлять атрибуты.
+    __slots__ = ('app', 'obj_filename', 'mesh', 'game_object_id', 'transform_store', 'transform_row')
+
     def __init__(self, 
                  app,  # Ссылка на главный класс приложения/движка (Engine)
                  obj_filename: str, # Имя .obj файла для загрузки меша
@@ -21,7 +28,11 @@ class GameObject:
                  scale: glm.vec3 = glm.vec3(1.0, 1.0, 1.0),
                  # Цвет по умолчанию для меша, если в .obj файле нет информации о цвете
                  # или если load_obj_file использует его как основной цвет.
-                 default_mesh_color: tuple = (0.8, 0.8, 0.8) # (R, G, B) от 0.0 до 1.0
+                 default_mesh_color: tuple = (0.8, 0.8, 0.8), # (R, G, B) от 0.0 до 1.0
+                 # True - не ждать загрузки: меш догружается в фоне и до этого объект не рендерится.
+                 async_load: bool = False,
+                 # Хранилище трансформаций сцены; None - общее хранилище по умолчанию.
+                 transform_store: TransformStore = None
                 ):
         """
         Конструктор GameObject.
@@ -32,23 +43,33 @@ class GameObject:
         :param rotation: Начальное вращение объекта в градусах (углы Эйлера Y, X, Z) (glm.vec3).
         :param scale: Начальный масштаб объекта (glm.vec3).
         :param default_mesh_color: Цвет по умолчанию для меша (кортеж RGB, 0.0-1.0).
+        :param async_load: Загружать меш в фоне (см. meshes.asset_loader); готовность - свойство is_loaded.
+        :param transform_store: TransformStore, в котором объект получит строку трансформации.
         """
         self.app = app  # Сохраняем ссылку на приложение/движок
         self.obj_filename = obj_filename # Имя файла модели
 
+        # --- Уникальный ID объекта ---
+        # Используется для кэширования в C++ рендерере.
+        # id(self) возвращает уникальный идентификатор объекта Python в памяти.
+        self.game_object_id = id(self)
+
         # --- Трансформации ---
-        # Храним как объекты glm.vec3 для удобства работы с ними
-        self.position = glm.vec3(position)
-        self.rotation = glm.vec3(rotation)  # Ожидается, что это углы в градусах
-        self.scale = glm.vec3(scale)
+        # Строка [pos.xyz, rot.xyz (градусы), scale.xyz] в TransformStore; position/rotation/scale -
+        # живые представления этой строки (Vec3View), запись в них сразу попадает в массив сцены.
+        self.transform_store = transform_store if transform_store is not None else get_transform_store()
+        self.transform_row = self.transform_store.allocate(self, position, rotation, scale,
+                                                           object_id=self.game_object_id)
 
         # --- Меш ---
-        # Создаем экземпляр меша для этого объекта.
+        # Меш берется из общего реестра: одинаковые .obj загружаются один раз,
+        # и все объекты разделяют один read-only буфер вершин.
         # Mesh отвечает за загрузку данных вершин и их передачу в рендерер.
         try:
-            self.mesh = Mesh(self.app, 
-                             obj_filename=self.obj_filename, 
-                             default_color_tuple=default_mesh_color)
+            acquire = get_mesh_registry().acquire_async if async_load else get_mesh_registry().acquire
+            self.mesh = acquire(self.app,
+                                obj_filename=self.obj_filename,
+                                default_color=default_mesh_color)
         except Exception as e:
             print(f"Error creating Mesh for GameObject ('{obj_filename}'): {e}")
             # В случае ошибки создания меша, можно присвоить None или "пустой" меш,
@@ -57,11 +78,6 @@ class GameObject:
             # Или можно перебросить исключение, если объект критичен:
             # raise
 
-        # --- Уникальный ID объекта ---
-        # Используется для кэширования в C++ рендерере.
-        # id(self) возвращает уникальный идентификатор объекта Python в памяти.
-        self.game_object_id = id(self)
-
         # --- Пользовательская инициализация ---
         # Вызываем метод start() для дополнительной настройки, специфичной для этого GameObject.
         # Этот метод может быть переопределен в дочерних классах.
@@ -71,6 +87,41 @@ class GameObject:
             print(f"GameObject '{obj_filename}' could not execute start() due to mesh creation failure.")
 
 
+    @property
+    def position(self) -> Vec3View:
+        return Vec3View(self, POSITION_OFFSET)
+
+    @position.setter
+    def position(self, value):
+        self.transform_store.set_vec3(self.transform_row, POSITION_OFFSET, value)
+
+    @property
+    def rotation(self) -> Vec3View:
+        """Углы Эйлера в градусах (Y, X, Z)."""
+        return Vec3View(self, ROTATION_OFFSET)
+
+    @rotation.setter
+    def rotation(self, value):
+        self.transform_store.set_vec3(self.transform_row, ROTATION_OFFSET, value)
+
+    @property
+    def scale(self) -> Vec3View:
+        return Vec3View(self, SCALE_OFFSET)
+
+    @scale.setter
+    def scale(self, value):
+        self.transform_store.set_vec3(self.transform_row, SCALE_OFFSET, value)
+
+    @property
+    def transform_params(self):
+        """Строка трансформации (view формы (9,) float32) в формате C++ transform_params."""
+        return self.transform_store.array[self.transform_row]
+
+    @property
+    def is_loaded(self) -> bool:
+        """True, когда данные меша загружены (для async_load - после обработки фоновой загрузки)."""
+        return self.mesh is not None and self.mesh.is_loaded
+
     def start(self):
         """
         Метод для пользовательской инициализации объекта.
@@ -117,6 +168,18 @@ class GameObject:
             # print(f"GameObject '{self.obj_filename}' has no mesh to render.")
 
 
+    def destroy(self):
+        """
+        Освобождает ссылку на общий меш в реестре и строку в TransformStore.
+        Вызывать при удалении объекта из сцены; после этого объект не рендерится.
+        """
+        if self.mesh:
+            get_mesh_registry().release(self.mesh)
+            self.mesh = None
+        if self.transform_row is not None:
+            self.transform_store.free(self.transform_row)
+            self.transform_row = None
+
     # --- Дополнительные полезные методы (примеры) ---
 
     def set_position(self, x: float, y: float, z: float):
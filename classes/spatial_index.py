@@ -0,0 +1,183 @@
+# classes/spatial_index.py
+"""
+Пространственный индекс объектов сцены для отсечения по пирамиде видимости.
+
+Равномерная "рыхлая" сетка: объект попадает в ячейку по центру своего мирового AABB,
+а границы ячейки - объединение AABB ее объектов (поэтому объект, торчащий из ячейки, не теряется).
+Индекс обновляется инкрементально по флагам изменений TransformStore: пересчитываются только
+измененные строки (векторно), и только затронутые ячейки. Запрос сначала отсекает ячейки,
+затем проверяет объекты частично видимых ячеек.
+"""
+import numpy as np
+
+from settings import SPATIAL_GRID_CELL_SIZE
+
+
+def frustum_planes(view_projection) -> np.ndarray:
+    """
+    (6, 4) плоскости пирамиды (a, b, c, d), точка p внутри, если a*x + b*y + c*z + d >= 0 для всех.
+    view_projection - glm.mat4 (projection * view) или ndarray 4x4 в обычной (строчной) записи.
+    Плоскости совпадают с отсечением в C++: -w <= x, y, z <= w.
+    """
+    m = np.asarray(view_projection, dtype=np.float64).reshape(4, 4)
+    row_x, row_y, row_z, row_w = m
+    return np.array([row_w + row_x, row_w - row_x,   # Left, Right
+                     row_w + row_y, row_w - row_y,   # Bottom, Top
+                     row_w + row_z, row_w - row_z])  # Near, Far
+
+
+def classify_aabbs(bounds: np.ndarray, planes: np.ndarray) -> tuple:
+    """Для (K, 6) AABB [min.xyz, max.xyz] возвращает маски (outside, inside) относительно planes."""
+    centers = (bounds[:, :3] + bounds[:, 3:]) * 0.5
+    extents = (bounds[:, 3:] - bounds[:, :3]) * 0.5
+    distances = centers @ planes[:, :3].T + planes[:, 3]
+    radii = extents @ np.abs(planes[:, :3]).T
+    outside = np.any(distances + radii < 0.0, axis=1)
+    inside = np.all(distances - radii >= 0.0, axis=1)
+    return outside, inside
+
+
+def model_matrices_3x3(transforms: np.ndarray) -> np.ndarray:
+    """
+    (K, 3, 3) линейная часть матриц модели для строк TransformStore (K, 9) -
+    тот же порядок, что build_model_matrix_internal_cpp: Ry * Rx * Rz * Scale, углы в градусах.
+    """
+    angles = np.radians(transforms[:, 3:6].astype(np.float64))
+    sx, sy, sz = np.sin(angles).T
+    cx, cy, cz = np.cos(angles).T
+    zeros, ones = np.zeros_like(sx), np.ones_like(sx)
+    rot_y = np.stack([cy, zeros, sy, zeros, ones, zeros, -sy, zeros, cy], axis=1).reshape(-1, 3, 3)
+    rot_x = np.stack([ones, zeros, zeros, zeros, cx, -sx, zeros, sx, cx], axis=1).reshape(-1, 3, 3)
+    rot_z = np.stack([cz, -sz, zeros, sz, cz, zeros, zeros, zeros, ones], axis=1).reshape(-1, 3, 3)
+    return rot_y @ rot_x @ rot_z * transforms[:, None, 6:9].astype(np.float64)
+
+
+def transform_aabbs(local_bounds: np.ndarray, transforms: np.ndarray) -> np.ndarray:
+    """Мировые AABB (K, 6) для локальных AABB (K, 6) и строк трансформаций (K, 9)."""
+    linear = model_matrices_3x3(transforms)
+    centers = (local_bounds[:, :3] + local_bounds[:, 3:]) * 0.5
+    extents = (local_bounds[:, 3:] - local_bounds[:, :3]) * 0.5
+    world_centers = np.einsum('kij,kj->ki', linear, centers) + transforms[:, 0:3]
+    world_extents = np.einsum('kij,kj->ki', np.abs(linear), extents)
+    return np.hstack((world_centers - world_extents, world_centers + world_extents)).astype(np.float32)
+
+
+class SceneSpatialIndex:
+    def __init__(self, transform_store, cell_size: float = None):
+        self.transform_store = transform_store
+        self.cell_size = float(SPATIAL_GRID_CELL_SIZE if cell_size is None else cell_size)
+        self._size = 0
+        self._world_bounds = np.zeros((0, 6), dtype=np.float32)
+        self._row_cells = []        # row -> ключ ячейки или None (меш не загружен/пуст)
+        self._cells = {}            # ключ (ix, iy, iz) -> set(rows)
+        self._cell_bounds = {}      # ключ -> (6,) объединение AABB объектов ячейки
+        self._pending = set()       # строки, у мешей которых еще нет границ (фоновая загрузка)
+        self._cell_arrays = None    # (bounds (C, 6), [rows]) для запросов; None - пересобрать
+        self.last_query_stats = {'objects': 0, 'visible': 0, 'cells': 0, 'visible_cells': 0}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def sync(self):
+        """
+        Применяет изменения TransformStore: новые/удаленные/измененные строки.
+        Забирает (сбрасывает) флаги изменений хранилища.
+        """
+        store = self.transform_store
+        size = len(store)
+        touched_cells = set()
+        for row in range(size, self._size): # Хранилище уплотнилось - хвостовые строки исчезли
+            self._unlink_row(row, touched_cells)
+            self._pending.discard(row)
+        del self._row_cells[size:]
+        self._row_cells.extend([None] * (size - len(self._row_cells)))
+        if size != self._world_bounds.shape[0]:
+            world_bounds = np.full((size, 6), np.nan, dtype=np.float32)
+            keep = min(size, self._world_bounds.shape[0])
+            world_bounds[:keep] = self._world_bounds[:keep]
+            self._world_bounds = world_bounds
+
+        rows = set(store.dirty_rows().tolist()) | set(range(self._size, size)) | self._pending
+        store.clear_dirty()
+        self._size = size
+        if rows:
+            self._update_rows(np.array(sorted(rows), dtype=np.int64), touched_cells)
+        for key in touched_cells:
+            self._refresh_cell(key)
+        if touched_cells:
+            self._cell_arrays = None
+
+    def query_frustum(self, view_projection) -> np.ndarray:
+        """Номера строк TransformStore (по возрастанию), чьи AABB пересекают пирамиду видимости."""
+        if self._cell_arrays is None:
+            keys = list(self._cells)
+            bounds = np.array([self._cell_bounds[key] for key in keys], dtype=np.float32).reshape(-1, 6)
+            members = [np.fromiter(self._cells[key], dtype=np.int64) for key in keys]
+            self._cell_arrays = (bounds, members)
+        cell_bounds, cell_members = self._cell_arrays
+        planes = frustum_planes(view_projection)
+        visible = []
+        num_visible_cells = 0
+        if len(cell_members):
+            outside, inside = classify_aabbs(cell_bounds, planes)
+            partial_rows = []
+            for index in np.flatnonzero(~outside):
+                (visible if inside[index] else partial_rows).append(cell_members[index])
+            num_visible_cells = int(np.count_nonzero(~outside))
+            if partial_rows:
+                candidates = np.concatenate(partial_rows)
+                object_outside, _ = classify_aabbs(self._world_bounds[candidates], planes)
+                visible.append(candidates[~object_outside])
+        rows = np.sort(np.concatenate(visible)) if visible else np.zeros(0, dtype=np.int64)
+        self.last_query_stats = {'objects': self._size, 'visible': int(rows.size),
+                                 'cells': len(cell_members), 'visible_cells': num_visible_cells}
+        return rows
+
+    def world_bounds(self, row: int) -> np.ndarray:
+        """Мировой AABB строки (NaN, если меш еще не загружен)."""
+        return self._world_bounds[row]
+
+    def _update_rows(self, rows: np.ndarray, touched_cells: set):
+        objects = self.transform_store.objects
+        local_bounds = np.full((len(rows), 6), np.nan, dtype=np.float32)
+        for i, row in enumerate(rows.tolist()):
+            mesh = objects[row].mesh
+            bounds = mesh.local_bounds if mesh is not None else None
+            if bounds is None:
+                self._pending.add(row)
+                self._unlink_row(row, touched_cells)
+            else:
+                self._pending.discard(row)
+                local_bounds[i] = bounds
+        known = ~np.isnan(local_bounds[:, 0])
+        self._world_bounds[rows[~known]] = np.nan
+        rows, local_bounds = rows[known], local_bounds[known]
+        if rows.size == 0:
+            return
+        world_bounds = transform_aabbs(local_bounds, self.transform_store.array[rows])
+        self._world_bounds[rows] = world_bounds
+        cell_coords = np.floor((world_bounds[:, :3] + world_bounds[:, 3:]) * (0.5 / self.cell_size)).astype(np.int64)
+        for row, key in zip(rows.tolist(), map(tuple, cell_coords.tolist())):
+            old_key = self._row_cells[row]
+            if old_key != key:
+                self._unlink_row(row, touched_cells)
+                self._cells.setdefault(key, set()).add(row)
+                self._row_cells[row] = key
+            touched_cells.add(key)
+
+    def _unlink_row(self, row: int, touched_cells: set):
+        key = self._row_cells[row] if row < len(self._row_cells) else None
+        if key is None:
+            return
+        self._cells[key].discard(row)
+        self._row_cells[row] = None
+        touched_cells.add(key)
+
+    def _refresh_cell(self, key):
+        members = self._cells.get(key)
+        if not members:
+            self._cells.pop(key, None)
+            self._cell_bounds.pop(key, None)
+            return
+        bounds = self._world_bounds[np.fromiter(members, dtype=np.int64)]
+        self._cell_bounds[key] = np.concatenate((bounds[:, :3].min(axis=0), bounds[:, 3:].max(axis=0)))
@@ -0,0 +1,235 @@
+# classes/transform_store.py
+"""
+Хранилище трансформаций объектов сцены в виде структуры массивов (SoA).
+
+Все трансформации лежат в одном float32 массиве (N, 9): [pos.xyz, rot.xyz (градусы), scale.xyz] -
+тот же формат, что принимают process_and_accumulate_object_cpp и submit_batch_cpp, поэтому массив
+уходит в C++ без упаковки по объектам. GameObject хранит только номер своей строки.
+Массовые изменения (сдвинуть 10k объектов) - одна векторная операция над positions/rotations/scales.
+Строки плотные: при освобождении последняя строка переезжает на место удаленной,
+а ее владельцу сообщается новый номер (атрибут transform_row).
+Рядом хранится текущий уровень детализации объекта (lod_levels, см. meshes.mesh_lod): выбор уровня
+с гистерезисом зависит от уровня в прошлом кадре.
+"""
+import glm
+import numpy as np
+
+TRANSFORM_WIDTH = 9
+POSITION_OFFSET = 0
+ROTATION_OFFSET = 3
+SCALE_OFFSET = 6
+
+
+class TransformStore:
+    def __init__(self, capacity: int = 64):
+        capacity = max(1, capacity)
+        self._data = np.zeros((capacity, TRANSFORM_WIDTH), dtype=np.float32)
+        self._object_ids = np.zeros(capacity, dtype=np.uint64)
+        self._dirty = np.zeros(capacity, dtype=bool)
+        self._lod_levels = np.zeros(capacity, dtype=np.int8)
+        self._owners = []  # row -> владелец строки (объект с атрибутом transform_row)
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def allocate(self, owner, position, rotation, scale, object_id: int = None) -> int:
+        """Добавляет строку для owner и возвращает ее номер. object_id по умолчанию - id(owner)."""
+        row = len(self._owners)
+        if row == self._data.shape[0]:
+            self._grow(row * 2)
+        self._data[row] = (*position, *rotation, *scale)
+        self._object_ids[row] = id(owner) if object_id is None else object_id
+        self._dirty[row] = True
+        self._lod_levels[row] = 0
+        self._owners.append(owner)
+        return row
+
+    def free(self, row: int):
+        """Освобождает строку; последняя строка переезжает на ее место (владелец получает новый transform_row)."""
+        last = len(self._owners) - 1
+        if row < 0 or row > last:
+            raise IndexError(f"TransformStore: row {row} is out of range (size {last + 1}).")
+        if row != last:
+            self._data[row] = self._data[last]
+            self._object_ids[row] = self._object_ids[last]
+            self._lod_levels[row] = self._lod_levels[last]
+            self._dirty[row] = True
+            moved = self._owners[last]
+            self._owners[row] = moved
+            moved.transform_row = row
+        self._owners.pop()
+        self._dirty[last] = False
+
+    # --- Плотные представления живых строк (views, без копирования) ---
+
+    @property
+    def array(self) -> np.ndarray:
+        """(N, 9) float32 трансформации всех объектов; можно передавать в C++ напрямую."""
+        return self._data[:len(self._owners)]
+
+    @property
+    def object_ids(self) -> np.ndarray:
+        return self._object_ids[:len(self._owners)]
+
+    @property
+    def lod_levels(self) -> np.ndarray:
+        """(N,) int8 уровни детализации, выбранные рендерером в прошлом кадре (0 - исходный меш)."""
+        return self._lod_levels[:len(self._owners)]
+
+    @property
+    def objects(self) -> list:
+        """Владельцы строк в порядке строк (не изменять)."""
+        return self._owners
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.array[:, POSITION_OFFSET:POSITION_OFFSET + 3]
+
+    @property
+    def rotations(self) -> np.ndarray:
+        return self.array[:, ROTATION_OFFSET:ROTATION_OFFSET + 3]
+
+    @property
+    def scales(self) -> np.ndarray:
+        return self.array[:, SCALE_OFFSET:SCALE_OFFSET + 3]
+
+    def translate(self, delta, rows=None):
+        """Сдвигает объекты (все или rows) на delta одной векторной операцией."""
+        positions = self.positions
+        if rows is None:
+            positions += np.asarray(delta, dtype=np.float32)
+        else:
+            positions[rows] += np.asarray(delta, dtype=np.float32)
+        self.mark_dirty(rows)
+
+    # --- Доступ к одной строке ---
+
+    def get_vec3(self, row: int, offset: int) -> glm.vec3:
+        return glm.vec3(self._data[row, offset:offset + 3])
+
+    def set_vec3(self, row: int, offset: int, value):
+        self._data[row, offset:offset + 3] = tuple(value)
+        self._dirty[row] = True
+
+    # --- Флаги изменений ---
+
+    def mark_dirty(self, rows=None):
+        """Помечает строки измененными (после прямой записи в array/positions/...). None - все строки."""
+        if rows is None:
+            self._dirty[:len(self._owners)] = True
+        else:
+            self._dirty[rows] = True
+
+    def dirty_rows(self) -> np.ndarray:
+        """Номера строк, измененных после последнего clear_dirty()."""
+        return np.flatnonzero(self._dirty[:len(self._owners)])
+
+    def clear_dirty(self):
+        self._dirty[:] = False
+
+    def _grow(self, capacity: int):
+        size = len(self._owners)
+        data = np.zeros((capacity, TRANSFORM_WIDTH), dtype=np.float32)
+        data[:size] = self._data[:size]
+        object_ids = np.zeros(capacity, dtype=np.uint64)
+        object_ids[:size] = self._object_ids[:size]
+        dirty = np.zeros(capacity, dtype=bool)
+        dirty[:size] = self._dirty[:size]
+        lod_levels = np.zeros(capacity, dtype=np.int8)
+        lod_levels[:size] = self._lod_levels[:size]
+        self._data, self._object_ids, self._dirty, self._lod_levels = data, object_ids, dirty, lod_levels
+
+
+class Vec3View:
+    """
+    Живое представление position/rotation/scale объекта: чтение и запись идут прямо в строку
+    TransformStore (obj.position.z += 1 работает как с glm.vec3). Арифметика возвращает glm.vec3.
+    """
+    __slots__ = ('_owner', '_offset')
+
+    def __init__(self, owner, offset: int):
+        self._owner = owner
+        self._offset = offset
+
+    def _row(self) -> np.ndarray:
+        owner = self._owner
+        return owner.transform_store._data[owner.transform_row, self._offset:self._offset + 3]
+
+    def _set(self, index: int, value: float):
+        owner = self._owner
+        owner.transform_store._data[owner.transform_row, self._offset + index] = value
+        owner.transform_store._dirty[owner.transform_row] = True
+
+    def to_glm(self) -> glm.vec3:
+        return glm.vec3(self._row())
+
+    x = property(lambda self: float(self._row()[0]), lambda self, v: self._set(0, v))
+    y = property(lambda self: float(self._row()[1]), lambda self, v: self._set(1, v))
+    z = property(lambda self: float(self._row()[2]), lambda self, v: self._set(2, v))
+
+    @property
+    def xyz(self) -> glm.vec3:
+        return self.to_glm()
+
+    @xyz.setter
+    def xyz(self, value):
+        owner = self._owner
+        owner.transform_store.set_vec3(owner.transform_row, self._offset, value)
+
+    def __len__(self) -> int:
+        return 3
+
+    def __iter__(self):
+        return iter(self._row().tolist())
+
+    def __getitem__(self, index: int) -> float:
+        return float(self._row()[index])
+
+    def __setitem__(self, index: int, value: float):
+        if not -3 <= index < 3:
+            raise IndexError("Vec3View index out of range")
+        self._set(index % 3, value)
+
+    def __eq__(self, other) -> bool:
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Vec3View{tuple(self)}"
+
+    def __neg__(self): return -self.to_glm()
+    def __add__(self, other): return self.to_glm() + _as_glm(other)
+    def __radd__(self, other): return _as_glm(other) + self.to_glm()
+    def __sub__(self, other): return self.to_glm() - _as_glm(other)
+    def __rsub__(self, other): return _as_glm(other) - self.to_glm()
+    def __mul__(self, other): return self.to_glm() * _as_glm(other)
+    def __rmul__(self, other): return _as_glm(other) * self.to_glm()
+    def __truediv__(self, other): return self.to_glm() / _as_glm(other)
+
+    def __iadd__(self, other):
+        self.xyz = self + other
+        return self
+
+    def __isub__(self, other):
+        self.xyz = self - other
+        return self
+
+    def __imul__(self, other):
+        self.xyz = self * other
+        return self
+
+
+def _as_glm(value):
+    return value.to_glm() if isinstance(value, Vec3View) else value
+
+
+_DEFAULT_STORE = TransformStore()
+
+
+def get_transform_store() -> TransformStore:
+    """Хранилище по умолчанию для GameObject, созданных без явного transform_store."""
+    return _DEFAULT_STORE
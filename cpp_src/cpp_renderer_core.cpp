@@ -17,7 +17,12 @@
 #include <map> 
 #include <mutex>
 #include <memory>
+#include <atomic>
 #include <stdexcept> 
+#include <exception>
+#include <limits>
+#include <cstring>
+#include <chrono>
 #include <string>    
 #include <iostream> // Для std::cerr
 #include <unordered_map> // For UI elements
@@ -43,6 +48,9 @@
 #include "../vendor/glm/gtx/norm.hpp"
 #include "../vendor/glm/gtx/hash.hpp"
 
+#include "obj_loader_cpp.hpp"
+#include "simd_transform_cpp.hpp"
+
 namespace py = pybind11;
 
 // --- SDL Global Variables ---
@@ -145,15 +153,28 @@ struct CppClipVertex {
     glm::vec3 world_pos;
     bool is_original;
 
+    CppClipVertex() = default;
     CppClipVertex(const glm::vec4& pc, const glm::vec3& c, float vz, const glm::vec3& wp, bool io) :
         position_clip(pc), color_f(c), view_z(vz), world_pos(wp), is_original(io) {}
 };
 
+// Convex polygon being clipped, on the stack: each plane adds at most one vertex, so a triangle clipped
+// by the six frustum planes has at most 9.
+constexpr int CLIP_POLYGON_MAX_VERTICES = 9;
+struct CppClipPolygon {
+    std::array<CppClipVertex, CLIP_POLYGON_MAX_VERTICES> vertices;
+    int size = 0;
+};
+
 struct CppScreenTriangle {
     std::array<std::array<float, 2>, 3> screen_coords; 
     float depth;
+    std::array<float, 3> inv_w;                       // 1 / clip w per vertex: depth for the software rasterizer
     std::array<unsigned char, 3> color_final_uint8;   
+    uint32_t source;                                  // Source triangle * SCREEN_TRIANGLE_FAN_SLOTS + clipping fan piece
 };
+// Fan pieces of a clipped triangle: at most CLIP_POLYGON_MAX_VERTICES - 2 = 7.
+constexpr uint32_t SCREEN_TRIANGLE_FAN_SLOTS = 8;
 
 struct CppWorldDataL2 {
     std::vector<float> world_vertices_flat;
@@ -189,57 +210,102 @@ namespace std {
     };
 } 
 
-class LruCacheL2Internal {
+// Bytes one cached value keeps alive, heap buffers included (capacity, not size: that is what is allocated).
+inline size_t cache_value_bytes_internal_cpp(const CppWorldDataL2& data) {
+    return sizeof(CppWorldDataL2) +
+           (data.world_vertices_flat.capacity() + data.world_face_normals_flat.capacity() +
+            data.vertex_colors_flat.capacity()) * sizeof(float);
+}
+
+inline size_t cache_value_bytes_internal_cpp(const std::vector<CppScreenTriangle>& triangles) {
+    return sizeof(triangles) + triangles.capacity() * sizeof(CppScreenTriangle);
+}
+
+struct CppCacheStats {
+    size_t entries = 0;
+    size_t bytes = 0;        // Values plus per-entry bookkeeping (ENTRY_OVERHEAD_BYTES)
+    size_t budget_bytes = 0;
+    uint64_t hits = 0;
+    uint64_t misses = 0;
+    uint64_t insertions = 0;
+    uint64_t evictions = 0;  // Entries dropped to stay within the budget (clear() is not counted)
+    double saved_ms = 0.0;   // Sum over hits of the time it took to build the value that was hit
+};
+
+// LRU cache bounded by the bytes of its entries rather than their number: one L2 entry of a map holds megabytes,
+// one of a cube a few hundred bytes. Budget 0 disables caching; a value larger than the whole budget is not cached.
+// Every entry remembers how long its value took to build, so a hit can be credited with the time it saved.
+template <typename Key, typename Value>
+class LruCacheInternal {
 public:
-    LruCacheL2Internal() : capacity_(0) {} 
-    void set_capacity(size_t capacity) {
+    void set_budget_bytes(size_t budget_bytes) {
         std::lock_guard<std::mutex> lock(cache_mutex_);
-        capacity_ = capacity > 0 ? capacity : 1; 
-        while (items_map_.size() > capacity_) { evict_oldest_nolock(); }
+        budget_bytes_ = budget_bytes;
+        while (bytes_ > budget_bytes_) { evict_oldest_nolock(); }
     }
-    size_t get_capacity() const { std::lock_guard<std::mutex> lock(cache_mutex_); return capacity_; }
-    void clear() { std::lock_guard<std::mutex> lock(cache_mutex_); items_map_.clear(); lru_list_.clear(); }
-    std::shared_ptr<const CppWorldDataL2> get(const CacheKeyL2& key) {
+    size_t get_budget_bytes() const { std::lock_guard<std::mutex> lock(cache_mutex_); return budget_bytes_; }
+    void clear() { std::lock_guard<std::mutex> lock(cache_mutex_); items_map_.clear(); lru_list_.clear(); bytes_ = 0; }
+    std::shared_ptr<const Value> get(const Key& key) {
         std::lock_guard<std::mutex> lock(cache_mutex_);
         auto it = items_map_.find(key);
-        if (it == items_map_.end()) { return nullptr; }
-        lru_list_.erase(it->second.lru_iterator);
-        lru_list_.push_front(key);
-        it->second.lru_iterator = lru_list_.begin();
+        if (it == items_map_.end()) { ++stats_.misses; return nullptr; }
+        ++stats_.hits;
+        stats_.saved_ms += it->second.build_ms;
+        lru_list_.splice(lru_list_.begin(), lru_list_, it->second.lru_iterator);
         return it->second.data_ptr;
     }
-    void put(const CacheKeyL2& key, CppWorldDataL2 data_to_cache) {
-        if (capacity_ == 0) return; 
+    void put(const Key& key, std::shared_ptr<const Value> data_ptr, double build_ms) {
+        const size_t entry_bytes = cache_value_bytes_internal_cpp(*data_ptr) + ENTRY_OVERHEAD_BYTES;
         std::lock_guard<std::mutex> lock(cache_mutex_);
-        auto data_ptr = std::make_shared<CppWorldDataL2>(std::move(data_to_cache));
         auto it = items_map_.find(key);
-        if (it != items_map_.end()) { 
-            lru_list_.erase(it->second.lru_iterator); 
-            it->second.data_ptr = data_ptr;          
-            lru_list_.push_front(key);               
-            it->second.lru_iterator = lru_list_.begin(); 
-        } else { 
-            if (items_map_.size() >= capacity_) { evict_oldest_nolock(); }
-            lru_list_.push_front(key);
-            items_map_.emplace(key, CacheEntry{data_ptr, lru_list_.begin()});
-        }
+        if (it != items_map_.end()) { erase_nolock(it); }
+        if (entry_bytes > budget_bytes_) return;
+        while (bytes_ + entry_bytes > budget_bytes_) { evict_oldest_nolock(); }
+        lru_list_.push_front(key);
+        items_map_.emplace(key, CacheEntry{std::move(data_ptr), lru_list_.begin(), entry_bytes, build_ms});
+        bytes_ += entry_bytes;
+        ++stats_.insertions;
     }
+    CppCacheStats get_stats() const {
+        std::lock_guard<std::mutex> lock(cache_mutex_);
+        CppCacheStats stats = stats_;
+        stats.entries = items_map_.size();
+        stats.bytes = bytes_;
+        stats.budget_bytes = budget_bytes_;
+        return stats;
+    }
+    // Zeroes the counters; the entries stay.
+    void reset_stats() { std::lock_guard<std::mutex> lock(cache_mutex_); stats_ = CppCacheStats(); }
 private:
     struct CacheEntry {
-        std::shared_ptr<CppWorldDataL2> data_ptr;
-        std::list<CacheKeyL2>::iterator lru_iterator;
+        std::shared_ptr<const Value> data_ptr;
+        typename std::list<Key>::iterator lru_iterator;
+        size_t entry_bytes;
+        double build_ms;
     };
+    using ItemsMap = std::unordered_map<Key, CacheEntry>;
+    // The key in the LRU list and in the hash map node, the entry, list and map node links, shared_ptr control block.
+    static constexpr size_t ENTRY_OVERHEAD_BYTES = 2 * sizeof(Key) + sizeof(CacheEntry) + 8 * sizeof(void*);
+
+    void erase_nolock(typename ItemsMap::iterator it) {
+        bytes_ -= it->second.entry_bytes;
+        lru_list_.erase(it->second.lru_iterator);
+        items_map_.erase(it);
+    }
     void evict_oldest_nolock() {
         if (lru_list_.empty()) return;
-        CacheKeyL2 oldest_key = lru_list_.back();
-        lru_list_.pop_back();
-        items_map_.erase(oldest_key);
-    }
-    size_t capacity_;
-    std::list<CacheKeyL2> lru_list_;
-    std::unordered_map<CacheKeyL2, CacheEntry> items_map_;
-    mutable std::mutex cache_mutex_; 
+        erase_nolock(items_map_.find(lru_list_.back()));
+        ++stats_.evictions;
+    }
+    size_t budget_bytes_ = 0;
+    size_t bytes_ = 0;
+    CppCacheStats stats_; // Counters only: entries, bytes and budget are filled in by get_stats()
+    std::list<Key> lru_list_;
+    ItemsMap items_map_;
+    mutable std::mutex cache_mutex_;
 };
+
+using LruCacheL2Internal = LruCacheInternal<CacheKeyL2, CppWorldDataL2>;
 static LruCacheL2Internal global_l2_cache_cpp_instance;
 
 struct CacheKeyL1 {
@@ -251,8 +317,10 @@ struct CacheKeyL1 {
     bool back_cull_enabled;
     bool clipping_enabled; 
     bool debug_clipping_enabled;
+    float guard_band;
     std::array<unsigned char, 3> debug_clipped_color; 
     float small_tri_area_threshold;
+    std::size_t occlusion_hash; // Occluders the clusters were culled against (0 - no occlusion culling)
 
     bool operator==(const CacheKeyL1& other) const {
         return object_id == other.object_id &&
@@ -263,8 +331,10 @@ struct CacheKeyL1 {
                back_cull_enabled == other.back_cull_enabled &&
                clipping_enabled == other.clipping_enabled &&
                debug_clipping_enabled == other.debug_clipping_enabled &&
+               guard_band == other.guard_band &&
                debug_clipped_color == other.debug_clipped_color &&
-               small_tri_area_threshold == other.small_tri_area_threshold;
+               small_tri_area_threshold == other.small_tri_area_threshold &&
+               occlusion_hash == other.occlusion_hash;
     }
 };
 namespace std {
@@ -280,70 +350,77 @@ namespace std {
             seed ^= hash<bool>{}(k.back_cull_enabled) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
             seed ^= hash<bool>{}(k.clipping_enabled) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
             seed ^= hash<bool>{}(k.debug_clipping_enabled) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
+            seed ^= hash<float>{}(k.guard_band) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
             for(int i=0; i<3; ++i) {
                 seed ^= hash<unsigned char>{}(k.debug_clipped_color[i]) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
             }
             seed ^= hash<float>{}(k.small_tri_area_threshold) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
+            seed ^= k.occlusion_hash + 0x9e3779b9 + (seed << 6) + (seed >> 2);
             return seed;
         }
     };
 } 
-class LruCacheL1Internal {
-public:
-    LruCacheL1Internal() : capacity_(0) {}
-    void set_capacity(size_t capacity) {
-        std::lock_guard<std::mutex> lock(cache_mutex_);
-        capacity_ = capacity > 0 ? capacity : 1;
-        while (items_map_.size() > capacity_) { evict_oldest_nolock(); }
-    }
-    size_t get_capacity() const { std::lock_guard<std::mutex> lock(cache_mutex_); return capacity_; }
-    void clear() { std::lock_guard<std::mutex> lock(cache_mutex_); items_map_.clear(); lru_list_.clear(); }
-    std::shared_ptr<const std::vector<CppScreenTriangle>> get(const CacheKeyL1& key) {
-        std::lock_guard<std::mutex> lock(cache_mutex_);
-        auto it = items_map_.find(key);
-        if (it == items_map_.end()) { return nullptr; }
-        lru_list_.erase(it->second.lru_iterator);
-        lru_list_.push_front(key);
-        it->second.lru_iterator = lru_list_.begin();
-        return it->second.data_ptr;
-    }
-    void put(const CacheKeyL1& key, std::vector<CppScreenTriangle> data_to_cache) {
-        if (capacity_ == 0) return;
-        std::lock_guard<std::mutex> lock(cache_mutex_);
-        auto data_ptr = std::make_shared<const std::vector<CppScreenTriangle>>(std::move(data_to_cache));
-        auto it = items_map_.find(key);
-        if (it != items_map_.end()) {
-            lru_list_.erase(it->second.lru_iterator);
-            it->second.data_ptr = data_ptr;
-            lru_list_.push_front(key);
-            it->second.lru_iterator = lru_list_.begin();
-        } else {
-            if (items_map_.size() >= capacity_) { evict_oldest_nolock(); }
-            lru_list_.push_front(key);
-            items_map_.emplace(key, CacheEntryL1{data_ptr, lru_list_.begin()});
-        }
-    }
-private:
-    struct CacheEntryL1 {
-        std::shared_ptr<const std::vector<CppScreenTriangle>> data_ptr;
-        std::list<CacheKeyL1>::iterator lru_iterator;
-    };
-    void evict_oldest_nolock() {
-        if (lru_list_.empty()) return;
-        CacheKeyL1 oldest_key = lru_list_.back();
-        lru_list_.pop_back();
-        items_map_.erase(oldest_key);
-    }
-    size_t capacity_;
-    std::list<CacheKeyL1> lru_list_;
-    std::unordered_map<CacheKeyL1, CacheEntryL1> items_map_;
-    mutable std::mutex cache_mutex_;
-};
+using LruCacheL1Internal = LruCacheInternal<CacheKeyL1, std::vector<CppScreenTriangle>>;
 static LruCacheL1Internal global_l1_cache_cpp_instance;
 
 // --- Global Frame Data & Parameters ---
 static std::vector<CppScreenTriangle> global_frame_triangles_cpp_;
+struct CppFrameSegment { // Triangles of one submitted object, consecutive in global_frame_triangles_cpp_
+    uint64_t object_id;
+    std::shared_ptr<const std::vector<CppScreenTriangle>> triangles; // L1 cache entry: same pointer - same triangles
+    std::array<float, 9> transform; // pos, rot, scale: same transform and other triangles - only the camera moved
+
+    CppFrameSegment(uint64_t id, std::shared_ptr<const std::vector<CppScreenTriangle>> tris, const float* tp_ptr)
+        : object_id(id), triangles(std::move(tris)) { std::copy(tp_ptr, tp_ptr + 9, transform.begin()); }
+};
+static std::vector<CppFrameSegment> global_frame_segments_cpp_; // In order; used by the temporal depth sort
 static std::mutex global_frame_triangles_mutex_; 
+
+// Meshes registered for submit_batch_cpp. The NumPy arrays are kept alive (no copy);
+// the map is only touched with the GIL held.
+namespace {
+struct CppRegisteredMesh {
+    py::array_t<float, py::array::c_style | py::array::forcecast> vertices;
+    py::array_t<uint32_t, py::array::c_style | py::array::forcecast> indices; // Empty - triangle soup
+    bool indexed;
+    int vertex_data_stride;
+    bool use_vertex_normals;
+    // Optional BVH in mesh space (see meshes/mesh_bvh.py)
+    py::array_t<float, py::array::c_style | py::array::forcecast> bvh_bounds;      // (M, 6)
+    py::array_t<int32_t, py::array::c_style | py::array::forcecast> bvh_nodes;     // (M, 3) first, count, skip
+    py::array_t<uint32_t, py::array::c_style | py::array::forcecast> bvh_triangles; // (T,)
+    bool has_bvh;
+    // Optional clusters over bvh_triangles (see meshes/mesh_clusters.py)
+    py::array_t<int32_t, py::array::c_style | py::array::forcecast> cluster_ranges; // (K, 2) first, count
+    py::array_t<float, py::array::c_style | py::array::forcecast> cluster_cones;    // (K, 8) center, radius, axis, cos
+    bool has_clusters;
+    // Optional PVS of the clusters (see meshes/mesh_pvs.py)
+    py::array_t<float, py::array::c_style | py::array::forcecast> pvs_grid;          // (4,) origin, cell size
+    py::array_t<uint8_t, py::array::c_style | py::array::forcecast> pvs_visibility;  // (NX, NY, NZ, B) cluster bits
+    bool has_pvs;
+};
+} // namespace
+
+struct CppOcclusionBuffer;
+
+// Raw view of a mesh BVH (and its clusters, if any), usable without the GIL.
+struct CppMeshBvhView {
+    const float* bounds;
+    const int32_t* nodes;
+    const uint32_t* triangles;
+    size_t num_nodes;
+    size_t num_triangles;
+    const int32_t* cluster_ranges;
+    const float* cluster_cones;
+    size_t num_clusters;
+    const float* pvs_grid;           // nullptr - no PVS
+    const uint8_t* pvs_visibility;
+    int64_t pvs_dims[3];
+    size_t pvs_row_bytes;
+    const CppOcclusionBuffer* occlusion; // nullptr - no occlusion culling of the nodes
+};
+static std::unordered_map<int64_t, CppRegisteredMesh> g_registered_meshes_cpp;
+static int64_t g_next_mesh_handle_cpp = 1;
 static glm::mat4 g_current_view_matrix_cpp;
 static glm::mat4 g_current_projection_matrix_cpp;
 static glm::vec3 g_current_camera_pos_w_cpp;
@@ -351,6 +428,7 @@ static bool g_current_light_enabled_flag;
 static bool g_current_back_cull_enabled_flag;
 static bool g_current_clipping_enabled_flag; 
 static bool g_current_debug_clipping_enabled_flag;
+static float g_guard_band_cpp = 1.0f; // Side clip planes at x, y = +-g_guard_band_cpp * w (1 - the frustum itself)
 static std::array<unsigned char, 3> g_current_debug_clipped_color_arr_cpp;
 static bool g_current_sort_triangles_in_cpp_flag; 
 static float g_current_small_triangle_area_threshold;
@@ -384,70 +462,88 @@ float get_intersection_param_internal_cpp(const glm::vec4& v_start_pos_c, const
     return dist_start / (dist_start - dist_end); 
 }
 
-std::vector<CppClipVertex> clip_polygon_to_plane_internal_cpp(const std::vector<CppClipVertex>& polygon_in, const glm::vec4& plane_coeffs) {
-    std::vector<CppClipVertex> polygon_out; 
-    size_t num_vertices = polygon_in.size();
-    if (num_vertices == 0) return polygon_out;
-    polygon_out.reserve(num_vertices + 1); 
-
-    for (size_t i = 0; i < num_vertices; ++i) {
-        const CppClipVertex& current_v = polygon_in[i];
-        const CppClipVertex& prev_v = polygon_in[(i + num_vertices - 1) % num_vertices]; 
-        float dist_current = glm::dot(plane_coeffs, current_v.position_clip);
-        float dist_prev = glm::dot(plane_coeffs, prev_v.position_clip);
-        bool current_is_inside = dist_current >= -1e-7f; 
-        bool prev_is_inside = dist_prev >= -1e-7f;
+// Frustum planes in clip space (dot(plane, p) >= 0 inside), in the order of the outcode bits.
+static const std::array<glm::vec4, 6> FRUSTUM_PLANES_CLIP = {
+    glm::vec4(1.f, 0.f, 0.f, 1.f), glm::vec4(-1.f,0.f, 0.f, 1.f), // Left, Right
+    glm::vec4(0.f, 1.f, 0.f, 1.f), glm::vec4(0.f,-1.f, 0.f, 1.f), // Bottom, Top
+    glm::vec4(0.f, 0.f, 1.f, 1.f), glm::vec4(0.f, 0.f,-1.f, 1.f)  // Near, Far (for -w to w range)
+};
+constexpr float CLIP_INSIDE_EPSILON = -1e-7f;
+
+// Bit i is set when the point is outside FRUSTUM_PLANES_CLIP[i] (same tolerance as the clipper), with the
+// side planes moved out to x, y = +-guard_band * w.
+inline uint32_t clip_outcode_internal_cpp(const glm::vec4& p, float guard_band = 1.0f) {
+    const float side_w = p.w * guard_band;
+    return (p.x + side_w < CLIP_INSIDE_EPSILON ? 1u : 0u) | (side_w - p.x < CLIP_INSIDE_EPSILON ? 2u : 0u)
+         | (p.y + side_w < CLIP_INSIDE_EPSILON ? 4u : 0u) | (side_w - p.y < CLIP_INSIDE_EPSILON ? 8u : 0u)
+         | (p.z + p.w < CLIP_INSIDE_EPSILON ? 16u : 0u) | (p.w - p.z < CLIP_INSIDE_EPSILON ? 32u : 0u);
+}
 
+// Sutherland-Hodgman step: the part of polygon_in inside the plane, written to polygon_out.
+void clip_polygon_to_plane_internal_cpp(const CppClipPolygon& polygon_in, const glm::vec4& plane_coeffs,
+                                        CppClipPolygon& polygon_out) {
+    polygon_out.size = 0;
+    const int num_vertices = polygon_in.size;
+    if (num_vertices == 0) return;
+
+    auto emit_intersection = [&](const CppClipVertex& prev_v, const CppClipVertex& current_v) {
+        float t = get_intersection_param_internal_cpp(prev_v.position_clip, current_v.position_clip, plane_coeffs);
+        if (t >= 0.0f && t <= 1.0f && polygon_out.size < CLIP_POLYGON_MAX_VERTICES) {
+            polygon_out.vertices[polygon_out.size++] = CppClipVertex(
+                glm::mix(prev_v.position_clip, current_v.position_clip, t),
+                glm::mix(prev_v.color_f, current_v.color_f, t),
+                glm::mix(prev_v.view_z, current_v.view_z, t),
+                glm::mix(prev_v.world_pos, current_v.world_pos, t),
+                false);
+        }
+    };
+    const CppClipVertex* prev_v = &polygon_in.vertices[num_vertices - 1];
+    bool prev_is_inside = glm::dot(plane_coeffs, prev_v->position_clip) >= CLIP_INSIDE_EPSILON;
+    for (int i = 0; i < num_vertices; ++i) {
+        const CppClipVertex& current_v = polygon_in.vertices[i];
+        const bool current_is_inside = glm::dot(plane_coeffs, current_v.position_clip) >= CLIP_INSIDE_EPSILON;
         if (current_is_inside) {
-            if (!prev_is_inside) { 
-                float t = get_intersection_param_internal_cpp(prev_v.position_clip, current_v.position_clip, plane_coeffs);
-                if (t >= 0.0f && t <= 1.0f) { 
-                    polygon_out.emplace_back(
-                        glm::mix(prev_v.position_clip, current_v.position_clip, t),
-                        glm::mix(prev_v.color_f, current_v.color_f, t),
-                        glm::mix(prev_v.view_z, current_v.view_z, t),
-                        glm::mix(prev_v.world_pos, current_v.world_pos, t),
-                        false 
-                    );
-                }
-            }
-            polygon_out.push_back(current_v); 
-        } else if (prev_is_inside) { 
-            float t = get_intersection_param_internal_cpp(prev_v.position_clip, current_v.position_clip, plane_coeffs);
-            if (t >= 0.0f && t <= 1.0f) { 
-                 polygon_out.emplace_back(
-                    glm::mix(prev_v.position_clip, current_v.position_clip, t),
-                    glm::mix(prev_v.color_f, current_v.color_f, t),
-                    glm::mix(prev_v.view_z, current_v.view_z, t),
-                    glm::mix(prev_v.world_pos, current_v.world_pos, t),
-                    false
-                );
-            }
+            if (!prev_is_inside) emit_intersection(*prev_v, current_v);
+            if (polygon_out.size < CLIP_POLYGON_MAX_VERTICES) polygon_out.vertices[polygon_out.size++] = current_v;
+        } else if (prev_is_inside) {
+            emit_intersection(*prev_v, current_v);
         }
+        prev_v = &current_v;
+        prev_is_inside = current_is_inside;
     }
-    return polygon_out;
 }
 
-std::vector<std::vector<CppClipVertex>> clip_triangle_to_frustum_internal_cpp(
-    const std::vector<CppClipVertex>& triangle_clip_vertices_in, 
-    const std::vector<glm::vec4>& frustum_planes_coeffs
-) {
-    std::vector<std::vector<CppClipVertex>> final_triangulated_polygons;
-    if (triangle_clip_vertices_in.size() != 3) return final_triangulated_polygons; 
-    std::vector<CppClipVertex> polygon_to_clip = triangle_clip_vertices_in;
-    for (const auto& plane : frustum_planes_coeffs) {
-        polygon_to_clip = clip_polygon_to_plane_internal_cpp(polygon_to_clip, plane);
-        if (polygon_to_clip.size() < 3) { 
-            return final_triangulated_polygons; 
-        }
+// Clips the triangle in polygon (size 3) to the frustum in place; the result is a convex polygon to be
+// triangulated as a fan, or size < 3 if nothing is left. Outcodes skip the work for triangles fully inside
+// (unchanged) or fully outside one plane (rejected), and planes no vertex is outside of.
+// guard_band > 1 - guard-band clipping: triangles are still rejected against the frustum, but the side planes
+// are only clipped against at x, y = +-guard_band * w. Triangles crossing the screen edges inside that band are
+// drawn unclipped (the rasterizer discards off-screen pixels), so mostly only the near and far planes clip.
+void clip_triangle_to_frustum_internal_cpp(CppClipPolygon& polygon, float guard_band = 1.0f) {
+    const uint32_t code0 = clip_outcode_internal_cpp(polygon.vertices[0].position_clip);
+    const uint32_t code1 = clip_outcode_internal_cpp(polygon.vertices[1].position_clip);
+    const uint32_t code2 = clip_outcode_internal_cpp(polygon.vertices[2].position_clip);
+    if ((code0 | code1 | code2) == 0) return; // Trivial accept
+    if ((code0 & code1 & code2) != 0) { // Trivial reject
+        polygon.size = 0;
+        return;
     }
-    if (polygon_to_clip.size() >= 3) {
-        const CppClipVertex& anchor_vertex = polygon_to_clip[0];
-        for (size_t i = 1; i < polygon_to_clip.size() - 1; ++i) {
-            final_triangulated_polygons.push_back({anchor_vertex, polygon_to_clip[i], polygon_to_clip[i + 1]});
-        }
+    uint32_t planes_crossed = code0 | code1 | code2;
+    if (guard_band > 1.0f) {
+        planes_crossed = clip_outcode_internal_cpp(polygon.vertices[0].position_clip, guard_band)
+                       | clip_outcode_internal_cpp(polygon.vertices[1].position_clip, guard_band)
+                       | clip_outcode_internal_cpp(polygon.vertices[2].position_clip, guard_band);
+        if (planes_crossed == 0) return; // Inside the guard band
+    }
+    CppClipPolygon scratch;
+    for (int i_plane = 0; i_plane < 6; ++i_plane) {
+        if (!(planes_crossed & (1u << i_plane))) continue;
+        glm::vec4 plane = FRUSTUM_PLANES_CLIP[i_plane];
+        if (i_plane < 4) plane.w = guard_band;
+        clip_polygon_to_plane_internal_cpp(polygon, plane, scratch);
+        std::swap(polygon, scratch);
+        if (polygon.size < 3) return;
     }
-    return final_triangulated_polygons;
 }
 
 bool is_triangle_too_small_on_screen(const CppScreenTriangle& tri, float min_area_threshold) {
@@ -458,6 +554,917 @@ bool is_triangle_too_small_on_screen(const CppScreenTriangle& tri, float min_are
     return std::abs(area_doubled) * 0.5f < min_area_threshold;
 }
 
+// --- Occlusion Culling ---
+// Coarse software depth buffer (256x144 by default, see set_occlusion_parameters_cpp). submit_batch_cpp
+// rasterizes the nearest clusters of the batch's cluster meshes (maps) into it as occluders, then the BVH node
+// boxes of every object (cull_mesh_bvh_internal_cpp) are tested against a hierarchy of its farthest depths:
+// a box is occluded if its nearest point is behind the farthest occluder in its screen rectangle.
+// Depth is stored as 1/w (w - view depth): larger is nearer, 0 - empty, and 1/w is linear in screen space.
+// Occluders only write the buffer pixels they cover completely (see rasterize_triangles), so a gap between
+// occluders (or a hole in one), however narrow, is never filled in and the test stays conservative.
+struct CppOcclusionBuffer {
+    int width = 0;
+    int height = 0;
+    std::vector<std::vector<float>> levels;      // levels[0] - the buffer; level k - min (farthest) over 2x2 of level k - 1
+    std::vector<std::array<int, 2>> level_sizes;
+
+    void reset(int new_width, int new_height) {
+        width = std::max(1, new_width);
+        height = std::max(1, new_height);
+        levels.assign(1, std::vector<float>(static_cast<size_t>(width) * height, 0.0f));
+        level_sizes.assign(1, {width, height});
+    }
+
+    // Occluder triangles in clip space, in front of the near plane (w > 0). The buffer must be reset first.
+    // A pixel gets a depth if it is covered completely: by one triangle (the farthest value of its 1/w plane over
+    // the pixel square, so the stored depth never lies in front of the occluder), or, where only edges shared
+    // inside the occluder surface cross it, by the triangles along those edges (the smallest of their bounds).
+    // An edge is shared if exactly two triangles use it (vertices matched by their clip coordinates: a mesh vertex
+    // is transformed identically for both) and they lie on its opposite sides on screen; all other edges are
+    // boundary edges, and a pixel touched by one is left empty. So the seams inside a wall are filled, while a gap
+    // between occluders (or a hole in one), however narrow, is not.
+    void rasterize_triangles(const std::vector<std::array<glm::vec4, 3>>& triangles) {
+        struct Setup {
+            float sx[3], sy[3];
+            float sign, dzdx, dzdy, depth0, pixel_slack, min_inv_w;
+            float edge_slack[3];   // Half the sum of the absolute gradients of edge k (opposite vertex k)
+            bool boundary[3];
+            bool valid;
+        };
+        // Edge k of a triangle runs from vertex (k + 1) % 3 to (k + 2) % 3; its edge function is positive inside.
+        auto edge_value = [](const Setup& t, int k, float x, float y) {
+            const int a = (k + 1) % 3, b = (k + 2) % 3;
+            return ((t.sx[b] - t.sx[a]) * (y - t.sy[a]) - (t.sy[b] - t.sy[a]) * (x - t.sx[a])) * t.sign;
+        };
+        std::vector<Setup> setups(triangles.size());
+        for (size_t i = 0; i < triangles.size(); ++i) {
+            Setup& t = setups[i];
+            float inv_w[3];
+            for (int k = 0; k < 3; ++k) {
+                const glm::vec4& clip = triangles[i][k];
+                inv_w[k] = 1.0f / clip.w;
+                t.sx[k] = (clip.x * inv_w[k] + 1.0f) * 0.5f * static_cast<float>(width);
+                t.sy[k] = (1.0f - clip.y * inv_w[k]) * 0.5f * static_cast<float>(height);
+            }
+            const float area = (t.sx[1] - t.sx[0]) * (t.sy[2] - t.sy[0]) - (t.sy[1] - t.sy[0]) * (t.sx[2] - t.sx[0]);
+            t.valid = std::abs(area) >= 1e-12f;
+            if (!t.valid) continue;
+            // Plane of 1/w over the screen; a pixel square is at least its center value minus pixel_slack.
+            const float dz1 = inv_w[1] - inv_w[0], dz2 = inv_w[2] - inv_w[0];
+            t.dzdx = (dz1 * (t.sy[2] - t.sy[0]) - dz2 * (t.sy[1] - t.sy[0])) / area;
+            t.dzdy = (dz2 * (t.sx[1] - t.sx[0]) - dz1 * (t.sx[2] - t.sx[0])) / area;
+            t.depth0 = inv_w[0];
+            t.pixel_slack = 0.5f * (std::abs(t.dzdx) + std::abs(t.dzdy));
+            t.min_inv_w = std::min({inv_w[0], inv_w[1], inv_w[2]});
+            t.sign = area > 0.0f ? 1.0f : -1.0f;
+            for (int k = 0; k < 3; ++k) {
+                const int a = (k + 1) % 3, b = (k + 2) % 3;
+                t.edge_slack[k] = 0.5f * (std::abs(t.sx[b] - t.sx[a]) + std::abs(t.sy[b] - t.sy[a]));
+                t.boundary[k] = true;
+            }
+        }
+
+        // Shared edges.
+        struct VertexKeyHash {
+            size_t operator()(const std::array<uint32_t, 4>& key) const {
+                size_t seed = 0;
+                for (uint32_t value : key) seed ^= std::hash<uint32_t>{}(value) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
+                return seed;
+            }
+        };
+        struct EdgeUse { uint32_t count; uint32_t triangle[2]; int edge[2]; };
+        std::unordered_map<std::array<uint32_t, 4>, uint32_t, VertexKeyHash> vertex_ids;
+        std::unordered_map<uint64_t, EdgeUse> edges;
+        vertex_ids.reserve(triangles.size() * 2);
+        edges.reserve(triangles.size() * 2);
+        for (size_t i = 0; i < triangles.size(); ++i) {
+            if (!setups[i].valid) continue;
+            uint32_t ids[3];
+            for (int k = 0; k < 3; ++k) {
+                std::array<uint32_t, 4> key;
+                std::memcpy(key.data(), &triangles[i][k], sizeof(key));
+                ids[k] = vertex_ids.emplace(key, static_cast<uint32_t>(vertex_ids.size())).first->second;
+            }
+            for (int k = 0; k < 3; ++k) {
+                const uint32_t a = ids[(k + 1) % 3], b = ids[(k + 2) % 3];
+                EdgeUse& use = edges.emplace((static_cast<uint64_t>(std::min(a, b)) << 32) | std::max(a, b),
+                                             EdgeUse{0, {0, 0}, {0, 0}}).first->second;
+                if (use.count < 2) {
+                    use.triangle[use.count] = static_cast<uint32_t>(i);
+                    use.edge[use.count] = k;
+                }
+                ++use.count;
+            }
+        }
+        for (const auto& entry : edges) {
+            const EdgeUse& use = entry.second;
+            if (use.count != 2) continue;
+            const Setup& first = setups[use.triangle[0]];
+            const Setup& second = setups[use.triangle[1]];
+            const int opposite = use.edge[1]; // The second triangle's vertex off the edge
+            if (edge_value(first, use.edge[0], second.sx[opposite], second.sy[opposite]) < 0.0f) {
+                setups[use.triangle[0]].boundary[use.edge[0]] = false;
+                setups[use.triangle[1]].boundary[use.edge[1]] = false;
+            }
+        }
+
+        // Pixels covered by one triangle go straight to the buffer; pixels crossed by edges collect the smallest
+        // bound of the triangles touching them and are filled afterwards if no boundary edge touches them.
+        enum : uint8_t { PIXEL_TOUCHED = 1, PIXEL_CENTER_COVERED = 2, PIXEL_ON_BOUNDARY = 4 };
+        std::vector<float>& depth = levels[0];
+        std::vector<float> seam_depth(depth.size(), std::numeric_limits<float>::max());
+        std::vector<uint8_t> seam_flags(depth.size(), 0);
+        for (const Setup& t : setups) {
+            if (!t.valid) continue;
+            // Pixels whose squares [px, px + 1] x [py, py + 1] overlap the triangle's bounding box.
+            const int x0 = std::max(0, static_cast<int>(std::floor(std::min({t.sx[0], t.sx[1], t.sx[2]}))));
+            const int x1 = std::min(width - 1, static_cast<int>(std::ceil(std::max({t.sx[0], t.sx[1], t.sx[2]}))) - 1);
+            const int y0 = std::max(0, static_cast<int>(std::floor(std::min({t.sy[0], t.sy[1], t.sy[2]}))));
+            const int y1 = std::min(height - 1, static_cast<int>(std::ceil(std::max({t.sy[0], t.sy[1], t.sy[2]}))) - 1);
+            for (int py = y0; py <= y1; ++py) {
+                const float cy = static_cast<float>(py) + 0.5f;
+                for (int px = x0; px <= x1; ++px) {
+                    const float cx = static_cast<float>(px) + 0.5f;
+                    // An edge function is linear: over the pixel square it ranges over its center value +- slack.
+                    const float e[3] = {edge_value(t, 0, cx, cy), edge_value(t, 1, cx, cy), edge_value(t, 2, cx, cy)};
+                    if (e[0] + t.edge_slack[0] < 0.0f || e[1] + t.edge_slack[1] < 0.0f || e[2] + t.edge_slack[2] < 0.0f) continue;
+                    const float z = std::max(t.min_inv_w, t.depth0 + t.dzdx * (cx - t.sx[0]) + t.dzdy * (cy - t.sy[0]) - t.pixel_slack);
+                    const size_t pixel = static_cast<size_t>(py) * width + px;
+                    if (e[0] >= t.edge_slack[0] && e[1] >= t.edge_slack[1] && e[2] >= t.edge_slack[2]) {
+                        if (z > depth[pixel]) depth[pixel] = z;
+                        continue;
+                    }
+                    seam_depth[pixel] = std::min(seam_depth[pixel], z);
+                    uint8_t flags = PIXEL_TOUCHED;
+                    if (e[0] >= 0.0f && e[1] >= 0.0f && e[2] >= 0.0f) flags |= PIXEL_CENTER_COVERED;
+                    for (int k = 0; k < 3; ++k) { // A boundary edge crossing the square (its line and its bounding box)
+                        if (!t.boundary[k] || e[k] >= t.edge_slack[k]) continue;
+                        const int a = (k + 1) % 3, b = (k + 2) % 3;
+                        if (std::min(t.sx[a], t.sx[b]) <= static_cast<float>(px + 1) && std::max(t.sx[a], t.sx[b]) >= static_cast<float>(px) &&
+                            std::min(t.sy[a], t.sy[b]) <= static_cast<float>(py + 1) && std::max(t.sy[a], t.sy[b]) >= static_cast<float>(py)) {
+                            flags |= PIXEL_ON_BOUNDARY;
+                        }
+                    }
+                    seam_flags[pixel] |= flags;
+                }
+            }
+        }
+        for (size_t pixel = 0; pixel < depth.size(); ++pixel) {
+            if (depth[pixel] == 0.0f && (seam_flags[pixel] & (PIXEL_TOUCHED | PIXEL_CENTER_COVERED | PIXEL_ON_BOUNDARY)) ==
+                                            (PIXEL_TOUCHED | PIXEL_CENTER_COVERED)) {
+                depth[pixel] = seam_depth[pixel];
+            }
+        }
+    }
+
+    void build_hierarchy() {
+        levels.resize(1);
+        level_sizes.resize(1);
+        while (level_sizes.back()[0] > 1 || level_sizes.back()[1] > 1) {
+            const std::vector<float>& fine = levels.back();
+            const int fine_w = level_sizes.back()[0], fine_h = level_sizes.back()[1];
+            const int coarse_w = (fine_w + 1) / 2, coarse_h = (fine_h + 1) / 2;
+            std::vector<float> coarse(static_cast<size_t>(coarse_w) * coarse_h);
+            for (int y = 0; y < coarse_h; ++y) {
+                for (int x = 0; x < coarse_w; ++x) {
+                    float farthest = fine[static_cast<size_t>(2 * y) * fine_w + 2 * x];
+                    if (2 * x + 1 < fine_w) farthest = std::min(farthest, fine[static_cast<size_t>(2 * y) * fine_w + 2 * x + 1]);
+                    if (2 * y + 1 < fine_h) {
+                        farthest = std::min(farthest, fine[static_cast<size_t>(2 * y + 1) * fine_w + 2 * x]);
+                        if (2 * x + 1 < fine_w) farthest = std::min(farthest, fine[static_cast<size_t>(2 * y + 1) * fine_w + 2 * x + 1]);
+                    }
+                    coarse[static_cast<size_t>(y) * coarse_w + x] = farthest;
+                }
+            }
+            levels.push_back(std::move(coarse));
+            level_sizes.push_back({coarse_w, coarse_h});
+        }
+    }
+
+    // box - [min.xyz, max.xyz] in the space mvp is applied to. Boxes crossing the near plane
+    // or outside the screen are never occluded (the frustum test handles the latter).
+    bool is_box_occluded(const glm::mat4& mvp, const float* box) const {
+        glm::vec4 corners[8];
+        for (int corner = 0; corner < 8; ++corner) {
+            corners[corner] = mvp * glm::vec4(box[(corner & 1) ? 3 : 0], box[(corner & 2) ? 4 : 1], box[(corner & 4) ? 5 : 2], 1.0f);
+        }
+        return are_points_occluded(corners, 8);
+    }
+
+    // True if the convex hull of the clip-space points is hidden: its screen rectangle lies behind
+    // the occluders at the depth of its nearest point.
+    bool are_points_occluded(const glm::vec4* clip, int count) const {
+        float x_min = std::numeric_limits<float>::max(), y_min = x_min;
+        float x_max = -x_min, y_max = -x_min;
+        float nearest = 0.0f;
+        for (int k = 0; k < count; ++k) {
+            if (clip[k].w <= 1e-5f) return false;
+            const float inv_w = 1.0f / clip[k].w;
+            const float x = (clip[k].x * inv_w + 1.0f) * 0.5f * static_cast<float>(width);
+            const float y = (1.0f - clip[k].y * inv_w) * 0.5f * static_cast<float>(height);
+            x_min = std::min(x_min, x); x_max = std::max(x_max, x);
+            y_min = std::min(y_min, y); y_max = std::max(y_max, y);
+            nearest = std::max(nearest, inv_w);
+        }
+        if (x_max < 0.0f || y_max < 0.0f || x_min >= static_cast<float>(width) || y_min >= static_cast<float>(height)) return false;
+        const int x0 = std::clamp(static_cast<int>(std::floor(x_min)), 0, width - 1);
+        const int x1 = std::clamp(static_cast<int>(std::floor(x_max)), 0, width - 1);
+        const int y0 = std::clamp(static_cast<int>(std::floor(y_min)), 0, height - 1);
+        const int y1 = std::clamp(static_cast<int>(std::floor(y_max)), 0, height - 1);
+        // The finest level where the rectangle spans at most 2x2 texels.
+        size_t level = 0;
+        while (level + 1 < levels.size() && ((x1 >> level) - (x0 >> level) > 1 || (y1 >> level) - (y0 >> level) > 1)) ++level;
+        const std::vector<float>& texels = levels[level];
+        const int level_w = level_sizes[level][0];
+        for (int y = y0 >> level; y <= (y1 >> level); ++y) {
+            for (int x = x0 >> level; x <= (x1 >> level); ++x) {
+                if (nearest >= texels[static_cast<size_t>(y) * level_w + x]) return false;
+            }
+        }
+        return true;
+    }
+};
+// --- Software Rasterizer ---
+// Optional backend (set_software_rasterizer_cpp): instead of sorting triangles by average depth and drawing them
+// with SDL_RenderGeometry, render_accumulated_triangles_cpp rasterizes them into a framebuffer with a per-pixel
+// depth buffer and streams it into one SDL texture per frame. Overlaps are resolved per pixel, so no sorting is
+// needed, and a pixel already covered by something nearer is rejected before its color is written (early-Z).
+// Depth is 1/w (see CppScreenTriangle::inv_w): larger is nearer, 0 - background, linear in screen space.
+// Coverage uses edge functions at pixel centers with the top-left rule: a pixel on an edge shared by two
+// triangles is filled exactly once.
+// The screen is split into square tiles (64x64 by default). Triangles are first set up and binned into the tiles
+// their bounding boxes touch; then every tile is an independent task: an OpenMP thread rasterizes its triangles
+// into a tile-sized color and depth buffer (which stay in L1/L2) and copies the color into the framebuffer.
+// Tiles never share pixels, so nothing needs locks, and dynamic scheduling balances dense and empty tiles.
+struct CppRasterTriangle {
+    int64_t a[3], b[3], c[3]; // Edge k (opposite vertex k): e_k(p) = a_k * px + b_k * py + c_k in 1/16 pixel units
+    float z[3];
+    float inv_area;
+    float dz_dx;
+    uint32_t color; // ARGB8888
+    int x_begin, x_end, y_begin, y_end; // Pixel bounding box clipped to the screen, [begin, end)
+};
+
+struct CppSoftwareFramebuffer {
+    int width = 0;
+    int height = 0;
+    std::vector<uint32_t> color; // ARGB8888, row-major
+    SDL_Texture* texture = nullptr;
+    // Per-frame scratch, kept between frames so that binning does not allocate.
+    std::vector<CppRasterTriangle> setups;
+    std::vector<std::vector<std::vector<uint32_t>>> bins; // [thread][tile] -> indices into setups, in submission order
+
+    void resize(int new_width, int new_height) {
+        if (new_width == width && new_height == height) return;
+        width = std::max(1, new_width);
+        height = std::max(1, new_height);
+        color.assign(static_cast<size_t>(width) * height, 0);
+        bins.clear();
+        release_texture();
+    }
+
+    void release_texture() {
+        if (texture) {
+            SDL_DestroyTexture(texture);
+            texture = nullptr;
+        }
+    }
+};
+
+// Counters of the last rasterized frame (get_software_raster_stats_cpp).
+struct CppSoftwareRasterStats {
+    long submitted = 0;   // Triangles handed to the rasterizer (the frame's screen triangles)
+    long triangles = 0;   // Triangles that reached binning (non-degenerate, on screen)
+    long bin_entries = 0; // (triangle, tile) pairs
+    long fragments = 0;   // Covered pixels before the depth test
+    int tiles = 0;
+    int threads = 0;
+    double raster_ms = 0.0; // Setup, binning, rasterization and the copy into the framebuffer
+};
+
+static bool g_software_raster_enabled_cpp = false;
+static CppSoftwareFramebuffer g_software_framebuffer_cpp;
+static int g_software_raster_tile_size_cpp = 64;
+static int g_software_raster_threads_cpp = 0; // 0 - omp_get_max_threads()
+static CppSoftwareRasterStats g_software_raster_stats_cpp;
+
+constexpr int SOFTWARE_RASTER_SUBPIXEL_BITS = 4;
+constexpr float SOFTWARE_RASTER_MAX_COORD = 1 << 20; // Larger screen coordinates (clipping off) would overflow
+
+inline int64_t floor_div_internal_cpp(int64_t a, int64_t b) { // b > 0
+    return a >= 0 ? a / b : -((-a + b - 1) / b);
+}
+
+// Snaps the triangle to 1/16 pixel and computes its integer edge functions and depth gradient. Returns false
+// for triangles that cover no pixel of a width x height screen.
+inline bool setup_raster_triangle_internal_cpp(const CppScreenTriangle& tri, int width, int height,
+                                               CppRasterTriangle& out) {
+    constexpr int64_t one = int64_t(1) << SOFTWARE_RASTER_SUBPIXEL_BITS;
+    int64_t x[3], y[3];
+    for (int k = 0; k < 3; ++k) {
+        const float sx = tri.screen_coords[k][0], sy = tri.screen_coords[k][1];
+        if (!(std::abs(sx) < SOFTWARE_RASTER_MAX_COORD && std::abs(sy) < SOFTWARE_RASTER_MAX_COORD)) return false;
+        x[k] = static_cast<int64_t>(std::lround(sx * static_cast<float>(one)));
+        y[k] = static_cast<int64_t>(std::lround(sy * static_cast<float>(one)));
+        out.z[k] = tri.inv_w[k];
+    }
+    int64_t area = (x[1] - x[0]) * (y[2] - y[0]) - (y[1] - y[0]) * (x[2] - x[0]);
+    if (area == 0) return false;
+    if (area < 0) { // Both windings are drawn (back-face culling happens before); make it clockwise on screen
+        std::swap(x[1], x[2]); std::swap(y[1], y[2]); std::swap(out.z[1], out.z[2]);
+        area = -area;
+    }
+    out.x_begin = std::max(0, static_cast<int>(floor_div_internal_cpp(std::min({x[0], x[1], x[2]}), one)));
+    out.x_end = std::min(width, static_cast<int>(floor_div_internal_cpp(std::max({x[0], x[1], x[2]}), one)) + 1);
+    out.y_begin = std::max(0, static_cast<int>(floor_div_internal_cpp(std::min({y[0], y[1], y[2]}), one)));
+    out.y_end = std::min(height, static_cast<int>(floor_div_internal_cpp(std::max({y[0], y[1], y[2]}), one)) + 1);
+    if (out.x_begin >= out.x_end || out.y_begin >= out.y_end) return false;
+
+    // A pixel center exactly on an edge belongs to the triangle only for top-left edges; for the others
+    // the test e_k >= 0 becomes e_k - 1 >= 0.
+    for (int k = 0; k < 3; ++k) {
+        const int i = (k + 1) % 3, j = (k + 2) % 3;
+        out.a[k] = y[i] - y[j];
+        out.b[k] = x[j] - x[i];
+        out.c[k] = x[i] * y[j] - x[j] * y[i] - (((out.a[k] == 0 && out.b[k] < 0) || out.a[k] > 0) ? 0 : 1);
+    }
+    out.inv_area = 1.0f / static_cast<float>(area);
+    out.dz_dx = (static_cast<float>(out.a[0] * one) * out.z[0] + static_cast<float>(out.a[1] * one) * out.z[1]
+               + static_cast<float>(out.a[2] * one) * out.z[2]) * out.inv_area;
+    out.color = 0xFF000000u | (static_cast<uint32_t>(tri.color_final_uint8[0]) << 16)
+              | (static_cast<uint32_t>(tri.color_final_uint8[1]) << 8) | tri.color_final_uint8[2];
+    return true;
+}
+
+// Rasterizes the part of the triangle inside the tile [tile_x, tile_x + tile_w) x [tile_y, tile_y + tile_h)
+// into tile buffers with row stride `stride`. The pixel span of every row is computed exactly from the integer
+// edge functions, so the spans of triangles sharing an edge neither overlap nor leave gaps, also across tiles.
+// Returns the number of covered pixels.
+inline long rasterize_triangle_tile_internal_cpp(const CppRasterTriangle& rt, int tile_x, int tile_y,
+                                                 int tile_w, int tile_h, int stride,
+                                                 uint32_t* color_tile, float* depth_tile) {
+    constexpr int64_t one = int64_t(1) << SOFTWARE_RASTER_SUBPIXEL_BITS;
+    const int x_begin = std::max(rt.x_begin, tile_x), x_end = std::min(rt.x_end, tile_x + tile_w);
+    const int y_begin = std::max(rt.y_begin, tile_y), y_end = std::min(rt.y_end, tile_y + tile_h);
+    long fragments = 0;
+    for (int py = y_begin; py < y_end; ++py) {
+        const int64_t center_y = py * one + one / 2;
+        // Row span: e_k at pixel px is step_k * px + start_k.
+        int64_t span_begin = x_begin, span_end = x_end - 1;
+        int64_t start[3];
+        for (int k = 0; k < 3; ++k) {
+            const int64_t step = rt.a[k] * one;
+            start[k] = rt.a[k] * (one / 2) + rt.b[k] * center_y + rt.c[k];
+            if (step > 0) span_begin = std::max(span_begin, floor_div_internal_cpp(-start[k] + step - 1, step));
+            else if (step < 0) span_end = std::min(span_end, floor_div_internal_cpp(start[k], -step));
+            else if (start[k] < 0) span_end = -1;
+        }
+        if (span_begin > span_end) continue;
+        fragments += static_cast<long>(span_end - span_begin + 1);
+        float depth = (static_cast<float>(start[0] + rt.a[0] * one * span_begin) * rt.z[0]
+                     + static_cast<float>(start[1] + rt.a[1] * one * span_begin) * rt.z[1]
+                     + static_cast<float>(start[2] + rt.a[2] * one * span_begin) * rt.z[2]) * rt.inv_area;
+        float* depth_row = depth_tile + static_cast<size_t>(py - tile_y) * stride - tile_x;
+        uint32_t* color_row = color_tile + static_cast<size_t>(py - tile_y) * stride - tile_x;
+        for (int64_t px = span_begin; px <= span_end; ++px) {
+            if (depth > depth_row[px]) { // Early-Z: hidden pixels are rejected before the color write
+                depth_row[px] = depth;
+                color_row[px] = rt.color;
+            }
+            depth += rt.dz_dx;
+        }
+    }
+    return fragments;
+}
+
+// Rasterizes all triangles into the framebuffer (background where nothing is drawn).
+void rasterize_triangles_software_internal_cpp(const std::vector<CppScreenTriangle>& triangles,
+                                               CppSoftwareFramebuffer& fb) {
+    const auto start_time = std::chrono::steady_clock::now();
+    const uint32_t background = 0xFF000000u | (static_cast<uint32_t>(g_background_color_cpp[0]) << 16)
+                              | (static_cast<uint32_t>(g_background_color_cpp[1]) << 8) | g_background_color_cpp[2];
+    const int tile_size = g_software_raster_tile_size_cpp;
+    const int tiles_x = (fb.width + tile_size - 1) / tile_size;
+    const int tiles_y = (fb.height + tile_size - 1) / tile_size;
+    const int num_tiles = tiles_x * tiles_y;
+    int num_threads = 1;
+    #ifdef _OPENMP
+        num_threads = g_software_raster_threads_cpp > 0 ? g_software_raster_threads_cpp : omp_get_max_threads();
+        num_threads = std::max(1, num_threads);
+    #endif
+
+    const long num_triangles = static_cast<long>(triangles.size());
+    fb.setups.resize(triangles.size());
+    if (fb.bins.size() != static_cast<size_t>(num_threads)) fb.bins.assign(num_threads, {});
+    for (auto& thread_bins : fb.bins) {
+        thread_bins.resize(num_tiles);
+        for (auto& bin : thread_bins) bin.clear();
+    }
+
+    long binned_triangles = 0, bin_entries = 0, fragments = 0;
+#ifdef _MSC_VER
+    _Pragma("omp parallel num_threads(num_threads) reduction(+:binned_triangles, bin_entries, fragments)")
+#else
+    #pragma omp parallel num_threads(num_threads) reduction(+:binned_triangles, bin_entries, fragments)
+#endif
+    {
+        int thread = 0, team_size = 1;
+        #ifdef _OPENMP
+            thread = omp_get_thread_num();
+            team_size = omp_get_num_threads();
+        #endif
+        // Binning: every thread sets up a contiguous run of triangles into its own bins, so that the tiles
+        // below see each bin list in submission order (equal depths resolve the same way every frame).
+        std::vector<std::vector<uint32_t>>& thread_bins = fb.bins[thread];
+        const long first = num_triangles * thread / team_size, last = num_triangles * (thread + 1) / team_size;
+        for (long i = first; i < last; ++i) {
+            CppRasterTriangle& rt = fb.setups[i];
+            if (!setup_raster_triangle_internal_cpp(triangles[i], fb.width, fb.height, rt)) continue;
+            ++binned_triangles;
+            for (int ty = rt.y_begin / tile_size; ty <= (rt.y_end - 1) / tile_size; ++ty) {
+                for (int tx = rt.x_begin / tile_size; tx <= (rt.x_end - 1) / tile_size; ++tx) {
+                    thread_bins[ty * tiles_x + tx].push_back(static_cast<uint32_t>(i));
+                    ++bin_entries;
+                }
+            }
+        }
+        #pragma omp barrier
+
+        std::vector<uint32_t> color_tile(static_cast<size_t>(tile_size) * tile_size);
+        std::vector<float> depth_tile(static_cast<size_t>(tile_size) * tile_size);
+#ifdef _MSC_VER
+        _Pragma("omp for schedule(dynamic, 1)")
+#else
+        #pragma omp for schedule(dynamic, 1)
+#endif
+        for (int tile = 0; tile < num_tiles; ++tile) {
+            const int tile_x = (tile % tiles_x) * tile_size, tile_y = (tile / tiles_x) * tile_size;
+            const int tile_w = std::min(tile_size, fb.width - tile_x), tile_h = std::min(tile_size, fb.height - tile_y);
+            std::fill(color_tile.begin(), color_tile.end(), background);
+            std::fill(depth_tile.begin(), depth_tile.end(), 0.0f);
+            for (const auto& bins_of_thread : fb.bins) {
+                for (const uint32_t i : bins_of_thread[tile]) {
+                    fragments += rasterize_triangle_tile_internal_cpp(fb.setups[i], tile_x, tile_y, tile_w, tile_h,
+                                                                      tile_size, color_tile.data(), depth_tile.data());
+                }
+            }
+            for (int row = 0; row < tile_h; ++row) {
+                std::copy_n(color_tile.data() + static_cast<size_t>(row) * tile_size, tile_w,
+                            fb.color.data() + static_cast<size_t>(tile_y + row) * fb.width + tile_x);
+            }
+        }
+    }
+
+    g_software_raster_stats_cpp.submitted = num_triangles;
+    g_software_raster_stats_cpp.triangles = binned_triangles;
+    g_software_raster_stats_cpp.bin_entries = bin_entries;
+    g_software_raster_stats_cpp.fragments = fragments;
+    g_software_raster_stats_cpp.tiles = num_tiles;
+    g_software_raster_stats_cpp.threads = num_threads;
+    g_software_raster_stats_cpp.raster_ms = std::chrono::duration<double, std::milli>(
+        std::chrono::steady_clock::now() - start_time).count();
+}
+
+// Uploads the framebuffer into its streaming texture and copies it to the whole render target.
+void present_software_framebuffer_internal_cpp(CppSoftwareFramebuffer& fb) {
+    if (!fb.texture) {
+        fb.texture = SDL_CreateTexture(g_sdl_renderer, SDL_PIXELFORMAT_ARGB8888, SDL_TEXTUREACCESS_STREAMING,
+                                       fb.width, fb.height);
+        if (!fb.texture) return;
+    }
+    if (SDL_UpdateTexture(fb.texture, nullptr, fb.color.data(), fb.width * static_cast<int>(sizeof(uint32_t))) == 0) {
+        SDL_RenderCopy(g_sdl_renderer, fb.texture, nullptr, nullptr);
+    }
+}
+
+void set_software_rasterizer_cpp(bool enabled, int tile_size, int num_threads) {
+    g_software_raster_enabled_cpp = enabled;
+    g_software_raster_tile_size_cpp = std::clamp(tile_size, 8, 1024);
+    g_software_raster_threads_cpp = std::max(0, num_threads);
+    if (!enabled) { // Free the framebuffer and bins while SDL_RenderGeometry draws
+        g_software_framebuffer_cpp.release_texture();
+        g_software_framebuffer_cpp = CppSoftwareFramebuffer();
+    }
+}
+
+// Copy of the software framebuffer (H, W) as ARGB8888; (0, 0) until the software rasterizer has drawn a frame.
+py::array_t<uint32_t> get_software_framebuffer_cpp() {
+    const CppSoftwareFramebuffer& framebuffer = g_software_framebuffer_cpp;
+    const bool drawn = !framebuffer.color.empty();
+    py::array_t<uint32_t> color_np({static_cast<py::ssize_t>(drawn ? framebuffer.height : 0),
+                                    static_cast<py::ssize_t>(drawn ? framebuffer.width : 0)});
+    if (drawn) std::copy(framebuffer.color.begin(), framebuffer.color.end(), static_cast<uint32_t*>(color_np.request().ptr));
+    return color_np;
+}
+
+py::dict get_software_raster_stats_cpp() {
+    const CppSoftwareRasterStats& stats = g_software_raster_stats_cpp;
+    py::dict result;
+    result["submitted"] = stats.submitted;
+    result["triangles"] = stats.triangles;
+    result["bin_entries"] = stats.bin_entries;
+    result["fragments"] = stats.fragments;
+    result["tiles"] = stats.tiles;
+    result["threads"] = stats.threads;
+    result["raster_ms"] = stats.raster_ms;
+    return result;
+}
+
+// --- Depth Sort ---
+// Painter's ordering of the frame's triangles (render_accumulated_triangles_cpp with sorting on). Instead of
+// comparison-sorting the CppScreenTriangle structs, every depth becomes a 32-bit key whose unsigned order equals
+// the float order, an LSD radix sort (3 passes of 11 bits) orders compact (key, index) pairs, and the SDL vertices
+// are emitted through the sorted indices. The sort is stable: equal depths keep submission order.
+// Each pass is parallel: every thread counts the digits of its contiguous chunk, a prefix sum over (digit, thread)
+// gives every thread its own output range per digit, and the threads scatter without locks. A pass whose digit is
+// the same for all keys (typically the top bits of nearby depths) is skipped.
+struct CppDepthSortItem {
+    uint32_t key;
+    uint32_t index;
+};
+
+constexpr int DEPTH_SORT_RADIX_BITS = 11;
+constexpr uint32_t DEPTH_SORT_RADIX_SIZE = 1u << DEPTH_SORT_RADIX_BITS;
+constexpr int DEPTH_SORT_PASSES = 3; // 33 bits cover the 32-bit key
+constexpr size_t DEPTH_SORT_PARALLEL_MIN_ITEMS = 1 << 16; // Fewer items are sorted by one thread
+
+inline uint32_t depth_sort_key_internal_cpp(float depth) {
+    uint32_t bits;
+    std::memcpy(&bits, &depth, sizeof(bits));
+    if ((bits & 0x7FFFFFFFu) == 0) bits = 0; // -0 and +0 are equal depths (checked on bits: survives -ffast-math)
+    return (bits & 0x80000000u) ? ~bits : (bits | 0x80000000u); // Negative floats reversed and below positive ones
+}
+
+// Sorts items by key (stable). scratch is resized to items.size() and clobbered.
+void radix_sort_depth_items_internal_cpp(std::vector<CppDepthSortItem>& items, std::vector<CppDepthSortItem>& scratch) {
+    const size_t num_items = items.size();
+    scratch.resize(num_items);
+    int num_threads = 1;
+    #ifdef _OPENMP
+        if (num_items >= DEPTH_SORT_PARALLEL_MIN_ITEMS) num_threads = std::max(1, omp_get_max_threads());
+    #endif
+    std::vector<size_t> offsets(static_cast<size_t>(num_threads) * DEPTH_SORT_RADIX_SIZE); // [thread][digit]
+    CppDepthSortItem* src = items.data();
+    CppDepthSortItem* dst = scratch.data();
+    for (int pass = 0; pass < DEPTH_SORT_PASSES; ++pass) {
+        const int shift = pass * DEPTH_SORT_RADIX_BITS;
+        bool skip_pass = false;
+        std::fill(offsets.begin(), offsets.end(), 0);
+#ifdef _MSC_VER
+        _Pragma("omp parallel num_threads(num_threads)")
+#else
+        #pragma omp parallel num_threads(num_threads)
+#endif
+        {
+            int thread = 0, team_size = 1;
+            #ifdef _OPENMP
+                thread = omp_get_thread_num();
+                team_size = omp_get_num_threads();
+            #endif
+            const size_t begin = num_items * thread / team_size, end = num_items * (thread + 1) / team_size;
+            size_t* thread_offsets = offsets.data() + static_cast<size_t>(thread) * DEPTH_SORT_RADIX_SIZE;
+            for (size_t i = begin; i < end; ++i) ++thread_offsets[(src[i].key >> shift) & (DEPTH_SORT_RADIX_SIZE - 1)];
+            #pragma omp barrier
+            #pragma omp single
+            {
+                size_t running = 0;
+                for (uint32_t digit = 0; digit < DEPTH_SORT_RADIX_SIZE; ++digit) {
+                    const size_t digit_begin = running;
+                    for (int t = 0; t < num_threads; ++t) {
+                        const size_t count = offsets[static_cast<size_t>(t) * DEPTH_SORT_RADIX_SIZE + digit];
+                        offsets[static_cast<size_t>(t) * DEPTH_SORT_RADIX_SIZE + digit] = running;
+                        running += count;
+                    }
+                    if (running - digit_begin == num_items) skip_pass = true;
+                }
+            }
+            if (!skip_pass) {
+                for (size_t i = begin; i < end; ++i) {
+                    dst[thread_offsets[(src[i].key >> shift) & (DEPTH_SORT_RADIX_SIZE - 1)]++] = src[i];
+                }
+            }
+        }
+        if (!skip_pass) std::swap(src, dst);
+    }
+    if (src != items.data()) items.swap(scratch);
+}
+
+// Fills items with (key, index) pairs of the triangles and sorts them by depth (ascending, see CppScreenTriangle::depth).
+void sort_triangles_by_depth_internal_cpp(const std::vector<CppScreenTriangle>& triangles,
+                                          std::vector<CppDepthSortItem>& items, std::vector<CppDepthSortItem>& scratch) {
+    const long num_triangles = static_cast<long>(triangles.size());
+    items.resize(triangles.size());
+#ifdef _MSC_VER
+    _Pragma("omp parallel for schedule(static) if(num_triangles >= static_cast<long>(DEPTH_SORT_PARALLEL_MIN_ITEMS))")
+#else
+    #pragma omp parallel for schedule(static) if(num_triangles >= static_cast<long>(DEPTH_SORT_PARALLEL_MIN_ITEMS))
+#endif
+    for (long i = 0; i < num_triangles; ++i) {
+        items[i] = {depth_sort_key_internal_cpp(triangles[i].depth), static_cast<uint32_t>(i)};
+    }
+    radix_sort_depth_items_internal_cpp(items, scratch);
+}
+
+// Temporal ordering: the previous frame's order is kept per object id and carried into this frame.
+//  - An object whose triangles are the same L1 entry keeps its place and depths.
+//  - An object recomputed with the same transform (only the camera moved) keeps its place too: its triangles are
+//    matched to the previous ones by CppScreenTriangle::source and take their new depths ("re-keyed").
+//  - Triangles of objects that moved or appeared, and triangles that appeared (back-face or frustum changes) are new.
+// The carried order is repaired by an insertion sort: a camera that only moves keeps nearly all depth differences,
+// so the repair is about one linear pass. A turning camera reorders everything, so objects are only re-keyed while
+// the view rotation is the same as in the previous frame. If the repair still needs more than
+// DEPTH_SORT_REPAIR_MOVES_PER_ITEM moves per triangle it gives up, the frame is radix-sorted from scratch and
+// re-keying is not tried for the next DEPTH_SORT_REKEY_RETRY_FRAMES frames. New triangles are radix-sorted and merged in.
+// Ties are broken by triangle index everywhere, so the result is exactly the radix sort's order.
+struct CppDepthSortStats { // Last painter's sort (get_depth_sort_stats_cpp)
+    long triangles = 0;
+    long reused = 0;   // Triangles placed by the previous frame's order
+    long rekeyed = 0;  // Of those, triangles whose depths changed (repaired by the insertion sort)
+    long fresh = 0;    // Triangles radix-sorted (and merged in)
+    double sort_ms = 0.0;
+};
+
+struct CppTemporalSortState {
+    std::vector<CppFrameSegment> segments; // Previous frame's segments; holding them keeps the pointer comparison valid
+    std::vector<uint32_t> segment_begin;   // Their first triangle in the previous frame's list
+    std::vector<uint32_t> sources;         // CppScreenTriangle::source of the previous frame's list
+    std::vector<CppDepthSortItem> items;   // Painter's order of the last sorted frame
+    std::vector<CppDepthSortItem> previous_items; // While sorting: the order before that (swapped, not copied)
+    std::vector<uint32_t> source_slots;    // Scratch, all zero between uses: new index + 1 by CppScreenTriangle::source
+    // Scratch kept between frames (no page faults on fresh allocations every frame).
+    std::vector<uint32_t> next_sources, keys, new_index;
+    std::vector<uint8_t> is_carried;
+    std::vector<CppDepthSortItem> carried, fresh, scratch;
+    glm::mat3 view_rotation{0.0f};         // Previous frame's camera rotation
+    int rekey_retry_in = 0;                // Frames until re-keying is tried again after a failed repair
+};
+
+constexpr size_t DEPTH_SORT_REPAIR_MOVES_PER_ITEM = 4; // A walking camera needs about 0.03
+constexpr int DEPTH_SORT_REKEY_RETRY_FRAMES = 8;
+
+static bool g_temporal_depth_sort_enabled_cpp = false;
+static CppTemporalSortState g_temporal_sort_state_cpp;
+static CppDepthSortStats g_depth_sort_stats_cpp;
+
+inline uint64_t depth_sort_rank_internal_cpp(const CppDepthSortItem& item) { // Painter's order: depth, then index
+    return (static_cast<uint64_t>(item.key) << 32) | item.index;
+}
+
+// Insertion sort of items by (key, index); gives up (returns false, items a permutation) after max_moves moves.
+bool repair_depth_order_internal_cpp(std::vector<CppDepthSortItem>& items, size_t max_moves) {
+    size_t moves = 0;
+    for (size_t i = 1; i < items.size(); ++i) {
+        const CppDepthSortItem item = items[i];
+        const uint64_t rank = depth_sort_rank_internal_cpp(item);
+        size_t j = i;
+        while (j > 0 && depth_sort_rank_internal_cpp(items[j - 1]) > rank) {
+            items[j] = items[j - 1];
+            --j;
+        }
+        items[j] = item;
+        moves += i - j;
+        if (moves > max_moves) return false;
+    }
+    return true;
+}
+
+// Painter's order of the frame into state.items using the previous frame's order (see above); moves segments into
+// state for the next frame.
+void temporal_sort_triangles_by_depth_internal_cpp(const std::vector<CppScreenTriangle>& triangles,
+                                                   std::vector<CppFrameSegment>& segments, const glm::mat4& view,
+                                                   CppTemporalSortState& state, CppDepthSortStats& stats) {
+    state.previous_items.swap(state.items);
+    const std::vector<CppDepthSortItem>& previous_items = state.previous_items;
+    std::vector<CppDepthSortItem>& items = state.items;
+    const size_t num_triangles = triangles.size();
+    std::vector<uint32_t> segment_begin(segments.size() + 1, 0);
+    std::unordered_map<uint64_t, uint32_t> segment_of_object;
+    segment_of_object.reserve(segments.size());
+    for (size_t s = 0; s < segments.size(); ++s) {
+        segment_begin[s + 1] = segment_begin[s] + static_cast<uint32_t>(segments[s].triangles->size());
+        segment_of_object[segments[s].object_id] = static_cast<uint32_t>(s);
+    }
+    if (segment_begin.back() != num_triangles) { // Triangles without segments: nothing to match, sort from scratch
+        state = CppTemporalSortState();
+        sort_triangles_by_depth_internal_cpp(triangles, items, state.scratch);
+        stats.fresh = static_cast<long>(num_triangles);
+        return;
+    }
+
+    // How each segment relates to the previous frame.
+    enum SegmentReuse : uint8_t { SEGMENT_NEW, SEGMENT_SAME, SEGMENT_REKEY };
+    constexpr uint32_t not_carried = std::numeric_limits<uint32_t>::max();
+    constexpr uint32_t rekey_bit = 1u << 31; // In new_index: the carried triangle takes its new depth
+    const glm::mat3 view_rotation(view);
+    const bool try_rekey = state.rekey_retry_in == 0 && view_rotation == state.view_rotation;
+    state.view_rotation = view_rotation;
+    if (state.rekey_retry_in > 0) --state.rekey_retry_in;
+    std::vector<uint32_t> previous_of(segments.size(), not_carried);
+    std::vector<uint8_t> reuse(segments.size(), SEGMENT_NEW);
+    bool all_same = segments.size() == state.segments.size(), any_carried = false;
+    for (size_t s = 0; s < state.segments.size(); ++s) {
+        const CppFrameSegment& previous = state.segments[s];
+        auto it = segment_of_object.find(previous.object_id);
+        if (it == segment_of_object.end() || reuse[it->second] != SEGMENT_NEW) { all_same = false; continue; }
+        const CppFrameSegment& current = segments[it->second];
+        if (current.triangles == previous.triangles) {
+            reuse[it->second] = SEGMENT_SAME;
+        } else if (try_rekey && current.transform == previous.transform) {
+            reuse[it->second] = SEGMENT_REKEY;
+        } else {
+            all_same = false;
+            continue;
+        }
+        previous_of[it->second] = static_cast<uint32_t>(s);
+        any_carried = true;
+        all_same &= reuse[it->second] == SEGMENT_SAME && segment_begin[it->second] == state.segment_begin[s];
+    }
+    if (all_same) { // Same objects with the same triangles in the same places: the previous order as is
+        items.swap(state.previous_items);
+        stats.reused = static_cast<long>(num_triangles);
+        state.segments.swap(segments);
+        return;
+    }
+
+    std::vector<uint32_t>& sources = state.next_sources;
+    sources.resize(num_triangles);
+    if (!any_carried) { // Nothing to reuse (e.g. a turning camera while re-keying waits): the radix sort
+        items.resize(num_triangles);
+        for (uint32_t index = 0; index < num_triangles; ++index) { // One pass over the triangles for both
+            items[index] = {depth_sort_key_internal_cpp(triangles[index].depth), index};
+            sources[index] = triangles[index].source;
+        }
+        radix_sort_depth_items_internal_cpp(items, state.scratch);
+        stats.fresh = static_cast<long>(num_triangles);
+        state.sources.swap(sources);
+        state.segment_begin.swap(segment_begin);
+        state.segments.swap(segments);
+        return;
+    }
+
+    // Sources and depth keys in list order, and the new index of every carried previous triangle.
+    std::vector<uint32_t>& keys = state.keys;
+    std::vector<uint32_t>& new_index = state.new_index;
+    std::vector<uint8_t>& is_carried = state.is_carried;
+    keys.resize(num_triangles);
+    new_index.assign(state.sources.size(), not_carried);
+    is_carried.assign(num_triangles, 0);
+    for (size_t s = 0; s < segments.size(); ++s) {
+        const std::vector<CppScreenTriangle>& current = *segments[s].triangles;
+        const uint32_t begin = segment_begin[s];
+        if (reuse[s] == SEGMENT_SAME) { // Keys stay in the carried items
+            const uint32_t previous_begin = state.segment_begin[previous_of[s]];
+            std::copy(state.sources.begin() + previous_begin, state.sources.begin() + previous_begin + current.size(),
+                      sources.begin() + begin);
+            for (uint32_t k = 0; k < current.size(); ++k) new_index[previous_begin + k] = begin + k;
+            std::fill(is_carried.begin() + begin, is_carried.begin() + segment_begin[s + 1], 1);
+            continue;
+        }
+        for (uint32_t k = 0; k < current.size(); ++k) {
+            sources[begin + k] = current[k].source;
+            keys[begin + k] = depth_sort_key_internal_cpp(current[k].depth);
+        }
+        if (reuse[s] != SEGMENT_REKEY) continue;
+        const uint32_t end = segment_begin[s + 1];
+        const uint32_t previous_begin = state.segment_begin[previous_of[s]];
+        const uint32_t previous_end = state.segment_begin[previous_of[s] + 1];
+        if (previous_end - previous_begin == end - begin &&
+            std::equal(sources.begin() + begin, sources.begin() + end, state.sources.begin() + previous_begin)) {
+            // The same triangles in the same order (the usual case for a small move): matched by position
+            for (uint32_t k = 0; k < end - begin; ++k) new_index[previous_begin + k] = (begin + k) | rekey_bit;
+            std::fill(is_carried.begin() + begin, is_carried.begin() + end, 1);
+            stats.rekeyed += static_cast<long>(end - begin);
+            continue;
+        }
+        for (uint32_t index = begin; index < end; ++index) {
+            if (state.source_slots.size() <= sources[index]) state.source_slots.resize(static_cast<size_t>(sources[index]) + 1, 0);
+            state.source_slots[sources[index]] = index + 1;
+        }
+        for (uint32_t previous = previous_begin; previous < previous_end; ++previous) {
+            const uint32_t source = state.sources[previous];
+            const uint32_t slot = source < state.source_slots.size() ? state.source_slots[source] : 0;
+            if (slot == 0) continue;
+            new_index[previous] = (slot - 1) | rekey_bit;
+            is_carried[slot - 1] = 1;
+            ++stats.rekeyed;
+        }
+        for (uint32_t index = begin; index < end; ++index) state.source_slots[sources[index]] = 0;
+    }
+
+    // Previous order renumbered to this frame's list (re-keyed where the depths changed), then repaired.
+    std::vector<CppDepthSortItem>& carried = state.carried;
+    carried.clear();
+    for (const CppDepthSortItem& item : previous_items) {
+        const uint32_t index = new_index[item.index];
+        if (index == not_carried) continue;
+        if (index & rekey_bit) carried.push_back({keys[index & ~rekey_bit], index & ~rekey_bit});
+        else carried.push_back({item.key, index});
+    }
+    // Repaired even without re-keyed triangles: objects that changed their submission order (a removed object,
+    // a different set of visible objects) renumber their triangles, and equal depths are ordered by index.
+    // On a sorted list the repair is one pass without moves.
+    if (!repair_depth_order_internal_cpp(carried, carried.size() * DEPTH_SORT_REPAIR_MOVES_PER_ITEM)) {
+        if (stats.rekeyed > 0) state.rekey_retry_in = DEPTH_SORT_REKEY_RETRY_FRAMES;
+        stats.rekeyed = 0;
+        sort_triangles_by_depth_internal_cpp(triangles, items, state.scratch);
+        stats.fresh = static_cast<long>(num_triangles);
+    } else {
+        std::vector<CppDepthSortItem>& fresh = state.fresh;
+        fresh.clear();
+        for (uint32_t index = 0; index < num_triangles; ++index) {
+            if (!is_carried[index]) fresh.push_back({keys[index], index});
+        }
+        radix_sort_depth_items_internal_cpp(fresh, state.scratch);
+        items.resize(num_triangles);
+        std::merge(carried.begin(), carried.end(), fresh.begin(), fresh.end(), items.begin(),
+                   [](const CppDepthSortItem& a, const CppDepthSortItem& b) {
+                       return depth_sort_rank_internal_cpp(a) < depth_sort_rank_internal_cpp(b);
+                   });
+        stats.reused = static_cast<long>(carried.size());
+        stats.fresh = static_cast<long>(fresh.size());
+    }
+    state.sources.swap(sources);
+    state.segment_begin.swap(segment_begin);
+    state.segments.swap(segments);
+}
+
+static std::vector<CppDepthSortItem> g_depth_sort_order_cpp, g_depth_sort_scratch_cpp; // Radix sort from scratch
+static bool g_depth_sort_capture_enabled_cpp = false; // get_captured_depth_sort_cpp: keep the last sorted frame
+static std::vector<float> g_captured_depths_cpp;
+static std::vector<uint32_t> g_captured_order_cpp;
+
+// Painter's order for render_accumulated_triangles_cpp: temporal when enabled, radix sort from scratch otherwise.
+// The order is valid until the next call.
+const std::vector<CppDepthSortItem>& sort_frame_triangles_internal_cpp(const std::vector<CppScreenTriangle>& triangles,
+                                                                       std::vector<CppFrameSegment>& segments) {
+    const auto start_time = std::chrono::steady_clock::now();
+    g_depth_sort_stats_cpp = CppDepthSortStats();
+    g_depth_sort_stats_cpp.triangles = static_cast<long>(triangles.size());
+    if (g_temporal_depth_sort_enabled_cpp) {
+        temporal_sort_triangles_by_depth_internal_cpp(triangles, segments, g_current_view_matrix_cpp,
+                                                      g_temporal_sort_state_cpp, g_depth_sort_stats_cpp);
+    } else {
+        sort_triangles_by_depth_internal_cpp(triangles, g_depth_sort_order_cpp, g_depth_sort_scratch_cpp);
+        g_depth_sort_stats_cpp.fresh = g_depth_sort_stats_cpp.triangles;
+    }
+    g_depth_sort_stats_cpp.sort_ms = std::chrono::duration<double, std::milli>(
+        std::chrono::steady_clock::now() - start_time).count();
+    const std::vector<CppDepthSortItem>& order = g_temporal_depth_sort_enabled_cpp ? g_temporal_sort_state_cpp.items
+                                                                                   : g_depth_sort_order_cpp;
+    if (g_depth_sort_capture_enabled_cpp) {
+        g_captured_depths_cpp.resize(triangles.size());
+        g_captured_order_cpp.resize(order.size());
+        for (size_t i = 0; i < triangles.size(); ++i) g_captured_depths_cpp[i] = triangles[i].depth;
+        for (size_t i = 0; i < order.size(); ++i) g_captured_order_cpp[i] = order[i].index;
+    }
+    return order;
+}
+
+// --- Batch Vertex Transforms (simd_transform_cpp.hpp) ---
+constexpr size_t VERTEX_TRANSFORM_CHUNK = 1024; // Vertices per kernel call in the Stage 1 OpenMP loops
+
+// The first num_rows rows of m as affine rows (the fourth column multiplies w = 1).
+simd_transform_cpp::TransformRows affine_rows_internal_cpp(const glm::mat4& m, int num_rows) {
+    simd_transform_cpp::TransformRows t;
+    t.num_rows = num_rows;
+    for (int r = 0; r < num_rows; ++r) {
+        for (int c = 0; c < 4; ++c) t.rows[4 * r + c] = m[c][r];
+    }
+    return t;
+}
+
+// World positions (and unit world normals from the vertex normals at offset 6, if normals_out is given) of
+// `count` interleaved vertices, as SoA arrays.
+void transform_vertices_to_world_internal_cpp(const float* vertices, int vertex_data_stride, size_t count,
+                                              const glm::mat4& model_m, float* const* world_out,
+                                              float* const* normals_out) {
+    const simd_transform_cpp::TransformRows world_rows = affine_rows_internal_cpp(model_m, 3);
+    const simd_transform_cpp::TransformRows normal_rows = affine_rows_internal_cpp(
+        glm::mat4(glm::transpose(glm::inverse(glm::mat3(model_m)))), 3); // No translation: the last column is 0
+    const size_t stride = static_cast<size_t>(vertex_data_stride);
+    const long num_chunks = static_cast<long>((count + VERTEX_TRANSFORM_CHUNK - 1) / VERTEX_TRANSFORM_CHUNK);
+#ifdef _MSC_VER
+    _Pragma("omp parallel for schedule(static)")
+#else
+    #pragma omp parallel for schedule(static)
+#endif
+    for (long i_chunk = 0; i_chunk < num_chunks; ++i_chunk) {
+        const size_t begin = static_cast<size_t>(i_chunk) * VERTEX_TRANSFORM_CHUNK;
+        const size_t chunk_count = std::min(VERTEX_TRANSFORM_CHUNK, count - begin);
+        const float* v_ptr = vertices + begin * stride;
+        float* const chunk_world[3] = {world_out[0] + begin, world_out[1] + begin, world_out[2] + begin};
+        simd_transform_cpp::transform_points(world_rows, {v_ptr, v_ptr + 1, v_ptr + 2, stride}, chunk_count, chunk_world);
+        if (!normals_out) continue;
+        float* const chunk_normals[3] = {normals_out[0] + begin, normals_out[1] + begin, normals_out[2] + begin};
+        simd_transform_cpp::transform_points(normal_rows, {v_ptr + 6, v_ptr + 7, v_ptr + 8, stride}, chunk_count, chunk_normals);
+        for (size_t i = 0; i < chunk_count; ++i) {
+            const float inv_length = 1.0f / std::sqrt(chunk_normals[0][i] * chunk_normals[0][i]
+                + chunk_normals[1][i] * chunk_normals[1][i] + chunk_normals[2][i] * chunk_normals[2][i]);
+            chunk_normals[0][i] *= inv_length; chunk_normals[1][i] *= inv_length; chunk_normals[2][i] *= inv_length;
+        }
+    }
+}
+
 // --- Stage 1: Local to World Transformation ---
 CppWorldDataL2 transform_to_world_internal_cpp(
     const float* local_vertices_raw_ptr,
@@ -474,54 +1481,122 @@ CppWorldDataL2 transform_to_world_internal_cpp(
     const long num_source_triangles_long = static_cast<long>(num_total_floats_local / (static_cast<py::ssize_t>(vertex_data_stride) * 3));
     if (num_source_triangles_long <= 0) return world_data_out;
     world_data_out.num_source_triangles = static_cast<size_t>(num_source_triangles_long);
-    const glm::mat3 normal_model_m = glm::mat3(glm::transpose(glm::inverse(model_m)));
+    const bool has_vertex_normals = use_vertex_normals_from_mesh && vertex_data_stride >= 9;
     world_data_out.world_vertices_flat.resize(world_data_out.num_source_triangles * 9);
     world_data_out.world_face_normals_flat.resize(world_data_out.num_source_triangles * 3);
     world_data_out.vertex_colors_flat.resize(world_data_out.num_source_triangles * 9);
 
+    // All corners at once in SoA (x block, then y, then z), then gathered per triangle.
+    const size_t num_corners = world_data_out.num_source_triangles * 3;
+    std::vector<float> world_soa(num_corners * 3), normals_soa(has_vertex_normals ? num_corners * 3 : 0);
+    float* const world_out[3] = {world_soa.data(), world_soa.data() + num_corners, world_soa.data() + 2 * num_corners};
+    float* const normals_out[3] = {normals_soa.data(), normals_soa.data() + num_corners, normals_soa.data() + 2 * num_corners};
+    transform_vertices_to_world_internal_cpp(local_vertices_raw_ptr, vertex_data_stride, num_corners, model_m,
+                                             world_out, has_vertex_normals ? normals_out : nullptr);
+
 #ifdef _MSC_VER
-    _Pragma("omp parallel for schedule(dynamic, 8)")
+    _Pragma("omp parallel for schedule(static)")
 #else
-    #pragma omp parallel for schedule(dynamic, 8)
+    #pragma omp parallel for schedule(static)
 #endif
     for (long i_tri = 0; i_tri < num_source_triangles_long; ++i_tri) {
         const float* tri_base_ptr = local_vertices_raw_ptr + i_tri * vertex_data_stride * 3;
-        glm::vec3 local_v[3], model_n[3], v_colors[3];
-        bool current_triangle_has_vertex_normals = false;
         size_t base_idx_vertices = static_cast<size_t>(i_tri) * 9;
         size_t base_idx_normals = static_cast<size_t>(i_tri) * 3;
-
+        glm::vec3 world_v[3];
         for (int k = 0; k < 3; ++k) {
+            const size_t corner = static_cast<size_t>(i_tri) * 3 + k;
+            world_v[k] = glm::vec3(world_out[0][corner], world_out[1][corner], world_out[2][corner]);
             const float* v_ptr = tri_base_ptr + k * vertex_data_stride;
-            local_v[k] = glm::vec3(v_ptr[0], v_ptr[1], v_ptr[2]);
-            if (vertex_data_stride >= 6) {
-                v_colors[k] = glm::vec3(v_ptr[3], v_ptr[4], v_ptr[5]);
-            } else {
-                v_colors[k] = glm::vec3(0.5f, 0.5f, 0.5f); // Default color
+            for (int c = 0; c < 3; ++c) {
+                world_data_out.world_vertices_flat[base_idx_vertices + k*3 + c] = world_v[k][c];
+                world_data_out.vertex_colors_flat[base_idx_vertices + k*3 + c] = vertex_data_stride >= 6 ? v_ptr[3 + c] : 0.5f; // Default color
             }
-            if (use_vertex_normals_from_mesh && vertex_data_stride >= 9) {
-                model_n[k] = glm::vec3(v_ptr[6], v_ptr[7], v_ptr[8]);
-                current_triangle_has_vertex_normals = true;
+        }
+        glm::vec3 face_normal_w;
+        if (has_vertex_normals) {
+            glm::vec3 normal_sum(0.0f);
+            for (int k = 0; k < 3; ++k) {
+                const size_t corner = static_cast<size_t>(i_tri) * 3 + k;
+                normal_sum += glm::vec3(normals_out[0][corner], normals_out[1][corner], normals_out[2][corner]);
             }
-            world_data_out.vertex_colors_flat[base_idx_vertices + k*3 + 0] = v_colors[k].r;
-            world_data_out.vertex_colors_flat[base_idx_vertices + k*3 + 1] = v_colors[k].g;
-            world_data_out.vertex_colors_flat[base_idx_vertices + k*3 + 2] = v_colors[k].b;
+            face_normal_w = glm::normalize(normal_sum); // Average of transformed vertex normals
+        } else {
+            face_normal_w = calculate_triangle_normal_internal_cpp(world_v[0], world_v[1], world_v[2]);
         }
+        world_data_out.world_face_normals_flat[base_idx_normals + 0] = face_normal_w.x;
+        world_data_out.world_face_normals_flat[base_idx_normals + 1] = face_normal_w.y;
+        world_data_out.world_face_normals_flat[base_idx_normals + 2] = face_normal_w.z;
+    }
+    return world_data_out;
+}
+
+// --- Stage 1 (indexed): unique vertices are transformed once, then gathered per triangle ---
+CppWorldDataL2 transform_indexed_to_world_internal_cpp(
+    const float* local_vertices_raw_ptr,
+    py::ssize_t num_total_floats_local,
+    const uint32_t* indices_ptr,
+    py::ssize_t num_indices,
+    int vertex_data_stride,
+    bool use_vertex_normals_from_mesh,
+    const glm::mat4& model_m
+) {
+    CppWorldDataL2 world_data_out;
+    if (num_total_floats_local == 0 || num_indices == 0) return world_data_out;
+    if (vertex_data_stride <= 0 || (num_total_floats_local % vertex_data_stride) != 0) {
+         throw std::runtime_error("C++ (transform_indexed_to_world): Vertex data/stride mismatch.");
+    }
+    if (num_indices % 3 != 0) {
+         throw std::runtime_error("C++ (transform_indexed_to_world): Index count must be a multiple of 3.");
+    }
+    const long num_unique_vertices = static_cast<long>(num_total_floats_local / vertex_data_stride);
+    const long num_source_triangles_long = static_cast<long>(num_indices / 3);
+    for (py::ssize_t i = 0; i < num_indices; ++i) {
+        if (indices_ptr[i] >= static_cast<uint32_t>(num_unique_vertices)) {
+            throw std::runtime_error("C++ (transform_indexed_to_world): Index out of range.");
+        }
+    }
+    const bool has_vertex_normals = use_vertex_normals_from_mesh && vertex_data_stride >= 9;
+
+    const size_t num_vertices = static_cast<size_t>(num_unique_vertices);
+    std::vector<float> world_soa(num_vertices * 3), normals_soa(has_vertex_normals ? num_vertices * 3 : 0);
+    float* const world_out[3] = {world_soa.data(), world_soa.data() + num_vertices, world_soa.data() + 2 * num_vertices};
+    float* const normals_out[3] = {normals_soa.data(), normals_soa.data() + num_vertices, normals_soa.data() + 2 * num_vertices};
+    transform_vertices_to_world_internal_cpp(local_vertices_raw_ptr, vertex_data_stride, num_vertices, model_m,
+                                             world_out, has_vertex_normals ? normals_out : nullptr);
+
+    world_data_out.num_source_triangles = static_cast<size_t>(num_source_triangles_long);
+    world_data_out.world_vertices_flat.resize(world_data_out.num_source_triangles * 9);
+    world_data_out.world_face_normals_flat.resize(world_data_out.num_source_triangles * 3);
+    world_data_out.vertex_colors_flat.resize(world_data_out.num_source_triangles * 9);
+
+#ifdef _MSC_VER
+    _Pragma("omp parallel for schedule(static)")
+#else
+    #pragma omp parallel for schedule(static)
+#endif
+    for (long i_tri = 0; i_tri < num_source_triangles_long; ++i_tri) {
+        const uint32_t* tri_indices = indices_ptr + i_tri * 3;
+        size_t base_idx_vertices = static_cast<size_t>(i_tri) * 9;
+        size_t base_idx_normals = static_cast<size_t>(i_tri) * 3;
         glm::vec3 world_v[3];
-        world_v[0] = glm::vec3(model_m * glm::vec4(local_v[0], 1.0f));
-        world_v[1] = glm::vec3(model_m * glm::vec4(local_v[1], 1.0f));
-        world_v[2] = glm::vec3(model_m * glm::vec4(local_v[2], 1.0f));
-        for(int k=0; k<3; ++k) {
-            world_data_out.world_vertices_flat[base_idx_vertices + k*3 + 0] = world_v[k].x;
-            world_data_out.world_vertices_flat[base_idx_vertices + k*3 + 1] = world_v[k].y;
-            world_data_out.world_vertices_flat[base_idx_vertices + k*3 + 2] = world_v[k].z;
+        for (int k = 0; k < 3; ++k) {
+            const uint32_t vi = tri_indices[k];
+            world_v[k] = glm::vec3(world_out[0][vi], world_out[1][vi], world_out[2][vi]);
+            const float* v_ptr = local_vertices_raw_ptr + static_cast<size_t>(vi) * vertex_data_stride;
+            for (int c = 0; c < 3; ++c) {
+                world_data_out.world_vertices_flat[base_idx_vertices + k*3 + c] = world_v[k][c];
+                world_data_out.vertex_colors_flat[base_idx_vertices + k*3 + c] = vertex_data_stride >= 6 ? v_ptr[3 + c] : 0.5f;
+            }
         }
         glm::vec3 face_normal_w;
-        if (current_triangle_has_vertex_normals) {
-            glm::vec3 n0w = glm::normalize(normal_model_m * model_n[0]);
-            glm::vec3 n1w = glm::normalize(normal_model_m * model_n[1]);
-            glm::vec3 n2w = glm::normalize(normal_model_m * model_n[2]);
-            face_normal_w = glm::normalize(n0w + n1w + n2w); // Average of transformed vertex normals
+        if (has_vertex_normals) {
+            glm::vec3 normal_sum(0.0f);
+            for (int k = 0; k < 3; ++k) {
+                const uint32_t vi = tri_indices[k];
+                normal_sum += glm::vec3(normals_out[0][vi], normals_out[1][vi], normals_out[2][vi]);
+            }
+            face_normal_w = glm::normalize(normal_sum);
         } else {
             face_normal_w = calculate_triangle_normal_internal_cpp(world_v[0], world_v[1], world_v[2]);
         }
@@ -532,22 +1607,43 @@ CppWorldDataL2 transform_to_world_internal_cpp(
     return world_data_out;
 }
 
+// Culling counters of the current frame (get_culling_stats_cpp), reset by set_frame_parameters_cpp.
+// Objects are processed in parallel by submit_batch_cpp; L1 hits skip culling and Stage 2 and are not counted.
+struct CppCullingStats {
+    std::atomic<long> stage2_triangles{0}; // Source triangles handed to Stage 2 (after BVH, cluster and occlusion culling)
+    std::atomic<long> culled_clusters{0};  // Clusters dropped by the PVS and the back-facing cone test
+};
+static CppCullingStats g_culling_stats_cpp;
+
 // --- Stage 2: World to Screen Transformation ---
+constexpr size_t STAGE2_BLOCK_TRIANGLES = 64; // Front-facing triangles transformed by one batch kernel call
+
+struct CppStage2Block { // SoA vertices (3 per triangle) of up to STAGE2_BLOCK_TRIANGLES triangles
+    size_t triangles[STAGE2_BLOCK_TRIANGLES]; // Source triangle indices
+    size_t size = 0;
+    float world[3][STAGE2_BLOCK_TRIANGLES * 3];  // x, y, z
+    float clip[5][STAGE2_BLOCK_TRIANGLES * 3];   // x, y, z, w, view-space z
+    float screen[3][STAGE2_BLOCK_TRIANGLES * 3]; // x, y, 1 / w
+};
+
+// triangle_subset (optional) - source triangles to process, e.g. the ones left after BVH culling.
+// work_item_ends (optional) - end offsets of the clusters in triangle_subset; each cluster is one OpenMP task.
+// occlusion (optional) - clipped triangles hidden behind its occluders are dropped.
 std::vector<CppScreenTriangle> process_world_to_screen_internal_cpp(
-    const CppWorldDataL2& world_data
+    const CppWorldDataL2& world_data,
+    const std::vector<uint32_t>* triangle_subset = nullptr,
+    const std::vector<size_t>* work_item_ends = nullptr,
+    const CppOcclusionBuffer* occlusion = nullptr
 ) {
     if (world_data.num_source_triangles == 0) return {};
+    const size_t num_triangles_to_process = triangle_subset ? triangle_subset->size() : world_data.num_source_triangles;
+    if (num_triangles_to_process == 0) return {};
+    g_culling_stats_cpp.stage2_triangles += static_cast<long>(num_triangles_to_process);
 
     const float* world_verts_ptr = world_data.world_vertices_flat.data();
     const float* world_normals_ptr = world_data.world_face_normals_flat.data();
     const float* vert_colors_ptr = world_data.vertex_colors_flat.data();
 
-    const std::vector<glm::vec4> frustum_planes_static = {
-        glm::vec4(1.f, 0.f, 0.f, 1.f), glm::vec4(-1.f,0.f, 0.f, 1.f), // Left, Right
-        glm::vec4(0.f, 1.f, 0.f, 1.f), glm::vec4(0.f,-1.f, 0.f, 1.f), // Bottom, Top
-        glm::vec4(0.f, 0.f, 1.f, 1.f), glm::vec4(0.f, 0.f,-1.f, 1.f)  // Near, Far (for -w to w range)
-    };
-
     std::vector<std::vector<CppScreenTriangle>> per_thread_results;
     int num_threads_to_use = 1;
     #ifdef _OPENMP
@@ -556,25 +1652,25 @@ std::vector<CppScreenTriangle> process_world_to_screen_internal_cpp(
     #endif
     per_thread_results.resize(num_threads_to_use);
     for(auto& list : per_thread_results) {
-        if (world_data.num_source_triangles > 0 && num_threads_to_use > 0) {
-             list.reserve(world_data.num_source_triangles / num_threads_to_use + 32); // Heuristic
-        } else if (world_data.num_source_triangles > 0) {
-            list.reserve(world_data.num_source_triangles + 32);
+        if (num_threads_to_use > 0) {
+             list.reserve(num_triangles_to_process / num_threads_to_use + 32); // Heuristic
+        } else {
+            list.reserve(num_triangles_to_process + 32);
         }
     }
 
-#ifdef _MSC_VER
-    _Pragma("omp parallel for schedule(dynamic, 8)")
-#else
-    #pragma omp parallel for schedule(dynamic, 8)
-#endif
-    for (long i_tri_long = 0; i_tri_long < static_cast<long>(world_data.num_source_triangles); ++i_tri_long) {
-        size_t i_tri = static_cast<size_t>(i_tri_long);
-        int current_thread_id = 0;
-        #ifdef _OPENMP
-            current_thread_id = omp_get_thread_num();
-        #endif
+    // World -> clip in one step with the combined projection * view rows; the fifth row is the view-space z
+    // (the painter's sort depth).
+    simd_transform_cpp::TransformRows clip_rows = affine_rows_internal_cpp(g_current_projection_matrix_cpp * g_current_view_matrix_cpp, 4);
+    for (int c = 0; c < 4; ++c) clip_rows.rows[16 + c] = g_current_view_matrix_cpp[c][2];
+    clip_rows.num_rows = 5;
+    const float screen_width = static_cast<float>(g_window_width_cpp), screen_height = static_cast<float>(g_window_height_cpp);
 
+    // One front-facing triangle of the block: clipping, projection and shading. Projected vertices from the
+    // block are used as they are when the clipper leaves the triangle unchanged.
+    auto process_triangle = [&](const CppStage2Block& block, size_t i_block_tri, std::vector<CppScreenTriangle>& out) {
+        const size_t i_tri = block.triangles[i_block_tri];
+        const size_t base = i_block_tri * 3;
         glm::vec3 current_world_v[3]; glm::vec3 current_v_colors[3];
         for(int k=0; k<3; ++k){
             current_world_v[k] = glm::vec3(world_verts_ptr[i_tri*9 + k*3 + 0], world_verts_ptr[i_tri*9 + k*3 + 1], world_verts_ptr[i_tri*9 + k*3 + 2]);
@@ -582,37 +1678,41 @@ std::vector<CppScreenTriangle> process_world_to_screen_internal_cpp(
         }
         glm::vec3 current_world_face_normal(world_normals_ptr[i_tri*3 + 0], world_normals_ptr[i_tri*3 + 1], world_normals_ptr[i_tri*3 + 2]);
 
-        if (g_current_back_cull_enabled_flag) {
-            glm::vec3 triangle_center_w = (current_world_v[0] + current_world_v[1] + current_world_v[2]) / 3.0f;
-            if (!is_front_facing_internal_cpp(current_world_face_normal, g_current_camera_pos_w_cpp, triangle_center_w)) {
-                continue; 
-            }
-        }
-
-        std::vector<CppClipVertex> clip_space_input_triangle; clip_space_input_triangle.reserve(3);
+        CppClipPolygon polygon;
+        polygon.size = 3;
         for (int i_vtx = 0; i_vtx < 3; ++i_vtx) {
-            glm::vec4 view_space_pos_h = g_current_view_matrix_cpp * glm::vec4(current_world_v[i_vtx], 1.0f);
-            glm::vec4 clip_space_pos_h = g_current_projection_matrix_cpp * view_space_pos_h;
-            clip_space_input_triangle.emplace_back(clip_space_pos_h, current_v_colors[i_vtx], view_space_pos_h.z, current_world_v[i_vtx], true);
+            const size_t v = base + i_vtx;
+            const glm::vec4 clip_space_pos_h(block.clip[0][v], block.clip[1][v], block.clip[2][v], block.clip[3][v]);
+            polygon.vertices[i_vtx] = CppClipVertex(clip_space_pos_h, current_v_colors[i_vtx], block.clip[4][v], current_world_v[i_vtx], true);
         }
         
-        std::vector<std::vector<CppClipVertex>> processed_triangles_after_clipping;
         if (g_current_clipping_enabled_flag) {
-            processed_triangles_after_clipping = clip_triangle_to_frustum_internal_cpp(clip_space_input_triangle, frustum_planes_static);
-        } else {
-            processed_triangles_after_clipping.push_back(clip_space_input_triangle);
+            clip_triangle_to_frustum_internal_cpp(polygon, g_guard_band_cpp);
         }
 
-        for (const auto& single_clipped_triangle_verts_cpp : processed_triangles_after_clipping) {
-            if (single_clipped_triangle_verts_cpp.size() != 3) continue; 
+        // Clipping keeps the vertex order of a triangle it does not cut.
+        const bool unclipped = polygon.size == 3 && polygon.vertices[0].is_original && polygon.vertices[1].is_original &&
+                               polygon.vertices[2].is_original;
+
+        // The clipped polygon is drawn as a fan around its first vertex.
+        for (int i_fan = 1; i_fan + 1 < polygon.size; ++i_fan) {
+            const CppClipVertex* single_clipped_triangle_verts_cpp[3] = {&polygon.vertices[0], &polygon.vertices[i_fan],
+                                                                         &polygon.vertices[i_fan + 1]};
+            if (occlusion) {
+                const glm::vec4 clip[3] = {single_clipped_triangle_verts_cpp[0]->position_clip,
+                                           single_clipped_triangle_verts_cpp[1]->position_clip,
+                                           single_clipped_triangle_verts_cpp[2]->position_clip};
+                if (occlusion->are_points_occluded(clip, 3)) continue;
+            }
             CppScreenTriangle final_screen_triangle; 
+            final_screen_triangle.source = static_cast<uint32_t>(i_tri) * SCREEN_TRIANGLE_FAN_SLOTS + static_cast<uint32_t>(i_fan - 1);
             bool is_triangle_valid_for_draw = true; 
             bool was_modified_by_clipping_debug = false;
             final_screen_triangle.depth = 0.0f; 
             glm::vec3 accumulated_interpolated_color_float(0.0f);
 
             for (int i_final_vtx = 0; i_final_vtx < 3; ++i_final_vtx) {
-                const CppClipVertex& current_clip_vertex = single_clipped_triangle_verts_cpp[i_final_vtx];
+                const CppClipVertex& current_clip_vertex = *single_clipped_triangle_verts_cpp[i_final_vtx];
                 if (g_current_debug_clipping_enabled_flag && !current_clip_vertex.is_original) {
                     was_modified_by_clipping_debug = true;
                 }
@@ -620,13 +1720,21 @@ std::vector<CppScreenTriangle> process_world_to_screen_internal_cpp(
                 if (std::abs(clip_space_pos.w) < 1e-7f) { // Check for near-zero w
                     is_triangle_valid_for_draw = false; break; 
                 }
-                float inv_w = 1.0f / clip_space_pos.w; 
-                float ndc_x = clip_space_pos.x * inv_w; 
-                float ndc_y = clip_space_pos.y * inv_w;
-                // float ndc_z = clip_space_pos.z * inv_w; // For Z-buffer if needed
-                
-                final_screen_triangle.screen_coords[i_final_vtx][0] = (ndc_x + 1.0f) * 0.5f * static_cast<float>(g_window_width_cpp);
-                final_screen_triangle.screen_coords[i_final_vtx][1] = (1.0f - ndc_y) * 0.5f * static_cast<float>(g_window_height_cpp); 
+                if (unclipped) {
+                    const size_t v = base + i_final_vtx;
+                    final_screen_triangle.screen_coords[i_final_vtx][0] = block.screen[0][v];
+                    final_screen_triangle.screen_coords[i_final_vtx][1] = block.screen[1][v];
+                    final_screen_triangle.inv_w[i_final_vtx] = block.screen[2][v];
+                } else {
+                    float inv_w = 1.0f / clip_space_pos.w; 
+                    float ndc_x = clip_space_pos.x * inv_w; 
+                    float ndc_y = clip_space_pos.y * inv_w;
+                    // float ndc_z = clip_space_pos.z * inv_w; // For Z-buffer if needed
+
+                    final_screen_triangle.screen_coords[i_final_vtx][0] = (ndc_x + 1.0f) * 0.5f * screen_width;
+                    final_screen_triangle.screen_coords[i_final_vtx][1] = (1.0f - ndc_y) * 0.5f * screen_height; 
+                    final_screen_triangle.inv_w[i_final_vtx] = inv_w;
+                }
                 
                 final_screen_triangle.depth += current_clip_vertex.view_z; 
                 accumulated_interpolated_color_float += current_clip_vertex.color_f;
@@ -661,20 +1769,74 @@ std::vector<CppScreenTriangle> process_world_to_screen_internal_cpp(
                 final_screen_triangle.color_final_uint8[2] = static_cast<unsigned char>(std::clamp(average_final_color_float.b * light_intensity * 255.0f, 0.0f, 255.0f));
             }
             
-            // Safely add to per_thread_results
-            if (current_thread_id >= 0 && static_cast<size_t>(current_thread_id) < per_thread_results.size()) {
-                 per_thread_results[static_cast<size_t>(current_thread_id)].push_back(final_screen_triangle);
-            } else { 
-                // Fallback for safety, though should not happen with correct omp_get_thread_num usage
-                #pragma omp critical
-                { 
-                  if (per_thread_results.empty()) per_thread_results.resize(1); // Should not be empty
-                  size_t safe_thread_id = (current_thread_id >= 0 && static_cast<size_t>(current_thread_id) < per_thread_results.size()) ? static_cast<size_t>(current_thread_id) : 0;
-                  per_thread_results[safe_thread_id].push_back(final_screen_triangle);
+            out.push_back(final_screen_triangle);
+        }
+    };
+
+    // Triangles [begin, end) of triangle_subset (or of the mesh): back-face culling, then the vertices of each
+    // STAGE2_BLOCK_TRIANGLES front-facing triangles are transformed and projected together.
+    auto process_range = [&](size_t begin, size_t end, std::vector<CppScreenTriangle>& out) {
+        CppStage2Block block;
+        size_t k = begin;
+        while (k < end) {
+            block.size = 0;
+            for (; k < end && block.size < STAGE2_BLOCK_TRIANGLES; ++k) {
+                const size_t i_tri = triangle_subset ? static_cast<size_t>((*triangle_subset)[k]) : k;
+                const float* tri_verts = world_verts_ptr + i_tri * 9;
+                if (g_current_back_cull_enabled_flag) {
+                    const glm::vec3 triangle_center_w = (glm::make_vec3(tri_verts) + glm::make_vec3(tri_verts + 3) + glm::make_vec3(tri_verts + 6)) / 3.0f;
+                    if (!is_front_facing_internal_cpp(glm::make_vec3(world_normals_ptr + i_tri * 3), g_current_camera_pos_w_cpp, triangle_center_w)) {
+                        continue;
+                    }
+                }
+                for (int i_vtx = 0; i_vtx < 3; ++i_vtx) {
+                    for (int c = 0; c < 3; ++c) block.world[c][block.size * 3 + i_vtx] = tri_verts[i_vtx * 3 + c];
                 }
+                block.triangles[block.size++] = i_tri;
             }
+            const size_t num_vertices = block.size * 3;
+            float* const clip_out[5] = {block.clip[0], block.clip[1], block.clip[2], block.clip[3], block.clip[4]};
+            simd_transform_cpp::transform_points(clip_rows, {block.world[0], block.world[1], block.world[2], 1}, num_vertices, clip_out);
+            simd_transform_cpp::project_points(block.clip[0], block.clip[1], block.clip[3], num_vertices, screen_width, screen_height,
+                                               block.screen[0], block.screen[1], block.screen[2]);
+            for (size_t i_block_tri = 0; i_block_tri < block.size; ++i_block_tri) {
+                process_triangle(block, i_block_tri, out);
+            }
+        }
+    };
+
+    auto thread_results = [&]() -> std::vector<CppScreenTriangle>& {
+        int current_thread_id = 0;
+        #ifdef _OPENMP
+            current_thread_id = omp_get_thread_num();
+        #endif
+        return per_thread_results[static_cast<size_t>(current_thread_id) < per_thread_results.size() ? static_cast<size_t>(current_thread_id) : 0];
+    };
+
+    if (work_item_ends && triangle_subset && !work_item_ends->empty()) {
+        // Work items are clusters: contiguous, spatially coherent runs of triangle_subset.
+        const long num_work_items = static_cast<long>(work_item_ends->size());
+#ifdef _MSC_VER
+        _Pragma("omp parallel for schedule(dynamic, 1)")
+#else
+        #pragma omp parallel for schedule(dynamic, 1)
+#endif
+        for (long i_item = 0; i_item < num_work_items; ++i_item) {
+            const size_t begin = i_item == 0 ? 0 : (*work_item_ends)[i_item - 1];
+            process_range(begin, (*work_item_ends)[i_item], thread_results());
+        }
+    } else {
+        const long num_ranges = static_cast<long>((num_triangles_to_process + STAGE2_BLOCK_TRIANGLES - 1) / STAGE2_BLOCK_TRIANGLES);
+#ifdef _MSC_VER
+        _Pragma("omp parallel for schedule(dynamic, 1)")
+#else
+        #pragma omp parallel for schedule(dynamic, 1)
+#endif
+        for (long i_range = 0; i_range < num_ranges; ++i_range) {
+            const size_t begin = static_cast<size_t>(i_range) * STAGE2_BLOCK_TRIANGLES;
+            process_range(begin, std::min(begin + STAGE2_BLOCK_TRIANGLES, num_triangles_to_process), thread_results());
         }
-    } 
+    }
 
     std::vector<CppScreenTriangle> final_combined_output_list;
     size_t total_triangles_estimate = 0;
@@ -717,7 +1879,7 @@ void render_ui_elements_cpp();
 
 py::tuple initialize_cpp_renderer(int initial_width, int initial_height, bool fullscreen_flag,
                                   const std::string& window_title,
-                                  size_t l1_capacity, size_t l2_capacity,
+                                  size_t l1_cache_bytes, size_t l2_cache_bytes,
                                   std::array<unsigned char, 3> bg_color) {
     std::lock_guard<std::mutex> lock(g_sdl_resources_mutex); 
 
@@ -821,8 +1983,8 @@ py::tuple initialize_cpp_renderer(int initial_width, int initial_height, bool fu
 
     g_background_color_cpp = bg_color;
 
-    global_l1_cache_cpp_instance.set_capacity(l1_capacity);
-    global_l2_cache_cpp_instance.set_capacity(l2_capacity);
+    global_l1_cache_cpp_instance.set_budget_bytes(l1_cache_bytes);
+    global_l2_cache_cpp_instance.set_budget_bytes(l2_cache_bytes);
     py::print("C++: Caches configured.");
 
     return py::make_tuple(g_window_width_cpp, g_window_height_cpp);
@@ -833,6 +1995,7 @@ void cleanup_cpp_renderer() {
     py::print("C++: cleanup_cpp_renderer called.");
     global_l1_cache_cpp_instance.clear();
     global_l2_cache_cpp_instance.clear();
+    g_registered_meshes_cpp.clear();
     
     { // Clear UI elements and their textures
         std::lock_guard<std::mutex> ui_lock(g_ui_elements_mutex); // Блокировка для UI-коллекций
@@ -863,7 +2026,16 @@ void cleanup_cpp_renderer() {
         std::lock_guard<std::mutex> frame_lock(global_frame_triangles_mutex_);
         global_frame_triangles_cpp_.clear();
         global_frame_triangles_cpp_.shrink_to_fit();
+        global_frame_segments_cpp_.clear();
+        global_frame_segments_cpp_.shrink_to_fit();
     }
+    g_temporal_sort_state_cpp = CppTemporalSortState();
+    std::vector<CppDepthSortItem>().swap(g_depth_sort_order_cpp);
+    std::vector<CppDepthSortItem>().swap(g_depth_sort_scratch_cpp);
+    std::vector<float>().swap(g_captured_depths_cpp);
+    std::vector<uint32_t>().swap(g_captured_order_cpp);
+
+    g_software_framebuffer_cpp.release_texture(); // Textures die with the renderer
 
     if (g_sdl_renderer) {
         SDL_DestroyRenderer(g_sdl_renderer);
@@ -902,6 +2074,37 @@ void cleanup_cpp_renderer() {
     py::print("C++: Cleanup finished.");
 }
 
+void set_cache_budgets_cpp(size_t l1_cache_bytes, size_t l2_cache_bytes) {
+    global_l1_cache_cpp_instance.set_budget_bytes(l1_cache_bytes);
+    global_l2_cache_cpp_instance.set_budget_bytes(l2_cache_bytes);
+}
+
+py::dict cache_stats_to_dict_internal_cpp(const CppCacheStats& stats) {
+    py::dict result;
+    result["entries"] = stats.entries;
+    result["bytes"] = stats.bytes;
+    result["budget_bytes"] = stats.budget_bytes;
+    result["hits"] = stats.hits;
+    result["misses"] = stats.misses;
+    result["insertions"] = stats.insertions;
+    result["evictions"] = stats.evictions;
+    result["saved_ms"] = stats.saved_ms;
+    result["saved_ms_per_hit"] = stats.hits > 0 ? stats.saved_ms / static_cast<double>(stats.hits) : 0.0;
+    return result;
+}
+
+py::dict get_cache_stats_cpp() {
+    py::dict result;
+    result["l1"] = cache_stats_to_dict_internal_cpp(global_l1_cache_cpp_instance.get_stats());
+    result["l2"] = cache_stats_to_dict_internal_cpp(global_l2_cache_cpp_instance.get_stats());
+    return result;
+}
+
+void reset_cache_stats_cpp() {
+    global_l1_cache_cpp_instance.reset_stats();
+    global_l2_cache_cpp_instance.reset_stats();
+}
+
 // Хэшер для glm::mat4
 struct GlmMat4Hash {
     std::size_t operator()(const glm::mat4& m) const {
@@ -940,28 +2143,312 @@ void set_frame_parameters_cpp(
     g_current_debug_clipping_enabled_flag = debug_clipping_enabled_flag;
     g_current_debug_clipped_color_arr_cpp = debug_clipped_color_arr;
     g_current_sort_triangles_in_cpp_flag = sort_triangles_flag;
+    g_culling_stats_cpp.stage2_triangles = 0;
+    g_culling_stats_cpp.culled_clusters = 0;
     g_current_small_triangle_area_threshold = small_triangle_area_threshold;
 
     {
         std::lock_guard<std::mutex> lock(global_frame_triangles_mutex_);
         global_frame_triangles_cpp_.clear(); 
+        global_frame_segments_cpp_.clear();
     }
 }
 
-void process_and_accumulate_object_cpp(
-    uintptr_t object_id_py,
-    py::array_t<float, py::array::c_style | py::array::forcecast> transform_params_np, 
-    py::array_t<float, py::array::c_style | py::array::forcecast> local_vertex_data_np,
-    int vertex_data_stride,
-    bool use_vertex_normals_from_mesh
-) {
-    if (!g_sdl_renderer && !g_sdl_native_window) return; 
-    if (local_vertex_data_np.size() == 0) return;
-    if (transform_params_np.ndim() != 1 || transform_params_np.size() != 9) {
-         throw std::runtime_error("C++ (process_object): transform_params_np must be a flat array of 9 floats.");
+glm::mat4 build_model_matrix_internal_cpp(const float* tp_ptr) {
+    glm::vec3 pos(tp_ptr[0], tp_ptr[1], tp_ptr[2]);
+    glm::vec3 rot_deg(tp_ptr[3], tp_ptr[4], tp_ptr[5]);
+    glm::vec3 scl(tp_ptr[6], tp_ptr[7], tp_ptr[8]);
+    glm::mat4 model_m_calculated = glm::translate(glm::mat4(1.0f), pos);
+    model_m_calculated = glm::rotate(model_m_calculated, glm::radians(rot_deg.y), glm::vec3(0,1,0)); 
+    model_m_calculated = glm::rotate(model_m_calculated, glm::radians(rot_deg.x), glm::vec3(1,0,0)); 
+    model_m_calculated = glm::rotate(model_m_calculated, glm::radians(rot_deg.z), glm::vec3(0,0,1)); 
+    model_m_calculated = glm::scale(model_m_calculated, scl);
+    return model_m_calculated;
+}
+
+// Clip-space planes (-w <= x, y, z <= w) of mvp as planes in the space mvp is applied to:
+// a point p is inside if dot(plane.xyz, p) + plane.w >= 0 for all six.
+std::array<glm::vec4, 6> frustum_planes_internal_cpp(const glm::mat4& mvp) {
+    const glm::vec4 row_x(mvp[0][0], mvp[1][0], mvp[2][0], mvp[3][0]);
+    const glm::vec4 row_y(mvp[0][1], mvp[1][1], mvp[2][1], mvp[3][1]);
+    const glm::vec4 row_z(mvp[0][2], mvp[1][2], mvp[2][2], mvp[3][2]);
+    const glm::vec4 row_w(mvp[0][3], mvp[1][3], mvp[2][3], mvp[3][3]);
+    return {
+        row_w + row_x, row_w - row_x, // Left, Right
+        row_w + row_y, row_w - row_y, // Bottom, Top
+        row_w + row_z, row_w - row_z  // Near, Far
+    };
+}
+
+// Occlusion culling state (see CppOcclusionBuffer), configured by set_occlusion_parameters_cpp.
+static bool g_occlusion_enabled_cpp = false;
+static int g_occlusion_width_cpp = 256;
+static int g_occlusion_height_cpp = 144;
+static size_t g_occlusion_max_occluder_triangles_cpp = 4096;
+static CppOcclusionBuffer g_occlusion_buffer_cpp;
+static size_t g_occlusion_buffer_hash_cpp = 0; // Occluder set the buffer was built for (0 - not built)
+
+void set_occlusion_parameters_cpp(bool enabled, int width, int height, int max_occluder_triangles) {
+    if (width <= 0 || height <= 0 || max_occluder_triangles < 0) {
+        throw std::runtime_error("C++ (set_occlusion_parameters): buffer size must be positive and the occluder budget non-negative.");
+    }
+    g_occlusion_enabled_cpp = enabled;
+    g_occlusion_width_cpp = width;
+    g_occlusion_height_cpp = height;
+    g_occlusion_max_occluder_triangles_cpp = static_cast<size_t>(max_occluder_triangles);
+    g_occlusion_buffer_hash_cpp = 0;
+}
+
+// Rebuilds g_occlusion_buffer_cpp for a batch. Occluders are the triangles the renderer would draw
+// (front-facing, if back-face culling is on) of the nearest clusters inside the frustum of all cluster meshes,
+// up to g_occlusion_max_occluder_triangles_cpp. The buffer is kept while the camera and the occluder
+// objects do not change. Returns the hash of the occluder set (part of the L1 key), 0 - no occlusion culling.
+size_t update_occlusion_buffer_internal_cpp(size_t num_objects, const uint64_t* object_ids, const float* transforms,
+                                            const std::vector<const CppRegisteredMesh*>& meshes) {
+    if (!g_occlusion_enabled_cpp || g_occlusion_max_occluder_triangles_cpp == 0) return 0;
+    size_t occluder_hash = GlmMat4Hash{}(g_current_view_matrix_cpp);
+    auto combine = [&occluder_hash](size_t value) { occluder_hash ^= value + 0x9e3779b9 + (occluder_hash << 6) + (occluder_hash >> 2); };
+    combine(GlmMat4Hash{}(g_current_projection_matrix_cpp));
+    combine(std::hash<bool>{}(g_current_back_cull_enabled_flag));
+    combine(static_cast<size_t>(g_occlusion_width_cpp) * 65536 + static_cast<size_t>(g_occlusion_height_cpp));
+    combine(g_occlusion_max_occluder_triangles_cpp);
+    std::vector<size_t> occluder_objects;
+    for (size_t i = 0; i < num_objects; ++i) {
+        if (!meshes[i]->has_clusters) continue;
+        occluder_objects.push_back(i);
+        combine(std::hash<uint64_t>{}(object_ids[i]));
+        for (int k = 0; k < 9; ++k) combine(std::hash<float>{}(transforms[i * 9 + k]));
+    }
+    if (occluder_objects.empty()) return 0;
+    if (occluder_hash == 0) occluder_hash = 1;
+    if (occluder_hash == g_occlusion_buffer_hash_cpp) return occluder_hash;
+
+    // Candidate clusters inside the frustum, nearest first.
+    struct Candidate { float distance; size_t object; size_t cluster; };
+    std::vector<Candidate> candidates;
+    for (size_t i : occluder_objects) {
+        const CppRegisteredMesh& mesh = *meshes[i];
+        const float* tp_ptr = transforms + i * 9;
+        const glm::mat4 model_m = build_model_matrix_internal_cpp(tp_ptr);
+        const std::array<glm::vec4, 6> planes = frustum_planes_internal_cpp(g_current_projection_matrix_cpp * g_current_view_matrix_cpp * model_m);
+        const glm::vec3 camera_local = glm::vec3(glm::inverse(model_m) * glm::vec4(g_current_camera_pos_w_cpp, 1.0f));
+        const float max_scale = std::max({std::abs(tp_ptr[6]), std::abs(tp_ptr[7]), std::abs(tp_ptr[8])});
+        const float* cones = mesh.cluster_cones.data();
+        for (size_t k = 0; k < static_cast<size_t>(mesh.cluster_ranges.shape(0)); ++k) {
+            const glm::vec3 center(cones[k * 8 + 0], cones[k * 8 + 1], cones[k * 8 + 2]);
+            const float radius = cones[k * 8 + 3];
+            bool outside = false;
+            for (const glm::vec4& plane : planes) {
+                if (glm::dot(glm::vec3(plane), center) + plane.w < -radius * glm::length(glm::vec3(plane))) { outside = true; break; }
+            }
+            if (!outside) candidates.push_back({(glm::length(camera_local - center) - radius) * max_scale, i, k});
+        }
     }
-    const float* tp_ptr = transform_params_np.data();
+    std::sort(candidates.begin(), candidates.end(), [](const Candidate& a, const Candidate& b) { return a.distance < b.distance; });
+
+    const glm::mat4 view_projection = g_current_projection_matrix_cpp * g_current_view_matrix_cpp;
+    const glm::vec4 near_plane(0.0f, 0.0f, 1.0f, 1.0f);
+    std::vector<std::array<glm::vec4, 3>> occluder_triangles;
+    size_t budget = g_occlusion_max_occluder_triangles_cpp;
+    for (const Candidate& candidate : candidates) {
+        const CppRegisteredMesh& mesh = *meshes[candidate.object];
+        const int32_t* range = mesh.cluster_ranges.data() + candidate.cluster * 2;
+        if (static_cast<size_t>(range[1]) > budget) break;
+        budget -= static_cast<size_t>(range[1]);
+        const glm::mat4 model_m = build_model_matrix_internal_cpp(transforms + candidate.object * 9);
+        const glm::mat3 normal_model_m = glm::mat3(glm::transpose(glm::inverse(model_m)));
+        const float* vertices = mesh.vertices.data();
+        const int stride = mesh.vertex_data_stride;
+        const bool has_vertex_normals = mesh.use_vertex_normals && stride >= 9;
+        for (int32_t t = range[0]; t < range[0] + range[1]; ++t) {
+            const size_t triangle = static_cast<size_t>(mesh.bvh_triangles.data()[t]);
+            glm::vec3 world_v[3], normal_sum(0.0f);
+            for (int k = 0; k < 3; ++k) {
+                const size_t vertex = mesh.indexed ? static_cast<size_t>(mesh.indices.data()[triangle * 3 + k]) : triangle * 3 + k;
+                const float* v_ptr = vertices + vertex * stride;
+                world_v[k] = glm::vec3(model_m * glm::vec4(v_ptr[0], v_ptr[1], v_ptr[2], 1.0f));
+                if (has_vertex_normals) normal_sum += glm::normalize(normal_model_m * glm::vec3(v_ptr[6], v_ptr[7], v_ptr[8]));
+            }
+            if (g_current_back_cull_enabled_flag) { // Same normal and test as Stage 1 / Stage 2
+                const glm::vec3 normal_w = has_vertex_normals ? glm::normalize(normal_sum)
+                                                              : calculate_triangle_normal_internal_cpp(world_v[0], world_v[1], world_v[2]);
+                if (!is_front_facing_internal_cpp(normal_w, g_current_camera_pos_w_cpp, (world_v[0] + world_v[1] + world_v[2]) / 3.0f)) continue;
+            }
+            CppClipPolygon polygon;
+            polygon.size = 3;
+            for (int k = 0; k < 3; ++k) polygon.vertices[k] = CppClipVertex(view_projection * glm::vec4(world_v[k], 1.0f), glm::vec3(0.0f), 0.0f, world_v[k], true);
+            if (polygon.vertices[0].position_clip.z < -polygon.vertices[0].position_clip.w || polygon.vertices[1].position_clip.z < -polygon.vertices[1].position_clip.w ||
+                polygon.vertices[2].position_clip.z < -polygon.vertices[2].position_clip.w) {
+                CppClipPolygon clipped;
+                clip_polygon_to_plane_internal_cpp(polygon, near_plane, clipped);
+                polygon = clipped;
+            }
+            for (int k = 2; k < polygon.size; ++k) {
+                const std::array<glm::vec4, 3> clip = {polygon.vertices[0].position_clip, polygon.vertices[k - 1].position_clip, polygon.vertices[k].position_clip};
+                if (clip[0].w <= 1e-5f || clip[1].w <= 1e-5f || clip[2].w <= 1e-5f) continue;
+                occluder_triangles.push_back(clip);
+            }
+        }
+    }
+    g_occlusion_buffer_cpp.reset(g_occlusion_width_cpp, g_occlusion_height_cpp);
+    g_occlusion_buffer_cpp.rasterize_triangles(occluder_triangles);
+    g_occlusion_buffer_cpp.build_hierarchy();
+    g_occlusion_buffer_hash_cpp = occluder_hash;
+    return occluder_hash;
+}
+
+// Culling of whole clusters, both tests in mesh space (camera moved by the inverse model matrix):
+// - PVS: clusters not visible from the camera's cell are dropped (no PVS outside the grid);
+// - back-facing cones: a cluster is dropped when every normal in its cone faces away from every
+//   point of its bounding sphere. This matches the per-triangle test only for a uniform positive
+//   scale, so other transforms (or disabled back-face culling) skip it.
+// Returns the number of culled clusters.
+size_t cull_clusters_internal_cpp(const CppMeshBvhView& bvh, const float* tp_ptr, const glm::mat4& model_m,
+                                  std::vector<char>& cluster_culled) {
+    cluster_culled.assign(bvh.num_clusters, 0);
+    if (bvh.num_clusters == 0) return 0;
+    const float sx = tp_ptr[6], sy = tp_ptr[7], sz = tp_ptr[8];
+    const float scale_tolerance = 1e-6f * std::abs(sx);
+    const bool cone_culling = g_current_back_cull_enabled_flag &&
+        sx > 0.0f && std::abs(sy - sx) <= scale_tolerance && std::abs(sz - sx) <= scale_tolerance;
+    if (!cone_culling && !bvh.pvs_grid) return 0;
+
+    const glm::vec3 camera_local = glm::vec3(glm::inverse(model_m) * glm::vec4(g_current_camera_pos_w_cpp, 1.0f));
+    const uint8_t* pvs_row = nullptr;
+    if (bvh.pvs_grid) {
+        int64_t cell[3];
+        bool inside_grid = true;
+        for (int axis = 0; axis < 3; ++axis) {
+            const float coord = std::floor((camera_local[axis] - bvh.pvs_grid[axis]) / bvh.pvs_grid[3]);
+            inside_grid = inside_grid && coord >= 0.0f && coord < static_cast<float>(bvh.pvs_dims[axis]);
+            cell[axis] = static_cast<int64_t>(coord);
+        }
+        if (inside_grid) {
+            pvs_row = bvh.pvs_visibility + ((cell[0] * bvh.pvs_dims[1] + cell[1]) * bvh.pvs_dims[2] + cell[2]) * bvh.pvs_row_bytes;
+        }
+    }
+
+    size_t num_culled = 0;
+    for (size_t i = 0; i < bvh.num_clusters; ++i) {
+        if (pvs_row && !(pvs_row[i >> 3] & (1u << (i & 7)))) { cluster_culled[i] = 1; ++num_culled; continue; }
+        if (!cone_culling) continue;
+        const float* cone = bvh.cluster_cones + i * 8;
+        const float cos_angle = cone[7];
+        if (cos_angle <= 0.0f) continue;
+        const glm::vec3 center(cone[0], cone[1], cone[2]);
+        const glm::vec3 axis(cone[4], cone[5], cone[6]);
+        const glm::vec3 to_center = center - camera_local;
+        // Smallest dot(normal, to_center) over the cone: |to_center| * cos(angle(axis, to_center) + cone angle).
+        const float sin_angle = std::sqrt(std::max(0.0f, 1.0f - cos_angle * cos_angle));
+        const float min_facing = cos_angle * glm::dot(axis, to_center) - sin_angle * glm::length(glm::cross(axis, to_center));
+        if (min_facing > cone[3]) { cluster_culled[i] = 1; ++num_culled; }
+    }
+    return num_culled;
+}
 
+// Frustum culling of a mesh BVH in mesh space: the clip-space planes (-w <= x, y, z <= w) are
+// taken from rows of projection * view * model, so node boxes are tested without transforming them.
+// With bvh.occlusion, node boxes hidden behind the occluders are skipped too (down to the leaves,
+// the root box culls the whole object).
+// With clusters, back-facing and PVS-invisible clusters are dropped too, and work_item_ends receives the end offset of
+// each visible cluster in visible_triangles (Stage 2 schedules clusters as OpenMP tasks).
+// Returns false if nothing was culled (visible_triangles untouched), otherwise fills visible_triangles
+// with the triangles of the intersecting/inside leaves.
+bool cull_mesh_bvh_internal_cpp(const CppMeshBvhView& bvh, const float* tp_ptr, std::vector<uint32_t>& visible_triangles,
+                                std::vector<size_t>& work_item_ends) {
+    if (bvh.num_nodes == 0) return false;
+    const glm::mat4 model_m = build_model_matrix_internal_cpp(tp_ptr);
+    const glm::mat4 mvp = g_current_projection_matrix_cpp * g_current_view_matrix_cpp * model_m;
+    const std::array<glm::vec4, 6> planes = frustum_planes_internal_cpp(mvp);
+    std::vector<char> cluster_culled;
+    const size_t num_culled_clusters = cull_clusters_internal_cpp(bvh, tp_ptr, model_m, cluster_culled);
+    g_culling_stats_cpp.culled_clusters += static_cast<long>(num_culled_clusters);
+
+    // Visible ranges of bvh.triangles: whole subtrees inside the frustum and intersecting leaves.
+    std::vector<std::pair<size_t, size_t>> visible_ranges;
+    size_t node = 0;
+    while (node < bvh.num_nodes) {
+        const float* box = bvh.bounds + node * 6;
+        const int32_t* node_data = bvh.nodes + node * 3;
+        const size_t skip = static_cast<size_t>(node_data[2]);
+        bool outside = false, inside = true;
+        for (const glm::vec4& plane : planes) {
+            // Farthest corner along the plane normal (p-vertex) and the nearest one (n-vertex).
+            const float p_dist = plane.w + plane.x * box[plane.x >= 0.0f ? 3 : 0]
+                                         + plane.y * box[plane.y >= 0.0f ? 4 : 1]
+                                         + plane.z * box[plane.z >= 0.0f ? 5 : 2];
+            if (p_dist < 0.0f) { outside = true; break; }
+            const float n_dist = plane.w + plane.x * box[plane.x >= 0.0f ? 0 : 3]
+                                         + plane.y * box[plane.y >= 0.0f ? 1 : 4]
+                                         + plane.z * box[plane.z >= 0.0f ? 2 : 5];
+            if (n_dist < 0.0f) inside = false;
+        }
+        if (outside || (bvh.occlusion && bvh.occlusion->is_box_occluded(mvp, box))) { node = skip; continue; }
+        if (bvh.occlusion && inside && skip != node + 1) inside = false; // Test the children against the occluders
+        if (inside && node == 0 && num_culled_clusters == 0) return false; // The whole mesh is visible: keep the source order.
+        if (inside || skip == node + 1) { // Fully visible subtree or an intersecting leaf
+            visible_ranges.emplace_back(static_cast<size_t>(node_data[0]), static_cast<size_t>(node_data[1]));
+            node = skip;
+        } else {
+            node += 1; // Descend into the children
+        }
+    }
+
+    visible_triangles.clear();
+    work_item_ends.clear();
+    if (bvh.num_clusters == 0) {
+        for (const auto& range : visible_ranges) {
+            const uint32_t* first = bvh.triangles + range.first;
+            visible_triangles.insert(visible_triangles.end(), first, first + range.second);
+        }
+    } else {
+        // Clusters partition bvh.triangles into ascending ranges; a visible range is either inside one
+        // cluster (a leaf below it) or a run of whole clusters (a subtree above them).
+        size_t cluster = 0;
+        size_t last_item_cluster = bvh.num_clusters;
+        for (const auto& range : visible_ranges) {
+            const size_t range_end = range.first + range.second;
+            while (cluster + 1 < bvh.num_clusters && static_cast<size_t>(bvh.cluster_ranges[(cluster + 1) * 2]) <= range.first) ++cluster;
+            for (; cluster < bvh.num_clusters; ++cluster) {
+                const size_t cluster_first = static_cast<size_t>(bvh.cluster_ranges[cluster * 2]);
+                const size_t cluster_end = cluster_first + static_cast<size_t>(bvh.cluster_ranges[cluster * 2 + 1]);
+                if (cluster_first >= range_end) break;
+                if (!cluster_culled[cluster]) {
+                    const uint32_t* first = bvh.triangles + std::max(cluster_first, range.first);
+                    const uint32_t* last = bvh.triangles + std::min(cluster_end, range_end);
+                    visible_triangles.insert(visible_triangles.end(), first, last);
+                    if (cluster == last_item_cluster) {
+                        work_item_ends.back() = visible_triangles.size(); // Another leaf of the same cluster
+                    } else {
+                        work_item_ends.push_back(visible_triangles.size());
+                        last_item_cluster = cluster;
+                    }
+                }
+                if (cluster_end > range_end) break; // The next range may still be inside this cluster
+            }
+        }
+    }
+    // Nothing was culled: process in the source order, as without a BVH.
+    if (visible_triangles.size() < bvh.num_triangles) return true;
+    work_item_ends.clear();
+    return false;
+}
+
+// L1 -> L2 -> Stage 1 lookup shared by the soup, indexed and batch entry points.
+// transform_to_world(model_m) runs Stage 1 only on an L2 miss. Returns the object's screen
+// triangles (shared with the L1 cache, no copy) or nullptr if nothing is visible.
+// With a BVH, invisible subtrees and back-facing clusters are culled before Stage 2
+// (and Stage 1 is skipped if nothing is visible). occlusion_hash identifies the occluders
+// of bvh->occlusion, since the culled result depends on them.
+template <typename TransformToWorldFn>
+std::shared_ptr<const std::vector<CppScreenTriangle>> compute_object_screen_triangles_internal_cpp(
+    uintptr_t object_id_py,
+    const float* tp_ptr,
+    bool use_vertex_normals_from_mesh,
+    TransformToWorldFn&& transform_to_world,
+    const CppMeshBvhView* bvh = nullptr,
+    size_t occlusion_hash = 0
+) {
     CacheKeyL1 key_l1;
     key_l1.object_id = object_id_py;
     for (int i = 0; i < 9; ++i) key_l1.transform_params_hash_relevant[i] = tp_ptr[i];
@@ -971,16 +2458,24 @@ void process_and_accumulate_object_cpp(
     key_l1.back_cull_enabled = g_current_back_cull_enabled_flag;
     key_l1.clipping_enabled = g_current_clipping_enabled_flag;
     key_l1.debug_clipping_enabled = g_current_debug_clipping_enabled_flag;
+    key_l1.guard_band = g_current_clipping_enabled_flag ? g_guard_band_cpp : 1.0f;
     key_l1.debug_clipped_color = g_current_debug_clipped_color_arr_cpp;
     key_l1.small_tri_area_threshold = g_current_small_triangle_area_threshold;
+    key_l1.occlusion_hash = bvh && bvh->occlusion ? occlusion_hash : 0;
 
     std::shared_ptr<const std::vector<CppScreenTriangle>> screen_triangles_from_l1 = global_l1_cache_cpp_instance.get(key_l1);
+    if (screen_triangles_from_l1) return screen_triangles_from_l1;
+    const auto l1_build_start = std::chrono::steady_clock::now();
 
-    if (screen_triangles_from_l1) {
-        std::lock_guard<std::mutex> lock(global_frame_triangles_mutex_);
-        global_frame_triangles_cpp_.insert(global_frame_triangles_cpp_.end(), screen_triangles_from_l1->begin(), screen_triangles_from_l1->end());
-        return;
+    std::vector<uint32_t> visible_triangles;
+    std::vector<size_t> work_item_ends;
+    const std::vector<uint32_t>* triangle_subset = nullptr;
+    if (bvh && cull_mesh_bvh_internal_cpp(*bvh, tp_ptr, visible_triangles, work_item_ends)) {
+        if (visible_triangles.empty()) return nullptr;
+        triangle_subset = &visible_triangles;
     }
+    const std::vector<size_t>* work_items = work_item_ends.empty() ? nullptr : &work_item_ends;
+    const CppOcclusionBuffer* occlusion = bvh ? bvh->occlusion : nullptr;
 
     CacheKeyL2 key_l2;
     key_l2.object_id = object_id_py;
@@ -991,37 +2486,307 @@ void process_and_accumulate_object_cpp(
     std::vector<CppScreenTriangle> new_screen_triangles_for_l1;
 
     if (world_data_from_cache_l2) {
-        new_screen_triangles_for_l1 = process_world_to_screen_internal_cpp(*world_data_from_cache_l2);
+        new_screen_triangles_for_l1 = process_world_to_screen_internal_cpp(*world_data_from_cache_l2, triangle_subset, work_items, occlusion);
     } else {
-        glm::vec3 pos(tp_ptr[0], tp_ptr[1], tp_ptr[2]);
-        glm::vec3 rot_deg(tp_ptr[3], tp_ptr[4], tp_ptr[5]);
-        glm::vec3 scl(tp_ptr[6], tp_ptr[7], tp_ptr[8]);
-        glm::mat4 model_m_calculated = glm::translate(glm::mat4(1.0f), pos);
-        model_m_calculated = glm::rotate(model_m_calculated, glm::radians(rot_deg.y), glm::vec3(0,1,0)); 
-        model_m_calculated = glm::rotate(model_m_calculated, glm::radians(rot_deg.x), glm::vec3(1,0,0)); 
-        model_m_calculated = glm::rotate(model_m_calculated, glm::radians(rot_deg.z), glm::vec3(0,0,1)); 
-        model_m_calculated = glm::scale(model_m_calculated, scl);
-
-        CppWorldDataL2 new_world_data_l2 = transform_to_world_internal_cpp(
-            local_vertex_data_np.data(), local_vertex_data_np.size(),
-            vertex_data_stride, use_vertex_normals_from_mesh, model_m_calculated
-        );
+        const auto l2_build_start = std::chrono::steady_clock::now();
+        CppWorldDataL2 new_world_data_l2 = transform_to_world(build_model_matrix_internal_cpp(tp_ptr));
+        const double l2_build_ms = std::chrono::duration<double, std::milli>(
+            std::chrono::steady_clock::now() - l2_build_start).count();
 
         if (new_world_data_l2.num_source_triangles > 0) {
             // Move new_world_data_l2 into the cache, then get a shared_ptr to it
             // to avoid copying the potentially large data.
-            auto shared_new_world_data = std::make_shared<CppWorldDataL2>(std::move(new_world_data_l2));
-            global_l2_cache_cpp_instance.put(key_l2, *shared_new_world_data); // put might make its own shared_ptr or copy, check impl.
-                                                                              // My LruCacheL2Internal::put takes by value, then moves.
-                                                                              // So, it should be efficient.
-            new_screen_triangles_for_l1 = process_world_to_screen_internal_cpp(*shared_new_world_data);
+            auto shared_new_world_data = std::make_shared<const CppWorldDataL2>(std::move(new_world_data_l2));
+            global_l2_cache_cpp_instance.put(key_l2, shared_new_world_data, l2_build_ms);
+            new_screen_triangles_for_l1 = process_world_to_screen_internal_cpp(*shared_new_world_data, triangle_subset, work_items, occlusion);
         }
     }
 
-    if (!new_screen_triangles_for_l1.empty()) {
-        global_l1_cache_cpp_instance.put(key_l1, new_screen_triangles_for_l1); 
-        std::lock_guard<std::mutex> lock(global_frame_triangles_mutex_);
-        global_frame_triangles_cpp_.insert(global_frame_triangles_cpp_.end(), new_screen_triangles_for_l1.begin(), new_screen_triangles_for_l1.end());
+    if (new_screen_triangles_for_l1.empty()) return nullptr;
+    auto shared_screen_triangles = std::make_shared<const std::vector<CppScreenTriangle>>(std::move(new_screen_triangles_for_l1));
+    const double l1_build_ms = std::chrono::duration<double, std::milli>(
+        std::chrono::steady_clock::now() - l1_build_start).count(); // Culling, Stage 1 (or the L2 hit) and Stage 2
+    global_l1_cache_cpp_instance.put(key_l1, shared_screen_triangles, l1_build_ms);
+    return shared_screen_triangles;
+}
+
+template <typename TransformToWorldFn>
+void accumulate_object_internal_cpp(
+    uintptr_t object_id_py,
+    const float* tp_ptr,
+    bool use_vertex_normals_from_mesh,
+    TransformToWorldFn&& transform_to_world
+) {
+    auto screen_triangles = compute_object_screen_triangles_internal_cpp(
+        object_id_py, tp_ptr, use_vertex_normals_from_mesh, std::forward<TransformToWorldFn>(transform_to_world));
+    if (!screen_triangles) return;
+    std::lock_guard<std::mutex> lock(global_frame_triangles_mutex_);
+    global_frame_triangles_cpp_.insert(global_frame_triangles_cpp_.end(), screen_triangles->begin(), screen_triangles->end());
+    global_frame_segments_cpp_.emplace_back(static_cast<uint64_t>(object_id_py), screen_triangles, tp_ptr);
+}
+
+void process_and_accumulate_object_cpp(
+    uintptr_t object_id_py,
+    py::array_t<float, py::array::c_style | py::array::forcecast> transform_params_np, 
+    py::array_t<float, py::array::c_style | py::array::forcecast> local_vertex_data_np,
+    int vertex_data_stride,
+    bool use_vertex_normals_from_mesh
+) {
+    if (!g_sdl_renderer && !g_sdl_native_window) return; 
+    if (local_vertex_data_np.size() == 0) return;
+    if (transform_params_np.ndim() != 1 || transform_params_np.size() != 9) {
+         throw std::runtime_error("C++ (process_object): transform_params_np must be a flat array of 9 floats.");
+    }
+    accumulate_object_internal_cpp(object_id_py, transform_params_np.data(), use_vertex_normals_from_mesh,
+        [&](const glm::mat4& model_m) {
+            return transform_to_world_internal_cpp(
+                local_vertex_data_np.data(), local_vertex_data_np.size(),
+                vertex_data_stride, use_vertex_normals_from_mesh, model_m);
+        });
+}
+
+void process_and_accumulate_indexed_object_cpp(
+    uintptr_t object_id_py,
+    py::array_t<float, py::array::c_style | py::array::forcecast> transform_params_np, 
+    py::array_t<float, py::array::c_style | py::array::forcecast> local_vertex_data_np,
+    py::array_t<uint32_t, py::array::c_style | py::array::forcecast> index_data_np,
+    int vertex_data_stride,
+    bool use_vertex_normals_from_mesh
+) {
+    if (!g_sdl_renderer && !g_sdl_native_window) return; 
+    if (local_vertex_data_np.size() == 0 || index_data_np.size() == 0) return;
+    if (transform_params_np.ndim() != 1 || transform_params_np.size() != 9) {
+         throw std::runtime_error("C++ (process_indexed_object): transform_params_np must be a flat array of 9 floats.");
+    }
+    accumulate_object_internal_cpp(object_id_py, transform_params_np.data(), use_vertex_normals_from_mesh,
+        [&](const glm::mat4& model_m) {
+            return transform_indexed_to_world_internal_cpp(
+                local_vertex_data_np.data(), local_vertex_data_np.size(),
+                index_data_np.data(), index_data_np.size(),
+                vertex_data_stride, use_vertex_normals_from_mesh, model_m);
+        });
+}
+
+// --- Batch Submission ---
+// Meshes are registered once (register_mesh_cpp) and then referenced by handle, so a frame is
+// submitted with a single submit_batch_cpp call instead of one call per object.
+int64_t register_mesh_cpp(
+    py::array_t<float, py::array::c_style | py::array::forcecast> local_vertex_data_np,
+    py::object index_data_np,
+    int vertex_data_stride,
+    bool use_vertex_normals_from_mesh,
+    py::object bvh_bounds_np,
+    py::object bvh_nodes_np,
+    py::object bvh_triangles_np,
+    py::object cluster_ranges_np,
+    py::object cluster_cones_np,
+    py::object pvs_grid_np,
+    py::object pvs_visibility_np
+) {
+    if (vertex_data_stride <= 0) throw std::runtime_error("C++ (register_mesh): vertex_data_stride must be positive.");
+    CppRegisteredMesh mesh;
+    mesh.vertices = local_vertex_data_np;
+    mesh.indexed = !index_data_np.is_none();
+    if (mesh.indexed) {
+        mesh.indices = py::array_t<uint32_t, py::array::c_style | py::array::forcecast>::ensure(index_data_np);
+        if (!mesh.indices) throw std::runtime_error("C++ (register_mesh): index_data_np must be convertible to uint32.");
+    }
+    mesh.vertex_data_stride = vertex_data_stride;
+    mesh.use_vertex_normals = use_vertex_normals_from_mesh;
+    // Stage 1 checks the same, but submit_batch_cpp runs it inside an OpenMP loop: reject bad meshes here, once
+    // (the arrays are read-only and held by the registry, so they stay valid).
+    const py::ssize_t num_vertex_floats = mesh.vertices.size();
+    if (mesh.indexed) {
+        if (num_vertex_floats % vertex_data_stride != 0) {
+            throw std::runtime_error("C++ (register_mesh): Vertex data/stride mismatch.");
+        }
+        if (mesh.indices.size() % 3 != 0) {
+            throw std::runtime_error("C++ (register_mesh): Index count must be a multiple of 3.");
+        }
+        const uint32_t* indices = mesh.indices.data();
+        const uint32_t max_index = mesh.indices.size() > 0 ? *std::max_element(indices, indices + mesh.indices.size()) : 0;
+        if (mesh.indices.size() > 0 && max_index >= static_cast<uint64_t>(num_vertex_floats / vertex_data_stride)) {
+            throw std::runtime_error("C++ (register_mesh): Index out of range.");
+        }
+    } else if (num_vertex_floats % (static_cast<py::ssize_t>(vertex_data_stride) * 3) != 0) {
+        throw std::runtime_error("C++ (register_mesh): Vertex data/stride mismatch.");
+    }
+    mesh.has_bvh = !bvh_bounds_np.is_none();
+    if (mesh.has_bvh) {
+        mesh.bvh_bounds = py::array_t<float, py::array::c_style | py::array::forcecast>::ensure(bvh_bounds_np);
+        mesh.bvh_nodes = py::array_t<int32_t, py::array::c_style | py::array::forcecast>::ensure(bvh_nodes_np);
+        mesh.bvh_triangles = py::array_t<uint32_t, py::array::c_style | py::array::forcecast>::ensure(bvh_triangles_np);
+        if (!mesh.bvh_bounds || !mesh.bvh_nodes || !mesh.bvh_triangles) {
+            throw std::runtime_error("C++ (register_mesh): BVH needs bounds, nodes and triangles arrays.");
+        }
+        const py::ssize_t num_nodes = mesh.bvh_bounds.size() / 6;
+        const py::ssize_t num_triangles = mesh.indexed ? mesh.indices.size() / 3
+                                                       : mesh.vertices.size() / (static_cast<py::ssize_t>(vertex_data_stride) * 3);
+        if (mesh.bvh_bounds.size() != num_nodes * 6 || mesh.bvh_nodes.size() != num_nodes * 3 ||
+            mesh.bvh_triangles.size() != num_triangles) {
+            throw std::runtime_error("C++ (register_mesh): BVH arrays do not match the mesh.");
+        }
+        const int32_t* nodes = mesh.bvh_nodes.data();
+        for (py::ssize_t i = 0; i < num_nodes; ++i) {
+            const int32_t first = nodes[i * 3], count = nodes[i * 3 + 1], skip = nodes[i * 3 + 2];
+            if (first < 0 || count < 0 || first + static_cast<int64_t>(count) > num_triangles || skip <= i || skip > num_nodes) {
+                throw std::runtime_error("C++ (register_mesh): invalid BVH node.");
+            }
+        }
+        const uint32_t* triangles = mesh.bvh_triangles.data();
+        for (py::ssize_t i = 0; i < num_triangles; ++i) {
+            if (triangles[i] >= static_cast<uint32_t>(num_triangles)) {
+                throw std::runtime_error("C++ (register_mesh): BVH triangle index out of range.");
+            }
+        }
+    }
+    mesh.has_clusters = !cluster_ranges_np.is_none();
+    if (mesh.has_clusters) {
+        if (!mesh.has_bvh) throw std::runtime_error("C++ (register_mesh): clusters need a BVH.");
+        mesh.cluster_ranges = py::array_t<int32_t, py::array::c_style | py::array::forcecast>::ensure(cluster_ranges_np);
+        mesh.cluster_cones = py::array_t<float, py::array::c_style | py::array::forcecast>::ensure(cluster_cones_np);
+        if (!mesh.cluster_ranges || !mesh.cluster_cones) {
+            throw std::runtime_error("C++ (register_mesh): clusters need ranges and cones arrays.");
+        }
+        const py::ssize_t num_clusters = mesh.cluster_ranges.size() / 2;
+        if (mesh.cluster_ranges.size() != num_clusters * 2 || mesh.cluster_cones.size() != num_clusters * 8) {
+            throw std::runtime_error("C++ (register_mesh): cluster arrays do not match.");
+        }
+        // Clusters must cover bvh_triangles in order, without gaps or overlaps.
+        const int32_t* ranges = mesh.cluster_ranges.data();
+        int64_t expected_first = 0;
+        for (py::ssize_t i = 0; i < num_clusters; ++i) {
+            if (ranges[i * 2] != expected_first || ranges[i * 2 + 1] <= 0) {
+                throw std::runtime_error("C++ (register_mesh): clusters must partition the BVH triangles in order.");
+            }
+            expected_first += ranges[i * 2 + 1];
+        }
+        if (expected_first != static_cast<int64_t>(mesh.bvh_triangles.size())) {
+            throw std::runtime_error("C++ (register_mesh): clusters must partition the BVH triangles in order.");
+        }
+    }
+    mesh.has_pvs = !pvs_grid_np.is_none();
+    if (mesh.has_pvs) {
+        if (!mesh.has_clusters) throw std::runtime_error("C++ (register_mesh): PVS needs clusters.");
+        mesh.pvs_grid = py::array_t<float, py::array::c_style | py::array::forcecast>::ensure(pvs_grid_np);
+        mesh.pvs_visibility = py::array_t<uint8_t, py::array::c_style | py::array::forcecast>::ensure(pvs_visibility_np);
+        if (!mesh.pvs_grid || !mesh.pvs_visibility || mesh.pvs_grid.size() != 4 || mesh.pvs_visibility.ndim() != 4) {
+            throw std::runtime_error("C++ (register_mesh): PVS needs a (4,) grid and an (NX, NY, NZ, B) visibility array.");
+        }
+        const py::ssize_t num_clusters = mesh.cluster_ranges.size() / 2;
+        if (mesh.pvs_visibility.shape(3) != (num_clusters + 7) / 8 || !(mesh.pvs_grid.data()[3] > 0.0f)) {
+            throw std::runtime_error("C++ (register_mesh): PVS does not match the clusters.");
+        }
+    }
+    const int64_t handle = g_next_mesh_handle_cpp++;
+    g_registered_meshes_cpp.emplace(handle, std::move(mesh));
+    return handle;
+}
+
+void unregister_mesh_cpp(int64_t mesh_handle) {
+    g_registered_meshes_cpp.erase(mesh_handle);
+}
+
+void submit_batch_cpp(
+    py::array_t<uint64_t, py::array::c_style | py::array::forcecast> object_ids_np,
+    py::array_t<float, py::array::c_style | py::array::forcecast> transforms_np,
+    py::array_t<int64_t, py::array::c_style | py::array::forcecast> mesh_handles_np
+) {
+    if (!g_sdl_renderer && !g_sdl_native_window) return;
+    const py::ssize_t num_objects = object_ids_np.size();
+    if (num_objects == 0) return;
+    if (transforms_np.ndim() != 2 || transforms_np.shape(0) != num_objects || transforms_np.shape(1) != 9) {
+        throw std::runtime_error("C++ (submit_batch): transforms must have shape (N, 9).");
+    }
+    if (mesh_handles_np.size() != num_objects) {
+        throw std::runtime_error("C++ (submit_batch): object_ids and mesh_handles must have the same length.");
+    }
+
+    // Resolve handles while the GIL is still held: after this only raw pointers are used.
+    const uint64_t* object_ids = object_ids_np.data();
+    const float* transforms = transforms_np.data();
+    const int64_t* mesh_handles = mesh_handles_np.data();
+    std::vector<const CppRegisteredMesh*> meshes(static_cast<size_t>(num_objects));
+    for (py::ssize_t i = 0; i < num_objects; ++i) {
+        auto it = g_registered_meshes_cpp.find(mesh_handles[i]);
+        if (it == g_registered_meshes_cpp.end()) {
+            throw std::runtime_error("C++ (submit_batch): unknown mesh handle " + std::to_string(mesh_handles[i]) + ".");
+        }
+        meshes[i] = &it->second;
+    }
+
+    py::gil_scoped_release release;
+    const size_t occlusion_hash = update_occlusion_buffer_internal_cpp(static_cast<size_t>(num_objects), object_ids, transforms, meshes);
+    const CppOcclusionBuffer* occlusion = occlusion_hash ? &g_occlusion_buffer_cpp : nullptr;
+    std::vector<std::shared_ptr<const std::vector<CppScreenTriangle>>> per_object(static_cast<size_t>(num_objects));
+    // With fewer objects than threads (e.g. one big map) parallelism stays inside each object's stages.
+    int num_threads = 1;
+    #ifdef _OPENMP
+        num_threads = omp_get_max_threads();
+    #endif
+    const long num_objects_long = static_cast<long>(num_objects);
+    // An exception must not leave the OpenMP region (std::terminate): the first one is rethrown after it.
+    std::exception_ptr first_error;
+    std::mutex first_error_mutex;
+#ifdef _MSC_VER
+    _Pragma("omp parallel for schedule(dynamic, 1) if(num_objects_long >= num_threads)")
+#else
+    #pragma omp parallel for schedule(dynamic, 1) if(num_objects_long >= num_threads)
+#endif
+    for (long i = 0; i < num_objects_long; ++i) {
+        try {
+            const CppRegisteredMesh& mesh = *meshes[i];
+            const float* tp_ptr = transforms + static_cast<size_t>(i) * 9;
+            if (mesh.vertices.size() == 0 || (mesh.indexed && mesh.indices.size() == 0)) continue;
+            CppMeshBvhView bvh_view{};
+            if (mesh.has_bvh) {
+                bvh_view = {mesh.bvh_bounds.data(), mesh.bvh_nodes.data(), mesh.bvh_triangles.data(),
+                            static_cast<size_t>(mesh.bvh_bounds.size() / 6), static_cast<size_t>(mesh.bvh_triangles.size()),
+                            nullptr, nullptr, 0, nullptr, nullptr, {0, 0, 0}, 0, nullptr};
+                if (mesh.has_clusters) {
+                    bvh_view.cluster_ranges = mesh.cluster_ranges.data();
+                    bvh_view.cluster_cones = mesh.cluster_cones.data();
+                    bvh_view.num_clusters = static_cast<size_t>(mesh.cluster_ranges.size() / 2);
+                }
+                bvh_view.occlusion = occlusion;
+                if (mesh.has_pvs) {
+                    bvh_view.pvs_grid = mesh.pvs_grid.data();
+                    bvh_view.pvs_visibility = mesh.pvs_visibility.data();
+                    for (int axis = 0; axis < 3; ++axis) bvh_view.pvs_dims[axis] = mesh.pvs_visibility.shape(axis);
+                    bvh_view.pvs_row_bytes = static_cast<size_t>(mesh.pvs_visibility.shape(3));
+                }
+            }
+            per_object[i] = compute_object_screen_triangles_internal_cpp(
+                static_cast<uintptr_t>(object_ids[i]), tp_ptr, mesh.use_vertex_normals,
+                [&](const glm::mat4& model_m) {
+                    if (mesh.indexed) {
+                        return transform_indexed_to_world_internal_cpp(
+                            mesh.vertices.data(), mesh.vertices.size(),
+                            mesh.indices.data(), mesh.indices.size(),
+                            mesh.vertex_data_stride, mesh.use_vertex_normals, model_m);
+                    }
+                    return transform_to_world_internal_cpp(
+                        mesh.vertices.data(), mesh.vertices.size(),
+                        mesh.vertex_data_stride, mesh.use_vertex_normals, model_m);
+                },
+                mesh.has_bvh ? &bvh_view : nullptr, occlusion_hash);
+        } catch (...) {
+            std::lock_guard<std::mutex> error_lock(first_error_mutex);
+            if (!first_error) first_error = std::current_exception();
+        }
+    }
+    if (first_error) std::rethrow_exception(first_error);
+
+    // One lock per frame; objects are appended in submission order.
+    size_t total_triangles = 0;
+    for (const auto& triangles : per_object) { if (triangles) total_triangles += triangles->size(); }
+    std::lock_guard<std::mutex> lock(global_frame_triangles_mutex_);
+    global_frame_triangles_cpp_.reserve(global_frame_triangles_cpp_.size() + total_triangles);
+    for (py::ssize_t i = 0; i < num_objects; ++i) {
+        const auto& triangles = per_object[i];
+        if (!triangles) continue;
+        global_frame_triangles_cpp_.insert(global_frame_triangles_cpp_.end(), triangles->begin(), triangles->end());
+        global_frame_segments_cpp_.emplace_back(static_cast<uint64_t>(object_ids[i]), triangles, transforms + i * 9);
     }
 }
 
@@ -1029,44 +2794,46 @@ void render_accumulated_triangles_cpp() {
     if (!g_sdl_renderer) return; 
     
     std::vector<CppScreenTriangle> triangles_to_render_this_frame; 
+    std::vector<CppFrameSegment> segments_this_frame;
     { 
         std::lock_guard<std::mutex> frame_lock(global_frame_triangles_mutex_);
         if (!global_frame_triangles_cpp_.empty()) {
             triangles_to_render_this_frame.swap(global_frame_triangles_cpp_); // Efficiently move data
         }
+        segments_this_frame.swap(global_frame_segments_cpp_);
         // global_frame_triangles_cpp_ is now empty or contains previous frame's (if swap wasn't needed)
         // but it's cleared in set_frame_parameters_cpp anyway.
     }
 
+    g_depth_sort_stats_cpp = CppDepthSortStats(); // Frames that are not sorted report zeros
     SDL_SetRenderDrawColor(g_sdl_renderer, g_background_color_cpp[0], g_background_color_cpp[1], g_background_color_cpp[2], SDL_ALPHA_OPAQUE);
     SDL_RenderClear(g_sdl_renderer);
 
+    if (g_software_raster_enabled_cpp) { // Depth buffer instead of sorting (see CppSoftwareFramebuffer)
+        g_software_framebuffer_cpp.resize(g_window_width_cpp, g_window_height_cpp);
+        rasterize_triangles_software_internal_cpp(triangles_to_render_this_frame, g_software_framebuffer_cpp);
+        present_software_framebuffer_internal_cpp(g_software_framebuffer_cpp);
+        render_ui_elements_cpp();
+        SDL_RenderPresent(g_sdl_renderer);
+        return;
+    }
+
     if (triangles_to_render_this_frame.empty()) {
         render_ui_elements_cpp(); 
         SDL_RenderPresent(g_sdl_renderer); 
         return;
     }
 
+    const std::vector<CppDepthSortItem>* order = nullptr; // Painter's order as indices into triangles_to_render_this_frame
     if (g_current_sort_triangles_in_cpp_flag) {
-        #if __cplusplus >= 201703L && defined(__cpp_lib_parallel_algorithm) && !defined(_MSC_VER) && defined(USE_CPP_PARALLEL_SORT) // Add a define to control this
-        try {
-            std::sort(std::execution::par, triangles_to_render_this_frame.begin(), triangles_to_render_this_frame.end(),
-                [](const CppScreenTriangle& a, const CppScreenTriangle& b) { return a.depth < b.depth; });
-        } catch (const std::exception& e) { 
-             // std::cerr << "Parallel sort failed: " << e.what() << ", falling back to sequential." << std::endl;
-             std::sort(triangles_to_render_this_frame.begin(), triangles_to_render_this_frame.end(),
-                [](const CppScreenTriangle& a, const CppScreenTriangle& b) { return a.depth < b.depth; });
-        }
-        #else
-        std::sort(triangles_to_render_this_frame.begin(), triangles_to_render_this_frame.end(),
-                  [](const CppScreenTriangle& a, const CppScreenTriangle& b) { return a.depth < b.depth; });
-        #endif
+        order = &sort_frame_triangles_internal_cpp(triangles_to_render_this_frame, segments_this_frame);
     }
     
     std::vector<SDL_Vertex> sdl_vertices;
     sdl_vertices.reserve(triangles_to_render_this_frame.size() * 3); 
 
-    for (const auto& tri : triangles_to_render_this_frame) {
+    for (size_t k = 0; k < triangles_to_render_this_frame.size(); ++k) {
+        const CppScreenTriangle& tri = triangles_to_render_this_frame[order ? (*order)[k].index : k];
         for (int i = 0; i < 3; ++i) {
             SDL_Vertex vertex;
             vertex.position.x = tri.screen_coords[i][0];
@@ -1097,6 +2864,252 @@ void render_accumulated_triangles_cpp() {
     SDL_RenderPresent(g_sdl_renderer);
 }
 
+// Painter's order of triangles with the given depths (the radix sort of render_accumulated_triangles_cpp).
+py::array_t<uint32_t> depth_sort_order_cpp(py::array_t<float, py::array::c_style | py::array::forcecast> depths_np) {
+    std::vector<CppScreenTriangle> triangles(static_cast<size_t>(depths_np.size()));
+    for (size_t i = 0; i < triangles.size(); ++i) triangles[i].depth = depths_np.data()[i];
+    std::vector<CppDepthSortItem> items, scratch;
+    sort_triangles_by_depth_internal_cpp(triangles, items, scratch);
+    auto order_np = py::array_t<uint32_t>(static_cast<py::ssize_t>(items.size()));
+    uint32_t* order = static_cast<uint32_t*>(order_np.request().ptr);
+    for (size_t i = 0; i < items.size(); ++i) order[i] = items[i].index;
+    return order_np;
+}
+
+// One triangle (3, 4) in clip space through the Stage 2 clipper (clip_triangle_to_frustum_internal_cpp).
+// Returns (polygon (M, 4) - fan around its first vertex, M = 0 if nothing is left; is_original (M,) - vertices of
+// the input triangle).
+py::tuple clip_triangle_cpp(py::array_t<float, py::array::c_style | py::array::forcecast> clip_vertices_np,
+                            float guard_band) {
+    if (clip_vertices_np.ndim() != 2 || clip_vertices_np.shape(0) != 3 || clip_vertices_np.shape(1) != 4) {
+        throw std::runtime_error("Clip vertices must have shape (3, 4).");
+    }
+    if (!(guard_band >= 1.0f)) throw std::runtime_error("Guard band must be at least 1 (the screen itself).");
+    const float* v = clip_vertices_np.data();
+    CppClipPolygon polygon;
+    polygon.size = 3;
+    for (int i = 0; i < 3; ++i) {
+        polygon.vertices[i] = CppClipVertex(glm::vec4(v[i * 4], v[i * 4 + 1], v[i * 4 + 2], v[i * 4 + 3]),
+                                            glm::vec3(0.0f), 0.0f, glm::vec3(0.0f), true);
+    }
+    clip_triangle_to_frustum_internal_cpp(polygon, guard_band);
+    const py::ssize_t size = polygon.size < 3 ? 0 : polygon.size;
+    py::array_t<float> polygon_np({size, static_cast<py::ssize_t>(4)});
+    py::array_t<bool> is_original_np(size);
+    float* out = static_cast<float*>(polygon_np.request().ptr);
+    bool* is_original = static_cast<bool*>(is_original_np.request().ptr);
+    for (py::ssize_t i = 0; i < size; ++i) {
+        for (int c = 0; c < 4; ++c) out[i * 4 + c] = polygon.vertices[i].position_clip[c];
+        is_original[i] = polygon.vertices[i].is_original;
+    }
+    return py::make_tuple(polygon_np, is_original_np);
+}
+
+// Occlusion test of boxes (B, 6) [min.xyz, max.xyz] (transformed by mvp, column-major 4x4) against a
+// width x height CppOcclusionBuffer of the occluder triangles (T, 3, 4) in clip space, in front of the near plane.
+// Returns (B,) bool - box hidden.
+py::array_t<bool> occlusion_test_cpp(py::array_t<float, py::array::c_style | py::array::forcecast> occluders_np,
+                                     py::array_t<float, py::array::c_style | py::array::forcecast> boxes_np,
+                                     py::array_t<float, py::array::c_style | py::array::forcecast> mvp_np,
+                                     int width, int height) {
+    if (occluders_np.ndim() != 3 || occluders_np.shape(1) != 3 || occluders_np.shape(2) != 4) {
+        throw std::runtime_error("Occluders must have shape (T, 3, 4).");
+    }
+    if (boxes_np.ndim() != 2 || boxes_np.shape(1) != 6) throw std::runtime_error("Boxes must have shape (B, 6).");
+    if (mvp_np.size() != 16) throw std::runtime_error("mvp must have 16 elements.");
+    if (width <= 0 || height <= 0) throw std::runtime_error("Buffer size must be positive.");
+    CppOcclusionBuffer buffer;
+    buffer.reset(width, height);
+    const float* occluders = occluders_np.data();
+    std::vector<std::array<glm::vec4, 3>> triangles(static_cast<size_t>(occluders_np.shape(0)));
+    for (size_t t = 0; t < triangles.size(); ++t) {
+        for (int k = 0; k < 3; ++k) {
+            triangles[t][k] = glm::make_vec4(occluders + (t * 3 + k) * 4);
+            if (triangles[t][k].w <= 1e-5f) throw std::runtime_error("Occluders must be in front of the near plane (w > 0).");
+        }
+    }
+    buffer.rasterize_triangles(triangles);
+    buffer.build_hierarchy();
+    const glm::mat4 mvp = glm::make_mat4(mvp_np.data());
+    py::array_t<bool> occluded_np(boxes_np.shape(0));
+    bool* occluded = static_cast<bool*>(occluded_np.request().ptr);
+    for (py::ssize_t b = 0; b < boxes_np.shape(0); ++b) occluded[b] = buffer.is_box_occluded(mvp, boxes_np.data() + b * 6);
+    return occluded_np;
+}
+
+void set_guard_band_clipping_cpp(bool enabled, float guard_band) {
+    if (enabled && !(guard_band >= 1.0f)) throw std::runtime_error("Guard band must be at least 1 (the screen itself).");
+    g_guard_band_cpp = enabled ? guard_band : 1.0f;
+}
+
+void set_temporal_depth_sort_cpp(bool enabled) {
+    g_temporal_depth_sort_enabled_cpp = enabled;
+    g_temporal_sort_state_cpp = CppTemporalSortState();
+}
+
+void set_depth_sort_capture_cpp(bool enabled) {
+    g_depth_sort_capture_enabled_cpp = enabled;
+    std::vector<float>().swap(g_captured_depths_cpp);
+    std::vector<uint32_t>().swap(g_captured_order_cpp);
+}
+
+// (depths (N,), order (N,)) of the last frame sorted while capturing: the triangles' depths in list order and the
+// painter's order as indices into them.
+py::tuple get_captured_depth_sort_cpp() {
+    py::array_t<float> depths_np(static_cast<py::ssize_t>(g_captured_depths_cpp.size()));
+    py::array_t<uint32_t> order_np(static_cast<py::ssize_t>(g_captured_order_cpp.size()));
+    std::copy(g_captured_depths_cpp.begin(), g_captured_depths_cpp.end(), static_cast<float*>(depths_np.request().ptr));
+    std::copy(g_captured_order_cpp.begin(), g_captured_order_cpp.end(), static_cast<uint32_t*>(order_np.request().ptr));
+    return py::make_tuple(depths_np, order_np);
+}
+
+py::dict get_depth_sort_stats_cpp() {
+    const CppDepthSortStats& stats = g_depth_sort_stats_cpp;
+    py::dict result;
+    result["triangles"] = stats.triangles;
+    result["reused"] = stats.reused;
+    result["rekeyed"] = stats.rekeyed;
+    result["fresh"] = stats.fresh;
+    result["sort_ms"] = stats.sort_ms;
+    return result;
+}
+
+py::dict get_culling_stats_cpp() {
+    py::dict result;
+    result["stage2_triangles"] = g_culling_stats_cpp.stage2_triangles.load();
+    result["culled_clusters"] = g_culling_stats_cpp.culled_clusters.load();
+    return result;
+}
+
+// Microbenchmark for benchmarks/bench_depth_sort.py: the best of `repeats` runs of std::sort over the
+// CppScreenTriangle structs (the previous painter's sort) and of the radix sort, on triangles with the given depths.
+py::dict benchmark_depth_sort_cpp(py::array_t<float, py::array::c_style | py::array::forcecast> depths_np, int repeats) {
+    std::vector<CppScreenTriangle> triangles(static_cast<size_t>(depths_np.size()));
+    for (size_t i = 0; i < triangles.size(); ++i) triangles[i].depth = depths_np.data()[i];
+    double std_sort_ms = std::numeric_limits<double>::infinity(), radix_sort_ms = std_sort_ms;
+    bool matches = true;
+    {
+        py::gil_scoped_release release;
+        std::vector<CppScreenTriangle> sorted;
+        std::vector<CppDepthSortItem> items, scratch;
+        for (int repeat = 0; repeat < std::max(1, repeats); ++repeat) {
+            sorted = triangles;
+            auto start = std::chrono::steady_clock::now();
+            std::sort(sorted.begin(), sorted.end(),
+                      [](const CppScreenTriangle& a, const CppScreenTriangle& b) { return a.depth < b.depth; });
+            std_sort_ms = std::min(std_sort_ms, std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - start).count());
+
+            start = std::chrono::steady_clock::now();
+            sort_triangles_by_depth_internal_cpp(triangles, items, scratch);
+            radix_sort_ms = std::min(radix_sort_ms, std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - start).count());
+        }
+        for (size_t i = 0; i < items.size() && matches; ++i) matches = triangles[items[i].index].depth == sorted[i].depth;
+    }
+    py::dict result;
+    result["std_sort_ms"] = std_sort_ms;
+    result["radix_sort_ms"] = radix_sort_ms;
+    result["matches"] = matches;
+    return result;
+}
+
+// --- Batch Vertex Transform Kernels ---
+simd_transform_cpp::SimdLevel simd_level_from_name_internal_cpp(const std::string& name) {
+    if (name == "auto") return simd_transform_cpp::detect_simd_level();
+    if (name == "avx2") return simd_transform_cpp::SimdLevel::AVX2;
+    if (name == "sse2") return simd_transform_cpp::SimdLevel::SSE2;
+    if (name == "scalar") return simd_transform_cpp::SimdLevel::Scalar;
+    throw std::runtime_error("Unknown SIMD level '" + name + "' (expected auto, avx2, sse2 or scalar).");
+}
+
+std::string set_simd_transform_cpp(const std::string& level) {
+    return simd_transform_cpp::simd_level_name(simd_transform_cpp::set_active_level(simd_level_from_name_internal_cpp(level)));
+}
+
+py::dict get_simd_transform_info_cpp() {
+    py::dict result;
+    result["level"] = simd_transform_cpp::simd_level_name(simd_transform_cpp::active_level());
+    result["supported"] = simd_transform_cpp::simd_level_name(simd_transform_cpp::detect_simd_level());
+    return result;
+}
+
+// matrix (column-major 4x4, as in set_frame_parameters_cpp) * (x, y, z, 1) for the first three columns of
+// points_np (N, S), with the kernels of `level`. Returns (N, 4).
+py::array_t<float> transform_points_cpp(py::array_t<float, py::array::c_style | py::array::forcecast> points_np,
+                                        py::array_t<float, py::array::c_style | py::array::forcecast> matrix_np,
+                                        const std::string& level) {
+    if (points_np.ndim() != 2 || points_np.shape(1) < 3) throw std::runtime_error("Points must have shape (N, S), S >= 3.");
+    if (matrix_np.size() != 16) throw std::runtime_error("Matrix must have 16 floats.");
+    const simd_transform_cpp::SimdLevel simd_level = simd_level_from_name_internal_cpp(level);
+    if (static_cast<int>(simd_level) > static_cast<int>(simd_transform_cpp::detect_simd_level())) {
+        throw std::runtime_error("SIMD level '" + level + "' is not supported by this CPU.");
+    }
+    const size_t count = static_cast<size_t>(points_np.shape(0)), stride = static_cast<size_t>(points_np.shape(1));
+    std::vector<float> soa(count * 4);
+    float* const out[4] = {soa.data(), soa.data() + count, soa.data() + 2 * count, soa.data() + 3 * count};
+    const float* p = points_np.data();
+    simd_transform_cpp::transform_points(affine_rows_internal_cpp(glm::make_mat4(matrix_np.data()), 4),
+                                         {p, p + 1, p + 2, stride}, count, out, simd_level);
+    py::array_t<float> result_np({static_cast<py::ssize_t>(count), static_cast<py::ssize_t>(4)});
+    float* result = static_cast<float*>(result_np.request().ptr);
+    for (size_t i = 0; i < count; ++i) {
+        for (int r = 0; r < 4; ++r) result[i * 4 + r] = out[r][i];
+    }
+    return result_np;
+}
+
+// Microbenchmark for benchmarks/bench_simd_transform.py: the best of `repeats` single-threaded runs of the Stage 1
+// kernels (world positions from interleaved vertices) and the Stage 2 kernels (clip coordinates and view z from
+// SoA world positions, then projection to the screen) over all vertices, for every level the CPU supports.
+// Returns {level: {'world_ms', 'clip_ms', 'max_error' (largest difference of the clip coordinates from scalar)}}.
+py::dict benchmark_vertex_transform_cpp(py::array_t<float, py::array::c_style | py::array::forcecast> vertices_np,
+                                        int vertex_data_stride, int repeats) {
+    if (vertex_data_stride < 3 || vertices_np.size() % vertex_data_stride != 0) {
+        throw std::runtime_error("Vertex data/stride mismatch.");
+    }
+    const size_t count = static_cast<size_t>(vertices_np.size() / vertex_data_stride);
+    const glm::mat4 model_m = glm::rotate(glm::translate(glm::mat4(1.0f), glm::vec3(0.5f, -0.25f, -3.0f)), 0.3f, glm::vec3(0, 1, 0));
+    const glm::mat4 view_m = glm::lookAt(glm::vec3(0.0f, 0.5f, 2.0f), glm::vec3(0.0f, 0.0f, -3.0f), glm::vec3(0, 1, 0));
+    simd_transform_cpp::TransformRows clip_rows = affine_rows_internal_cpp(glm::perspective(glm::radians(60.0f), 16.0f / 9.0f, 0.1f, 1000.0f) * view_m, 4);
+    for (int c = 0; c < 4; ++c) clip_rows.rows[16 + c] = view_m[c][2];
+    clip_rows.num_rows = 5;
+    const simd_transform_cpp::TransformRows world_rows = affine_rows_internal_cpp(model_m, 3);
+
+    py::dict result;
+    std::vector<float> world(count * 3), clip(count * 5), screen(count * 3), scalar_clip;
+    float* const world_out[3] = {world.data(), world.data() + count, world.data() + 2 * count};
+    float* clip_out[5];
+    for (int r = 0; r < 5; ++r) clip_out[r] = clip.data() + r * count;
+    const float* v = vertices_np.data();
+    const int max_level = static_cast<int>(simd_transform_cpp::detect_simd_level());
+    for (int i_level = 0; i_level <= max_level; ++i_level) {
+        const auto level = static_cast<simd_transform_cpp::SimdLevel>(i_level);
+        double world_ms = std::numeric_limits<double>::infinity(), clip_ms = world_ms;
+        float max_error = 0.0f;
+        {
+            py::gil_scoped_release release;
+            for (int repeat = 0; repeat < std::max(1, repeats); ++repeat) {
+                auto start = std::chrono::steady_clock::now();
+                simd_transform_cpp::transform_points(world_rows, {v, v + 1, v + 2, static_cast<size_t>(vertex_data_stride)}, count, world_out, level);
+                world_ms = std::min(world_ms, std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - start).count());
+
+                start = std::chrono::steady_clock::now();
+                simd_transform_cpp::transform_points(clip_rows, {world_out[0], world_out[1], world_out[2], 1}, count, clip_out, level);
+                simd_transform_cpp::project_points(clip_out[0], clip_out[1], clip_out[3], count, 1920.0f, 1080.0f,
+                                                   screen.data(), screen.data() + count, screen.data() + 2 * count, level);
+                clip_ms = std::min(clip_ms, std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - start).count());
+            }
+            if (level == simd_transform_cpp::SimdLevel::Scalar) scalar_clip = clip;
+            for (size_t i = 0; i < clip.size(); ++i) max_error = std::max(max_error, std::abs(clip[i] - scalar_clip[i]));
+        }
+        py::dict level_result;
+        level_result["world_ms"] = world_ms;
+        level_result["clip_ms"] = clip_ms;
+        level_result["max_error"] = max_error;
+        result[simd_transform_cpp::simd_level_name(level)] = level_result;
+    }
+    return result;
+}
+
 // --- New Window/Input Control Functions ---
 void set_window_title_cpp(const std::string& title) {
     std::lock_guard<std::mutex> lock(g_sdl_resources_mutex);
@@ -1643,17 +3656,71 @@ py::array_t<float> calculate_triangle_normal_test_wrapper(
 }
 
 
+// --- Native OBJ Loading ---
+// Hands a std::vector to NumPy without copying: the capsule owns the vector.
+template <typename T>
+py::array_t<T> vector_to_numpy_owned(std::vector<T>&& values) {
+    auto* owned = new std::vector<T>(std::move(values));
+    py::capsule owner(owned, [](void* p) { delete static_cast<std::vector<T>*>(p); });
+    return py::array_t<T>({static_cast<py::ssize_t>(owned->size())}, {static_cast<py::ssize_t>(sizeof(T))},
+                          owned->data(), owner);
+}
+
+py::object load_obj_cpp(const std::string& path, std::vector<float> default_color, bool use_vertex_normals, bool indexed) {
+    if (default_color.size() < 3) {
+        throw std::runtime_error("C++ (load_obj_cpp): default_color must have 3 components.");
+    }
+    const std::array<float, 3> default_rgb = {default_color[0], default_color[1], default_color[2]};
+    std::vector<float> vertices;
+    std::vector<uint32_t> indices;
+    {
+        py::gil_scoped_release release;
+        obj_loader_cpp::ObjCorners corners = obj_loader_cpp::parse_obj(path, default_rgb, use_vertex_normals);
+        if (indexed) {
+            std::vector<size_t> unique_corners;
+            obj_loader_cpp::deduplicate_corners(corners, unique_corners, indices);
+            vertices.resize(unique_corners.size() * 9);
+            obj_loader_cpp::write_vertices(corners, &unique_corners, vertices.data());
+        } else {
+            vertices.resize(corners.corner_v.size() * 9);
+            obj_loader_cpp::write_vertices(corners, nullptr, vertices.data());
+        }
+    }
+    if (indexed) {
+        return py::make_tuple(vector_to_numpy_owned(std::move(vertices)), vector_to_numpy_owned(std::move(indices)));
+    }
+    return vector_to_numpy_owned(std::move(vertices));
+}
+
 PYBIND11_MODULE(cpp_renderer_core, m) {
     m.doc() = "C++ core renderer using direct SDL rendering, with L1/L2 cache and input handling";
 
+    // Registered meshes hold NumPy arrays: release them while the interpreter is still alive,
+    // even if cleanup_cpp_renderer was never called (static destructors run after finalization).
+    py::module_::import("atexit").attr("register")(py::cpp_function([]() { g_registered_meshes_cpp.clear(); }));
+
     m.def("initialize_cpp_renderer", &initialize_cpp_renderer,
-          "Initializes SDL creating its own window, and sets up caches. Returns (actual_width, actual_height).",
+          "Initializes SDL creating its own window, and sets up caches (memory budgets in bytes). "
+          "Returns (actual_width, actual_height).",
           py::arg("initial_width"), py::arg("initial_height"), py::arg("fullscreen_flag"),
-          py::arg("window_title"), py::arg("l1_cache_capacity"), py::arg("l2_cache_capacity"),
+          py::arg("window_title"), py::arg("l1_cache_bytes"), py::arg("l2_cache_bytes"),
           py::arg("background_color_rgb"));
 
     m.def("cleanup_cpp_renderer", &cleanup_cpp_renderer, "Cleans up C++ SDL resources and caches.");
 
+    m.def("set_cache_budgets_cpp", &set_cache_budgets_cpp,
+          "Sets the memory budgets of the L1 (screen triangles) and L2 (world data) caches in bytes, evicting "
+          "least recently used entries down to them. 0 disables a cache.",
+          py::arg("l1_cache_bytes"), py::arg("l2_cache_bytes"));
+
+    m.def("get_cache_stats_cpp", &get_cache_stats_cpp,
+          "Returns {'l1': stats, 'l2': stats}, stats = {'entries', 'bytes', 'budget_bytes', 'hits', 'misses', "
+          "'insertions', 'evictions', 'saved_ms', 'saved_ms_per_hit'}. A hit saves the time its entry took to build: "
+          "culling and Stages 1-2 for L1, Stage 1 for L2.");
+
+    m.def("reset_cache_stats_cpp", &reset_cache_stats_cpp,
+          "Zeroes the hit, miss, insertion, eviction and saved time counters of both caches; the entries stay.");
+
     m.def("set_frame_parameters_cpp", &set_frame_parameters_cpp,
           "Sets view/projection matrices and other per-frame rendering flags for C++ processing.",
           py::arg("view_matrix_np"), py::arg("projection_matrix_np"), py::arg("camera_pos_w_np"),
@@ -1661,6 +3728,101 @@ PYBIND11_MODULE(cpp_renderer_core, m) {
           py::arg("debug_clipping_enabled_flag"), py::arg("debug_clipped_color_arr"),
           py::arg("sort_triangles_flag"), py::arg("small_triangle_area_threshold"));
 
+    m.def("set_occlusion_parameters_cpp", &set_occlusion_parameters_cpp,
+          "Configures occlusion culling in submit_batch_cpp: the nearest clusters of cluster meshes (up to "
+          "max_occluder_triangles) are rasterized into a width x height depth buffer, and BVH nodes of all meshes "
+          "hidden behind them are skipped. Disabled by default.",
+          py::arg("enabled"), py::arg("width") = 256, py::arg("height") = 144, py::arg("max_occluder_triangles") = 4096);
+
+    m.def("set_software_rasterizer_cpp", &set_software_rasterizer_cpp,
+          "Switches render_accumulated_triangles_cpp between sorting triangles for SDL_RenderGeometry (default) and "
+          "rasterizing them with a per-pixel depth buffer into a streamed texture (no sorting needed). The screen is "
+          "split into tile_size x tile_size tiles rasterized in parallel by num_threads OpenMP threads (0 - all).",
+          py::arg("enabled"), py::arg("tile_size") = 64, py::arg("num_threads") = 0);
+
+    m.def("depth_sort_order_cpp", &depth_sort_order_cpp,
+          "Returns the painter's order (stable, ascending depth) that render_accumulated_triangles_cpp uses for "
+          "triangles with the given depths: indices from the parallel LSD radix sort.",
+          py::arg("depths_np"));
+
+    m.def("clip_triangle_cpp", &clip_triangle_cpp,
+          "Clips one triangle (3, 4) in clip space as Stage 2 does, with the side planes at +-guard_band * w "
+          "(1 - the frustum). Returns (polygon (M, 4), drawn as a fan around its first vertex, M = 0 if nothing is "
+          "left; is_original (M,) bool - the vertex is one of the input).",
+          py::arg("clip_vertices_np"), py::arg("guard_band") = 1.0f);
+
+    m.def("occlusion_test_cpp", &occlusion_test_cpp,
+          "Test hook: rasterizes the occluder triangles (T, 3, 4) in clip space into a width x height occlusion "
+          "buffer (as set_occlusion_parameters_cpp does with the nearest map clusters) and tests the boxes (B, 6) "
+          "[min.xyz, max.xyz], transformed by mvp (column-major 4x4), against it. Returns (B,) bool - box occluded.",
+          py::arg("occluders_np"), py::arg("boxes_np"), py::arg("mvp_np"), py::arg("width") = 256,
+          py::arg("height") = 144);
+
+    m.def("set_guard_band_clipping_cpp", &set_guard_band_clipping_cpp,
+          "Enables guard-band clipping: triangles crossing the screen edges are clipped only if they reach beyond "
+          "guard_band times the screen size (from its center); otherwise they go to the rasterizer unclipped. "
+          "The near and far planes are always clipped. Disabled by default (clipping to the frustum).",
+          py::arg("enabled"), py::arg("guard_band") = 4.0f);
+
+    m.def("set_temporal_depth_sort_cpp", &set_temporal_depth_sort_cpp,
+          "Enables or disables (default) reusing the previous frame's painter's order per object id: the order is "
+          "carried into the new frame (objects recomputed only because the camera moved without turning take their "
+          "new depths, triangles matched by source triangle), repaired by an insertion sort, and only moved or new "
+          "objects and triangles are radix-sorted and merged in. The result equals the radix sort's order. Resets "
+          "the remembered order.",
+          py::arg("enabled"));
+
+    m.def("set_depth_sort_capture_cpp", &set_depth_sort_capture_cpp,
+          "Test hook: while enabled, every painter's sort keeps a copy of the frame's triangle depths and of its "
+          "order (get_captured_depth_sort_cpp). Clears the last capture.",
+          py::arg("enabled"));
+
+    m.def("get_captured_depth_sort_cpp", &get_captured_depth_sort_cpp,
+          "Test hook: (depths (N,), order (N,)) of the last frame sorted while capturing - the triangles' depths in "
+          "submission order and the painter's order as indices into them (compare with depth_sort_order_cpp).");
+
+    m.def("get_culling_stats_cpp", &get_culling_stats_cpp,
+          "Counters of the frame since set_frame_parameters_cpp, for objects missing the L1 cache: stage2_triangles "
+          "(source triangles left for Stage 2 after BVH, cluster and occlusion culling) and culled_clusters (dropped by "
+          "the PVS and the back-facing cone test).");
+
+    m.def("get_depth_sort_stats_cpp", &get_depth_sort_stats_cpp,
+          "Counters of the last frame's painter's sort (zeros if it was not sorted): triangles, reused (placed by "
+          "the previous frame's order), rekeyed (reused with new depths), fresh (radix-sorted this frame) and sort_ms.");
+
+    m.def("benchmark_depth_sort_cpp", &benchmark_depth_sort_cpp,
+          "Times std::sort over screen triangle structs against the radix depth sort for the given depths. "
+          "Returns {'std_sort_ms', 'radix_sort_ms' (best of repeats), 'matches' (same depth order)}.",
+          py::arg("depths_np"), py::arg("repeats") = 5);
+
+    m.def("set_simd_transform_cpp", &set_simd_transform_cpp,
+          "Selects the vertex transform kernels of Stage 1 and Stage 2: 'auto' (default - the best the CPU supports), "
+          "'avx2', 'sse2' or 'scalar'. Levels the CPU lacks fall back to the best supported one. "
+          "Returns the level in use.",
+          py::arg("level") = "auto");
+
+    m.def("get_simd_transform_info_cpp", &get_simd_transform_info_cpp,
+          "Returns {'level': kernels in use, 'supported': best level of this CPU}.");
+
+    m.def("transform_points_cpp", &transform_points_cpp,
+          "Multiplies (x, y, z, 1) from the first three columns of points_np (N, S) by a column-major 4x4 matrix "
+          "with the kernels of the given level ('avx2', 'sse2', 'scalar' or 'auto'). Returns (N, 4).",
+          py::arg("points_np"), py::arg("matrix_np"), py::arg("level") = "auto");
+
+    m.def("benchmark_vertex_transform_cpp", &benchmark_vertex_transform_cpp,
+          "Times the Stage 1 (world) and Stage 2 (clip and screen) transform kernels of every supported level over "
+          "the vertices (best of repeats, one thread). Returns {level: {'world_ms', 'clip_ms', 'max_error'}}.",
+          py::arg("vertices_np"), py::arg("vertex_data_stride"), py::arg("repeats") = 5);
+
+    m.def("get_software_framebuffer_cpp", &get_software_framebuffer_cpp,
+          "Returns a copy of the software rasterizer's last frame, shape (height, width), uint32 ARGB8888 "
+          "((0, 0) before the first software frame).");
+
+    m.def("get_software_raster_stats_cpp", &get_software_raster_stats_cpp,
+          "Counters of the last frame drawn by the software rasterizer: submitted (triangles handed to it), triangles "
+          "(the non-degenerate on-screen ones that reached binning), bin_entries (triangle-tile pairs), "
+          "fragments (covered pixels before the depth test), tiles, threads and raster_ms.");
+
     m.def("process_and_accumulate_object_cpp", &process_and_accumulate_object_cpp,
           "Processes a single object and adds its triangles to a global C++ list for the current frame.",
           py::arg("object_id_py"), py::arg("transform_params_np"),
@@ -1668,6 +3830,41 @@ PYBIND11_MODULE(cpp_renderer_core, m) {
           py::arg("use_vertex_normals_from_mesh"),
           py::call_guard<py::gil_scoped_release>()); 
 
+    m.def("process_and_accumulate_indexed_object_cpp", &process_and_accumulate_indexed_object_cpp,
+          "Like process_and_accumulate_object_cpp, but for deduplicated vertices plus uint32 triangle indices: "
+          "each unique vertex is transformed once per L2 miss.",
+          py::arg("object_id_py"), py::arg("transform_params_np"),
+          py::arg("local_vertex_data_np"), py::arg("index_data_np"), py::arg("vertex_data_stride"),
+          py::arg("use_vertex_normals_from_mesh"),
+          py::call_guard<py::gil_scoped_release>()); 
+
+    m.def("register_mesh_cpp", &register_mesh_cpp,
+          "Registers mesh buffers for submit_batch_cpp and returns an integer handle. index_data_np is None for a "
+          "triangle soup. bvh_* are the optional mesh-space BVH arrays of meshes/mesh_bvh.py used for frustum culling, "
+          "cluster_* the optional clusters of meshes/mesh_clusters.py (back-facing cluster culling, one OpenMP task per cluster), "
+          "pvs_* the optional cluster PVS of meshes/mesh_pvs.py. "
+          "The arrays are referenced, not copied: they must not be modified while registered.",
+          py::arg("local_vertex_data_np"), py::arg("index_data_np"), py::arg("vertex_data_stride"),
+          py::arg("use_vertex_normals_from_mesh"), py::arg("bvh_bounds_np") = py::none(),
+          py::arg("bvh_nodes_np") = py::none(), py::arg("bvh_triangles_np") = py::none(),
+          py::arg("cluster_ranges_np") = py::none(), py::arg("cluster_cones_np") = py::none(),
+          py::arg("pvs_grid_np") = py::none(), py::arg("pvs_visibility_np") = py::none());
+
+    m.def("unregister_mesh_cpp", &unregister_mesh_cpp,
+          "Releases a handle returned by register_mesh_cpp.", py::arg("mesh_handle"));
+
+    m.def("submit_batch_cpp", &submit_batch_cpp,
+          "Processes N objects in one call: object_ids (uint64[N]), transforms (float32[N, 9], as in "
+          "process_and_accumulate_object_cpp) and mesh_handles (int64[N]). Objects are processed in parallel "
+          "without the GIL and their triangles are appended in submission order.",
+          py::arg("object_ids"), py::arg("transforms"), py::arg("mesh_handles"));
+
+    m.def("load_obj_cpp", &load_obj_cpp,
+          "Parses an OBJ (+MTL) file natively into the interleaved [x,y,z, r,g,b, nx,ny,nz] float32 buffer of "
+          "meshes.obj_loader.load_obj_file. With indexed=True returns (unique vertices, uint32 indices) like "
+          "load_obj_file_indexed. The GIL is released while parsing; arrays own their memory (no copy).",
+          py::arg("path"), py::arg("default_color"), py::arg("use_vertex_normals") = true, py::arg("indexed") = false);
+
     m.def("render_accumulated_triangles_cpp", &render_accumulated_triangles_cpp,
           "Renders all accumulated triangles for the frame to the SDL renderer.",
           py::call_guard<py::gil_scoped_release>()); 
@@ -0,0 +1,265 @@
+// --- START OF FILE obj_loader_cpp.hpp ---
+// Native OBJ/MTL loader behind load_obj_cpp (see cpp_renderer_core.cpp).
+// Follows meshes/obj_loader.py record for record: v/vn/f/usemtl/mtllib, fan triangulation,
+// one palette entry per usemtl occurrence, default normal (0, 0, 1) and default color for
+// materials without Kd. Pure C++: safe to run with the GIL released.
+
+#pragma once
+
+#include <array>
+#include <charconv>
+#include <cstdint>
+#include <filesystem>
+#include <fstream>
+#include <stdexcept>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+#include <vector>
+
+namespace obj_loader_cpp {
+
+struct ObjCorners {
+    std::vector<float> positions;           // xyz per "v"
+    std::vector<float> normals;             // xyz per "vn"
+    std::vector<std::array<float, 3>> palette; // 0 - default color, then one entry per usemtl
+    std::vector<int64_t> corner_v;          // 0-based, 3 corners per triangle
+    std::vector<int64_t> corner_vn;         // 0-based, -1 - no normal
+    std::vector<int32_t> corner_material;   // index into palette
+};
+
+inline bool is_blank(char c) { return c == ' ' || c == '\t' || c == '\r' || c == '\v' || c == '\f'; }
+
+inline std::string_view trim_left(std::string_view s) {
+    size_t i = 0;
+    while (i < s.size() && is_blank(s[i])) ++i;
+    return s.substr(i);
+}
+
+inline std::string_view next_token(std::string_view& s) {
+    s = trim_left(s);
+    size_t end = 0;
+    while (end < s.size() && !is_blank(s[end])) ++end;
+    std::string_view token = s.substr(0, end);
+    s = s.substr(end);
+    return token;
+}
+
+inline std::string_view strip_comment(std::string_view s) {
+    size_t hash = s.find('#');
+    return hash == std::string_view::npos ? s : s.substr(0, hash);
+}
+
+inline double parse_double(std::string_view token) {
+    if (!token.empty() && token[0] == '+') token.remove_prefix(1);
+    double value = 0.0;
+    auto result = std::from_chars(token.data(), token.data() + token.size(), value);
+    if (result.ec != std::errc() || result.ptr != token.data() + token.size()) {
+        throw std::runtime_error("OBJ: invalid number '" + std::string(token) + "'");
+    }
+    return value;
+}
+
+inline int64_t parse_int(std::string_view token) {
+    if (!token.empty() && token[0] == '+') token.remove_prefix(1);
+    int64_t value = 0;
+    auto result = std::from_chars(token.data(), token.data() + token.size(), value);
+    if (result.ec != std::errc() || result.ptr != token.data() + token.size()) {
+        throw std::runtime_error("OBJ: invalid index '" + std::string(token) + "'");
+    }
+    return value;
+}
+
+inline void parse_vec3(std::string_view body, std::vector<float>& out) {
+    for (int k = 0; k < 3; ++k) {
+        std::string_view token = next_token(body);
+        if (token.empty()) throw std::runtime_error("OBJ: vector record with less than 3 components");
+        out.push_back(static_cast<float>(parse_double(token)));
+    }
+}
+
+// Calls on_line(std::string_view) for every line, reading the file in fixed-size blocks.
+template <typename LineFn>
+void for_each_line(const std::string& path, LineFn&& on_line) {
+    std::ifstream file(path, std::ios::binary);
+    if (!file) throw std::runtime_error("OBJ: file '" + path + "' not found or unreadable");
+    constexpr size_t kBlockSize = 1 << 20;
+    std::string buffer;
+    std::vector<char> block(kBlockSize);
+    while (file) {
+        file.read(block.data(), static_cast<std::streamsize>(block.size()));
+        std::streamsize got = file.gcount();
+        if (got <= 0) break;
+        buffer.append(block.data(), static_cast<size_t>(got));
+        size_t line_start = 0;
+        for (size_t nl = buffer.find('\n'); nl != std::string::npos; nl = buffer.find('\n', line_start)) {
+            on_line(std::string_view(buffer.data() + line_start, nl - line_start));
+            line_start = nl + 1;
+        }
+        buffer.erase(0, line_start);
+    }
+    if (!buffer.empty()) on_line(std::string_view(buffer));
+}
+
+inline std::unordered_map<std::string, std::array<float, 3>> parse_mtl_kd(const std::string& path) {
+    std::unordered_map<std::string, std::array<float, 3>> colors;
+    std::ifstream probe(path, std::ios::binary);
+    if (!probe) return colors; // Как parse_mtl: нет файла - нет материалов.
+    probe.close();
+    std::string current;
+    bool has_current = false;
+    for_each_line(path, [&](std::string_view line) {
+        line = trim_left(line);
+        if (line.empty() || line[0] == '#') return;
+        std::string_view command = next_token(line);
+        if (command == "newmtl") {
+            current = std::string(next_token(line));
+            has_current = true;
+            colors.erase(current);
+        } else if (command == "Kd" && has_current) {
+            std::vector<float> kd;
+            parse_vec3(line, kd);
+            colors[current] = {kd[0], kd[1], kd[2]};
+        }
+    });
+    return colors;
+}
+
+inline std::string resolve_mtl_path(const std::string& obj_path, const std::string& mtl_name) {
+    std::filesystem::path candidate = std::filesystem::path(obj_path).parent_path() / mtl_name;
+    std::error_code ec;
+    if (std::filesystem::is_regular_file(candidate, ec)) return candidate.string();
+    return "assets/" + mtl_name;
+}
+
+inline ObjCorners parse_obj(const std::string& path, const std::array<float, 3>& default_color, bool use_vertex_normals) {
+    ObjCorners out;
+    std::vector<std::string> mtllib_names;
+    std::vector<std::string> usemtl_names;
+    int32_t current_material = 0;
+    std::vector<int64_t> face_v, face_vn;
+
+    for_each_line(path, [&](std::string_view line) {
+        line = trim_left(line);
+        if (line.empty() || line[0] == '#') return;
+        size_t cmd_end = 0;
+        while (cmd_end < line.size() && !is_blank(line[cmd_end])) ++cmd_end;
+        // Команда должна отделяться пробелом/табом, как в регулярках Python-загрузчика.
+        if (cmd_end >= line.size() || (line[cmd_end] != ' ' && line[cmd_end] != '\t')) return;
+        std::string_view command = line.substr(0, cmd_end);
+        std::string_view body = line.substr(cmd_end);
+
+        if (command == "v") {
+            parse_vec3(strip_comment(body), out.positions);
+        } else if (command == "vn") {
+            if (use_vertex_normals) parse_vec3(strip_comment(body), out.normals);
+        } else if (command == "f") {
+            body = strip_comment(body);
+            face_v.clear();
+            face_vn.clear();
+            const int64_t v_count = static_cast<int64_t>(out.positions.size() / 3);
+            const int64_t vn_count = static_cast<int64_t>(out.normals.size() / 3);
+            for (std::string_view corner = next_token(body); !corner.empty(); corner = next_token(body)) {
+                size_t slash1 = corner.find('/');
+                int64_t v_raw = parse_int(corner.substr(0, slash1));
+                int64_t vn_raw = 0;
+                if (slash1 != std::string_view::npos) {
+                    size_t slash2 = corner.find('/', slash1 + 1);
+                    if (slash2 != std::string_view::npos && slash2 + 1 < corner.size()) {
+                        std::string_view vn_token = corner.substr(slash2 + 1);
+                        vn_token = vn_token.substr(0, vn_token.find('/'));
+                        vn_raw = parse_int(vn_token);
+                    }
+                }
+                face_v.push_back(v_raw > 0 ? v_raw - 1 : v_count + v_raw);
+                face_vn.push_back(!use_vertex_normals || vn_raw == 0 ? -1 : (vn_raw > 0 ? vn_raw - 1 : vn_count + vn_raw));
+            }
+            // Триангуляция веером: (0, 1, 2), затем (0, i-1, i).
+            for (size_t i = 2; i < face_v.size(); ++i) {
+                const size_t tri[3] = {0, i - 1, i};
+                for (size_t k : tri) {
+                    out.corner_v.push_back(face_v[k]);
+                    out.corner_vn.push_back(face_vn[k]);
+                    out.corner_material.push_back(current_material);
+                }
+            }
+        } else if (command == "usemtl") {
+            usemtl_names.emplace_back(next_token(body));
+            current_material = static_cast<int32_t>(usemtl_names.size());
+        } else if (command == "mtllib") {
+            mtllib_names.emplace_back(next_token(body));
+        }
+    });
+
+    // Как и в Python-загрузчике, все mtllib файла объединяются до разрешения usemtl.
+    std::unordered_map<std::string, std::array<float, 3>> materials;
+    for (const std::string& name : mtllib_names) {
+        for (auto& [material, kd] : parse_mtl_kd(resolve_mtl_path(path, name))) materials[material] = kd;
+    }
+    out.palette.reserve(usemtl_names.size() + 1);
+    out.palette.push_back(default_color);
+    for (const std::string& name : usemtl_names) {
+        auto it = materials.find(name);
+        out.palette.push_back(it != materials.end() ? it->second : default_color);
+    }
+
+    const int64_t v_total = static_cast<int64_t>(out.positions.size() / 3);
+    const int64_t vn_total = static_cast<int64_t>(out.normals.size() / 3);
+    for (size_t i = 0; i < out.corner_v.size(); ++i) {
+        if (out.corner_v[i] < 0 || out.corner_v[i] >= v_total) {
+            throw std::runtime_error("OBJ: vertex index out of range in '" + path + "'");
+        }
+        if (out.corner_vn[i] >= vn_total || out.corner_vn[i] < 0) out.corner_vn[i] = -1;
+    }
+    return out;
+}
+
+// Interleaved [x,y,z, r,g,b, nx,ny,nz] for the given corners, written to dst.
+inline void write_vertices(const ObjCorners& corners, const std::vector<size_t>* corner_subset, float* dst) {
+    const long count = static_cast<long>(corner_subset ? corner_subset->size() : corners.corner_v.size());
+#ifdef _MSC_VER
+    _Pragma("omp parallel for schedule(static)")
+#else
+    #pragma omp parallel for schedule(static)
+#endif
+    for (long i = 0; i < count; ++i) {
+        const size_t c = corner_subset ? (*corner_subset)[i] : static_cast<size_t>(i);
+        float* row = dst + static_cast<size_t>(i) * 9;
+        const float* p = corners.positions.data() + corners.corner_v[c] * 3;
+        const std::array<float, 3>& color = corners.palette[corners.corner_material[c]];
+        row[0] = p[0]; row[1] = p[1]; row[2] = p[2];
+        row[3] = color[0]; row[4] = color[1]; row[5] = color[2];
+        if (corners.corner_vn[c] >= 0) {
+            const float* n = corners.normals.data() + corners.corner_vn[c] * 3;
+            row[6] = n[0]; row[7] = n[1]; row[8] = n[2];
+        } else {
+            row[6] = 0.0f; row[7] = 0.0f; row[8] = 1.0f;
+        }
+    }
+}
+
+// Unique corners (v, vn, material) in order of first appearance plus uint32 index per corner.
+inline void deduplicate_corners(const ObjCorners& corners, std::vector<size_t>& unique_corners, std::vector<uint32_t>& indices) {
+    struct KeyHash {
+        size_t operator()(const std::array<int64_t, 3>& k) const {
+            size_t seed = std::hash<int64_t>{}(k[0]);
+            seed ^= std::hash<int64_t>{}(k[1]) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
+            seed ^= std::hash<int64_t>{}(k[2]) + 0x9e3779b9 + (seed << 6) + (seed >> 2);
+            return seed;
+        }
+    };
+    const size_t count = corners.corner_v.size();
+    std::unordered_map<std::array<int64_t, 3>, uint32_t, KeyHash> ids;
+    ids.reserve(count / 2 + 1);
+    indices.resize(count);
+    for (size_t c = 0; c < count; ++c) {
+        std::array<int64_t, 3> key = {corners.corner_v[c], corners.corner_vn[c], corners.corner_material[c]};
+        auto [it, inserted] = ids.emplace(key, static_cast<uint32_t>(unique_corners.size()));
+        if (inserted) unique_corners.push_back(c);
+        indices[c] = it->second;
+    }
+}
+
+} // namespace obj_loader_cpp
+
+// --- END OF FILE obj_loader_cpp.hpp ---
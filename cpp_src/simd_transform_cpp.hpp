@@ -0,0 +1,237 @@
+// --- START OF FILE simd_transform_cpp.hpp ---
+// Batch vertex transform kernels behind Stage 1 and Stage 2 of cpp_renderer_core.cpp.
+// Points are multiplied by up to MAX_ROWS affine rows (out_r = a_r * x + b_r * y + c_r * z + d_r) and written
+// in SoA layout, 4 (SSE2) or 8 (AVX2 + FMA) points per instruction; project_points does the perspective divide
+// and viewport mapping the same way. The module is built for plain x86-64 (see setup.py), so the AVX2 kernels
+// carry a function-level target attribute and are only called after a CPUID check; other CPUs use the scalar
+// kernels. Pure C++: safe to run with the GIL released.
+
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+
+#if defined(__x86_64__) || defined(_M_X64) || defined(__i386__) || defined(_M_IX86)
+#define SIMD_TRANSFORM_X86 1
+#include <immintrin.h>
+#ifdef _MSC_VER
+#include <intrin.h>
+#endif
+#endif
+
+#if defined(SIMD_TRANSFORM_X86) && (defined(__GNUC__) || defined(__clang__))
+#define SIMD_TRANSFORM_TARGET_SSE2 __attribute__((target("sse2")))
+#define SIMD_TRANSFORM_TARGET_AVX2 __attribute__((target("avx2,fma")))
+#else // MSVC compiles any intrinsic without /arch
+#define SIMD_TRANSFORM_TARGET_SSE2
+#define SIMD_TRANSFORM_TARGET_AVX2
+#endif
+
+namespace simd_transform_cpp {
+
+enum class SimdLevel : int { Scalar = 0, SSE2 = 1, AVX2 = 2 };
+
+inline const char* simd_level_name(SimdLevel level) {
+    switch (level) {
+        case SimdLevel::AVX2: return "avx2";
+        case SimdLevel::SSE2: return "sse2";
+        default: return "scalar";
+    }
+}
+
+constexpr int MAX_ROWS = 5;
+
+// Affine rows, row-major: rows[4 * r + c] multiplies x, y, z and 1 for c = 0..3.
+struct TransformRows {
+    float rows[4 * MAX_ROWS] = {};
+    int num_rows = 0;
+};
+
+// Point i is (x[i * stride], y[i * stride], z[i * stride]): stride 1 - SoA arrays, stride > 1 - interleaved
+// vertices (e.g. x = vertex_data, y = vertex_data + 1, z = vertex_data + 2, stride = vertex_data_stride).
+struct PointsIn {
+    const float* x;
+    const float* y;
+    const float* z;
+    size_t stride;
+};
+
+inline void transform_points_scalar(const TransformRows& t, const PointsIn& in, size_t begin, size_t end,
+                                    float* const* out) {
+    for (size_t i = begin; i < end; ++i) {
+        const float x = in.x[i * in.stride], y = in.y[i * in.stride], z = in.z[i * in.stride];
+        for (int r = 0; r < t.num_rows; ++r) {
+            const float* row = t.rows + 4 * r;
+            out[r][i] = row[0] * x + row[1] * y + row[2] * z + row[3];
+        }
+    }
+}
+
+// inv_w = 1 / w, screen = ((x, -y) * inv_w + 1) * 0.5 * (width, height) - the viewport mapping of Stage 2.
+inline void project_points_scalar(const float* clip_x, const float* clip_y, const float* clip_w, size_t begin,
+                                  size_t end, float width, float height,
+                                  float* screen_x, float* screen_y, float* inv_w) {
+    for (size_t i = begin; i < end; ++i) {
+        const float iw = 1.0f / clip_w[i];
+        inv_w[i] = iw;
+        screen_x[i] = (clip_x[i] * iw + 1.0f) * 0.5f * width;
+        screen_y[i] = (1.0f - clip_y[i] * iw) * 0.5f * height;
+    }
+}
+
+#ifdef SIMD_TRANSFORM_X86
+SIMD_TRANSFORM_TARGET_SSE2
+inline void transform_points_sse2(const TransformRows& t, const PointsIn& in, size_t count, float* const* out) {
+    __m128 coef[MAX_ROWS][4];
+    for (int r = 0; r < t.num_rows; ++r) {
+        for (int c = 0; c < 4; ++c) coef[r][c] = _mm_set1_ps(t.rows[4 * r + c]);
+    }
+    const size_t s = in.stride;
+    size_t i = 0;
+    for (; i + 4 <= count; i += 4) {
+        __m128 x, y, z;
+        if (s == 1) {
+            x = _mm_loadu_ps(in.x + i); y = _mm_loadu_ps(in.y + i); z = _mm_loadu_ps(in.z + i);
+        } else {
+            x = _mm_setr_ps(in.x[i * s], in.x[(i + 1) * s], in.x[(i + 2) * s], in.x[(i + 3) * s]);
+            y = _mm_setr_ps(in.y[i * s], in.y[(i + 1) * s], in.y[(i + 2) * s], in.y[(i + 3) * s]);
+            z = _mm_setr_ps(in.z[i * s], in.z[(i + 1) * s], in.z[(i + 2) * s], in.z[(i + 3) * s]);
+        }
+        for (int r = 0; r < t.num_rows; ++r) {
+            const __m128 xy = _mm_add_ps(_mm_mul_ps(coef[r][0], x), _mm_mul_ps(coef[r][1], y));
+            const __m128 zw = _mm_add_ps(_mm_mul_ps(coef[r][2], z), coef[r][3]);
+            _mm_storeu_ps(out[r] + i, _mm_add_ps(xy, zw));
+        }
+    }
+    transform_points_scalar(t, in, i, count, out);
+}
+
+SIMD_TRANSFORM_TARGET_SSE2
+inline void project_points_sse2(const float* clip_x, const float* clip_y, const float* clip_w, size_t count,
+                                float width, float height, float* screen_x, float* screen_y, float* inv_w) {
+    const __m128 one = _mm_set1_ps(1.0f);
+    const __m128 half_w = _mm_set1_ps(0.5f * width), half_h = _mm_set1_ps(0.5f * height);
+    size_t i = 0;
+    for (; i + 4 <= count; i += 4) {
+        const __m128 iw = _mm_div_ps(one, _mm_loadu_ps(clip_w + i));
+        _mm_storeu_ps(inv_w + i, iw);
+        _mm_storeu_ps(screen_x + i, _mm_mul_ps(_mm_add_ps(_mm_mul_ps(_mm_loadu_ps(clip_x + i), iw), one), half_w));
+        _mm_storeu_ps(screen_y + i, _mm_mul_ps(_mm_sub_ps(one, _mm_mul_ps(_mm_loadu_ps(clip_y + i), iw)), half_h));
+    }
+    project_points_scalar(clip_x, clip_y, clip_w, i, count, width, height, screen_x, screen_y, inv_w);
+}
+
+SIMD_TRANSFORM_TARGET_AVX2
+inline void transform_points_avx2(const TransformRows& t, const PointsIn& in, size_t count, float* const* out) {
+    __m256 coef[MAX_ROWS][4];
+    for (int r = 0; r < t.num_rows; ++r) {
+        for (int c = 0; c < 4; ++c) coef[r][c] = _mm256_set1_ps(t.rows[4 * r + c]);
+    }
+    const size_t s = in.stride;
+    const __m256i offsets = _mm256_mullo_epi32(_mm256_setr_epi32(0, 1, 2, 3, 4, 5, 6, 7),
+                                               _mm256_set1_epi32(static_cast<int>(s)));
+    size_t i = 0;
+    for (; i + 8 <= count; i += 8) {
+        __m256 x, y, z;
+        if (s == 1) {
+            x = _mm256_loadu_ps(in.x + i); y = _mm256_loadu_ps(in.y + i); z = _mm256_loadu_ps(in.z + i);
+        } else {
+            x = _mm256_i32gather_ps(in.x + i * s, offsets, 4);
+            y = _mm256_i32gather_ps(in.y + i * s, offsets, 4);
+            z = _mm256_i32gather_ps(in.z + i * s, offsets, 4);
+        }
+        for (int r = 0; r < t.num_rows; ++r) {
+            __m256 v = _mm256_fmadd_ps(coef[r][2], z, coef[r][3]);
+            v = _mm256_fmadd_ps(coef[r][1], y, v);
+            _mm256_storeu_ps(out[r] + i, _mm256_fmadd_ps(coef[r][0], x, v));
+        }
+    }
+    transform_points_scalar(t, in, i, count, out);
+}
+
+SIMD_TRANSFORM_TARGET_AVX2
+inline void project_points_avx2(const float* clip_x, const float* clip_y, const float* clip_w, size_t count,
+                                float width, float height, float* screen_x, float* screen_y, float* inv_w) {
+    const __m256 one = _mm256_set1_ps(1.0f);
+    const __m256 half_w = _mm256_set1_ps(0.5f * width), half_h = _mm256_set1_ps(0.5f * height);
+    size_t i = 0;
+    for (; i + 8 <= count; i += 8) {
+        const __m256 iw = _mm256_div_ps(one, _mm256_loadu_ps(clip_w + i));
+        _mm256_storeu_ps(inv_w + i, iw);
+        _mm256_storeu_ps(screen_x + i, _mm256_mul_ps(_mm256_fmadd_ps(_mm256_loadu_ps(clip_x + i), iw, one), half_w));
+        _mm256_storeu_ps(screen_y + i, _mm256_mul_ps(_mm256_fnmadd_ps(_mm256_loadu_ps(clip_y + i), iw, one), half_h));
+    }
+    project_points_scalar(clip_x, clip_y, clip_w, i, count, width, height, screen_x, screen_y, inv_w);
+}
+#endif
+
+// The best level this CPU (and OS, for the AVX registers) supports.
+inline SimdLevel detect_simd_level() {
+#ifdef SIMD_TRANSFORM_X86
+#if defined(_MSC_VER) && !defined(__clang__)
+    int info[4];
+    __cpuid(info, 0);
+    const int max_leaf = info[0];
+    __cpuid(info, 1);
+    const bool sse2 = (info[3] & (1 << 26)) != 0;
+    const bool fma = (info[2] & (1 << 12)) != 0;
+    const bool os_avx = (info[2] & (1 << 27)) != 0 && (info[2] & (1 << 28)) != 0 && (_xgetbv(0) & 6) == 6;
+    if (max_leaf >= 7 && fma && os_avx) {
+        __cpuidex(info, 7, 0);
+        if (info[1] & (1 << 5)) return SimdLevel::AVX2;
+    }
+    if (sse2) return SimdLevel::SSE2;
+#else
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("avx2") && __builtin_cpu_supports("fma")) return SimdLevel::AVX2;
+    if (__builtin_cpu_supports("sse2")) return SimdLevel::SSE2;
+#endif
+#endif
+    return SimdLevel::Scalar;
+}
+
+inline SimdLevel& active_level_storage() {
+    static SimdLevel level = detect_simd_level();
+    return level;
+}
+
+inline SimdLevel active_level() { return active_level_storage(); }
+
+// Selects the kernels (levels above detect_simd_level() fall back to it); returns the level in use.
+inline SimdLevel set_active_level(SimdLevel requested) {
+    const SimdLevel supported = detect_simd_level();
+    active_level_storage() = static_cast<int>(requested) > static_cast<int>(supported) ? supported : requested;
+    return active_level_storage();
+}
+
+// out[r][i] for points 0..count-1 and rows 0..t.num_rows-1.
+inline void transform_points(const TransformRows& t, const PointsIn& in, size_t count, float* const* out,
+                             SimdLevel level = active_level()) {
+#ifdef SIMD_TRANSFORM_X86
+    if (level == SimdLevel::AVX2) { transform_points_avx2(t, in, count, out); return; }
+    if (level == SimdLevel::SSE2) { transform_points_sse2(t, in, count, out); return; }
+#endif
+    (void)level;
+    transform_points_scalar(t, in, 0, count, out);
+}
+
+inline void project_points(const float* clip_x, const float* clip_y, const float* clip_w, size_t count,
+                           float width, float height, float* screen_x, float* screen_y, float* inv_w,
+                           SimdLevel level = active_level()) {
+#ifdef SIMD_TRANSFORM_X86
+    if (level == SimdLevel::AVX2) {
+        project_points_avx2(clip_x, clip_y, clip_w, count, width, height, screen_x, screen_y, inv_w);
+        return;
+    }
+    if (level == SimdLevel::SSE2) {
+        project_points_sse2(clip_x, clip_y, clip_w, count, width, height, screen_x, screen_y, inv_w);
+        return;
+    }
+#endif
+    (void)level;
+    project_points_scalar(clip_x, clip_y, clip_w, 0, count, width, height, screen_x, screen_y, inv_w);
+}
+
+} // namespace simd_transform_cpp
+
+// --- END OF FILE simd_transform_cpp.hpp ---
@@ -5,6 +5,7 @@ from settings import * # WIN_RES, FULLSCREEN, BG_COLOR, FOV_DEG, NEAR, FAR, TEST
 import pygame as pg
 from scene import Scene 
 from player import Player # Player должен быть адаптирован под SDL-ввод
+from meshes.asset_loader import get_asset_loader # Применение фоновых загрузок мешей
 import multiprocessing # Для multiprocessing.freeze_support()
 import sys 
 import gc # Для gc.disable() и manage_gc()
@@ -262,6 +263,8 @@ class Engine:
 
     @main_profiler
     def update(self):
+        # Применяем завершенные фоновые загрузки (в пределах ASSET_LOADER_FRAME_BUDGET_MS).
+        get_asset_loader().process_completed()
         self.player.update() # Player.update теперь в основном обновляет векторы камеры
         self.scene.update() 
         
@@ -405,6 +408,7 @@ class Engine:
         print("Engine attempting cleanup and exit...")
         # cleanup_cpp_renderer вызывается через atexit в Renderer,
         # поэтому здесь его вызывать не обязательно, если atexit надежен.
+        get_asset_loader().shutdown(wait=False) # Отменяем загрузки в очереди; начатые дорабатывают (их ждет выход интерпретатора)
         pg.quit() # Завершаем работу Pygame модулей (важно для аудио, джойстика и т.д.)
         sys.exit(exit_code)
 
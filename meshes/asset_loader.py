@@ -0,0 +1,118 @@
+# meshes/asset_loader.py
+"""
+Фоновая загрузка ассетов.
+
+Тяжелая работа (разбор .obj, чтение кэша) выполняется в пуле потоков: нативный загрузчик
+и NumPy большую часть времени работают без GIL, поэтому главный цикл не блокируется.
+Результаты складываются в очередь завершенных задач, которую главный поток разбирает
+в Engine.update через process_completed() - колбэки on_done всегда выполняются в главном потоке.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from settings import ASSET_LOADER_WORKERS, ASSET_LOADER_FRAME_BUDGET_MS
+
+
+class AssetLoader:
+    def __init__(self, max_workers: int = None):
+        self._max_workers = ASSET_LOADER_WORKERS if max_workers is None else max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._completed = queue.SimpleQueue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def submit(self, load_fn, *args, on_done=None):
+        """
+        Запускает load_fn(*args) в фоне. on_done(result, error) будет вызван из process_completed()
+        в главном потоке: error - None при успехе, иначе исключение (result тогда None).
+        """
+        with self._pending_lock:
+            self._pending += 1
+        future = self._get_executor().submit(load_fn, *args)
+        future.add_done_callback(lambda done: self._completed.put((done, on_done)))
+        return future
+
+    def process_completed(self, max_items: int = None, time_budget_ms: float = None) -> int:
+        """
+        Применяет завершенные загрузки (вызывать из главного потока раз в кадр).
+        Останавливается после max_items задач или по истечении time_budget_ms
+        (по умолчанию ASSET_LOADER_FRAME_BUDGET_MS), чтобы не создавать рывков.
+        Задачи, отмененные shutdown(), только снимаются со счета: загрузка не выполнялась, on_done не вызывается.
+        Возвращает количество обработанных задач.
+        """
+        budget_ms = ASSET_LOADER_FRAME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+        start = time.perf_counter()
+        processed = 0
+        while max_items is None or processed < max_items:
+            try:
+                future, on_done = self._completed.get_nowait()
+            except queue.Empty:
+                break
+            with self._pending_lock:
+                self._pending -= 1
+            processed += 1
+            if future.cancelled():
+                continue
+            error = future.exception()
+            result = None if error is not None else future.result()
+            if on_done is not None:
+                try:
+                    on_done(result, error)
+                except Exception as e:
+                    print(f"ERROR (AssetLoader): on_done callback failed: {e}")
+            elif error is not None:
+                print(f"ERROR (AssetLoader): Background load failed: {error}")
+            if budget_ms and (time.perf_counter() - start) * 1000 >= budget_ms:
+                break
+        return processed
+
+    @property
+    def pending_count(self) -> int:
+        """
+        Количество задач, результаты которых еще не обработаны process_completed()
+        (отмененные считаются, пока process_completed() их не снимет).
+        """
+        with self._pending_lock:
+            return self._pending
+
+    def wait_all(self, timeout: float = None) -> bool:
+        """
+        Блокирует главный поток, пока все задачи не будут загружены и обработаны
+        (например, для экрана загрузки). Возвращает False по таймауту.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            self.process_completed(time_budget_ms=0)
+            if self.pending_count == 0:
+                return True
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            time.sleep(0.001)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Останавливает пул. Задачи в очереди отменяются; уже начатые загрузки прервать нельзя -
+        wait=True дожидается их, wait=False нет (но интерпретатор все равно дождется потоков пула при выходе).
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(1, self._max_workers),
+                                                    thread_name_prefix='asset-loader')
+            return self._executor
+
+
+_GLOBAL_LOADER = AssetLoader()
+
+
+def get_asset_loader() -> AssetLoader:
+    """Возвращает общий для процесса фоновый загрузчик."""
+    return _GLOBAL_LOADER
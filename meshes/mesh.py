@@ -1,11 +1,94 @@
 # meshes/mesh.py
 import glm
-from settings import VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS
-from meshes.obj_loader import load_obj_file 
+from settings import (VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, USE_INDEXED_MESHES, MESH_BVH_ENABLED, MESH_BVH_LEAF_SIZE,
+                      MESH_CLUSTERS_ENABLED, MESH_CLUSTER_SIZE, MESH_PVS_ENABLED, MESH_PVS_CELL_SIZE,
+                      LOD_ENABLED, LOD_LEVELS, LOD_TRIANGLE_RATIO, LOD_MIN_TRIANGLES)
+from meshes.mesh_cache import (load_mesh_vertex_data, load_indexed_mesh_data, load_mesh_bvh, load_mesh_pvs,
+                               load_mesh_lods, mesh_bvh_options)
 import numpy as np
 
+
+def load_mesh_buffers(obj_filename: str, default_color_tuple: tuple, vertex_data_format_info: dict) -> tuple:
+    """
+    Загружает буферы меша: (vertex_data_np, index_data_np, bvh, lods), index_data_np - None для "супа" без индексов,
+    bvh - (bounds, nodes, triangles) из meshes.mesh_bvh или None (MESH_BVH_ENABLED выключен);
+    с MESH_CLUSTERS_ENABLED к нему добавляются (cluster_ranges, cluster_cones) из meshes.mesh_clusters,
+    а если для меша построен PVS (tools/build_pvs.py) и MESH_PVS_ENABLED - еще (pvs_grid, pvs_visibility).
+    lods - упрощенные уровни [(vertex_data_np, index_data_np), ...] из meshes.mesh_lod (пустой список,
+    если LOD_ENABLED выключен или в меше меньше LOD_MIN_TRIANGLES треугольников).
+    Не трогает состояние Mesh, поэтому может выполняться в фоновом потоке (см. meshes.asset_loader).
+    """
+    load_kwargs = dict(
+        default_color=default_color_tuple,
+        stride=vertex_data_format_info['VERTEX_DATA_STRIDE'],
+        use_vertex_normals=vertex_data_format_info['USE_VERTEX_NORMALS']
+    )
+    index_data_np = None
+    if USE_INDEXED_MESHES:
+        vertex_data_loaded, index_data_loaded = load_indexed_mesh_data(obj_filename, **load_kwargs)
+        if index_data_loaded.size > 0:
+            index_data_np = np.asarray(index_data_loaded, dtype=np.uint32)
+    else:
+        vertex_data_loaded = load_mesh_vertex_data(obj_filename, **load_kwargs)
+
+    if not isinstance(vertex_data_loaded, np.ndarray):
+        vertex_data_loaded = np.array(vertex_data_loaded, dtype=np.float32)
+    elif vertex_data_loaded.dtype != np.float32:
+        vertex_data_loaded = vertex_data_loaded.astype(np.float32)
+
+    stride = vertex_data_format_info['VERTEX_DATA_STRIDE']
+    if vertex_data_loaded.size > 0:
+        if vertex_data_loaded.ndim == 1:
+            if vertex_data_loaded.size % stride != 0:
+                print(f"WARNING (Mesh): Vertex data size ({vertex_data_loaded.size}) for '{obj_filename}' is not a multiple of stride ({stride}).")
+        elif vertex_data_loaded.ndim == 2:
+             if vertex_data_loaded.shape[1] != stride:
+                 print(f"WARNING (Mesh): Vertex data shape ({vertex_data_loaded.shape}) for '{obj_filename}' does not match stride ({stride}) in the second dimension.")
+             vertex_data_loaded = vertex_data_loaded.flatten() # Ensure flat array for C++
+        else:
+            print(f"WARNING (Mesh): Vertex data for '{obj_filename}' has an unexpected number of dimensions: {vertex_data_loaded.ndim}.")
+
+    if vertex_data_loaded.size == 0 and obj_filename:
+        # print(f"Warning (Mesh): No vertex data loaded for '{obj_filename}'. Using empty array.")
+        return np.array([], dtype=np.float32), None, None, []
+
+    bvh = None
+    if MESH_BVH_ENABLED and vertex_data_loaded.size > 0:
+        bvh = load_mesh_bvh(obj_filename, vertex_data_loaded, index_data_np, leaf_size=MESH_BVH_LEAF_SIZE,
+                            cluster_size=MESH_CLUSTER_SIZE if MESH_CLUSTERS_ENABLED else None, **load_kwargs)
+        if MESH_PVS_ENABLED and MESH_CLUSTERS_ENABLED and len(bvh[3]) > 0:
+            pvs = load_mesh_buffers_pvs(obj_filename, default_color_tuple, vertex_data_format_info,
+                                        indexed=index_data_np is not None)
+            if pvs is not None:
+                bvh = bvh + tuple(pvs)
+
+    lods = []
+    num_triangles = index_data_np.size // 3 if index_data_np is not None else vertex_data_loaded.size // (stride * 3)
+    if LOD_ENABLED and LOD_LEVELS > 0 and num_triangles >= LOD_MIN_TRIANGLES:
+        lods = load_mesh_lods(obj_filename, vertex_data_loaded, index_data_np, levels=LOD_LEVELS,
+                              ratio=LOD_TRIANGLE_RATIO, **load_kwargs)
+    return vertex_data_loaded, index_data_np, bvh, lods
+
+
+def load_mesh_buffers_pvs(obj_filename: str, default_color_tuple: tuple, vertex_data_format_info: dict,
+                          indexed: bool, build=None) -> tuple:
+    """
+    PVS кластеров меша (grid, visibility) из кэша или None, если он не построен.
+    Ключ записи - те же опции, с которыми load_mesh_buffers строит BVH и кластеры;
+    build() строит PVS при промахе (см. tools/build_pvs.py).
+    """
+    bvh_options = mesh_bvh_options(default_color_tuple, vertex_data_format_info['VERTEX_DATA_STRIDE'],
+                                   vertex_data_format_info['USE_VERTEX_NORMALS'], indexed,
+                                   MESH_BVH_LEAF_SIZE, MESH_CLUSTER_SIZE)
+    return load_mesh_pvs(obj_filename, bvh_options, MESH_PVS_CELL_SIZE, build=build)
+
+
 class Mesh:
-    def __init__(self, app, obj_filename: str, default_color_tuple: tuple = (0.8, 0.8, 0.8)):
+    def __init__(self, app, obj_filename: str, default_color_tuple: tuple = (0.8, 0.8, 0.8), load: bool = True):
+        """
+        :param load: False - создать "ожидающий" меш без данных (ничего не рендерит),
+                     данные приходят позже через set_buffers() (фоновая загрузка).
+        """
         self.app = app
         self.obj_filename = obj_filename
         
@@ -13,33 +96,65 @@ class Mesh:
             'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE,
             'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS
         }
-        self.vertex_data_np = self._load_and_prepare_vertex_data(default_color_tuple)
-
-    def _load_and_prepare_vertex_data(self, default_color_tuple: tuple) -> np.ndarray:
-        vertex_data_loaded = load_obj_file(self.obj_filename, default_color=default_color_tuple)
-
-        if not isinstance(vertex_data_loaded, np.ndarray):
-            vertex_data_loaded = np.array(vertex_data_loaded, dtype=np.float32)
-        elif vertex_data_loaded.dtype != np.float32:
-            vertex_data_loaded = vertex_data_loaded.astype(np.float32)
-
-        stride = self.vertex_data_format_info['VERTEX_DATA_STRIDE']
-        if vertex_data_loaded.size > 0:
-            if vertex_data_loaded.ndim == 1:
-                if vertex_data_loaded.size % stride != 0:
-                    print(f"WARNING (Mesh): Vertex data size ({vertex_data_loaded.size}) for '{self.obj_filename}' is not a multiple of stride ({stride}).")
-            elif vertex_data_loaded.ndim == 2:
-                 if vertex_data_loaded.shape[1] != stride:
-                     print(f"WARNING (Mesh): Vertex data shape ({vertex_data_loaded.shape}) for '{self.obj_filename}' does not match stride ({stride}) in the second dimension.")
-                 vertex_data_loaded = vertex_data_loaded.flatten() # Ensure flat array for C++
-            else:
-                print(f"WARNING (Mesh): Vertex data for '{self.obj_filename}' has an unexpected number of dimensions: {vertex_data_loaded.ndim}.")
-        
-        if vertex_data_loaded.size == 0 and self.obj_filename:
-            # print(f"Warning (Mesh): No vertex data loaded for '{self.obj_filename}'. Using empty array.")
-            return np.array([], dtype=np.float32) 
-            
-        return vertex_data_loaded
+        # index_data_np - uint32 индексы треугольников в vertex_data_np (None для "супа" без индексов)
+        self.index_data_np = None
+        self.vertex_data_np = np.array([], dtype=np.float32)
+        # bvh - (bounds, nodes, triangles[, cluster_ranges, cluster_cones[, pvs_grid, pvs_visibility]]) для отсечения
+        # по пирамиде видимости, конусам нормалей и PVS (см. meshes.mesh_bvh, mesh_clusters, mesh_pvs) или None
+        self.bvh = None
+        # lods - упрощенные уровни 1..n (Mesh без BVH), см. lod() и meshes.mesh_lod
+        self.lods = []
+        self.is_loaded = False
+        # Хэндл буферов, зарегистрированных в C++ для пакетной отправки (Renderer.get_mesh_handle)
+        self.native_handle = None
+        if load:
+            self.set_buffers(*load_mesh_buffers(obj_filename, default_color_tuple, self.vertex_data_format_info))
+
+    def set_buffers(self, vertex_data_np: np.ndarray, index_data_np: np.ndarray = None, bvh: tuple = None,
+                    lods: list = None):
+        """Устанавливает загруженные буферы; с этого момента меш рендерится."""
+        self.release_native_handle()
+        self.vertex_data_np = vertex_data_np
+        self.index_data_np = index_data_np
+        self.bvh = bvh
+        self.lods = []
+        for lod_vertex_data_np, lod_index_data_np in lods or ():
+            lod = Mesh(self.app, self.obj_filename, load=False)
+            lod.set_buffers(lod_vertex_data_np, lod_index_data_np)
+            self.lods.append(lod)
+        self.is_loaded = True
+
+    def lod(self, level: int) -> 'Mesh':
+        """Меш уровня детализации level (0 - сам меш); уровни сверх построенных дают самый грубый."""
+        if level <= 0 or not self.lods:
+            return self
+        return self.lods[min(level, len(self.lods)) - 1]
+
+    @property
+    def local_bounds(self) -> np.ndarray:
+        """AABB меша в локальных координатах [min.xyz, max.xyz] или None, если данных нет."""
+        if self.bvh is not None and len(self.bvh[0]) > 0:
+            return self.bvh[0][0] # Корень BVH
+        if self.vertex_data_np.size == 0:
+            return None
+        positions = self.vertex_data_np.reshape(-1, self.vertex_data_format_info['VERTEX_DATA_STRIDE'])[:, :3]
+        return np.concatenate((positions.min(axis=0), positions.max(axis=0)))
+
+    def release_native_handle(self):
+        """Снимает регистрацию буферов в C++; при следующей пакетной отправке меш зарегистрируется заново."""
+        if self.native_handle is not None:
+            renderer = getattr(self.app, 'renderer', None)
+            if renderer is not None and hasattr(renderer, 'release_mesh_handle'):
+                renderer.release_mesh_handle(self.native_handle)
+            self.native_handle = None
+        for lod in self.lods:
+            lod.release_native_handle()
+
+    @property
+    def num_triangles(self) -> int:
+        if self.index_data_np is not None:
+            return self.index_data_np.size // 3
+        return self.vertex_data_np.size // (self.vertex_data_format_info['VERTEX_DATA_STRIDE'] * 3)
 
     def render(self, game_object_id: int, position: glm.vec3, rotation: glm.vec3, scale: glm.vec3):
         if hasattr(self.app, 'renderer') and hasattr(self.app.renderer, 'render_mesh'):
@@ -47,10 +162,11 @@ class Mesh:
                 self.app.renderer.render_mesh(
                     object_id=game_object_id,
                     vertex_data_np=self.vertex_data_np,
+                    index_data_np=self.index_data_np,
                     vertex_data_format_info=self.vertex_data_format_info,
                     position=position,
                     rotation=rotation,
                     scale=scale
                 )
         # else:
-            # print(f"ERROR (Mesh): self.app.renderer or its method render_mesh not found for mesh '{self.obj_filename}'.")
\ No newline at end of file
+            # print(f"ERROR (Mesh): self.app.renderer or its method render_mesh not found for mesh '{self.obj_filename}'.")
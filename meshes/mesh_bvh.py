@@ -0,0 +1,72 @@
+# meshes/mesh_bvh.py
+"""
+Иерархия ограничивающих объемов (BVH) меша для отсечения по пирамиде видимости.
+
+Дерево строится один раз при загрузке (в локальных координатах меша) и кэшируется вместе с мешем
+(см. mesh_cache.load_mesh_bvh). C++ (submit_batch_cpp) проверяет узлы против шести плоскостей
+пирамиды и пропускает целые поддеревья, не трогая их треугольники.
+
+Формат (плоский массив узлов в порядке обхода в глубину, корень - узел 0):
+  bounds    (M, 6) float32 - AABB узла [min.xyz, max.xyz];
+  nodes     (M, 3) int32   - [first, count, skip]: треугольники узла - triangles[first:first + count],
+                             skip - номер узла после всего поддерева (лист: skip == номер + 1);
+  triangles (T,)   uint32  - номера треугольников меша, упорядоченные так, что каждое поддерево
+                             занимает непрерывный диапазон. Буферы меша не переупорядочиваются.
+"""
+import numpy as np
+
+from settings import VERTEX_DATA_STRIDE, MESH_BVH_LEAF_SIZE
+
+BVH_NODE_WIDTH = 3
+
+
+def empty_mesh_bvh() -> tuple:
+    return (np.empty((0, 6), dtype=np.float32),
+            np.empty((0, BVH_NODE_WIDTH), dtype=np.int32),
+            np.empty(0, dtype=np.uint32))
+
+
+def _triangle_corners(vertex_data_np: np.ndarray, index_data_np: np.ndarray, stride: int) -> np.ndarray:
+    """(T, 3, 3) позиции вершин каждого треугольника."""
+    positions = np.asarray(vertex_data_np, dtype=np.float32).reshape(-1, stride)[:, :3]
+    if index_data_np is None:
+        return positions.reshape(-1, 3, 3)
+    return positions[np.asarray(index_data_np).reshape(-1, 3)]
+
+
+def build_mesh_bvh(vertex_data_np: np.ndarray, index_data_np: np.ndarray = None,
+                   stride: int = VERTEX_DATA_STRIDE, leaf_size: int = None) -> tuple:
+    """
+    Строит BVH делением по медиане центров треугольников вдоль самой длинной оси.
+    index_data_np - None для "супа" треугольников. Возвращает (bounds, nodes, triangles).
+    """
+    leaf_size = max(1, MESH_BVH_LEAF_SIZE if leaf_size is None else leaf_size)
+    corners = _triangle_corners(vertex_data_np, index_data_np, stride)
+    num_triangles = len(corners)
+    if num_triangles == 0:
+        return empty_mesh_bvh()
+
+    tri_min = corners.min(axis=1)
+    tri_max = corners.max(axis=1)
+    centroids = (tri_min + tri_max) * 0.5
+    order = np.arange(num_triangles, dtype=np.int64)
+    bounds, nodes = [], []
+
+    def build(start: int, end: int):
+        node = len(nodes)
+        nodes.append(None)
+        tris = order[start:end]
+        bounds.append(np.concatenate((tri_min[tris].min(axis=0), tri_max[tris].max(axis=0))))
+        if end - start > leaf_size:
+            node_centroids = centroids[tris]
+            axis = int(np.argmax(node_centroids.max(axis=0) - node_centroids.min(axis=0)))
+            mid = (end - start) // 2
+            order[start:end] = tris[np.argpartition(node_centroids[:, axis], mid)]
+            build(start, start + mid)
+            build(start + mid, end)
+        nodes[node] = (start, end - start, len(nodes))
+
+    build(0, num_triangles)
+    return (np.array(bounds, dtype=np.float32),
+            np.array(nodes, dtype=np.int32),
+            order.astype(np.uint32))
@@ -0,0 +1,270 @@
+# meshes/mesh_cache.py
+"""
+Кэш скомпилированных мешей.
+
+При первой загрузке .obj итоговый float32-массив вершин сохраняется в MESH_CACHE_DIR
+как .npy, рядом кладется .json с метаданными (размер/mtime исходника и .mtl, опции загрузки).
+При следующих запусках массив открывается через np.load(mmap_mode='r') без разбора текста.
+Запись может содержать несколько массивов: первый лежит в <имя>.npy, остальные - в <имя>.<k>.npy
+(индексированный меш - вершины и индексы, BVH - bounds/nodes/triangles, см. meshes.mesh_bvh,
+кластеры - ranges/cones, см. meshes.mesh_clusters, PVS - grid/visibility, см. meshes.mesh_pvs,
+уровни детализации - вершины (и индексы) каждого уровня, см. meshes.mesh_lod).
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from meshes.obj_loader import load_obj_file, load_obj_file_indexed, find_mtl_dependencies
+from meshes.mesh_bvh import build_mesh_bvh
+from meshes.mesh_clusters import build_mesh_clusters
+from meshes.mesh_lod import build_mesh_lods
+from settings import MESH_CACHE_ENABLED, MESH_CACHE_DIR, MESH_CACHE_VALIDATE_HASH
+
+# Увеличивать при любом изменении формата данных, которые выдает загрузчик.
+CACHE_FORMAT_VERSION = 3
+
+
+def _file_signature(path: str, with_hash: bool) -> dict:
+    stat = os.stat(path)
+    signature = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        signature['sha1'] = _file_sha1(path)
+    return signature
+
+
+def _file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(obj_filename: str, options: dict, cache_dir: str) -> tuple:
+    """Имя записи: <имя_файла>-<sha1(абсолютный путь + опции)>.npy/.json"""
+    key_source = json.dumps({'path': os.path.abspath(obj_filename), 'options': options}, sort_keys=True)
+    key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(obj_filename))[0]
+    base = os.path.join(cache_dir, f"{stem}-{key}")
+    return base + '.npy', base + '.json'
+
+
+def _is_entry_valid(meta: dict, options: dict, validate_hash: bool) -> bool:
+    if meta.get('version') != CACHE_FORMAT_VERSION or meta.get('options') != options:
+        return False
+    for dep in meta.get('dependencies', []):
+        try:
+            stat = os.stat(dep['path'])
+        except OSError:
+            return False
+        if stat.st_size != dep['size']:
+            return False
+        if validate_hash:
+            if dep.get('sha1') != _file_sha1(dep['path']):
+                return False
+        elif stat.st_mtime_ns != dep['mtime_ns']:
+            return False
+    return True
+
+
+def _array_paths(npy_path: str, count: int) -> list:
+    """Первый массив записи лежит в <база>.npy, k-й (k >= 1) - в <база>.<k>.npy."""
+    base = npy_path[:-len('.npy')]
+    return [npy_path] + [f"{base}.{k}.npy" for k in range(1, count)]
+
+
+def _write_entry(npy_path: str, json_path: str, arrays: tuple, meta: dict):
+    os.makedirs(os.path.dirname(npy_path) or '.', exist_ok=True)
+    # Пишем во временные файлы и атомарно подменяем, чтобы параллельный запуск не прочитал половину.
+    # .json подменяется последним: пока его нет, запись считается отсутствующей.
+    suffix = f'.{os.getpid()}.tmp'
+    paths = _array_paths(npy_path, len(arrays))
+    for path, array in zip(paths, arrays):
+        with open(path + suffix, 'wb') as f:
+            np.save(f, array, allow_pickle=False)
+    with open(json_path + suffix, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+    for path in paths + [json_path]:
+        os.replace(path + suffix, path)
+
+
+def _load_cached(obj_filename: str, options: dict, cache_dir: str, build) -> tuple:
+    """
+    Общая часть кэша: возвращает кортеж массивов из записи либо строит его через build()
+    и сохраняет. Пустой результат или пустой первый массив (ошибка загрузки) в кэш не попадает.
+    build=None - только поиск: при промахе возвращается None.
+    """
+    npy_path, json_path = _cache_paths(obj_filename, options, cache_dir)
+
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if _is_entry_valid(meta, options, MESH_CACHE_VALIDATE_HASH):
+            return tuple(np.load(path, mmap_mode='r', allow_pickle=False)
+                         for path in _array_paths(npy_path, meta.get('num_arrays', 1)))
+    except (OSError, ValueError):
+        pass
+    if build is None:
+        return None
+
+    # Подписи снимаем до разбора: если файл поменяют во время загрузки, запись окажется устаревшей, а не битой.
+    try:
+        dependencies = [_file_signature(path, MESH_CACHE_VALIDATE_HASH)
+                        for path in [obj_filename] + find_mtl_dependencies(obj_filename) if os.path.isfile(path)]
+    except OSError:
+        dependencies = None
+
+    arrays = build()
+    if not arrays or arrays[0].size == 0 or not dependencies:
+        return arrays
+
+    arrays = tuple(np.ascontiguousarray(array) for array in arrays)
+    meta = {
+        'version': CACHE_FORMAT_VERSION,
+        'source': os.path.abspath(obj_filename),
+        'options': options,
+        'dependencies': dependencies,
+        'num_arrays': len(arrays),
+        'num_floats': int(arrays[0].size),
+    }
+    try:
+        _write_entry(npy_path, json_path, arrays, meta)
+    except OSError as e:
+        print(f"WARNING (MeshCache): Could not write cache for '{obj_filename}': {e}")
+    return arrays
+
+
+def _load_options(default_color: tuple, stride: int, use_vertex_normals: bool, indexed: bool) -> dict:
+    return {
+        'default_color': [float(c) for c in default_color],
+        'stride': int(stride),
+        'use_vertex_normals': bool(use_vertex_normals),
+        'indexed': bool(indexed),
+    }
+
+
+def load_mesh_vertex_data(obj_filename: str, default_color: tuple, stride: int, use_vertex_normals: bool,
+                          cache_dir: str = None, enabled: bool = None) -> np.ndarray:
+    """
+    Возвращает плоский float32-массив вершин меша (формат load_obj_file).
+
+    При попадании в кэш результат - read-only memmap. При промахе файл разбирается
+    load_obj_file и записывается в кэш; ошибки записи кэша не мешают загрузке.
+    """
+    enabled = MESH_CACHE_ENABLED if enabled is None else enabled
+    cache_dir = MESH_CACHE_DIR if cache_dir is None else cache_dir
+    if not enabled or not obj_filename:
+        return load_obj_file(obj_filename, default_color=default_color)
+
+    options = _load_options(default_color, stride, use_vertex_normals, indexed=False)
+    build = lambda: (np.asarray(load_obj_file(obj_filename, default_color=default_color), dtype=np.float32),)
+    return _load_cached(obj_filename, options, cache_dir, build)[0]
+
+
+def load_indexed_mesh_data(obj_filename: str, default_color: tuple, stride: int, use_vertex_normals: bool,
+                           cache_dir: str = None, enabled: bool = None) -> tuple:
+    """
+    Возвращает (vertices, indices) индексированного меша (формат load_obj_file_indexed)
+    с тем же кэшированием, что и load_mesh_vertex_data.
+    """
+    enabled = MESH_CACHE_ENABLED if enabled is None else enabled
+    cache_dir = MESH_CACHE_DIR if cache_dir is None else cache_dir
+    if not enabled or not obj_filename:
+        return load_obj_file_indexed(obj_filename, default_color=default_color)
+
+    options = _load_options(default_color, stride, use_vertex_normals, indexed=True)
+    return _load_cached(obj_filename, options, cache_dir,
+                        lambda: load_obj_file_indexed(obj_filename, default_color=default_color))
+
+
+def load_mesh_bvh(obj_filename: str, vertex_data_np: np.ndarray, index_data_np: np.ndarray,
+                  default_color: tuple, stride: int, use_vertex_normals: bool, leaf_size: int,
+                  cluster_size: int = None, cache_dir: str = None, enabled: bool = None) -> tuple:
+    """
+    Возвращает BVH меша (bounds, nodes, triangles) - см. meshes.mesh_bvh, а с cluster_size -
+    (bounds, nodes, triangles, cluster_ranges, cluster_cones), см. meshes.mesh_clusters.
+    Запись кэша привязана к тем же опциям загрузки, что и буферы меша, плюс размеры листа и кластера;
+    при промахе дерево строится по переданным vertex_data_np/index_data_np.
+    """
+    enabled = MESH_CACHE_ENABLED if enabled is None else enabled
+    cache_dir = MESH_CACHE_DIR if cache_dir is None else cache_dir
+
+    def build():
+        bvh = build_mesh_bvh(vertex_data_np, index_data_np, stride=stride, leaf_size=leaf_size)
+        if cluster_size is None:
+            return bvh
+        return bvh + build_mesh_clusters(vertex_data_np, index_data_np, bvh, stride=stride,
+                                         use_vertex_normals=use_vertex_normals, max_triangles=cluster_size)
+
+    if not enabled or not obj_filename:
+        return build()
+
+    options = mesh_bvh_options(default_color, stride, use_vertex_normals, index_data_np is not None,
+                               leaf_size, cluster_size)
+    return _load_cached(obj_filename, options, cache_dir, build)
+
+
+def mesh_bvh_options(default_color: tuple, stride: int, use_vertex_normals: bool, indexed: bool,
+                     leaf_size: int, cluster_size: int = None) -> dict:
+    """Опции записи BVH (и кластеров) в кэше: опции загрузки буферов плюс размеры листа и кластера."""
+    options = _load_options(default_color, stride, use_vertex_normals, indexed)
+    options['bvh_leaf_size'] = int(leaf_size)
+    if cluster_size is not None:
+        options['cluster_size'] = int(cluster_size)
+    return options
+
+
+def load_mesh_pvs(obj_filename: str, bvh_options: dict, cell_size: float, build=None,
+                  cache_dir: str = None, enabled: bool = None) -> tuple:
+    """
+    Возвращает PVS меша (grid, visibility) - см. meshes.mesh_pvs - или None, если его еще не строили.
+    PVS строится долго, поэтому при загрузке меша только ищется в кэше; build (например,
+    из tools/build_pvs.py) строит и сохраняет запись. bvh_options - опции BVH и кластеров
+    (mesh_bvh_options), от которых зависит нумерация кластеров. Без кэша PVS недоступен.
+    """
+    enabled = MESH_CACHE_ENABLED if enabled is None else enabled
+    cache_dir = MESH_CACHE_DIR if cache_dir is None else cache_dir
+    if not enabled or not obj_filename:
+        return build() if build is not None else None
+    options = dict(bvh_options, pvs_cell_size=float(cell_size))
+    return _load_cached(obj_filename, options, cache_dir, build)
+
+
+def load_mesh_lods(obj_filename: str, vertex_data_np: np.ndarray, index_data_np: np.ndarray,
+                   default_color: tuple, stride: int, use_vertex_normals: bool, levels: int, ratio: float,
+                   cache_dir: str = None, enabled: bool = None) -> list:
+    """
+    Возвращает упрощенные уровни меша [(vertex_data_np, index_data_np), ...] - см. meshes.mesh_lod.
+    Запись кэша привязана к опциям загрузки буферов плюс числу уровней и доле треугольников;
+    при промахе уровни строятся по переданным vertex_data_np/index_data_np.
+    """
+    enabled = MESH_CACHE_ENABLED if enabled is None else enabled
+    cache_dir = MESH_CACHE_DIR if cache_dir is None else cache_dir
+    build = lambda: build_mesh_lods(vertex_data_np, index_data_np, stride=stride, levels=levels, ratio=ratio)
+    if not enabled or not obj_filename:
+        return build()
+
+    indexed = index_data_np is not None
+    options = dict(_load_options(default_color, stride, use_vertex_normals, indexed),
+                   lod_levels=int(levels), lod_ratio=float(ratio))
+    # В записи уровни лежат подряд: v1, i1, v2, i2, ... (у "супа" - только вершины).
+    flat_build = lambda: tuple(array for lod in build() for array in (lod if indexed else lod[:1]))
+    arrays = _load_cached(obj_filename, options, cache_dir, flat_build)
+    if indexed:
+        return [(arrays[k], arrays[k + 1]) for k in range(0, len(arrays), 2)]
+    return [(vertices, None) for vertices in arrays]
+
+
+def clear_mesh_cache(cache_dir: str = None) -> int:
+    """Удаляет все записи кэша мешей. Возвращает количество удаленных файлов."""
+    cache_dir = MESH_CACHE_DIR if cache_dir is None else cache_dir
+    removed = 0
+    if not os.path.isdir(cache_dir):
+        return removed
+    for name in os.listdir(cache_dir):
+        if name.endswith(('.npy', '.json', '.tmp')):
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
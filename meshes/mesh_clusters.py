@@ -0,0 +1,105 @@
+# meshes/mesh_clusters.py
+"""
+Кластеры (meshlets) меша для грубого отсечения и распределения работы между потоками.
+
+Кластер - максимальное поддерево BVH (meshes.mesh_bvh), в котором не больше max_triangles треугольников:
+непрерывный диапазон массива triangles BVH из пространственно близких треугольников
+(при листе BVH не больше max_triangles / 2 - от max_triangles / 2 до max_triangles треугольников).
+Для кластера хранится ограничивающая сфера и конус нормалей: C++ отбрасывает кластеры, все треугольники
+которых повернуты от камеры, и раздает видимые кластеры потокам OpenMP как отдельные задачи.
+
+Формат:
+  ranges (K, 2) int32   - [first, count] в triangles BVH; кластеры идут по возрастанию first без пропусков;
+  cones  (K, 8) float32 - [center.xyz, radius, axis.xyz, cos_angle]: сфера содержит все вершины кластера,
+                          нормали всех его треугольников отклоняются от axis не больше чем на arccos(cos_angle).
+                          cos_angle <= 0 - конус не уже полусферы, такой кластер по нормалям не отсекается.
+Нормали треугольников считаются так же, как в C++ (Stage 1): среднее нормалей вершин или нормаль грани.
+"""
+import numpy as np
+
+from settings import VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, MESH_CLUSTER_SIZE
+
+CLUSTER_CONE_WIDTH = 8
+# Запас на погрешность float при сравнении нормалей в C++: конус чуть шире точного.
+CONE_ANGLE_EPSILON = 1e-3
+
+
+def empty_mesh_clusters() -> tuple:
+    return (np.empty((0, 2), dtype=np.int32),
+            np.empty((0, CLUSTER_CONE_WIDTH), dtype=np.float32))
+
+
+def _triangle_normals(corners: np.ndarray, vertex_normals: np.ndarray) -> tuple:
+    """(T, 3) единичные нормали треугольников и (T,) маска вырожденных (нормаль не определена)."""
+    if vertex_normals is not None:
+        lengths = np.linalg.norm(vertex_normals, axis=2, keepdims=True)
+        degenerate = np.any(lengths[:, :, 0] < 1e-12, axis=1)
+        normals = (vertex_normals / np.maximum(lengths, 1e-12)).sum(axis=1)
+    else:
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        degenerate = np.zeros(len(corners), dtype=bool)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    degenerate |= lengths[:, 0] < 1e-12
+    return normals / np.maximum(lengths, 1e-12), degenerate
+
+
+def bvh_ordered_triangles(vertex_data_np: np.ndarray, index_data_np: np.ndarray, triangles: np.ndarray,
+                          stride: int, use_vertex_normals: bool) -> tuple:
+    """
+    Треугольники меша в порядке triangles BVH: (T, 3, 3) float64 вершины, (T, 3) единичные нормали
+    (как в C++ Stage 1) и (T,) маска вырожденных треугольников.
+    """
+    vertices = np.asarray(vertex_data_np, dtype=np.float32).reshape(-1, stride)
+    if index_data_np is not None:
+        vertices = vertices[np.asarray(index_data_np).reshape(-1)]
+    vertices = vertices.reshape(-1, 3, stride)[np.asarray(triangles, dtype=np.int64)].astype(np.float64)
+    corners = vertices[:, :, :3]
+    vertex_normals = vertices[:, :, 6:9] if use_vertex_normals and stride >= 9 else None
+    normals, degenerate = _triangle_normals(corners, vertex_normals)
+    return corners, normals, degenerate
+
+
+def cluster_ranges_from_bvh(nodes: np.ndarray, max_triangles: int) -> np.ndarray:
+    """(K, 2) [first, count] максимальных поддеревьев BVH, в которых не больше max_triangles треугольников."""
+    ranges = []
+    node = 0
+    while node < len(nodes):
+        first, count, skip = (int(value) for value in nodes[node])
+        if count <= max_triangles or skip == node + 1:
+            ranges.append((first, count))
+            node = skip
+        else:
+            node += 1
+    return np.array(ranges, dtype=np.int32).reshape(-1, 2)
+
+
+def build_mesh_clusters(vertex_data_np: np.ndarray, index_data_np: np.ndarray, bvh: tuple,
+                        stride: int = VERTEX_DATA_STRIDE, use_vertex_normals: bool = USE_VERTEX_NORMALS,
+                        max_triangles: int = None) -> tuple:
+    """Разбивает меш с готовым BVH (bounds, nodes, triangles) на кластеры. Возвращает (ranges, cones)."""
+    max_triangles = max(1, MESH_CLUSTER_SIZE if max_triangles is None else max_triangles)
+    _, nodes, triangles = bvh
+    if len(nodes) == 0:
+        return empty_mesh_clusters()
+
+    corners, normals, degenerate = bvh_ordered_triangles(vertex_data_np, index_data_np, triangles,
+                                                         stride, use_vertex_normals)
+    ranges = cluster_ranges_from_bvh(nodes, max_triangles)
+    starts = ranges[:, 0]
+    tri_min = corners.min(axis=1)
+    tri_max = corners.max(axis=1)
+    centers = (np.minimum.reduceat(tri_min, starts) + np.maximum.reduceat(tri_max, starts)) * 0.5
+    cluster_of_triangle = np.repeat(np.arange(len(ranges)), ranges[:, 1])
+    corner_distances = np.linalg.norm(corners - centers[cluster_of_triangle][:, None, :], axis=2).max(axis=1)
+    radii = np.maximum.reduceat(corner_distances, starts) * (1.0 + 1e-5) # Не потерять вершины при округлении до float32
+
+    axes = np.add.reduceat(normals, starts)
+    axis_lengths = np.linalg.norm(axes, axis=1, keepdims=True)
+    axes = axes / np.maximum(axis_lengths, 1e-12)
+    cos_angles = np.minimum.reduceat(np.einsum('ij,ij->i', normals, axes[cluster_of_triangle]), starts)
+    cos_angles = cos_angles - CONE_ANGLE_EPSILON
+    invalid = (np.logical_or.reduceat(degenerate, starts)) | (axis_lengths[:, 0] < 1e-12)
+    cos_angles[invalid] = -1.0
+
+    cones = np.hstack((centers, radii[:, None], axes, cos_angles[:, None])).astype(np.float32)
+    return ranges, cones
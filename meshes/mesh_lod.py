@@ -0,0 +1,196 @@
+# meshes/mesh_lod.py
+"""
+Уровни детализации (LOD) меша: упрощение кластеризацией вершин и выбор уровня по размеру на экране.
+
+Упрощение - кластеризация вершин по равномерной сетке (Rossignac-Borrel) с квадриками ошибки (Lindstrom):
+все вершины одной ячейки сливаются в одну, треугольники, у которых две вершины попали в одну ячейку,
+исчезают. Положение новой вершины минимизирует сумму квадратов расстояний до плоскостей исходных
+треугольников ячейки (поэтому ребра и углы сохраняются лучше, чем при усреднении), цвет - среднее
+по ячейке, нормаль - сглаженная нормаль упрощенных треугольников. Разрешение сетки подбирается
+двоичным поиском под нужное число треугольников. Все операции векторные (три уровня меша из 80K треугольников -
+около секунды), а результат хранится в кэше мешей (mesh_cache.load_mesh_lods).
+
+Уровень 0 - исходный меш, уровень l - примерно LOD_TRIANGLE_RATIO^l его треугольников.
+Уровень на кадр выбирается по доле высоты экрана, которую занимает ограничивающая сфера объекта,
+с гистерезисом: порог переключения на грубый уровень ниже порога возврата на детальный,
+поэтому объект на границе не "мигает" между уровнями.
+"""
+import numpy as np
+
+from settings import (VERTEX_DATA_STRIDE, LOD_LEVELS, LOD_TRIANGLE_RATIO,
+                      LOD_SCREEN_SIZES, LOD_HYSTERESIS)
+
+# Уровень детализации уходит в старший байт id объекта в C++ (id() объектов Python до него не достают):
+# кэши L1/L2 хранят треугольники каждого уровня отдельно.
+LOD_OBJECT_ID_SHIFT = 56
+MAX_GRID_RESOLUTION = 4096
+RESOLUTION_SEARCH_STEPS = 16
+# Регуляризация квадрики: в направлениях, где плоскости не задают положение (плоская ячейка), вершина остается в среднем.
+QUADRIC_REGULARIZATION = 1e-3
+
+
+def _cluster_vertices(positions: np.ndarray, resolution: int) -> tuple:
+    """Номер ячейки сетки resolution (по длинной стороне AABB) для каждой вершины и минимальные углы ячеек."""
+    lo = positions.min(axis=0)
+    extent = float((positions.max(axis=0) - lo).max())
+    cell_size = extent / resolution if extent > 0.0 else 1.0
+    cells = np.minimum(np.floor((positions - lo) / cell_size), resolution - 1).astype(np.int64)
+    keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+    unique_keys, cluster_of_vertex = np.unique(keys, return_inverse=True)
+    cell_index = np.stack((unique_keys // (resolution * resolution), unique_keys // resolution % resolution,
+                           unique_keys % resolution), axis=1)
+    return cluster_of_vertex.reshape(-1), lo + cell_index * cell_size, cell_size
+
+
+def _collapse_triangles(triangles: np.ndarray, cluster_of_vertex: np.ndarray) -> np.ndarray:
+    """Треугольники в номерах кластеров без вырожденных и повторов (ориентация первого вхождения сохраняется)."""
+    collapsed = cluster_of_vertex[triangles]
+    keep = ((collapsed[:, 0] != collapsed[:, 1]) & (collapsed[:, 1] != collapsed[:, 2])
+            & (collapsed[:, 0] != collapsed[:, 2]))
+    collapsed = collapsed[keep]
+    _, first = np.unique(np.sort(collapsed, axis=1), axis=0, return_index=True)
+    return collapsed[np.sort(first)]
+
+
+def _count_triangles(positions: np.ndarray, triangles: np.ndarray, resolution: int) -> int:
+    return len(_collapse_triangles(triangles, _cluster_vertices(positions, resolution)[0]))
+
+
+def _find_resolution(positions: np.ndarray, triangles: np.ndarray, target_triangles: int) -> int:
+    """Наибольшее разрешение сетки, при котором остается не больше target_triangles треугольников (но хотя бы один)."""
+    lo, hi = 1, MAX_GRID_RESOLUTION
+    best = None
+    for _ in range(RESOLUTION_SEARCH_STEPS):
+        if lo > hi:
+            break
+        middle = (lo + hi) // 2
+        count = _count_triangles(positions, triangles, middle)
+        if 0 < count <= target_triangles:
+            best = middle
+            lo = middle + 1
+        elif count == 0:
+            lo = middle + 1
+        else:
+            hi = middle - 1
+    return best if best is not None else lo
+
+
+def simplify_mesh(vertex_data_np: np.ndarray, index_data_np: np.ndarray, target_triangles: int,
+                  stride: int = VERTEX_DATA_STRIDE) -> tuple:
+    """
+    Упрощает меш (формат load_mesh_buffers) примерно до target_triangles треугольников.
+    Возвращает (vertex_data_np, index_data_np) в том же виде, что и вход: индексированный меш
+    остается индексированным, "суп" (index_data_np=None) - супом.
+    """
+    vertices = np.asarray(vertex_data_np, dtype=np.float32).reshape(-1, stride).astype(np.float64)
+    if index_data_np is not None:
+        triangles = np.asarray(index_data_np, dtype=np.int64).reshape(-1, 3)
+    else:
+        triangles = np.arange(len(vertices), dtype=np.int64).reshape(-1, 3)
+    positions = vertices[:, :3]
+
+    cluster_of_vertex, cell_min, cell_size = _cluster_vertices(
+        positions, _find_resolution(positions, triangles, max(1, int(target_triangles))))
+    num_clusters = len(cell_min)
+    collapsed = _collapse_triangles(triangles, cluster_of_vertex)
+
+    counts = np.bincount(cluster_of_vertex, minlength=num_clusters).astype(np.float64)[:, None]
+    new_vertices = np.stack([np.bincount(cluster_of_vertex, weights=column, minlength=num_clusters)
+                             for column in vertices.T], axis=1) / np.maximum(counts, 1.0)
+
+    # Квадрики плоскостей исходных треугольников (с весом площади) собираются в кластеры их вершин.
+    corners = positions[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = np.linalg.norm(face_normals, axis=1)
+    unit_normals = face_normals / np.maximum(areas, 1e-30)[:, None]
+    planes = np.hstack((unit_normals, -np.einsum('ij,ij->i', unit_normals, corners[:, 0])[:, None]))
+    face_quadrics = np.einsum('ti,tj->tij', planes, planes) * (areas * 0.5)[:, None, None]
+    corner_clusters = cluster_of_vertex[triangles].reshape(-1)
+    quadrics = np.stack([np.bincount(corner_clusters, weights=np.repeat(component, 3), minlength=num_clusters)
+                         for component in face_quadrics.reshape(-1, 16).T], axis=1).reshape(-1, 4, 4)
+    a, b = quadrics[:, :3, :3], quadrics[:, :3, 3]
+    means = new_vertices[:, :3]
+    regularization = QUADRIC_REGULARIZATION * np.trace(a, axis1=1, axis2=2) + 1e-30
+    offsets = np.linalg.solve(a + regularization[:, None, None] * np.eye(3),
+                              -(np.einsum('kij,kj->ki', a, means) + b)[:, :, None])[:, :, 0]
+    new_vertices[:, :3] = np.clip(means + offsets, cell_min, cell_min + cell_size)
+
+    if stride >= 9:
+        simplified = new_vertices[:, :3][collapsed]
+        smooth = np.cross(simplified[:, 1] - simplified[:, 0], simplified[:, 2] - simplified[:, 0])
+        normals = np.stack([np.bincount(collapsed.reshape(-1), weights=np.repeat(component, 3), minlength=num_clusters)
+                            for component in smooth.T], axis=1)
+        # Нормали из обхода треугольников направляем так же, как исходные нормали вершин (обход может быть обратным).
+        original = vertices[:, 6:9][triangles].sum(axis=1)
+        if np.count_nonzero(np.einsum('ij,ij->i', face_normals, original) < 0.0) * 2 > len(triangles):
+            normals = -normals
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        fallback = new_vertices[:, 6:9] # Средняя исходная нормаль, если треугольники вокруг вершины исчезли
+        fallback_lengths = np.linalg.norm(fallback, axis=1, keepdims=True)
+        new_vertices[:, 6:9] = np.where(lengths > 1e-30, normals / np.maximum(lengths, 1e-30),
+                                        fallback / np.maximum(fallback_lengths, 1e-30))
+
+    used, new_triangles = np.unique(collapsed, return_inverse=True)
+    new_vertices = new_vertices[used].astype(np.float32)
+    new_triangles = new_triangles.reshape(-1, 3)
+    if index_data_np is None:
+        return new_vertices[new_triangles].reshape(-1), None
+    return new_vertices.reshape(-1), new_triangles.astype(np.uint32).reshape(-1)
+
+
+def build_mesh_lods(vertex_data_np: np.ndarray, index_data_np: np.ndarray, stride: int = VERTEX_DATA_STRIDE,
+                    levels: int = None, ratio: float = None) -> list:
+    """
+    Строит упрощенные уровни 1..levels: [(vertex_data_np, index_data_np), ...], уровень l - примерно
+    ratio^l треугольников исходного меша. Каждый уровень упрощается из исходного меша (ошибки не копятся).
+    Построение останавливается раньше, если меш больше не упрощается.
+    """
+    levels = LOD_LEVELS if levels is None else levels
+    ratio = LOD_TRIANGLE_RATIO if ratio is None else ratio
+    if index_data_np is not None:
+        num_triangles = np.asarray(index_data_np).size // 3
+    else:
+        num_triangles = np.asarray(vertex_data_np).size // (stride * 3)
+    lods = []
+    previous = num_triangles
+    for level in range(1, levels + 1):
+        vertices, indices = simplify_mesh(vertex_data_np, index_data_np, num_triangles * ratio ** level,
+                                          stride=stride)
+        count = indices.size // 3 if indices is not None else vertices.size // (stride * 3)
+        if count == 0 or count >= previous:
+            break
+        lods.append((vertices, indices))
+        previous = count
+    return lods
+
+
+def projected_sizes(centers: np.ndarray, radii: np.ndarray, camera_position, projection_scale: float) -> np.ndarray:
+    """
+    Доля высоты экрана, которую занимает диаметр сфер (K, 3)/(K,) при перспективе с projection[1][1] = projection_scale.
+    Камера внутри сферы - inf (всегда самый детальный уровень).
+    """
+    distances = np.linalg.norm(np.asarray(centers, dtype=np.float64) - np.asarray(camera_position, dtype=np.float64),
+                               axis=1)
+    inside = distances <= radii
+    return np.where(inside, np.inf, radii * projection_scale / np.where(inside, 1.0, distances))
+
+
+def select_lod_levels(current_levels: np.ndarray, sizes: np.ndarray, thresholds=None, hysteresis: float = None,
+                      max_levels=None) -> np.ndarray:
+    """
+    Новые уровни детализации для объектов с экранными размерами sizes (projected_sizes).
+    thresholds - убывающие пороги: при размере не меньше thresholds[l] объекту нужен уровень не грубее l.
+    Объект огрубляется, только когда размер ниже порога на долю hysteresis, и уточняется, только когда
+    выше на ту же долю; между ними остается текущий уровень. max_levels (скаляр или (K,)) - число
+    упрощенных уровней у меша объекта.
+    """
+    thresholds = np.asarray(LOD_SCREEN_SIZES if thresholds is None else thresholds, dtype=np.float64)
+    hysteresis = LOD_HYSTERESIS if hysteresis is None else hysteresis
+    sizes = np.asarray(sizes, dtype=np.float64)[:, None]
+    current = np.asarray(current_levels, dtype=np.int64)
+    coarser = np.count_nonzero(sizes < thresholds * (1.0 - hysteresis), axis=1)
+    finer = np.count_nonzero(sizes < thresholds * (1.0 + hysteresis), axis=1)
+    levels = np.clip(current, coarser, finer)
+    if max_levels is not None:
+        levels = np.minimum(levels, max_levels)
+    return levels
@@ -0,0 +1,176 @@
+# meshes/mesh_pvs.py
+"""
+Потенциально видимые множества (PVS) кластеров меша для закрытых карт (de_dust2).
+
+Ограничивающий бокс меша делится на кубические ячейки. Для каждой ячейки из случайных точек внутри нее
+выпускаются лучи во все стороны и к точкам на треугольниках кластеров (meshes.mesh_clusters); кластер,
+в который луч попадает первым, считается видимым из ячейки. Лучи проходят сквозь треугольники, повернутые
+к ним обратной стороной: рендерер такие треугольники не рисует (BACK_CULL), значит, они ничего и не
+закрывают. Кластеры, чья сфера пересекает ячейку, видимы всегда. Результат приблизительный: чем больше лучей, тем меньше шанс
+потерять маленький видимый кластер.
+
+Построение дорогое, поэтому выполняется заранее утилитой tools/build_pvs.py, а результат хранится
+в кэше мешей (mesh_cache.load_mesh_pvs). C++ по положению камеры в координатах меша выбирает ячейку
+и отбрасывает невидимые из нее кластеры; камера вне сетки - PVS не применяется.
+
+Формат:
+  grid       (4,) float32               - [origin.xyz, cell_size], origin - минимальный угол сетки;
+  visibility (NX, NY, NZ, B) uint8      - битовые маски видимых кластеров ячейки,
+                                          кластер k - бит (k % 8) байта k // 8 (bitorder='little').
+"""
+import numpy as np
+
+from meshes.mesh_clusters import bvh_ordered_triangles
+from settings import (VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, MESH_PVS_CELL_SIZE, MESH_PVS_RAYS_PER_CELL,
+                      MESH_PVS_SAMPLES_PER_CLUSTER, MESH_PVS_DILATE_CELLS)
+
+RAY_T_MIN = 1e-4
+TARGET_SAMPLES_BATCH = 8
+
+
+def empty_mesh_pvs() -> tuple:
+    return np.zeros(4, dtype=np.float32), np.zeros((0, 0, 0, 0), dtype=np.uint8)
+
+
+def pvs_cell_of_point(grid: np.ndarray, visibility: np.ndarray, point) -> tuple:
+    """Индекс ячейки (ix, iy, iz), содержащей точку в координатах меша, или None вне сетки."""
+    cell = np.floor((np.asarray(point, dtype=np.float64) - grid[:3]) / grid[3]).astype(np.int64)
+    if np.any(cell < 0) or np.any(cell >= visibility.shape[:3]):
+        return None
+    return tuple(cell.tolist())
+
+
+def visible_clusters(grid: np.ndarray, visibility: np.ndarray, point, num_clusters: int) -> np.ndarray:
+    """Маска (K,) кластеров, видимых из точки; вне сетки видимы все."""
+    cell = pvs_cell_of_point(grid, visibility, point)
+    if cell is None:
+        return np.ones(num_clusters, dtype=bool)
+    return np.unpackbits(visibility[cell], count=num_clusters, bitorder='little').astype(bool)
+
+
+def _nearest_front_hits(origins, directions, v0, edge1, edge2, normals, occluders) -> np.ndarray:
+    """(n,) расстояние до ближайшего треугольника, повернутого к лучу лицевой стороной (inf - промах)."""
+    p = np.cross(directions[:, None, :], edge2[None, :, :])
+    det = np.einsum('mk,nmk->nm', edge1, p)
+    valid = (np.abs(det) > 1e-12) & occluders[None, :] & ((directions @ normals.T) < 0.0)
+    inv_det = 1.0 / np.where(valid, det, 1.0)
+    s = origins[:, None, :] - v0[None, :, :]
+    u = np.einsum('nmk,nmk->nm', s, p) * inv_det
+    q = np.cross(s, edge1[None, :, :])
+    v = np.einsum('nk,nmk->nm', directions, q) * inv_det
+    t = np.einsum('mk,nmk->nm', edge2, q) * inv_det
+    hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t > RAY_T_MIN)
+    return np.where(hit, t, np.inf).min(axis=1)
+
+
+def _cast_rays(origins, directions, centers, radii, ranges, v0, edge1, edge2, normals, occluders) -> tuple:
+    """Ближайшее лицевое попадание каждого луча: (t (n,), кластер (n,), -1 - промах)."""
+    best_t = np.full(len(origins), np.inf)
+    best_cluster = np.full(len(origins), -1, dtype=np.int64)
+    # Луч проверяет треугольники только тех кластеров, чью сферу он пересекает.
+    to_centers = centers[None, :, :] - origins[:, None, :]
+    along = np.einsum('rkc,rc->rk', to_centers, directions)
+    miss_sq = np.einsum('rkc,rkc->rk', to_centers, to_centers) - along * along
+    candidates = (miss_sq <= radii * radii) & (along + radii >= 0.0)
+    for k in np.flatnonzero(candidates.any(axis=0)):
+        rays = np.flatnonzero(candidates[:, k])
+        first, count = ranges[k]
+        tris = slice(first, first + count)
+        t = _nearest_front_hits(origins[rays], directions[rays], v0[tris], edge1[tris], edge2[tris],
+                                normals[tris], occluders[tris])
+        closer = t < best_t[rays]
+        best_t[rays[closer]] = t[closer]
+        best_cluster[rays[closer]] = k
+    return best_t, best_cluster
+
+
+def build_mesh_pvs(vertex_data_np: np.ndarray, index_data_np: np.ndarray, bvh: tuple,
+                   stride: int = VERTEX_DATA_STRIDE, use_vertex_normals: bool = USE_VERTEX_NORMALS,
+                   cell_size: float = None, rays_per_cell: int = None, samples_per_cluster: int = None,
+                   dilate_cells: int = None, seed: int = 0, progress=None) -> tuple:
+    """
+    Строит PVS по мешу с BVH и кластерами (bounds, nodes, triangles, cluster_ranges, cluster_cones).
+    Сначала из ячейки выпускаются rays_per_cell лучей в случайных направлениях, затем к каждому еще
+    не найденному кластеру - samples_per_cluster лучей в случайные точки его треугольников
+    (так находятся кластеры, видимые под малым углом). В конце видимость ячейки объединяется
+    с соседями на расстоянии dilate_cells (см. dilate_pvs). progress(done_cells, total_cells)
+    вызывается после каждой ячейки. Возвращает (grid, visibility).
+    """
+    cell_size = float(MESH_PVS_CELL_SIZE if cell_size is None else cell_size)
+    rays_per_cell = max(0, MESH_PVS_RAYS_PER_CELL if rays_per_cell is None else rays_per_cell)
+    samples_per_cluster = max(0, MESH_PVS_SAMPLES_PER_CLUSTER if samples_per_cluster is None else samples_per_cluster)
+    dilate_cells = max(0, MESH_PVS_DILATE_CELLS if dilate_cells is None else dilate_cells)
+    if len(bvh) < 5 or len(bvh[3]) == 0:
+        return empty_mesh_pvs()
+    bounds, _, triangles, ranges, cones = bvh
+    corners, normals, degenerate = bvh_ordered_triangles(vertex_data_np, index_data_np, triangles,
+                                                         stride, use_vertex_normals)
+    # Лучи считаются во float32: вдвое меньше трафика памяти, точности хватает для попаданий.
+    v0 = corners[:, 0].astype(np.float32)
+    edge1 = (corners[:, 1] - corners[:, 0]).astype(np.float32)
+    edge2 = (corners[:, 2] - corners[:, 0]).astype(np.float32)
+    normals = normals.astype(np.float32)
+    occluders = ~degenerate
+    geometry = (np.asarray(cones[:, :3], dtype=np.float32), np.asarray(cones[:, 3], dtype=np.float32),
+                ranges, v0, edge1, edge2, normals, occluders)
+    num_clusters = len(ranges)
+
+    origin = bounds[0, :3].astype(np.float64)
+    dims = np.maximum(1, np.ceil((bounds[0, 3:] - bounds[0, :3]) / cell_size).astype(np.int64))
+    visibility = np.zeros((*dims, (num_clusters + 7) // 8), dtype=np.uint8)
+    rng = np.random.default_rng(seed)
+    centers, radii = geometry[0], geometry[1]
+    total_cells = int(np.prod(dims))
+    for done, cell in enumerate(np.ndindex(*dims)):
+        cell_min = origin + np.array(cell) * cell_size
+        # Кластеры, задевающие ячейку, видимы из нее всегда.
+        nearest = np.clip(centers, cell_min, cell_min + cell_size)
+        visible = np.linalg.norm(nearest - centers, axis=1) <= radii
+
+        if rays_per_cell:
+            ray_origins = (cell_min + rng.random((rays_per_cell, 3)) * cell_size).astype(np.float32)
+            ray_directions = rng.standard_normal((rays_per_cell, 3), dtype=np.float32)
+            ray_directions /= np.linalg.norm(ray_directions, axis=1, keepdims=True)
+            _, hit_cluster = _cast_rays(ray_origins, ray_directions, *geometry)
+            visible[hit_cluster[hit_cluster >= 0]] = True
+
+        # Лучи к случайным точкам треугольников еще не найденных кластеров, порциями:
+        # найденный кластер выбывает, весь бюджет тратится только на действительно невидимые.
+        for batch_start in range(0, samples_per_cluster, TARGET_SAMPLES_BATCH):
+            hidden = np.flatnonzero(~visible)
+            if hidden.size == 0:
+                break
+            batch = min(TARGET_SAMPLES_BATCH, samples_per_cluster - batch_start)
+            target_clusters = np.repeat(hidden, batch)
+            target_tris = ranges[target_clusters, 0] + (rng.random(target_clusters.size) * ranges[target_clusters, 1]).astype(np.int64)
+            bary = rng.random((target_clusters.size, 2), dtype=np.float32)
+            bary = np.where(bary.sum(axis=1, keepdims=True) > 1.0, 1.0 - bary, bary)
+            targets = v0[target_tris] + bary[:, :1] * edge1[target_tris] + bary[:, 1:] * edge2[target_tris]
+            ray_origins = (cell_min + rng.random((target_clusters.size, 3)) * cell_size).astype(np.float32)
+            ray_directions = targets - ray_origins
+            distances = np.linalg.norm(ray_directions, axis=1)
+            usable = (distances > RAY_T_MIN) & occluders[target_tris]
+            ray_directions /= np.maximum(distances, RAY_T_MIN)[:, None]
+            usable &= np.einsum('nc,nc->n', ray_directions, normals[target_tris]) < 0.0 # Цель повернута к лучу
+            hit_t, hit_cluster = _cast_rays(ray_origins[usable], ray_directions[usable], *geometry)
+            reached = (hit_cluster == target_clusters[usable]) | (hit_t >= distances[usable] * (1.0 - 1e-4))
+            visible[target_clusters[usable][reached]] = True
+
+        visibility[cell] = np.packbits(visible, bitorder='little')
+        if progress is not None:
+            progress(done + 1, total_cells)
+
+    if dilate_cells > 0:
+        visibility = dilate_pvs(visibility, dilate_cells)
+    grid = np.array([*origin, cell_size], dtype=np.float32)
+    return grid, visibility
+
+
+def dilate_pvs(visibility: np.ndarray, radius: int) -> np.ndarray:
+    """Объединяет видимость каждой ячейки с соседями в кубе (2 * radius + 1)^3: меньше пропусков выборки."""
+    dims = visibility.shape[:3]
+    padded = np.pad(visibility, [(radius, radius)] * 3 + [(0, 0)])
+    result = np.zeros_like(visibility)
+    for offset in np.ndindex(*(2 * radius + 1,) * 3):
+        result |= padded[offset[0]:offset[0] + dims[0], offset[1]:offset[1] + dims[1], offset[2]:offset[2] + dims[2]]
+    return result
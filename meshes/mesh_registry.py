@@ -0,0 +1,213 @@
+# meshes/mesh_registry.py
+"""
+Общий для процесса реестр мешей.
+
+Одинаковые .obj (с одинаковыми опциями загрузки) разбираются один раз: все GameObject
+получают один и тот же экземпляр Mesh и один read-only буфер vertex_data_np.
+Реестр считает ссылки; когда последний владелец вызывает release(), меш выгружается.
+acquire_async() сразу возвращает "ожидающий" меш, а данные загружаются через meshes.asset_loader.
+"""
+import os
+import threading
+
+from meshes.mesh import Mesh, load_mesh_buffers
+from meshes.asset_loader import get_asset_loader
+from settings import VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, USE_INDEXED_MESHES
+
+
+class _RegistryEntry:
+    __slots__ = ('key', 'mesh', 'refcount', 'ready')
+
+    def __init__(self, key, mesh):
+        self.key = key
+        self.mesh = mesh          # None, пока acquire() строит меш (вне блокировки)
+        self.refcount = 0
+        self.ready = threading.Event()
+        if mesh is not None:
+            self.ready.set()
+
+
+class MeshRegistry:
+    def __init__(self):
+        self._entries = {}       # key -> _RegistryEntry
+        self._mesh_keys = {}     # id(mesh) -> key
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(obj_filename: str, default_color: tuple) -> tuple:
+        """Ключ реестра: нормализованный путь + опции загрузки, влияющие на буфер вершин."""
+        return (os.path.normcase(os.path.abspath(obj_filename)),
+                tuple(float(c) for c in default_color),
+                VERTEX_DATA_STRIDE,
+                USE_VERTEX_NORMALS,
+                USE_INDEXED_MESHES)
+
+    def acquire(self, app, obj_filename: str, default_color: tuple = (0.8, 0.8, 0.8)) -> Mesh:
+        """
+        Возвращает общий Mesh для файла (загружая его при первом обращении) и увеличивает счетчик ссылок.
+        Меш строится вне блокировки реестра: другие файлы тем временем выдаются без ожидания, а запросы того же
+        ключа ждут готовый меш (если загрузка упала, следующий из них пробует загрузить файл сам).
+        Если меш уже запрошен через acquire_async() и еще грузится, возвращается этот же ожидающий меш
+        (is_loaded == False): его данные появляются только в loader.process_completed() главного потока,
+        поэтому ждать их здесь нельзя.
+        """
+        key = self.make_key(obj_filename, default_color)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = _RegistryEntry(key, None) # Заглушка: ключ строит этот поток
+                    self._entries[key] = entry
+                    break
+                if entry.ready.is_set():
+                    entry.refcount += 1
+                    return entry.mesh
+            entry.ready.wait()
+
+        try:
+            mesh = Mesh(app, obj_filename=obj_filename, default_color_tuple=default_color)
+            self._make_read_only(mesh.vertex_data_np, mesh.index_data_np, mesh.bvh,
+                                 [(lod.vertex_data_np, lod.index_data_np) for lod in mesh.lods])
+        except BaseException:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            entry.ready.set()
+            raise
+        with self._lock:
+            entry.mesh = mesh
+            entry.refcount += 1
+            if self._entries.get(key) is entry: # Запись могли выгрузить (unload/clear), пока меш строился
+                self._mesh_keys[id(mesh)] = key
+        entry.ready.set()
+        return mesh
+
+    def acquire_async(self, app, obj_filename: str, default_color: tuple = (0.8, 0.8, 0.8), loader=None) -> Mesh:
+        """
+        Как acquire(), но не блокирует: новый меш создается пустым (ничего не рендерит), а его данные
+        загружаются в фоне через loader (по умолчанию get_asset_loader()) и появляются после
+        loader.process_completed() в главном потоке. Повторные запросы получают тот же меш.
+        """
+        key = self.make_key(obj_filename, default_color)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                mesh = Mesh(app, obj_filename=obj_filename, default_color_tuple=default_color, load=False)
+                entry = _RegistryEntry(key, mesh)
+                self._entries[key] = entry
+                self._mesh_keys[id(mesh)] = key
+                (loader or get_asset_loader()).submit(
+                    load_mesh_buffers, obj_filename, default_color, mesh.vertex_data_format_info,
+                    on_done=lambda result, error: self._finish_async_load(mesh, result, error))
+            entry.refcount += 1
+            return entry.mesh
+
+    def _finish_async_load(self, mesh: Mesh, result, error):
+        # Главный поток (loader.process_completed). Меш, выгруженный до конца загрузки (release до нуля,
+        # unload, clear), не заполняется: его уже никто не рендерит, а нативный хэндл освобожден.
+        with self._lock:
+            key = self._mesh_keys.get(id(mesh))
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None or entry.mesh is not mesh:
+                return
+        if error is not None:
+            print(f"ERROR (MeshRegistry): Background load of '{mesh.obj_filename}' failed: {error}")
+            return
+        self._make_read_only(*result)
+        mesh.set_buffers(*result)
+
+    @staticmethod
+    def _make_read_only(vertex_data_np, index_data_np, bvh, lods=()):
+        # Буферы разделяются между объектами, поэтому запрещаем запись в них.
+        for array in (vertex_data_np, index_data_np, *(bvh or ()), *(array for lod in lods for array in lod)):
+            if array is not None:
+                array.flags.writeable = False
+
+    def release(self, mesh: Mesh) -> int:
+        """Уменьшает счетчик ссылок меша. Возвращает оставшееся число ссылок (0 - меш выгружен)."""
+        with self._lock:
+            key = self._mesh_keys.get(id(mesh))
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None or entry.mesh is not mesh:
+                return 0
+            entry.refcount -= 1
+            if entry.refcount <= 0:
+                self._remove_nolock(entry)
+                return 0
+            return entry.refcount
+
+    def unload(self, obj_filename: str) -> int:
+        """
+        Принудительно выгружает все варианты меша для файла, независимо от счетчиков.
+        Объекты, уже держащие Mesh, продолжают им пользоваться; новые acquire() загрузят файл заново.
+        Возвращает количество выгруженных записей.
+        """
+        path = os.path.normcase(os.path.abspath(obj_filename))
+        with self._lock:
+            entries = [entry for key, entry in self._entries.items() if key[0] == path]
+            for entry in entries:
+                self._remove_nolock(entry)
+            return len(entries)
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.mesh is not None:
+                    entry.mesh.release_native_handle()
+            self._entries.clear()
+            self._mesh_keys.clear()
+
+    def _remove_nolock(self, entry: _RegistryEntry):
+        self._entries.pop(entry.key, None)
+        if entry.mesh is not None:
+            self._mesh_keys.pop(id(entry.mesh), None)
+            entry.mesh.release_native_handle()
+
+    def refcount(self, obj_filename: str, default_color: tuple = (0.8, 0.8, 0.8)) -> int:
+        with self._lock:
+            entry = self._entries.get(self.make_key(obj_filename, default_color))
+            return entry.refcount if entry else 0
+
+    def memory_report(self) -> list:
+        """Список словарей по каждому загруженному мешу: файл, цвет, ссылки, треугольники, байты."""
+        with self._lock:
+            report = []
+            for entry in self._entries.values():
+                mesh = entry.mesh
+                if mesh is None: # Еще строится
+                    continue
+                nbytes = mesh.vertex_data_np.nbytes
+                if mesh.index_data_np is not None:
+                    nbytes += mesh.index_data_np.nbytes
+                nbytes += sum(array.nbytes for array in mesh.bvh or ())
+                nbytes += sum(lod.vertex_data_np.nbytes + (lod.index_data_np.nbytes if lod.index_data_np is not None else 0)
+                              for lod in mesh.lods)
+                report.append({
+                    'obj_filename': mesh.obj_filename,
+                    'default_color': entry.key[1],
+                    'refcount': entry.refcount,
+                    'triangles': mesh.num_triangles,
+                    'nbytes': int(nbytes),
+                })
+            return sorted(report, key=lambda item: item['nbytes'], reverse=True)
+
+    def total_bytes(self) -> int:
+        return sum(item['nbytes'] for item in self.memory_report())
+
+    def print_report(self):
+        print("\n─── MeshRegistry report ───")
+        report = self.memory_report()
+        if not report:
+            print("  No meshes loaded.")
+        for item in report:
+            print(f"  {item['obj_filename']:40s}: {item['nbytes'] / 1024:10.1f} KiB | {item['triangles']:8d} tris | {item['refcount']:5d} refs")
+        print(f"  {'TOTAL':40s}: {sum(i['nbytes'] for i in report) / 1024:10.1f} KiB")
+        print("─────────────────────────────\n")
+
+
+_GLOBAL_REGISTRY = MeshRegistry()
+
+
+def get_mesh_registry() -> MeshRegistry:
+    """Возвращает общий для процесса реестр мешей."""
+    return _GLOBAL_REGISTRY
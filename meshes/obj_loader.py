@@ -1,5 +1,31 @@
+import locale
+import os
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
+from settings import (OBJ_STREAMING_THRESHOLD_MB, OBJ_STREAM_CHUNK_MB,
+                      OBJ_PARALLEL_WORKERS, OBJ_PARALLEL_THRESHOLD_MB, USE_NATIVE_OBJ_LOADER)
+
+# Нативный загрузчик из C++ модуля (если модуль собран); иначе работает NumPy-версия ниже.
+try:
+    from cpp_renderer_core import load_obj_cpp as _load_obj_cpp
+except ImportError:
+    _load_obj_cpp = None
+
+# Записи OBJ, которые интересуют векторизованный загрузчик (остаток строки без комментария).
+# Поиск идет по литеральному префиксу "\n<команда>", что в разы быстрее якоря ^ с re.M.
+_V_RE = re.compile(r'\nv[ \t]+([^\n#]*)')
+_VN_RE = re.compile(r'\nvn[ \t]+([^\n#]*)')
+_F_RE = re.compile(r'\nf[ \t]+([^\n#]*)')
+_USEMTL_RE = re.compile(r'\nusemtl[ \t]+(\S+)')
+_MTLLIB_RE = re.compile(r'\nmtllib[ \t]+(\S+)')
+_INDENTED_LINE_RE = re.compile(r'\n[ \t]+')
+_DEFAULT_NORMAL = np.array([0.0, 0.0, 1.0], dtype='float32')
+_MB = 1024 * 1024
+
 def parse_mtl(mtl_filename):
     """
     Парсит файл .mtl и извлекает информацию о материалах.
@@ -25,101 +51,493 @@ def parse_mtl(mtl_filename):
         print(f"Ошибка при парсинге MTL файла '{mtl_filename}': {e}")
     return materials
 
+def _parse_float_rows(bodies, width):
+    """
+    Разбирает список строк-записей ('v'/'vn' без префикса) в массив (N, width) float32.
+    Берутся первые width чисел каждой строки. Быстрый путь - один вызов np.fromstring
+    на весь блок; если в строках разное число компонент, разбираем построчно.
+    """
+    count = len(bodies)
+    if count == 0:
+        return np.zeros((0, width), dtype='float32')
+    values = None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(' '.join(bodies), dtype=np.float64, sep=' ')
+    except ValueError:
+        values = None
+    # Каждая корректная запись содержит минимум width чисел, поэтому совпадение
+    # общего количества означает, что во всех строках ровно width компонент.
+    if values is None or values.size != count * width:
+        values = np.array([body.split()[:width] for body in bodies], dtype=np.float64)
+    return values.reshape(count, width).astype('float32')
+
+
+def _parse_face_corners(f_bodies):
+    """
+    Разбирает записи граней ('f' без префикса).
+    Возвращает (counts, v_raw, vn_raw): число углов каждой грани и сырые (1-базные,
+    возможно отрицательные) индексы вершин и нормалей для всех углов подряд.
+    Отсутствующая нормаль кодируется нулём.
+    """
+    corners = ' '.join(f_bodies).split()
+    num_faces = len(f_bodies)
+    if len(corners) == num_faces * 3:
+        counts = np.full(num_faces, 3, dtype=np.int64)
+    else:
+        counts = np.fromiter(map(len, map(str.split, f_bodies)), dtype=np.int64, count=num_faces)
+
+    joined = ' '.join(corners).replace('//', '/0/')
+    slashes = joined.count('/')
+    num_corners = len(corners)
+    # Быстрые форматы: "v" (0 слэшей) и "v/vt/vn" / "v//vn" (ровно 2 слэша в каждом углу).
+    if slashes == 0 or slashes == 2 * num_corners:
+        fields = 1 if slashes == 0 else 3
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                flat = np.fromstring(joined.replace('/', ' '), dtype=np.int64, sep=' ')
+        except ValueError:
+            flat = None
+        if flat is not None and flat.size == num_corners * fields:
+            flat = flat.reshape(num_corners, fields)
+            v_raw = flat[:, 0]
+            vn_raw = flat[:, 2] if fields == 3 else np.zeros(num_corners, dtype=np.int64)
+            return counts, v_raw, vn_raw
+
+    v_raw = np.empty(num_corners, dtype=np.int64)
+    vn_raw = np.zeros(num_corners, dtype=np.int64)
+    for i, corner in enumerate(corners):
+        subparts = corner.split('/')
+        v_raw[i] = int(subparts[0])
+        if len(subparts) >= 3 and subparts[2]:
+            vn_raw[i] = int(subparts[2])
+    return counts, v_raw, vn_raw
+
+
+def _resolve_indices(raw, count_before):
+    """Переводит 1-базные/относительные индексы OBJ в 0-базные (относительные считаются от текущего конца списка)."""
+    return np.where(raw > 0, raw - 1, count_before + raw)
+
+
 def load_obj_file(filename, default_color=(0.5, 0.5, 0.5)):
     """
-    Загружает геометрию из .obj файла.
+    Загружает геометрию из .obj файла (векторизованная версия).
     Поддерживает вершины (v), нормали (vn), грани (f) и материалы из .mtl.
-    Грани могут быть треугольниками или четырехугольниками (автоматически триангулируются).
+    Грани могут быть треугольниками или многоугольниками (триангулируются веером).
     Для вершин без указанных нормалей используется default_normal = [0.0, 0.0, 1.0].
     Цвет вершин берется из материала (.mtl), если он определен, иначе используется default_color.
 
+    Файл читается целиком и одним регулярным выражением делится на записи v/vn/f/usemtl/mtllib;
+    числа разбираются пачками через NumPy, а итоговый буфер собирается fancy-индексацией.
+    Если доступен cpp_renderer_core.load_obj_cpp (и USE_NATIVE_OBJ_LOADER), разбор выполняется в C++;
+    при его ошибке или отсутствии - здесь. Файлы больше OBJ_STREAMING_THRESHOLD_MB разбираются кусками
+    (см. load_obj_file_streaming), а больше OBJ_PARALLEL_THRESHOLD_MB при OBJ_PARALLEL_WORKERS > 1 -
+    в нескольких процессах (см. load_obj_file_parallel).
+    Результат совпадает с исходным построчным загрузчиком (tests/obj_loader_legacy.py).
+
     Возвращает:
         numpy.array: Массив данных вершин в формате [x,y,z, r,g,b, nx,ny,nz, ...], dtype='float32'
                      или пустой массив в случае ошибки.
     """
-    vertices_raw = []  # Список для хранения координат вершин (v)
-    normals_raw = []   # Список для хранения нормалей (vn)
-    materials = {}     # Словарь для хранения материалов из .mtl
-    current_material = None
-    final_vertex_data = [] # Список для хранения итоговых данных (pos + color + normal)
-    default_normal = [0.0, 0.0, 1.0]
+    native = _load_native(filename, default_color, indexed=False)
+    if native is not None:
+        return native
+    return _load_with_builder(filename, default_color, _build_vertex_data, np.array([], dtype='float32'))
+
+
+def load_obj_file_indexed(filename, default_color=(0.5, 0.5, 0.5)):
+    """
+    Загружает .obj как индексированный меш.
+    Углы треугольников с одинаковой тройкой (позиция, нормаль, материал) сливаются в одну вершину.
+
+    Возвращает:
+        (vertices, indices): vertices - плоский float32 массив уникальных вершин
+        [x,y,z, r,g,b, nx,ny,nz, ...] (порядок первого появления), indices - uint32 массив
+        по 3 индекса на треугольник. vertices[indices] дает тот же буфер, что и load_obj_file.
+        В случае ошибки оба массива пустые.
+    """
+    native = _load_native(filename, default_color, indexed=True)
+    if native is not None:
+        return native
+    empty = (np.array([], dtype='float32'), np.array([], dtype='uint32'))
+    return _load_with_builder(filename, default_color, _build_indexed_vertex_data, empty)
+
 
+def _load_native(filename, default_color, indexed):
+    """
+    Пробует нативный load_obj_cpp. Возвращает None, если он недоступен, упал или не нашел геометрии -
+    тогда файл разбирает NumPy-загрузчик (он же печатает понятные сообщения об ошибках).
+    """
+    if _load_obj_cpp is None or not USE_NATIVE_OBJ_LOADER:
+        return None
     try:
-        with open(filename, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                parts = line.split()
-                command = parts[0]
-
-                if command == 'mtllib':
-                    # Загрузка файла .mtl
-                    mtl_filename = parts[1]
-                    materials = parse_mtl('assets/'+mtl_filename)
-                elif command == 'usemtl':
-                    # Установка текущего материала
-                    current_material = parts[1]
-                elif command == 'v':
-                    # Координаты вершины
-                    vertices_raw.append(list(map(float, parts[1:4])))
-                elif command == 'vn':
-                    # Нормали
-                    normals_raw.append(list(map(float, parts[1:4])))
-                elif command == 'f':
-                    # Определение грани
-                    face_vertices = []
-                    for part in parts[1:]:
-                        subparts = part.split('/')
-                        v_index = int(subparts[0]) - 1
-                        vn_index = None
-                        if len(subparts) >= 3 and subparts[2]:
-                            vn_index = int(subparts[2]) - 1
-                        face_vertices.append((v_index, vn_index))
-
-                    # Триангуляция
-                    if len(face_vertices) >= 3:
-                        # Первый треугольник
-                        for i in [0, 1, 2]:
-                            v_index, vn_index = face_vertices[i]
-                            position = vertices_raw[v_index]
-                            normal = normals_raw[vn_index] if vn_index is not None and vn_index < len(normals_raw) else default_normal
-                            # Получение цвета из текущего материала
-                            if current_material in materials and 'Kd' in materials[current_material]:
-                                color = materials[current_material]['Kd']
-                            else:
-                                color = default_color
-                            final_vertex_data.extend(position)
-                            final_vertex_data.extend(color)
-                            final_vertex_data.extend(normal)
-
-                        # Дополнительные треугольники для полигонов
-                        for i in range(3, len(face_vertices)):
-                            for j in [0, i-1, i]:
-                                v_index, vn_index = face_vertices[j]
-                                position = vertices_raw[v_index]
-                                normal = normals_raw[vn_index] if vn_index is not None and vn_index < len(normals_raw) else default_normal
-                                # Используем тот же цвет для всех треугольников одной грани
-                                if current_material in materials and 'Kd' in materials[current_material]:
-                                    color = materials[current_material]['Kd']
-                                else:
-                                    color = default_color
-                                final_vertex_data.extend(position)
-                                final_vertex_data.extend(color)
-                                final_vertex_data.extend(normal)
+        result = _load_obj_cpp(filename, [float(c) for c in default_color[:3]], True, indexed)
+    except (RuntimeError, ValueError, TypeError):
+        return None
+    vertices = result[0] if indexed else result
+    return result if vertices.size > 0 else None
+
+
+def load_obj_file_streaming(filename, default_color=(0.5, 0.5, 0.5), chunk_bytes=None):
+    """
+    То же, что load_obj_file, но файл читается кусками по chunk_bytes (по умолчанию OBJ_STREAM_CHUNK_MB),
+    выровненными по границам строк. Треугольники каждого куска сразу дописываются в растущий float32 буфер,
+    поэтому пиковая память - это кусок текста + таблицы v/vn + сам результат, независимо от размера файла.
+
+    Ограничения потокового режима: грань может ссылаться только на уже объявленные v/vn,
+    а mtllib действует на usemtl, встреченные после него (для обычных экспортов так и есть).
+    """
+    return _load_with_builder(filename, default_color, _build_vertex_data, np.array([], dtype='float32'),
+                              streaming=True, chunk_bytes=chunk_bytes)
 
+
+def iter_obj_triangle_chunks(filename, default_color=(0.5, 0.5, 0.5), chunk_triangles=65536, chunk_bytes=None):
+    """
+    Генератор готовых треугольников .obj: блоки float32 формы (3 * k, 9), k <= chunk_triangles,
+    в формате load_obj_file. Память ограничена куском текста и таблицами v/vn.
+    В отличие от load_obj_file, ошибки чтения/разбора не перехватываются.
+    """
+    chunk_chars = chunk_bytes or OBJ_STREAM_CHUNK_MB * _MB
+    block_rows = max(int(chunk_triangles), 1) * 3
+    state = _ObjParseState(filename, default_color)
+    with open(filename, 'r') as f:
+        for text in _iter_text_chunks(f, chunk_chars):
+            corners = _parse_chunk(text, state)
+            if corners is None:
+                continue
+            vertices = _gather_vertices(state, *corners)
+            for start in range(0, len(vertices), block_rows):
+                yield vertices[start:start + block_rows]
+
+
+def load_obj_file_parallel(filename, default_color=(0.5, 0.5, 0.5), workers=None, chunk_bytes=None):
+    """
+    То же, что load_obj_file_streaming, но куски файла (байтовые диапазоны по границам строк)
+    разбираются в ProcessPoolExecutor из workers процессов (по умолчанию os.cpu_count()).
+    Глобальные смещения индексов v/vn и текущий usemtl применяются в основном процессе по порядку кусков,
+    поэтому результат побитово совпадает с последовательным загрузчиком.
+
+    На Windows процессы запускаются через spawn: вызывать только из кода под if __name__ == '__main__'.
+    """
+    return _load_with_builder(filename, default_color, _build_vertex_data, np.array([], dtype='float32'),
+                              workers=workers or os.cpu_count() or 1, chunk_bytes=chunk_bytes)
+
+
+def _load_with_builder(filename, default_color, builder, empty, streaming=None, workers=None, chunk_bytes=None):
+    try:
+        file_size = os.path.getsize(filename)
+        if workers is None:
+            workers = OBJ_PARALLEL_WORKERS if file_size > OBJ_PARALLEL_THRESHOLD_MB * _MB else 0
+        if streaming is None:
+            streaming = file_size > OBJ_STREAMING_THRESHOLD_MB * _MB
+        state = _ObjParseState(filename, default_color)
+        if workers > 1:
+            corner_chunks = (_resolve_chunk(scanned, state)
+                             for scanned in _scan_file_parallel(filename, file_size, workers, chunk_bytes))
+            result = builder(state, (corners for corners in corner_chunks if corners is not None))
+        else:
+            with open(filename, 'r') as f:
+                if streaming:
+                    chunk_chars = chunk_bytes or OBJ_STREAM_CHUNK_MB * _MB
+                    corner_chunks = (_parse_chunk(text, state) for text in _iter_text_chunks(f, chunk_chars))
+                else:
+                    corner_chunks = [_parse_chunk(f.read(), state)]
+                result = builder(state, (corners for corners in corner_chunks if corners is not None))
     except FileNotFoundError:
         print(f"Ошибка: Файл '{filename}' не найден.")
-        return np.array([], dtype='float32')
+        return empty
     except Exception as e:
         print(f"Ошибка при парсинге OBJ файла '{filename}': {e}")
-        return np.array([], dtype='float32')
+        return empty
 
-    if not final_vertex_data:
+    if result is None:
         print(f"Предупреждение: Не найдено данных о вершинах/гранях в файле '{filename}' или формат не поддерживается.")
-        return np.array([], dtype='float32')
+        return empty
+    return result
+
+
+def _line_aligned_ranges(filename, file_size, chunk_bytes):
+    """Делит файл на байтовые диапазоны [start, end) примерно по chunk_bytes, заканчивающиеся концом строки."""
+    ranges = []
+    start = 0
+    with open(filename, 'rb') as f:
+        while start < file_size:
+            end = min(start + chunk_bytes, file_size)
+            if end < file_size:
+                f.seek(end)
+                end += len(f.readline())
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _scan_byte_range(filename, start, end, encoding):
+    """Задача процесса-воркера: читает диапазон файла и выполняет _scan_chunk."""
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    if '\r' in text:
+        # Как текстовый режим open(): универсальные переводы строк.
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return _scan_chunk(text)
+
+
+def _scan_file_parallel(filename, file_size, workers, chunk_bytes=None):
+    """Генератор результатов _scan_chunk для кусков файла в исходном порядке."""
+    if chunk_bytes is None:
+        # Несколько кусков на процесс выравнивают нагрузку; больше OBJ_STREAM_CHUNK_MB не берем ради памяти.
+        chunk_bytes = max(min(OBJ_STREAM_CHUNK_MB * _MB, -(-file_size // (workers * 4))), 64 * 1024)
+    ranges = _line_aligned_ranges(filename, file_size, chunk_bytes)
+    if not ranges:
+        return
+    encoding = locale.getpreferredencoding(False)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        yield from pool.map(_scan_byte_range, [filename] * len(ranges),
+                            [start for start, _ in ranges], [end for _, end in ranges],
+                            [encoding] * len(ranges))
+
+
+def _iter_text_chunks(f, chunk_chars):
+    """Читает открытый текстовый файл кусками примерно по chunk_chars символов, обрезая их по концу строки."""
+    tail = ''
+    while True:
+        block = f.read(chunk_chars)
+        if not block:
+            break
+        text = tail + block
+        cut = text.rfind('\n')
+        if cut < 0:
+            tail = text
+            continue
+        tail = text[cut + 1:]
+        yield text[:cut]
+    if tail:
+        yield tail
+
+
+class _GrowableArray:
+    """Строки фиксированной ширины с амортизированным ростом (удвоение емкости)."""
+
+    def __init__(self, width, dtype='float32'):
+        self.width = width
+        self.dtype = np.dtype(dtype)
+        self.size = 0
+        self._data = np.empty((0, width), dtype=self.dtype)
+
+    @property
+    def array(self):
+        return self._data[:self.size]
+
+    def extend(self, rows):
+        count = len(rows)
+        if count == 0:
+            return
+        if self._data.shape[0] == 0 and rows.dtype == self.dtype and rows.base is None and rows.flags.c_contiguous:
+            # Первый блок забираем без копии: при загрузке одним куском это и есть результат.
+            self._data = rows
+            self.size = count
+            return
+        needed = self.size + count
+        if needed > self._data.shape[0]:
+            grown = np.empty((max(needed, 2 * self._data.shape[0], 1024), self.width), dtype=self.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = rows
+        self.size = needed
+
+    def finish(self):
+        """Возвращает накопленный массив, отдавая лишнюю емкость."""
+        if self._data.shape[0] != self.size:
+            # Буфер принадлежит только нам, поэтому ужимаем его на месте без второй копии.
+            self._data.resize((self.size, self.width), refcheck=False)
+        return self._data
+
+
+class _ObjParseState:
+    """Состояние разбора, переживающее границы кусков: таблицы v/vn, материалы и текущий usemtl."""
+
+    def __init__(self, filename, default_color):
+        self.filename = filename
+        self.positions = _GrowableArray(3)
+        self.normals = _GrowableArray(3)
+        self.materials = {}
+        self.default_color = np.asarray(default_color, dtype='float32')[:3]
+        # Палитра: 0 - цвет по умолчанию, далее по записи на каждый встреченный usemtl.
+        self.palette = _GrowableArray(3)
+        self.palette.extend(self.default_color[np.newaxis].copy())
+        self.current_material = 0
+
+
+def _scan_chunk(text):
+    """
+    Разбирает кусок текста .obj (целые строки) без внешнего состояния, поэтому может выполняться
+    в отдельном процессе. Индексы граней остаются сырыми; смещения прошлых кусков и материалы
+    применяются в _resolve_chunk.
+    Возвращает кортеж: (positions, normals, mtllib_names, usemtl_names, faces), где faces -
+    None или (v_raw, vn_raw, v_before, vn_before, face_usemtl, tri_face, tri_corners).
+    """
+    # Все записи ищутся по литеральному префиксу "\n<команда>", поэтому ведущий перевод строки
+    # нужен для первой строки куска, а отступы в начале строк убираем заранее.
+    text = '\n' + text
+    if _INDENTED_LINE_RE.search(text):
+        text = _INDENTED_LINE_RE.sub('\n', text)
+
+    positions = _parse_float_rows(_V_RE.findall(text), 3)
+    normals = _parse_float_rows(_VN_RE.findall(text), 3)
+    mtllib_names = _MTLLIB_RE.findall(text)
+    usemtl_matches = list(_USEMTL_RE.finditer(text))
+    usemtl_names = [m.group(1) for m in usemtl_matches]
+
+    f_bodies = _F_RE.findall(text)
+    if not f_bodies:
+        return positions, normals, mtllib_names, usemtl_names, None
+    counts, v_raw, vn_raw = _parse_face_corners(f_bodies)
+    num_faces = len(f_bodies)
+    face_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Позиции граней в тексте нужны только для usemtl и относительных индексов.
+    has_relative = (v_raw < 0).any() or (vn_raw < 0).any()
+    face_pos = np.array([m.start() for m in _F_RE.finditer(text)]) if usemtl_matches or has_relative else None
+
+    # Относительные (отрицательные) индексы: считаем, сколько v/vn этого куска было объявлено до каждой грани.
+    if has_relative:
+        corner_face = np.repeat(np.arange(num_faces), counts)
+        v_pos = np.array([m.start() for m in _V_RE.finditer(text)], dtype=np.int64)
+        vn_pos = np.array([m.start() for m in _VN_RE.finditer(text)], dtype=np.int64)
+        v_before = np.searchsorted(v_pos, face_pos)[corner_face]
+        vn_before = np.searchsorted(vn_pos, face_pos)[corner_face]
+    else:
+        v_before = vn_before = 0
+
+    # Материал грани - последний usemtl перед ней: 0 - унаследованный из прошлых кусков, k - k-й usemtl куска.
+    face_usemtl = None
+    if usemtl_matches:
+        face_usemtl = np.searchsorted(np.array([m.start() for m in usemtl_matches]), face_pos)
+
+    # Триангуляция веером: (0, 1, 2), затем (0, i-1, i) для i >= 3.
+    tris_per_face = np.maximum(counts - 2, 0)
+    tri_face = np.repeat(np.arange(num_faces), tris_per_face)
+    tri_local = np.arange(tri_face.size) - np.repeat(np.cumsum(tris_per_face) - tris_per_face, tris_per_face) + 2
+    base = face_starts[tri_face]
+    tri_corners = np.stack((base, base + tri_local - 1, base + tri_local), axis=1).ravel()
+    return positions, normals, mtllib_names, usemtl_names, (v_raw, vn_raw, v_before, vn_before,
+                                                            face_usemtl, tri_face, tri_corners)
+
+
+def _resolve_chunk(scanned, state):
+    """
+    Применяет результат _scan_chunk к state (по порядку кусков).
+    Возвращает (corner_v, corner_vn, corner_color) - индексы в state.positions, state.normals
+    (-1 - нормали нет) и state.palette для каждого угла (по 3 подряд на треугольник), либо None.
+    """
+    positions, normals, mtllib_names, usemtl_names, faces = scanned
+    for mtl_name in mtllib_names:
+        state.materials.update(parse_mtl(_resolve_mtl_path(state.filename, mtl_name)))
+
+    v_count_before = state.positions.size
+    vn_count_before = state.normals.size
+    state.positions.extend(positions)
+    state.normals.extend(normals)
+
+    material_ids = np.concatenate(([state.current_material],
+                                   state.palette.size + np.arange(len(usemtl_names))))
+    for name in usemtl_names:
+        material = state.materials.get(name, {})
+        color = np.asarray(material['Kd'], dtype='float32') if 'Kd' in material else state.default_color
+        state.palette.extend(color[np.newaxis].copy())
+    state.current_material = int(material_ids[-1])
+
+    if faces is None:
+        return None
+    v_raw, vn_raw, v_before, vn_before, face_usemtl, tri_face, tri_corners = faces
+    if tri_face.size == 0:
+        return None
+    v_idx = _resolve_indices(v_raw, v_count_before + v_before)
+    vn_idx = np.where(vn_raw == 0, -1, _resolve_indices(vn_raw, vn_count_before + vn_before))
+
+    if face_usemtl is not None:
+        tri_material = material_ids[face_usemtl[tri_face]]
+    else:
+        tri_material = np.full(tri_face.size, material_ids[0], dtype=np.int64)
+
+    corner_v = v_idx[tri_corners]
+    corner_vn = vn_idx[tri_corners]
+    corner_vn = np.where((corner_vn >= 0) & (corner_vn < state.normals.size), corner_vn, -1)
+    corner_color = np.repeat(tri_material, 3)
+    return corner_v, corner_vn, corner_color
+
+
+def _parse_chunk(text, state):
+    return _resolve_chunk(_scan_chunk(text), state)
+
+
+def _gather_vertices(state, v_idx, vn_idx, color_idx):
+    """Собирает строки [x,y,z, r,g,b, nx,ny,nz] (N, 9) float32 по индексам углов."""
+    vertices = np.empty((len(v_idx), 9), dtype='float32')
+    vertices[:, 0:3] = state.positions.array[v_idx]
+    vertices[:, 3:6] = state.palette.array[color_idx]
+    has_normal = vn_idx >= 0
+    if has_normal.all():
+        vertices[:, 6:9] = state.normals.array[vn_idx]
+    else:
+        vertices[:, 6:9] = _DEFAULT_NORMAL
+        vertices[has_normal, 6:9] = state.normals.array[vn_idx[has_normal]]
+    return vertices
+
+
+def _build_vertex_data(state, corner_chunks):
+    buffer = _GrowableArray(9)
+    for corners in corner_chunks:
+        buffer.extend(_gather_vertices(state, *corners))
+    if buffer.size == 0:
+        return None
+    return buffer.finish().ravel()
+
+
+def _build_indexed_vertex_data(state, corner_chunks):
+    # Копим только ключи углов (3 x int32), вершины собираются один раз после дедупликации.
+    keys = _GrowableArray(3, dtype='int32')
+    for corners in corner_chunks:
+        keys.extend(np.stack(corners, axis=1).astype('int32'))
+    if keys.size == 0:
+        return None
+    corner_keys = keys.finish()
+    _, first_corner, inverse = np.unique(corner_keys, axis=0, return_index=True, return_inverse=True)
+    # np.unique сортирует ключи; возвращаем уникальные вершины в порядке первого появления,
+    # чтобы соседние треугольники ссылались на близкие по памяти вершины.
+    order = np.argsort(first_corner, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    unique_keys = corner_keys[first_corner[order]]
+    vertices = _gather_vertices(state, unique_keys[:, 0], unique_keys[:, 1], unique_keys[:, 2]).ravel()
+    indices = rank[inverse.ravel()].astype('uint32')
+    return vertices, indices
+
+
+def _resolve_mtl_path(obj_filename, mtl_name):
+    """Ищет .mtl рядом с .obj, иначе в assets/ (как исторически делал загрузчик)."""
+    candidate = os.path.join(os.path.dirname(obj_filename), mtl_name)
+    if os.path.isfile(candidate):
+        return candidate
+    return 'assets/' + mtl_name
+
+
+def find_mtl_dependencies(filename):
+    """
+    Возвращает пути .mtl файлов, подключенных в .obj через mtllib.
+    Используется кэшем мешей, чтобы инвалидировать запись при изменении материалов.
+    """
+    names = []
+    try:
+        with open(filename, 'r') as f:
+            for text in _iter_text_chunks(f, OBJ_STREAM_CHUNK_MB * _MB):
+                names.extend(_MTLLIB_RE.findall('\n' + text))
+    except OSError:
+        return []
+    return [_resolve_mtl_path(filename, name) for name in names]
 
-    return np.array(final_vertex_data, dtype='float32')
 
 # Пример использования
 if __name__ == '__main__':
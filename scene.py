@@ -1,6 +1,8 @@
 from settings import *
 import pygame as pg
 from classes.GameObject import GameObject
+from classes.transform_store import TransformStore
+from classes.spatial_index import SceneSpatialIndex
 from ui import Button, TextLabel, Panel
 import random
 
@@ -9,10 +11,16 @@ class Scene:
     def __init__(self, app):
         self.app = app
         self.objs =[]
-        self.map = GameObject(self.app,'assets/de_dust2_2.obj')
+        # Трансформации всех объектов сцены - один массив (N, 9), см. classes/transform_store.py
+        self.transform_store = TransformStore()
+        # Сетка по мировым AABB объектов: в рендерер уходят только видимые камерой объекты
+        self.spatial_index = SceneSpatialIndex(self.transform_store) if SPATIAL_CULLING_ENABLED else None
+        # Карта грузится в фоне (ASYNC_ASSET_LOADING): окно отвечает сразу, геометрия появляется по готовности.
+        self.map = GameObject(self.app,'assets/de_dust2_2.obj', async_load=ASYNC_ASSET_LOADING,
+                              transform_store=self.transform_store)
         #for i in range(10):
-        #    self.objs.append(GameObject(self.app,'assets/cube2.obj'))
-        #    self.objs.append(GameObject(self.app,'assets/pawn.obj'))
+        #    self.objs.append(GameObject(self.app,'assets/cube2.obj', transform_store=self.transform_store))
+        #    self.objs.append(GameObject(self.app,'assets/pawn.obj', transform_store=self.transform_store))
         #self.quad1 = Mesh(self.app,'assets/de_dust2.obj')
         self.init_ui()
 
@@ -60,6 +68,7 @@ class Scene:
     def update(self):
         pass
         
+        # Массовые изменения - одной векторной операцией: self.transform_store.translate((0, 0, 0.001))
         #for obj in self.objs:
         #    obj.position.z += 0.001
         #    obj.scale.xyz += 0.0001
@@ -68,7 +77,11 @@ class Scene:
             #self.obj.position.z += 0.0001
 
     def render(self):
-        self.map.render()
-        #for obj in self.objs:
-        #    obj.render()
+        # Все видимые объекты сцены уходят в C++ одним пакетом прямо из TransformStore.
+        visible_rows = None
+        if self.spatial_index is not None:
+            self.spatial_index.sync()
+            visible_rows = self.spatial_index.query_frustum(
+                self.app.projection_matrix * self.app.player.get_view_matrix())
+        self.app.renderer.render_transform_store(self.transform_store, rows=visible_rows)
         #self.quad1.render()
\ No newline at end of file
@@ -30,8 +30,9 @@ MOUSE_SENSITIVITY = 0.002  # Чувствительность мыши для у
 BG_COLOR = glm.vec3(0.08, 0.10, 0.18) # Цвет фона окна (R, G, B от 0.0 до 1.0)
 
 # --- Настройки C++ Рендерера и Кэшей ---
-MAX_L1_CACHE_SIZE_CPP = 1000  
-MAX_L2_CACHE_SIZE_CPP = 10000 
+L1_CACHE_BYTES = 64 * 1024 * 1024  # Память кэша L1 (экранные треугольники объекта для вида), байт
+L2_CACHE_BYTES = 256 * 1024 * 1024 # Память кэша L2 (мировые вершины объекта для трансформации), байт
+USE_BATCH_SUBMISSION = True # Scene.render отправляет все объекты одним вызовом submit_batch_cpp
 
 # --- Флаги Пайплайна Рендеринга (передаются в C++) ---
 TEST = False # Не используется напрямую рендерером, но может использоваться в main.py
@@ -39,11 +40,63 @@ TEST = False # Не используется напрямую рендереро
 LIGHT = True               
 BACK_CULL = True           
 CLIPPING = True            
+GUARD_BAND_CLIPPING = True  # Треугольники, пересекающие края экрана, не отсекаются боковыми плоскостями, пока не выходят за GUARD_BAND
+GUARD_BAND = 4.0           # Размер защитной полосы в размерах экрана (от центра): дальше треугольники все же отсекаются
 SORT = True                
+SORT_TEMPORAL = False      # Объекты, чьи треугольники не изменились с прошлого кадра, сохраняют место в прошлом порядке; сортируются только изменившиеся
+                           # (выключено: выигрыш только при неподвижной камере, при 50% движущихся объектов медленнее radix sort)
+SOFTWARE_RASTERIZER = False  # Растеризовать треугольники в C++ с буфером глубины (правильные перекрытия, SORT не нужен) вместо SDL_RenderGeometry
+SOFTWARE_RASTER_TILE_SIZE = 64  # Сторона тайла (пикселей): тайлы растеризуются параллельно, буферы тайла помещаются в кэш ядра
 
 # --- Настройки Геометрии и Вершин ---
 VERTEX_DATA_STRIDE = 9     
 USE_VERTEX_NORMALS = True  
+USE_INDEXED_MESHES = True  # Дедуплицировать вершины и передавать в C++ индексы: каждая вершина трансформируется один раз
+MESH_BVH_ENABLED = True    # Строить BVH меша при загрузке; C++ отсекает невидимые поддеревья до обработки треугольников
+MESH_BVH_LEAF_SIZE = 64    # Максимум треугольников в листе BVH
+MESH_CLUSTERS_ENABLED = True  # Делить меш на кластеры (поддеревья BVH) со сферой и конусом нормалей: отсечение кластеров, повернутых от камеры
+MESH_CLUSTER_SIZE = 128       # Максимум треугольников в кластере; при листе BVH 64 кластеры получаются по 64-128
+MESH_PVS_ENABLED = True       # Применять PVS кластеров, если он построен (python -m tools.build_pvs <карта.obj>)
+MESH_PVS_CELL_SIZE = 32.0     # Размер ячейки сетки PVS (единицы меша)
+MESH_PVS_RAYS_PER_CELL = 256  # Лучей в случайных направлениях на ячейку при построении PVS
+MESH_PVS_SAMPLES_PER_CLUSTER = 32  # Лучей из ячейки к каждому еще не найденному кластеру
+MESH_PVS_DILATE_CELLS = 0     # > 0 - объединять видимость ячейки с соседями (запас на промахи выборки, меньше отсечение)
+
+# --- Отсечение Объектов Сцены ---
+SPATIAL_CULLING_ENABLED = True  # Scene.render отправляет в рендерер только объекты, чьи AABB видны камере
+SPATIAL_GRID_CELL_SIZE = 64.0   # Размер ячейки пространственной сетки (мировые единицы)
+OCCLUSION_CULLING_ENABLED = False # C++ растеризует ближайшие кластеры карты в грубый буфер глубины и отбрасывает закрытое ими
+                                  # (выключено: одна карта при движущейся камере - 0.25 -> 2.5 мс/кадр, буфер строится заново;
+                                  # окупается при многих детальных объектах за картой: 64 дракона - 25 -> 12 мс/кадр, если камера
+                                  # стоит, 15 -> 11 мс/кадр, если идет; см. benchmarks/bench_occlusion.py)
+OCCLUSION_BUFFER_WIDTH = 256      # Размер буфера глубины окклюзии (окклюдер пишет только пиксели, покрытые им целиком)
+OCCLUSION_BUFFER_HEIGHT = 144
+OCCLUSION_MAX_OCCLUDER_TRIANGLES = 4096  # Бюджет треугольников-окклюдеров на кадр
+
+# --- Уровни Детализации (LOD) ---
+LOD_ENABLED = True            # Строить упрощенные уровни мешей при загрузке и выбирать уровень по размеру объекта на экране
+LOD_LEVELS = 3                # Упрощенных уровней на меш (уровень 0 - исходный меш)
+LOD_TRIANGLE_RATIO = 0.25     # Уровень l содержит примерно LOD_TRIANGLE_RATIO^l треугольников исходного меша
+LOD_MIN_TRIANGLES = 2000      # Меши с меньшим числом треугольников не упрощаются
+LOD_SCREEN_SIZES = (0.4, 0.15, 0.05)  # Доля высоты экрана (диаметр сферы объекта), ниже которой уровень 0, 1, 2 сменяется следующим
+LOD_HYSTERESIS = 0.2          # Запас вокруг порогов: уровень меняется, только когда размер отошел от порога на эту долю
+
+# --- Загрузка OBJ ---
+USE_NATIVE_OBJ_LOADER = True      # Разбирать .obj в C++ (cpp_renderer_core.load_obj_cpp), если модуль собран
+OBJ_STREAMING_THRESHOLD_MB = 64   # Файлы крупнее разбираются кусками с ограниченной пиковой памятью
+OBJ_STREAM_CHUNK_MB = 8           # Размер куска текста при потоковом разборе
+OBJ_PARALLEL_WORKERS = 0          # > 1 - разбирать крупные .obj в стольких процессах (0 - отключено)
+OBJ_PARALLEL_THRESHOLD_MB = 16    # Минимальный размер файла для параллельного разбора
+
+# --- Фоновая Загрузка Ассетов ---
+ASYNC_ASSET_LOADING = True          # Сцена создает объекты сразу, меши догружаются в фоне
+ASSET_LOADER_WORKERS = 2            # Потоки фонового загрузчика
+ASSET_LOADER_FRAME_BUDGET_MS = 2.0  # Сколько времени кадра можно тратить на применение готовых загрузок
+
+# --- Кэш Скомпилированных Мешей ---
+MESH_CACHE_ENABLED = True          # Сохранять разобранные .obj как .npy и открывать их через memmap
+MESH_CACHE_DIR = 'cache/meshes'    # Каталог кэша (относительно рабочей директории)
+MESH_CACHE_VALIDATE_HASH = False   # True - сверять SHA-1 содержимого вместо размера+mtime (медленнее)
 
 # --- Отсечение Мелких Треугольников ---
 SMALL_TRIANGLE_CULLING_ENABLED = False 
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from meshes.asset_loader import AssetLoader
+from meshes.mesh_registry import MeshRegistry
+
+TRIANGLE_OBJ = "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+
+
+class TestAssetLoader(unittest.TestCase):
+    def setUp(self):
+        self.loader = AssetLoader(max_workers=2)
+
+    def tearDown(self):
+        self.loader.shutdown()
+
+    def test_callback_runs_on_calling_thread(self):
+        results = []
+        self.loader.submit(lambda a, b: a + b, 2, 3,
+                           on_done=lambda result, error: results.append((result, error, threading.current_thread())))
+        self.assertTrue(self.loader.wait_all(timeout=5))
+        self.assertEqual(results, [(5, None, threading.current_thread())])
+        self.assertEqual(self.loader.pending_count, 0)
+
+    def test_error_is_passed_to_callback(self):
+        def fail():
+            raise ValueError("broken asset")
+        results = []
+        self.loader.submit(fail, on_done=lambda result, error: results.append((result, error)))
+        self.assertTrue(self.loader.wait_all(timeout=5))
+        self.assertIsNone(results[0][0])
+        self.assertIsInstance(results[0][1], ValueError)
+
+    def test_max_items_limits_work_per_call(self):
+        done = []
+        futures = [self.loader.submit(lambda i=i: i, on_done=lambda r, e: done.append(r)) for i in range(3)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(self.loader.process_completed(max_items=1, time_budget_ms=0), 1)
+        self.assertEqual(len(done), 1)
+        self.assertTrue(self.loader.wait_all(timeout=5))
+        self.assertEqual(sorted(done), [0, 1, 2])
+
+    def test_shutdown_cancels_queued_loads(self):
+        started, release = threading.Semaphore(0), threading.Event()
+
+        def block():
+            started.release()
+            release.wait(5)
+
+        done = []
+        running = [self.loader.submit(block, on_done=lambda r, e: done.append(('running', e))) for _ in range(2)]
+        for _ in running: # Оба потока пула заняты
+            self.assertTrue(started.acquire(timeout=5))
+        queued = [self.loader.submit(lambda: None, on_done=lambda r, e: done.append(('queued', e))) for _ in range(3)]
+        self.loader.shutdown(wait=False)
+        self.assertTrue(all(future.cancelled() for future in queued))
+        release.set()
+        for future in running:
+            future.result(timeout=5)
+        self.assertEqual(self.loader.pending_count, 5) # Отмененные снимаются в process_completed
+        self.assertEqual(self.loader.process_completed(time_budget_ms=0), 5)
+        self.assertEqual(self.loader.pending_count, 0)
+        self.assertEqual(done, [('running', None), ('running', None)])
+
+
+class TestAsyncMeshAcquire(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.obj_path = os.path.join(self.tmp_dir.name, 'tri.obj')
+        with open(self.obj_path, 'w') as f:
+            f.write(TRIANGLE_OBJ)
+        self.app = Mock()
+        self.registry = MeshRegistry()
+        self.loader = AssetLoader(max_workers=1)
+        self.cache_patch = patch('meshes.mesh_cache.MESH_CACHE_ENABLED', False)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.loader.shutdown()
+        self.tmp_dir.cleanup()
+
+    def test_pending_mesh_is_filled_on_main_thread(self):
+        mesh = self.registry.acquire_async(self.app, self.obj_path, loader=self.loader)
+        self.assertFalse(mesh.is_loaded)
+        self.assertEqual(mesh.vertex_data_np.size, 0)
+        self.assertTrue(self.loader.wait_all(timeout=5))
+        self.assertTrue(mesh.is_loaded)
+        self.assertEqual(mesh.num_triangles, 1)
+        self.assertFalse(mesh.vertex_data_np.flags.writeable)
+
+    def test_repeated_acquire_shares_pending_mesh(self):
+        first = self.registry.acquire_async(self.app, self.obj_path, loader=self.loader)
+        second = self.registry.acquire_async(self.app, self.obj_path, loader=self.loader)
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.refcount(self.obj_path), 2)
+        self.assertTrue(self.loader.wait_all(timeout=5))
+        self.assertTrue(second.is_loaded)
+
+    def test_mesh_released_before_completion_is_not_filled(self):
+        mesh = self.registry.acquire_async(self.app, self.obj_path, loader=self.loader)
+        self.assertEqual(self.registry.release(mesh), 0) # Обработчик загрузки вызывается только в wait_all ниже
+        reloaded = self.registry.acquire_async(self.app, self.obj_path, loader=self.loader)
+        self.assertIsNot(reloaded, mesh)
+        with patch.object(mesh, 'set_buffers') as set_buffers:
+            self.assertTrue(self.loader.wait_all(timeout=5))
+        set_buffers.assert_not_called()
+        self.assertFalse(mesh.is_loaded)
+        self.assertTrue(reloaded.is_loaded)
+        self.assertEqual(self.registry.refcount(self.obj_path), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
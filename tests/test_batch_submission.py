@@ -0,0 +1,121 @@
+import os
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+from tests.test_mesh_clusters import _indexed_sphere
+
+STRIDE = 9
+WIDTH, HEIGHT = 160, 90
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestRegisterMeshValidation(unittest.TestCase):
+    """submit_batch_cpp выполняет этап 1 внутри цикла OpenMP, поэтому некорректные буферы отклоняются при регистрации."""
+
+    def setUp(self):
+        self.vertices = np.zeros(3 * STRIDE, dtype=np.float32)
+
+    def test_valid_meshes_are_registered(self):
+        for indices in (None, np.array([0, 1, 2], dtype=np.uint32)):
+            handle = cpp_renderer_core.register_mesh_cpp(self.vertices, indices, STRIDE, True)
+            cpp_renderer_core.unregister_mesh_cpp(handle)
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(RuntimeError):
+            cpp_renderer_core.register_mesh_cpp(self.vertices, np.array([0, 1, 7], dtype=np.uint32), STRIDE, True)
+
+    def test_index_count_not_multiple_of_three(self):
+        with self.assertRaises(RuntimeError):
+            cpp_renderer_core.register_mesh_cpp(self.vertices, np.array([0, 1], dtype=np.uint32), STRIDE, True)
+
+    def test_truncated_vertex_data(self):
+        with self.assertRaises(RuntimeError): # Треугольник без двух последних float
+            cpp_renderer_core.register_mesh_cpp(self.vertices[:-2], None, STRIDE, True)
+        with self.assertRaises(RuntimeError): # Последняя вершина неполная
+            cpp_renderer_core.register_mesh_cpp(self.vertices[:-1], np.array([0, 1, 2], dtype=np.uint32), STRIDE, True)
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestBatchMatchesPerObject(unittest.TestCase):
+    """submit_batch_cpp рисует тот же кадр, что и вызовы process_and_accumulate_(indexed_)object_cpp по объектам."""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        cpp_renderer_core.initialize_cpp_renderer(WIDTH, HEIGHT, False, "test_batch_submission", 1 << 24, 1 << 24,
+                                                  np.zeros(3, dtype=np.uint8))
+        cls.indexed = _indexed_sphere(8, 16)
+        vertices, indices = cls.indexed
+        cls.soup = np.ascontiguousarray(vertices.reshape(-1, STRIDE)[indices].ravel())
+        cls.soup_handle = cpp_renderer_core.register_mesh_cpp(cls.soup, None, STRIDE, True)
+        cls.indexed_handle = cpp_renderer_core.register_mesh_cpp(vertices, indices, STRIDE, True)
+        cls.next_object_id = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        cpp_renderer_core.set_software_rasterizer_cpp(False)
+        cpp_renderer_core.unregister_mesh_cpp(cls.soup_handle)
+        cpp_renderer_core.unregister_mesh_cpp(cls.indexed_handle)
+        cpp_renderer_core.cleanup_cpp_renderer()
+
+    def object_ids(self, count: int) -> np.ndarray:
+        """Новые id: кэши L1/L2 общие для обоих путей и не должны подставлять результат другого."""
+        ids = np.arange(self.next_object_id + 1, self.next_object_id + count + 1, dtype=np.uint64)
+        type(self).next_object_id += count
+        return ids
+
+    def begin_frame(self):
+        cpp_renderer_core.set_software_rasterizer_cpp(True, 32, 1)
+        view = glm.lookAt(glm.vec3(0, 2, 9), glm.vec3(0, 0, 0), glm.vec3(0, 1, 0))
+        projection = glm.perspective(glm.radians(60), WIDTH / HEIGHT, 0.1, 100.0)
+        cpp_renderer_core.set_frame_parameters_cpp(
+            np.array(view, dtype=np.float32).flatten(order='F'),
+            np.array(projection, dtype=np.float32).flatten(order='F'),
+            np.array([0, 2, 9], dtype=np.float32), True, True, True, False, np.array([255, 0, 255], dtype=np.uint8),
+            False, 0.0)
+
+    def end_frame(self) -> tuple:
+        cpp_renderer_core.render_accumulated_triangles_cpp()
+        return cpp_renderer_core.get_software_framebuffer_cpp(), cpp_renderer_core.get_software_raster_stats_cpp()['submitted']
+
+    def test_batch_matches_per_object_calls(self):
+        transforms = np.array([[-4.0, 0.0, 0.0, 0, 0, 0, 1, 1, 1], [-1.5, 1.0, -2.0, 30, 40, 0, 1.5, 1.5, 1.5],
+                               [1.0, -1.0, 1.0, 0, 90, 10, 1.0, 2.0, 1.0], [3.5, 0.5, -1.0, 45, 0, 0, 1.2, 1.2, 1.2],
+                               [0.0, 0.0, -1.0, 0, 0, 0, 1.3, 1.3, 1.3]], dtype=np.float32)
+        # Перекрывающиеся объекты обоих видов; несколько объектов на один хэндл.
+        handles = np.array([self.soup_handle, self.indexed_handle, self.soup_handle, self.indexed_handle,
+                            self.indexed_handle], dtype=np.int64)
+        vertices, indices = self.indexed
+        self.begin_frame()
+        for object_id, transform, handle in zip(self.object_ids(len(handles)), transforms, handles):
+            if handle == self.soup_handle:
+                cpp_renderer_core.process_and_accumulate_object_cpp(int(object_id), transform, self.soup, STRIDE, True)
+            else:
+                cpp_renderer_core.process_and_accumulate_indexed_object_cpp(int(object_id), transform, vertices, indices,
+                                                                            STRIDE, True)
+        frame, triangles = self.end_frame()
+        self.begin_frame()
+        cpp_renderer_core.submit_batch_cpp(self.object_ids(len(handles)), transforms, handles)
+        frame_batch, triangles_batch = self.end_frame()
+        np.testing.assert_array_equal(frame_batch, frame)
+        self.assertEqual(triangles_batch, triangles)
+        self.assertGreater(len(np.unique(frame)), 20)
+
+    def test_unknown_handle(self):
+        self.begin_frame()
+        unknown = max(self.soup_handle, self.indexed_handle) + 1000
+        with self.assertRaises(RuntimeError):
+            cpp_renderer_core.submit_batch_cpp(self.object_ids(2), np.zeros((2, 9), dtype=np.float32),
+                                               np.array([self.soup_handle, unknown], dtype=np.int64))
+        self.end_frame()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+
+def clip_reference(triangle: np.ndarray, guard_band: float = 1.0) -> np.ndarray:
+    """
+    Sutherland-Hodgman в float64 по шести плоскостям в порядке этапа 2 (боковые - на +-guard_band * w);
+    треугольник целиком вне одной плоскости настоящей пирамиды отбрасывается.
+    """
+    frustum = np.array([[1, 0, 0, 1], [-1, 0, 0, 1], [0, 1, 0, 1], [0, -1, 0, 1], [0, 0, 1, 1], [0, 0, -1, 1]],
+                       dtype=np.float64)
+    if (triangle.astype(np.float64) @ frustum.T < 0).all(axis=0).any():
+        return np.zeros((0, 4))
+    planes = frustum.copy()
+    planes[:4, 3] = guard_band
+    polygon = [vertex for vertex in triangle.astype(np.float64)]
+    for plane in planes:
+        clipped = []
+        for i, current in enumerate(polygon):
+            previous = polygon[i - 1]
+            d_previous, d_current = plane @ previous, plane @ current
+            if (d_previous >= 0) != (d_current >= 0):
+                clipped.append(previous + (current - previous) * (d_previous / (d_previous - d_current)))
+            if d_current >= 0:
+                clipped.append(current)
+        polygon = clipped
+        if len(polygon) < 3:
+            return np.zeros((0, 4))
+    return np.array(polygon)
+
+
+def random_triangles(rng, count: int, spread: float) -> np.ndarray:
+    """Треугольники в пространстве отсечения: w в [0.5, 2], x, y, z до spread * w."""
+    w = rng.uniform(0.5, 2.0, (count, 3, 1))
+    return np.concatenate((rng.uniform(-spread, spread, (count, 3, 3)) * w, w), axis=2).astype(np.float32)
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestFrustumClipping(unittest.TestCase):
+    def assert_matches_reference(self, triangle: np.ndarray, guard_band: float = 1.0):
+        polygon, is_original = cpp_renderer_core.clip_triangle_cpp(triangle, guard_band)
+        expected = clip_reference(triangle, guard_band)
+        self.assertEqual(polygon.shape, expected.shape, triangle)
+        self.assertEqual(is_original.shape, (len(polygon),))
+        np.testing.assert_allclose(polygon, expected, rtol=1e-5, atol=1e-5, err_msg=str(triangle))
+        for vertex, original in zip(polygon, is_original):
+            self.assertEqual(original, any(np.array_equal(vertex, corner) for corner in triangle))
+        return polygon, is_original
+
+    def test_trivial_accept_keeps_triangle(self):
+        triangle = np.array([[-0.5, -0.5, 0.0, 1.0], [0.9, -0.2, 0.5, 1.0], [0.0, 1.6, 1.0, 2.0]], dtype=np.float32)
+        polygon, is_original = cpp_renderer_core.clip_triangle_cpp(triangle)
+        np.testing.assert_array_equal(polygon, triangle)
+        self.assertTrue(is_original.all())
+
+    def test_trivial_reject(self):
+        for outside in ([[2, 0, 0, 1], [3, 1, 0, 1], [2.5, -1, 0, 1]], # Вне правой плоскости
+                        [[0, 0, -2, 1], [0.5, 0, -3, 1], [0, 0.5, -1.5, 1]]): # Перед ближней
+            polygon, is_original = cpp_renderer_core.clip_triangle_cpp(np.array(outside, dtype=np.float32))
+            self.assertEqual(polygon.shape, (0, 4))
+            self.assertEqual(is_original.shape, (0,))
+
+    def test_outside_across_corner_is_rejected_by_clipping(self):
+        # Вершины вне разных плоскостей (тривиально не отбрасывается), но треугольник проходит мимо угла экрана.
+        triangle = np.array([[1.6, 0.6, 0, 1], [3.0, 3.0, 0, 1], [0.6, 1.6, 0, 1]], dtype=np.float32)
+        polygon, _ = cpp_renderer_core.clip_triangle_cpp(triangle)
+        self.assertEqual(polygon.shape, (0, 4))
+
+    def test_single_plane(self):
+        triangle = np.array([[0.0, 0.0, 0.0, 1.0], [2.0, 0.0, 0.0, 1.0], [0.0, 0.5, 0.0, 1.0]], dtype=np.float32)
+        polygon, is_original = self.assert_matches_reference(triangle)
+        self.assertEqual(is_original.tolist(), [True, False, False, True])
+        np.testing.assert_allclose(polygon[~is_original, 0], 1.0) # Новые вершины на правой плоскости x = w
+        near = np.array([[0.0, 0.0, -3.0, 1.0], [0.5, 0.0, 0.5, 1.0], [0.0, 0.5, 0.5, 1.0]], dtype=np.float32)
+        polygon, is_original = self.assert_matches_reference(near)
+        np.testing.assert_allclose(polygon[~is_original, 2], -polygon[~is_original, 3], atol=1e-6) # z = -w
+
+    def test_multiple_planes(self):
+        # Большой треугольник вокруг экрана режется всеми боковыми плоскостями.
+        triangle = np.array([[-5.0, -5.0, 0.0, 1.0], [5.0, -5.0, 0.0, 1.0], [0.0, 8.0, 0.0, 1.0]], dtype=np.float32)
+        polygon, is_original = self.assert_matches_reference(triangle)
+        self.assertFalse(is_original.any())
+        self.assertLessEqual(len(polygon), 9)
+
+    def test_random_triangles_match_reference(self):
+        rng = np.random.default_rng(21)
+        for triangle in random_triangles(rng, 500, 2.0):
+            self.assert_matches_reference(triangle)
+
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestGuardBandClipping(unittest.TestCase):
+    GUARD_BAND = 4.0
+
+    def clip(self, triangle) -> tuple:
+        return cpp_renderer_core.clip_triangle_cpp(np.array(triangle, dtype=np.float32), self.GUARD_BAND)
+
+    def test_triangle_in_band_is_kept(self):
+        # Пересекает правый и верхний края экрана, но целиком внутри полосы: рисуется без отсечения.
+        triangle = np.array([[0.5, 0.5, 0.0, 1.0], [3.5, 0.0, 0.2, 1.0], [0.0, 7.0, 0.4, 2.0]], dtype=np.float32)
+        polygon, is_original = self.clip(triangle)
+        np.testing.assert_array_equal(polygon, triangle)
+        self.assertTrue(is_original.all())
+
+    def test_rejection_uses_real_frustum(self):
+        # Справа от экрана, но внутри полосы: отбрасывается, а не отдается растеризатору.
+        polygon, _ = self.clip([[1.5, 0.0, 0.0, 1.0], [3.0, 0.5, 0.0, 1.0], [2.0, -0.5, 0.0, 1.0]])
+        self.assertEqual(polygon.shape, (0, 4))
+
+    def test_only_near_and_far_create_vertices_in_band(self):
+        rng = np.random.default_rng(22)
+        for triangle in random_triangles(rng, 500, 2.0): # |x|, |y| <= 2w: вершины внутри полосы
+            polygon, is_original = cpp_renderer_core.clip_triangle_cpp(triangle, self.GUARD_BAND)
+            np.testing.assert_allclose(polygon, clip_reference(triangle, self.GUARD_BAND), rtol=1e-5, atol=1e-5)
+            new_vertices = polygon[~is_original]
+            on_near_or_far = np.isclose(np.abs(new_vertices[:, 2]), new_vertices[:, 3], rtol=1e-5, atol=1e-5)
+            self.assertTrue(on_near_or_far.all(), triangle)
+
+    def test_beyond_band_is_clipped_at_band(self):
+        triangle = np.array([[0.0, 0.0, 0.0, 1.0], [10.0, 0.0, 0.0, 1.0], [0.0, 0.5, 0.0, 1.0]], dtype=np.float32)
+        polygon, is_original = self.clip(triangle)
+        np.testing.assert_allclose(polygon, clip_reference(triangle, self.GUARD_BAND), rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(polygon[~is_original, 0], self.GUARD_BAND) # x = guard_band * w
+        rng = np.random.default_rng(23)
+        for triangle in random_triangles(rng, 500, 8.0):
+            polygon, _ = cpp_renderer_core.clip_triangle_cpp(triangle, self.GUARD_BAND)
+            np.testing.assert_allclose(polygon, clip_reference(triangle, self.GUARD_BAND), rtol=1e-5, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
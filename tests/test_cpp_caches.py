@@ -0,0 +1,139 @@
+import os
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+from settings import L1_CACHE_BYTES, L2_CACHE_BYTES
+
+STRIDE = 9
+TRANSFORM = np.array([0, 0, 0, 0, 0, 0, 1, 1, 1], dtype=np.float32)
+
+
+def quad_grid_vertices(size: int = 4) -> np.ndarray:
+    """Сетка size x size квадратов из пар треугольников в плоскости z = 0 (без индексов), цвет серый."""
+    vertices = []
+    for row in range(size):
+        for col in range(size):
+            x0, y0 = col / size - 0.5, row / size - 0.5
+            x1, y1 = x0 + 1 / size, y0 + 1 / size
+            for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y0), (x1, y1), (x0, y1)):
+                vertices.append([x, y, 0.0] + [0.5] * (STRIDE - 3))
+    return np.array(vertices, dtype=np.float32).ravel()
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestCppCaches(unittest.TestCase):
+    def tearDown(self):
+        cpp_renderer_core.set_cache_budgets_cpp(L1_CACHE_BYTES, L2_CACHE_BYTES)
+
+    def test_budgets_are_reported(self):
+        cpp_renderer_core.set_cache_budgets_cpp(1 << 20, 3 << 20)
+        stats = cpp_renderer_core.get_cache_stats_cpp()
+        self.assertEqual(stats['l1']['budget_bytes'], 1 << 20)
+        self.assertEqual(stats['l2']['budget_bytes'], 3 << 20)
+        for level in ('l1', 'l2'):
+            self.assertEqual(set(stats[level]), {'entries', 'bytes', 'budget_bytes', 'hits', 'misses', 'insertions',
+                                                 'evictions', 'saved_ms', 'saved_ms_per_hit'})
+            self.assertLessEqual(stats[level]['bytes'], stats[level]['budget_bytes'])
+
+    def test_zero_budget_empties_cache(self):
+        cpp_renderer_core.set_cache_budgets_cpp(0, 0)
+        stats = cpp_renderer_core.get_cache_stats_cpp()
+        for level in ('l1', 'l2'):
+            self.assertEqual(stats[level]['entries'], 0)
+            self.assertEqual(stats[level]['bytes'], 0)
+
+    def test_reset_zeroes_counters(self):
+        cpp_renderer_core.set_cache_budgets_cpp(0, 0) # Вытеснение всех записей увеличивает evictions
+        cpp_renderer_core.reset_cache_stats_cpp()
+        for stats in cpp_renderer_core.get_cache_stats_cpp().values():
+            for counter in ('hits', 'misses', 'insertions', 'evictions', 'saved_ms', 'saved_ms_per_hit'):
+                self.assertEqual(stats[counter], 0, counter)
+
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestCppCacheEntries(unittest.TestCase):
+    """Кэши с настоящими записями: объект на экране отправляется через submit_batch_cpp под разными id."""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        cpp_renderer_core.initialize_cpp_renderer(64, 64, False, "test_cpp_caches", L1_CACHE_BYTES, L2_CACHE_BYTES,
+                                                  np.zeros(3, dtype=np.uint8))
+        cls.handle = cpp_renderer_core.register_mesh_cpp(quad_grid_vertices(), None, STRIDE, False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cpp_renderer_core.unregister_mesh_cpp(cls.handle)
+        cpp_renderer_core.cleanup_cpp_renderer()
+
+    def setUp(self):
+        cpp_renderer_core.set_cache_budgets_cpp(0, 0) # Пустые кэши
+        cpp_renderer_core.set_cache_budgets_cpp(L1_CACHE_BYTES, L2_CACHE_BYTES)
+        cpp_renderer_core.reset_cache_stats_cpp()
+        view = glm.lookAt(glm.vec3(0, 0, 3), glm.vec3(0), glm.vec3(0, 1, 0))
+        projection = glm.perspective(glm.radians(60), 1.0, 0.1, 100.0)
+        cpp_renderer_core.set_frame_parameters_cpp(
+            np.array(view, dtype=np.float32).flatten(order='F'),
+            np.array(projection, dtype=np.float32).flatten(order='F'),
+            np.array([0, 0, 3], dtype=np.float32), True, False, True, False, np.array([255, 0, 255], dtype=np.uint8),
+            True, 0.0)
+
+    def tearDown(self):
+        cpp_renderer_core.set_cache_budgets_cpp(L1_CACHE_BYTES, L2_CACHE_BYTES)
+
+    def submit(self, object_id: int) -> dict:
+        """Отправляет объект (по одному: порядок записей в LRU определен) и возвращает статистику кэшей."""
+        cpp_renderer_core.submit_batch_cpp(np.array([object_id], dtype=np.uint64), TRANSFORM[None, :],
+                                           np.array([self.handle], dtype=np.int64))
+        return cpp_renderer_core.get_cache_stats_cpp()
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        stats = self.submit(1)
+        entry_bytes = {level: stats[level]['bytes'] for level in ('l1', 'l2')}
+        self.assertGreater(entry_bytes['l1'], 0)
+        self.assertGreater(entry_bytes['l2'], 0)
+        budgets = {level: int(entry_bytes[level] * 3.5) for level in ('l1', 'l2')} # Помещается 3 записи
+        cpp_renderer_core.set_cache_budgets_cpp(budgets['l1'], budgets['l2'])
+        self.submit(2)
+        self.submit(3)
+        stats = self.submit(1) # Попадание в L1: в L1 последним использован 1, в L2 (не спрашивали) - 3
+        self.assertEqual(stats['l1']['hits'], 1)
+        stats = self.submit(4) # Вытесняет 2 из L1 и 1 из L2
+        for level in ('l1', 'l2'):
+            self.assertEqual(stats[level]['entries'], 3, level)
+            self.assertEqual(stats[level]['evictions'], 1, level)
+            self.assertLessEqual(stats[level]['bytes'], budgets[level], level)
+        self.assertEqual(self.submit(1)['l1']['hits'], 2)
+        self.assertEqual(self.submit(3)['l1']['hits'], 3)
+        stats = self.submit(2) # Промах L1, но 2 остался в L2
+        self.assertEqual(stats['l1']['misses'], 5)
+        self.assertEqual(stats['l2']['hits'], 1)
+        cpp_renderer_core.set_cache_budgets_cpp(0, budgets['l2']) # Без L1 следующий запрос доходит до L2
+        stats = self.submit(1)
+        self.assertEqual(stats['l2']['hits'], 1) # 1 вытеснен из L2: промах
+        self.assertEqual(stats['l2']['misses'], 5)
+        for level in ('l1', 'l2'):
+            self.assertLessEqual(stats[level]['bytes'], stats[level]['budget_bytes'], level)
+
+
+    def test_hit_statistics(self):
+        self.submit(1)
+        stats = self.submit(1) # Те же объект и параметры кадра: попадание в L1
+        l1 = stats['l1']
+        self.assertEqual(l1['hits'], 1)
+        self.assertEqual(l1['misses'], 1)
+        self.assertGreater(l1['saved_ms'], 0.0)
+        self.assertAlmostEqual(l1['saved_ms_per_hit'], l1['saved_ms'] / l1['hits'])
+        self.assertEqual((stats['l2']['hits'], stats['l2']['misses']), (0, 1)) # L2 спрашивали только при промахе L1
+
+
+if __name__ == '__main__':
+    unittest.main()
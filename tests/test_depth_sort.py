@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestDepthSort(unittest.TestCase):
+    def test_matches_stable_argsort(self):
+        rng = np.random.default_rng(3)
+        for size in (0, 1, 1000, 100_000):
+            depths = rng.normal(0.0, 100.0, size).astype(np.float32)
+            depths[::7] = np.round(depths[::7]) # Равные глубины остаются в порядке отправки
+            order = cpp_renderer_core.depth_sort_order_cpp(depths)
+            np.testing.assert_array_equal(order, np.argsort(depths, kind='stable'), err_msg=str(size))
+
+    def test_special_values(self):
+        depths = np.array([0.0, -0.0, np.inf, -np.inf, 1e-30, -1e-30, 5.0, -5.0], dtype=np.float32)
+        order = cpp_renderer_core.depth_sort_order_cpp(depths)
+        np.testing.assert_array_equal(depths[order], np.sort(depths))
+        self.assertEqual(cpp_renderer_core.depth_sort_order_cpp(np.full(5, 2.0, dtype=np.float32)).tolist(),
+                         [0, 1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
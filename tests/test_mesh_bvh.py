@@ -0,0 +1,129 @@
+import os
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+from meshes.mesh_bvh import build_mesh_bvh
+from tests.test_occlusion import indexed_grid
+
+
+def _grid_soup(size: int) -> np.ndarray:
+    """size x size квадратов по два треугольника в плоскости XZ, формат [x,y,z, r,g,b, nx,ny,nz]."""
+    triangles = []
+    for i in range(size):
+        for j in range(size):
+            a, b, c, d = (i, 0, j), (i + 1, 0, j), (i + 1, 0, j + 1), (i, 0, j + 1)
+            triangles += [a, b, c, a, c, d]
+    positions = np.array(triangles, dtype=np.float32)
+    vertices = np.zeros((len(positions), 9), dtype=np.float32)
+    vertices[:, 0:3] = positions
+    vertices[:, 7] = 1.0
+    return vertices.ravel()
+
+
+class TestMeshBvh(unittest.TestCase):
+    def setUp(self):
+        self.vertices = _grid_soup(8)
+        self.num_triangles = self.vertices.size // 27
+        self.bounds, self.nodes, self.triangles = build_mesh_bvh(self.vertices, None, stride=9, leaf_size=4)
+
+    def test_triangles_are_a_permutation(self):
+        self.assertEqual(self.triangles.dtype, np.uint32)
+        np.testing.assert_array_equal(np.sort(self.triangles), np.arange(self.num_triangles))
+
+    def test_nodes_cover_their_triangles(self):
+        corners = self.vertices.reshape(-1, 3, 9)[:, :, :3]
+        self.assertEqual(tuple(self.nodes[0][:2]), (0, self.num_triangles))
+        self.assertEqual(self.nodes[0][2], len(self.nodes))
+        for node, (first, count, skip) in enumerate(self.nodes):
+            self.assertGreater(skip, node)
+            tris = corners[self.triangles[first:first + count]]
+            np.testing.assert_array_less(self.bounds[node, :3] - 1e-6, tris.min(axis=(0, 1)) + 1e-6)
+            np.testing.assert_array_less(tris.max(axis=(0, 1)) - 1e-6, self.bounds[node, 3:] + 1e-6)
+            if skip == node + 1:
+                self.assertLessEqual(count, 4)
+            else:  # Дети делят диапазон родителя пополам
+                left_first, left_count, left_skip = self.nodes[node + 1]
+                right_first, right_count, _ = self.nodes[left_skip]
+                self.assertEqual((left_first, left_first + left_count + right_count), (first, first + count))
+                self.assertEqual(right_first, first + left_count)
+
+    def test_indexed_mesh_gives_same_tree(self):
+        positions = self.vertices.reshape(-1, 9)
+        unique, indices = np.unique(positions, axis=0, return_inverse=True)
+        bounds, nodes, triangles = build_mesh_bvh(unique.ravel(), indices.astype(np.uint32), stride=9, leaf_size=4)
+        np.testing.assert_array_equal(bounds, self.bounds)
+        np.testing.assert_array_equal(nodes, self.nodes)
+        np.testing.assert_array_equal(triangles, self.triangles)
+
+    def test_empty_mesh(self):
+        bounds, nodes, triangles = build_mesh_bvh(np.array([], dtype=np.float32), None, stride=9)
+        self.assertEqual((bounds.shape, nodes.shape, triangles.shape), ((0, 6), (0, 3), (0,)))
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestBvhCullingFrames(unittest.TestCase):
+    """Один меш с BVH и без: кадры программного растеризатора совпадают, с BVH до него доходит меньше треугольников."""
+    WIDTH, HEIGHT = 160, 90
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        cpp_renderer_core.initialize_cpp_renderer(cls.WIDTH, cls.HEIGHT, False, "test_mesh_bvh", 1 << 24, 1 << 24,
+                                                  np.zeros(3, dtype=np.uint8))
+        vertices, indices = indexed_grid(16, 4.0, 0.0, (0.6, 0.4, 0.2))
+        positions = vertices.reshape(-1, 9)
+        positions[:, 2] = 0.3 * np.sin(positions[:, 0] * 2.0) * np.cos(positions[:, 1] * 3.0) # Волны: освещение разное
+        cls.plain = cpp_renderer_core.register_mesh_cpp(vertices, indices, 9, False)
+        cls.culled = cpp_renderer_core.register_mesh_cpp(vertices, indices, 9, False,
+                                                         *build_mesh_bvh(vertices, indices, stride=9, leaf_size=8))
+        cls.object_id = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        cpp_renderer_core.set_software_rasterizer_cpp(False)
+        cpp_renderer_core.unregister_mesh_cpp(cls.plain)
+        cpp_renderer_core.unregister_mesh_cpp(cls.culled)
+        cpp_renderer_core.cleanup_cpp_renderer()
+
+    def render(self, handle: int, camera, target, clipping: bool) -> tuple:
+        """Кадр и статистика растеризатора; новый object_id каждый раз, чтобы кэши L1/L2 не подменили результат."""
+        type(self).object_id += 1
+        cpp_renderer_core.set_software_rasterizer_cpp(True, 32, 1)
+        view = glm.lookAt(glm.vec3(*camera), glm.vec3(*target), glm.vec3(0, 1, 0))
+        projection = glm.perspective(glm.radians(60), self.WIDTH / self.HEIGHT, 0.1, 100.0)
+        cpp_renderer_core.set_frame_parameters_cpp(
+            np.array(view, dtype=np.float32).flatten(order='F'),
+            np.array(projection, dtype=np.float32).flatten(order='F'),
+            np.array(camera, dtype=np.float32), True, False, clipping, False, np.array([255, 0, 255], dtype=np.uint8),
+            False, 0.0)
+        cpp_renderer_core.submit_batch_cpp(np.array([self.object_id], dtype=np.uint64),
+                                           np.array([[0, 0, 0, 0, 0, 0, 1, 1, 1]], dtype=np.float32),
+                                           np.array([handle], dtype=np.int64))
+        cpp_renderer_core.render_accumulated_triangles_cpp()
+        return cpp_renderer_core.get_software_framebuffer_cpp(), cpp_renderer_core.get_software_raster_stats_cpp()
+
+    def test_same_frame_with_bvh(self):
+        views = {'внутри': ((0, 0, 12), (0, 0, 0)), 'частично': ((2.5, 1, 5), (3, 1, 0)),
+                 'снаружи': ((0, 0, 6), (-10, 0, 6)), 'частично близко': ((0, 0, 3), (0, 0, 0))}
+        for name, (camera, target) in views.items():
+            for clipping in (True, False):
+                frame, stats = self.render(self.plain, camera, target, clipping)
+                frame_culled, stats_culled = self.render(self.culled, camera, target, clipping)
+                np.testing.assert_array_equal(frame_culled, frame, err_msg=f"{name}, clipping {clipping}")
+                self.assertLessEqual(stats_culled['triangles'], stats['triangles'], name)
+                if name == 'внутри':
+                    self.assertEqual(stats_culled['submitted'], stats['submitted'])
+                    self.assertGreater(len(np.unique(frame)), 3)
+                elif not clipping: # С отсечением по пирамиде Stage 2 сам отбрасывает треугольники вне экрана
+                    self.assertLess(stats_culled['submitted'], stats['submitted'], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from meshes.mesh_cache import (load_mesh_vertex_data, load_indexed_mesh_data, load_mesh_bvh, load_mesh_pvs,
+                               load_mesh_lods, mesh_bvh_options, clear_mesh_cache)
+from meshes.obj_loader import load_obj_file, load_obj_file_indexed
+
+CUBE_OBJ = "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nf 1 2 3 4\n"
+
+
+class TestMeshCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.obj_path = os.path.join(self.tmp_dir, 'quad.obj')
+        with open(self.obj_path, 'w') as f:
+            f.write(CUBE_OBJ)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _load(self, color=(0.8, 0.8, 0.8), use_vertex_normals=True):
+        return load_mesh_vertex_data(self.obj_path, color, 9, use_vertex_normals,
+                                     cache_dir=self.cache_dir, enabled=True)
+
+    def test_miss_writes_entry_and_hit_is_readonly_memmap(self):
+        first = self._load()
+        self.assertNotIsInstance(first, np.memmap)
+        self.assertEqual(len([n for n in os.listdir(self.cache_dir) if n.endswith('.npy')]), 1)
+
+        second = self._load()
+        self.assertIsInstance(second, np.memmap)
+        self.assertFalse(second.flags.writeable)
+        np.testing.assert_array_equal(second, load_obj_file(self.obj_path, default_color=(0.8, 0.8, 0.8)))
+
+    def test_options_are_part_of_the_key(self):
+        self._load(color=(1.0, 0.0, 0.0))
+        other = self._load(color=(0.0, 1.0, 0.0))
+        self.assertNotIsInstance(other, np.memmap)
+        self.assertEqual(len([n for n in os.listdir(self.cache_dir) if n.endswith('.npy')]), 2)
+        np.testing.assert_allclose(other.reshape(-1, 9)[:, 3:6], np.tile((0.0, 1.0, 0.0), (6, 1)))
+
+    def test_source_change_invalidates_entry(self):
+        self._load()
+        with open(self.obj_path, 'a') as f:
+            f.write("f 1 3 4\n")
+        reloaded = self._load()
+        self.assertNotIsInstance(reloaded, np.memmap)
+        self.assertEqual(reloaded.size, 3 * 3 * 9)
+        self.assertIsInstance(self._load(), np.memmap)
+
+    def test_clear_mesh_cache(self):
+        self._load()
+        self.assertEqual(clear_mesh_cache(self.cache_dir), 2)
+        self.assertNotIsInstance(self._load(), np.memmap)
+
+    def test_indexed_entry_roundtrip(self):
+        load = lambda: load_indexed_mesh_data(self.obj_path, (0.8, 0.8, 0.8), 9, True,
+                                              cache_dir=self.cache_dir, enabled=True)
+        vertices, indices = load()
+        self.assertEqual(indices.dtype, np.uint32)
+        cached_vertices, cached_indices = load()
+        self.assertIsInstance(cached_vertices, np.memmap)
+        self.assertIsInstance(cached_indices, np.memmap)
+        np.testing.assert_array_equal(cached_vertices, vertices)
+        np.testing.assert_array_equal(cached_indices, indices)
+        # Индексированная запись не подменяет обычную.
+        self.assertNotIsInstance(self._load(), np.memmap)
+
+    def test_bvh_entry_keeps_array_shapes(self):
+        vertices, indices = load_obj_file_indexed(self.obj_path)
+        load = lambda: load_mesh_bvh(self.obj_path, vertices, indices, (0.8, 0.8, 0.8), 9, True, leaf_size=1,
+                                     cache_dir=self.cache_dir, enabled=True)
+        built = load()
+        cached = load()
+        self.assertIsInstance(cached[0], np.memmap)
+        for built_array, cached_array in zip(built, cached):
+            self.assertEqual(cached_array.shape, built_array.shape)
+            self.assertEqual(cached_array.dtype, built_array.dtype)
+            np.testing.assert_array_equal(cached_array, built_array)
+
+    def test_bvh_entry_with_clusters(self):
+        vertices, indices = load_obj_file_indexed(self.obj_path)
+        load = lambda cluster_size: load_mesh_bvh(self.obj_path, vertices, indices, (0.8, 0.8, 0.8), 9, True,
+                                                  leaf_size=1, cluster_size=cluster_size,
+                                                  cache_dir=self.cache_dir, enabled=True)
+        self.assertEqual(len(load(None)), 3)
+        built = load(2)
+        cached = load(2)
+        self.assertEqual(len(cached), 5)
+        self.assertIsInstance(cached[3], np.memmap)
+        for built_array, cached_array in zip(built, cached):
+            np.testing.assert_array_equal(cached_array, built_array)
+
+    def test_pvs_entry_is_built_only_on_request(self):
+        options = mesh_bvh_options((0.8, 0.8, 0.8), 9, True, True, leaf_size=1, cluster_size=2)
+        load = lambda cell_size, build=None: load_mesh_pvs(self.obj_path, options, cell_size, build=build,
+                                                           cache_dir=self.cache_dir, enabled=True)
+        pvs = (np.array([0, 0, 0, 1], dtype=np.float32), np.full((1, 1, 1, 1), 3, dtype=np.uint8))
+        self.assertIsNone(load(1.0))
+        load(1.0, build=lambda: pvs)
+        cached = load(1.0)
+        self.assertEqual(len(cached), 2)
+        for built_array, cached_array in zip(pvs, cached):
+            np.testing.assert_array_equal(cached_array, built_array)
+        self.assertIsNone(load(2.0)) # Размер ячейки - часть ключа
+
+    def test_lod_entry_roundtrip(self):
+        with open(self.obj_path, 'w') as f: # Сетка 8x8 квадратов - есть что упрощать
+            f.write(''.join(f"v {x} {y} 0\n" for y in range(9) for x in range(9)))
+            f.write(''.join(f"f {y * 9 + x + 1} {y * 9 + x + 2} {y * 9 + x + 11} {y * 9 + x + 10}\n"
+                            for y in range(8) for x in range(8)))
+        vertices, indices = load_obj_file_indexed(self.obj_path)
+        for index_data in (indices, None):
+            vertex_data = vertices if index_data is not None else vertices.reshape(-1, 9)[indices].ravel()
+            load = lambda: load_mesh_lods(self.obj_path, vertex_data, index_data, (0.8, 0.8, 0.8), 9, True,
+                                          levels=2, ratio=0.25, cache_dir=self.cache_dir, enabled=True)
+            built = load()
+            cached = load()
+            self.assertEqual(len(cached), len(built))
+            self.assertGreater(len(built), 0)
+            for (built_vertices, built_indices), (cached_vertices, cached_indices) in zip(built, cached):
+                self.assertIsInstance(cached_vertices, np.memmap)
+                np.testing.assert_array_equal(cached_vertices, built_vertices)
+                if index_data is None:
+                    self.assertIsNone(cached_indices)
+                else:
+                    np.testing.assert_array_equal(cached_indices, built_indices)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+from meshes.mesh_bvh import build_mesh_bvh
+from meshes.mesh_clusters import build_mesh_clusters
+
+
+def _height_field_soup(size: int, amplitude: float) -> np.ndarray:
+    """size x size квадратов по два треугольника, y = amplitude * sin(x) * cos(z), формат [x,y,z, r,g,b, nx,ny,nz]."""
+    height = lambda x, z: amplitude * np.sin(x * 0.7) * np.cos(z * 0.5)
+    triangles = []
+    for i in range(size):
+        for j in range(size):
+            a, b, c, d = [(x, height(x, z), z) for x, z in ((i, j), (i + 1, j), (i + 1, j + 1), (i, j + 1))]
+            triangles += [a, c, b, a, d, c] # Обход против часовой стрелки при взгляде сверху (+Y)
+    positions = np.array(triangles, dtype=np.float32)
+    vertices = np.zeros((len(positions), 9), dtype=np.float32)
+    vertices[:, 0:3] = positions
+    vertices[:, 7] = 1.0
+    return vertices.ravel()
+
+
+def _indexed_sphere(rings: int, segments: int) -> tuple:
+    """Замкнутая UV-сфера радиуса 1 с индексами, обход против часовой стрелки снаружи; цвет меняется с высотой."""
+    theta = np.linspace(0.0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    ring_points = np.stack([np.outer(np.sin(theta), np.cos(phi)), np.repeat(np.cos(theta)[:, None], segments, 1),
+                            -np.outer(np.sin(theta), np.sin(phi))], axis=2).reshape(-1, 3)
+    positions = np.vstack(([0.0, 1.0, 0.0], ring_points, [0.0, -1.0, 0.0]))
+    vertices = np.zeros((len(positions), 9), dtype=np.float32)
+    vertices[:, 0:3] = positions
+    vertices[:, 3:6] = np.stack([0.5 + 0.4 * positions[:, 1], 0.4 + 0.3 * positions[:, 0], 0.3 + 0.2 * positions[:, 2]], 1)
+    vertices[:, 6:9] = positions
+    ring = lambda r, k: 1 + r * segments + k % segments
+    south = len(positions) - 1
+    indices = []
+    for k in range(segments):
+        indices += [0, ring(0, k), ring(0, k + 1), south, ring(rings - 2, k + 1), ring(rings - 2, k)]
+        for r in range(rings - 2):
+            a, b, c, d = ring(r, k), ring(r + 1, k), ring(r + 1, k + 1), ring(r, k + 1)
+            indices += [a, b, c, a, c, d]
+    return vertices.ravel(), np.array(indices, dtype=np.uint32)
+
+
+class TestMeshClusters(unittest.TestCase):
+    def _build(self, vertices, max_triangles, use_vertex_normals=False):
+        bvh = build_mesh_bvh(vertices, None, stride=9, leaf_size=max_triangles // 2)
+        ranges, cones = build_mesh_clusters(vertices, None, bvh, stride=9, use_vertex_normals=use_vertex_normals,
+                                            max_triangles=max_triangles)
+        return bvh, ranges, cones
+
+    def test_clusters_partition_bvh_triangles(self):
+        vertices = _height_field_soup(16, 1.0)
+        _, ranges, cones = self._build(vertices, 32)
+        self.assertEqual((ranges.dtype, cones.dtype, cones.shape[1]), (np.int32, np.float32, 8))
+        self.assertEqual(ranges[0, 0], 0)
+        np.testing.assert_array_equal(ranges[1:, 0], np.cumsum(ranges[:-1, 1]))
+        self.assertEqual(ranges[:, 1].sum(), vertices.size // 27)
+        self.assertTrue(np.all((ranges[:, 1] >= 16) & (ranges[:, 1] <= 32)))
+
+    def test_sphere_and_cone_bound_cluster_triangles(self):
+        vertices = _height_field_soup(16, 1.0)
+        (_, _, triangles), ranges, cones = self._build(vertices, 32)
+        corners = vertices.reshape(-1, 3, 9)[:, :, :3].astype(np.float64)
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+        for (first, count), cone in zip(ranges, cones):
+            tris = triangles[first:first + count]
+            distances = np.linalg.norm(corners[tris] - cone[:3], axis=2)
+            self.assertLessEqual(distances.max(), cone[3])
+            self.assertAlmostEqual(float(np.linalg.norm(cone[4:7])), 1.0, places=5)
+            if cone[7] > 0.0:
+                self.assertGreaterEqual((normals[tris] @ cone[4:7]).min(), cone[7])
+        self.assertTrue(np.any(cones[:, 7] > 0.0))
+
+    def test_flat_cluster_has_narrow_cone(self):
+        _, _, cones = self._build(_height_field_soup(4, 0.0), 32, use_vertex_normals=True)
+        np.testing.assert_allclose(cones[:, 4:7], np.tile([0.0, 1.0, 0.0], (len(cones), 1)), atol=1e-6)
+        self.assertTrue(np.all(cones[:, 7] > 0.99))
+
+    def test_degenerate_normals_disable_cone(self):
+        vertices = _height_field_soup(4, 0.0).reshape(-1, 9)
+        vertices[0, 6:9] = 0.0 # Нулевая нормаль вершины: в C++ нормаль треугольника не определена
+        _, ranges, cones = self._build(vertices.ravel(), 64, use_vertex_normals=True)
+        self.assertEqual(len(ranges), 1)
+        self.assertLessEqual(cones[0, 7], 0.0)
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestClusterCullingFrames(unittest.TestCase):
+    """Замкнутый меш с кластерами и без (BVH у обоих), отсечение задних граней включено: кадры совпадают, а конусы
+    задних кластеров снимают треугольники со Stage 2."""
+    WIDTH, HEIGHT = 160, 90
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        cpp_renderer_core.initialize_cpp_renderer(cls.WIDTH, cls.HEIGHT, False, "test_mesh_clusters", 1 << 24, 1 << 24,
+                                                  np.zeros(3, dtype=np.uint8))
+        vertices, indices = _indexed_sphere(12, 24)
+        bvh = build_mesh_bvh(vertices, indices, stride=9, leaf_size=8)
+        clusters = build_mesh_clusters(vertices, indices, bvh, stride=9, use_vertex_normals=False, max_triangles=16)
+        cls.plain = cpp_renderer_core.register_mesh_cpp(vertices, indices, 9, False, *bvh)
+        cls.clustered = cpp_renderer_core.register_mesh_cpp(vertices, indices, 9, False, *bvh, *clusters)
+        cls.object_id = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        cpp_renderer_core.set_software_rasterizer_cpp(False)
+        cpp_renderer_core.unregister_mesh_cpp(cls.plain)
+        cpp_renderer_core.unregister_mesh_cpp(cls.clustered)
+        cpp_renderer_core.cleanup_cpp_renderer()
+
+    def render(self, handle: int, transforms: np.ndarray) -> tuple:
+        """Кадр и счетчики отсечения; новые object_id каждый раз, чтобы кэши L1/L2 не подменили результат."""
+        object_ids = np.arange(self.object_id + 1, self.object_id + len(transforms) + 1, dtype=np.uint64)
+        type(self).object_id += len(transforms)
+        cpp_renderer_core.set_software_rasterizer_cpp(True, 32, 1)
+        view = glm.lookAt(glm.vec3(0, 1, 8), glm.vec3(0, 0, 0), glm.vec3(0, 1, 0))
+        projection = glm.perspective(glm.radians(60), self.WIDTH / self.HEIGHT, 0.1, 100.0)
+        cpp_renderer_core.set_frame_parameters_cpp(
+            np.array(view, dtype=np.float32).flatten(order='F'),
+            np.array(projection, dtype=np.float32).flatten(order='F'),
+            np.array([0, 1, 8], dtype=np.float32), True, True, True, False, np.array([255, 0, 255], dtype=np.uint8),
+            False, 0.0)
+        cpp_renderer_core.submit_batch_cpp(object_ids, transforms, np.full(len(transforms), handle, dtype=np.int64))
+        cpp_renderer_core.render_accumulated_triangles_cpp()
+        return cpp_renderer_core.get_software_framebuffer_cpp(), cpp_renderer_core.get_culling_stats_cpp()
+
+    def test_same_frame_with_clusters(self):
+        uniform = [[-3.0, 0.5, 0.0, 10, 30, 0, 1.2, 1.2, 1.2], [0.0, -1.0, -2.0, 0, -60, 45, 1.5, 1.5, 1.5]]
+        non_uniform = [[3.0, 0.5, 0.0, 20, 10, 0, 1.8, 0.6, 1.0]] # Конусы не проверяются: нормали искажены
+        for transforms, cones_tested in ((uniform, True), (non_uniform, False), (uniform + non_uniform, True)):
+            transforms = np.array(transforms, dtype=np.float32)
+            frame, stats = self.render(self.plain, transforms)
+            frame_clustered, stats_clustered = self.render(self.clustered, transforms)
+            np.testing.assert_array_equal(frame_clustered, frame, err_msg=str(transforms))
+            self.assertGreater(len(np.unique(frame)), 10)
+            self.assertEqual(stats['culled_clusters'], 0)
+            if cones_tested:
+                self.assertGreater(stats_clustered['culled_clusters'], 0)
+                self.assertLess(stats_clustered['stage2_triangles'], stats['stage2_triangles'])
+            else:
+                self.assertEqual(stats_clustered['stage2_triangles'], stats['stage2_triangles'])
+
+if __name__ == '__main__':
+    unittest.main()
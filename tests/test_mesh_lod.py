@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+
+from meshes.mesh_lod import simplify_mesh, build_mesh_lods, projected_sizes, select_lod_levels
+
+
+def _sphere_mesh(rings: int = 40, segments: int = 40, radius: float = 10.0) -> tuple:
+    """Индексированная UV-сфера (формат load_obj_file_indexed) с внешними нормалями и обходом против часовой."""
+    theta = np.linspace(0.0, np.pi, rings)
+    phi = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing='ij')
+    directions = np.stack((np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)), axis=-1)
+    directions = directions.reshape(-1, 3)
+    vertices = np.zeros((len(directions), 9), dtype=np.float32)
+    vertices[:, 0:3] = directions * radius
+    vertices[:, 3:6] = 0.5
+    vertices[:, 6:9] = directions
+    ring, segment = np.meshgrid(np.arange(rings - 1), np.arange(segments), indexing='ij')
+    p0 = ring * segments + segment
+    p1 = ring * segments + (segment + 1) % segments
+    p2 = p0 + segments
+    p3 = p1 + segments
+    indices = np.stack((p0, p1, p2, p1, p3, p2), axis=-1).reshape(-1).astype(np.uint32)
+    return vertices.ravel(), indices
+
+
+class TestMeshLod(unittest.TestCase):
+    def test_simplified_sphere_stays_on_surface(self):
+        vertices, indices = _sphere_mesh()
+        target = indices.size // 3 // 4
+        lod_vertices, lod_indices = simplify_mesh(vertices, indices, target, stride=9)
+        self.assertEqual(lod_indices.dtype, np.uint32)
+        self.assertGreater(lod_indices.size // 3, target // 4)
+        self.assertLessEqual(lod_indices.size // 3, target)
+        lod = lod_vertices.reshape(-1, 9)
+        self.assertLess(lod_indices.max(), len(lod))
+        np.testing.assert_allclose(np.linalg.norm(lod[:, 0:3], axis=1), 10.0, atol=0.5)
+        # Нормали остаются внешними и единичными, цвет сохраняется.
+        np.testing.assert_allclose(np.linalg.norm(lod[:, 6:9], axis=1), 1.0, atol=1e-5)
+        self.assertTrue(np.all(np.einsum('ij,ij->i', lod[:, 6:9], lod[:, 0:3]) > 0.0))
+        np.testing.assert_allclose(lod[:, 3:6], 0.5)
+
+    def test_soup_stays_soup(self):
+        vertices, indices = _sphere_mesh()
+        soup = vertices.reshape(-1, 9)[indices].ravel()
+        lod_vertices, lod_indices = simplify_mesh(soup, None, 200, stride=9)
+        self.assertIsNone(lod_indices)
+        self.assertEqual(lod_vertices.size % 27, 0)
+        self.assertLessEqual(lod_vertices.size // 27, 200)
+
+    def test_levels_shrink(self):
+        vertices, indices = _sphere_mesh()
+        lods = build_mesh_lods(vertices, indices, stride=9, levels=3, ratio=0.25)
+        counts = [indices.size // 3] + [lod_indices.size // 3 for _, lod_indices in lods]
+        self.assertEqual(len(lods), 3)
+        self.assertTrue(all(a > b for a, b in zip(counts, counts[1:])), counts)
+        for level, count in enumerate(counts):
+            self.assertLessEqual(count, counts[0] * 0.25 ** level)
+
+    def test_projected_sizes(self):
+        sizes = projected_sizes(np.array([[0.0, 0.0, -10.0], [0.0, 0.0, -20.0], [0.5, 0.0, 0.0]]),
+                                np.array([1.0, 1.0, 1.0]), (0.0, 0.0, 0.0), 2.0)
+        np.testing.assert_allclose(sizes[:2], [0.2, 0.1])
+        self.assertEqual(sizes[2], np.inf) # Камера внутри сферы
+
+    def test_selection_has_hysteresis(self):
+        select = lambda current, size: int(select_lod_levels([current], [size], thresholds=(0.4, 0.15, 0.05),
+                                                             hysteresis=0.2)[0])
+        self.assertEqual(select(0, 1.0), 0)
+        self.assertEqual(select(3, 1.0), 0)
+        self.assertEqual(select(0, 0.01), 3)
+        # Около порога 0.4 уровень держится с обеих сторон, пока размер не отойдет на 20%.
+        self.assertEqual(select(0, 0.35), 0)
+        self.assertEqual(select(1, 0.45), 1)
+        self.assertEqual(select(0, 0.3), 1)
+        self.assertEqual(select(1, 0.5), 0)
+        self.assertEqual(select(0, 0.1), 2)
+
+    def test_selection_respects_available_levels(self):
+        levels = select_lod_levels([0, 0, 0], [0.01, 0.01, 1.0], thresholds=(0.4, 0.15, 0.05), hysteresis=0.2,
+                                   max_levels=np.array([1, 0, 3]))
+        np.testing.assert_array_equal(levels, [1, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
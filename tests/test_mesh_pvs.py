@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from meshes.mesh_bvh import build_mesh_bvh
+from meshes.mesh_clusters import build_mesh_clusters
+from meshes.mesh_pvs import build_mesh_pvs, dilate_pvs, pvs_cell_of_point, visible_clusters
+
+
+def _quad_x(x: float, half: float, facing: float) -> list:
+    """Квадрат в плоскости x = const со стороной 2 * half, нормаль (facing, 0, 0)."""
+    a, b, c, d = [(x, y, z) for y, z in ((-half, -half), (half, -half), (half, half), (-half, half))]
+    return [a, c, b, a, d, c] if facing < 0 else [a, b, c, a, c, d]
+
+
+def _walls_soup() -> np.ndarray:
+    """
+    Большая стена x = 0 лицом к -X, маленький квадрат x = 5 лицом к -X за ней и маленький x = -5 лицом к +X.
+    Треугольники 0-1 - стена, 2-3 - квадрат за стеной, 4-5 - квадрат перед стеной.
+    """
+    positions = np.array(_quad_x(0.0, 20.0, -1.0) + _quad_x(5.0, 1.0, -1.0) + _quad_x(-5.0, 1.0, 1.0),
+                         dtype=np.float32)
+    vertices = np.zeros((len(positions), 9), dtype=np.float32)
+    vertices[:, 0:3] = positions
+    return vertices.ravel()
+
+
+class TestMeshPvs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        vertices = _walls_soup()
+        bvh = build_mesh_bvh(vertices, None, stride=9, leaf_size=1)
+        ranges, cones = build_mesh_clusters(vertices, None, bvh, stride=9, use_vertex_normals=False, max_triangles=1)
+        cls.triangle_of_cluster = bvh[2][ranges[:, 0]]
+        cls.grid, cls.visibility = build_mesh_pvs(vertices, None, (*bvh, ranges, cones), stride=9,
+                                                  use_vertex_normals=False, cell_size=5.0, rays_per_cell=32,
+                                                  samples_per_cluster=16, dilate_cells=0)
+
+    def _visible_triangles(self, cell) -> set:
+        bits = np.unpackbits(self.visibility[cell], count=len(self.triangle_of_cluster), bitorder='little')
+        return set(self.triangle_of_cluster[bits.astype(bool)].tolist())
+
+    def test_grid_covers_mesh_bounds(self):
+        np.testing.assert_allclose(self.grid, [-5.0, -20.0, -20.0, 5.0])
+        self.assertEqual(self.visibility.shape, (2, 8, 8, 1))
+
+    def test_wall_hides_clusters_behind_it(self):
+        for cell in np.ndindex(*self.visibility.shape[:3]):
+            visible = self._visible_triangles(cell)
+            self.assertTrue({4, 5} <= visible, cell) # Перед стеной или сквозь ее обратную сторону
+            if cell[0] == 0:
+                self.assertFalse({2, 3} & visible, cell)
+            else:
+                self.assertTrue({2, 3} <= visible, cell)
+
+    def test_point_lookup(self):
+        num_clusters = len(self.triangle_of_cluster)
+        self.assertEqual(pvs_cell_of_point(self.grid, self.visibility, (-1.0, 0.0, 0.0)), (0, 4, 4))
+        self.assertIsNone(pvs_cell_of_point(self.grid, self.visibility, (-6.0, 0.0, 0.0)))
+        behind = visible_clusters(self.grid, self.visibility, (-1.0, 0.0, 0.0), num_clusters)
+        self.assertFalse(np.any(behind[np.isin(self.triangle_of_cluster, [2, 3])]))
+        self.assertTrue(np.all(visible_clusters(self.grid, self.visibility, (0.0, 30.0, 0.0), num_clusters)))
+
+    def test_dilate_merges_neighbour_cells(self):
+        visibility = np.zeros((3, 1, 1, 1), dtype=np.uint8)
+        visibility[0, 0, 0, 0] = 0b01
+        visibility[2, 0, 0, 0] = 0b10
+        np.testing.assert_array_equal(dilate_pvs(visibility, 1)[:, 0, 0, 0], [0b01, 0b11, 0b10])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from meshes.asset_loader import AssetLoader
+from meshes.mesh import Mesh
+from meshes.mesh_cache import load_indexed_mesh_data
+from meshes.mesh_registry import MeshRegistry
+
+TRIANGLE_OBJ = "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+
+
+class TestMeshRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.obj_path = os.path.join(self.tmp_dir.name, 'tri.obj')
+        with open(self.obj_path, 'w') as f:
+            f.write(TRIANGLE_OBJ)
+        self.app = Mock()
+        self.registry = MeshRegistry()
+        self.cache_patch = patch('meshes.mesh_cache.MESH_CACHE_ENABLED', False)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_same_file_is_loaded_once(self):
+        with patch('meshes.mesh.load_indexed_mesh_data', wraps=load_indexed_mesh_data) as loader:
+            first = self.registry.acquire(self.app, self.obj_path)
+            second = self.registry.acquire(self.app, self.obj_path)
+        self.assertIs(first, second)
+        self.assertIs(first.vertex_data_np, second.vertex_data_np)
+        self.assertEqual(loader.call_count, 1)
+        self.assertFalse(first.vertex_data_np.flags.writeable)
+        self.assertFalse(first.index_data_np.flags.writeable)
+        self.assertEqual(self.registry.refcount(self.obj_path), 2)
+
+    def test_different_options_are_separate_entries(self):
+        red = self.registry.acquire(self.app, self.obj_path, default_color=(1.0, 0.0, 0.0))
+        gray = self.registry.acquire(self.app, self.obj_path)
+        self.assertIsNot(red, gray)
+        self.assertEqual(len(self.registry.memory_report()), 2)
+
+    def test_release_unloads_at_zero_refs(self):
+        mesh = self.registry.acquire(self.app, self.obj_path)
+        self.registry.acquire(self.app, self.obj_path)
+        self.assertEqual(self.registry.release(mesh), 1)
+        self.assertEqual(self.registry.release(mesh), 0)
+        self.assertEqual(self.registry.memory_report(), [])
+        self.assertIsNot(self.registry.acquire(self.app, self.obj_path), mesh)
+
+    def test_explicit_unload_and_memory_report(self):
+        mesh = self.registry.acquire(self.app, self.obj_path)
+        report = self.registry.memory_report()
+        self.assertEqual(report[0]['triangles'], 1)
+        bvh_nbytes = sum(array.nbytes for array in mesh.bvh)
+        self.assertEqual(report[0]['nbytes'], mesh.vertex_data_np.nbytes + mesh.index_data_np.nbytes + bvh_nbytes)
+        # 9 floats * 3 вершины + 3 индекса + BVH из одного листа (6 float + 3 int32 + 1 треугольник)
+        # + один кластер (2 int32 + 8 float)
+        self.assertEqual(self.registry.total_bytes(), 27 * 4 + 3 * 4 + (6 + 3 + 1) * 4 + (2 + 8) * 4)
+        self.assertEqual(self.registry.unload(self.obj_path), 1)
+        self.assertEqual(self.registry.refcount(self.obj_path), 0)
+        # Старый владелец продолжает работать с уже выданным мешем; release не ломает реестр.
+        self.assertEqual(self.registry.release(mesh), 0)
+
+    def test_release_unregisters_native_handle(self):
+        mesh = self.registry.acquire(self.app, self.obj_path)
+        mesh.native_handle = 7
+        self.registry.release(mesh)
+        self.app.renderer.release_mesh_handle.assert_called_once_with(7)
+        self.assertIsNone(mesh.native_handle)
+
+    def test_build_runs_outside_the_lock(self):
+        other_path = os.path.join(self.tmp_dir.name, 'other.obj')
+        with open(other_path, 'w') as f:
+            f.write(TRIANGLE_OBJ)
+        building, finish = threading.Event(), threading.Event()
+        builds = []
+
+        def slow_mesh(app, obj_filename, **kwargs):
+            builds.append(obj_filename)
+            if obj_filename == self.obj_path:
+                building.set()
+                self.assertTrue(finish.wait(timeout=5))
+            return Mesh(app, obj_filename, **kwargs)
+
+        results = {}
+        with patch('meshes.mesh_registry.Mesh', side_effect=slow_mesh):
+            threads = [threading.Thread(target=lambda name=name: results.__setitem__(
+                name, self.registry.acquire(self.app, self.obj_path))) for name in ('first', 'second')]
+            threads[0].start()
+            self.assertTrue(building.wait(timeout=5))
+            threads[1].start()
+            other = self.registry.acquire(self.app, other_path) # Другой файл не ждет чужую загрузку
+            self.assertTrue(other.is_loaded)
+            self.assertEqual(self.registry.refcount(self.obj_path), 0)
+            finish.set()
+            for thread in threads:
+                thread.join(timeout=5)
+        self.assertIs(results['first'], results['second'])
+        self.assertEqual(builds.count(self.obj_path), 1)
+        self.assertEqual(self.registry.refcount(self.obj_path), 2)
+
+    def test_failed_build_is_retried(self):
+        with patch('meshes.mesh_registry.Mesh', side_effect=IOError("disk")):
+            with self.assertRaises(IOError):
+                self.registry.acquire(self.app, self.obj_path)
+        self.assertEqual(self.registry.memory_report(), [])
+        self.assertEqual(self.registry.acquire(self.app, self.obj_path).num_triangles, 1)
+
+    def test_acquire_returns_pending_async_mesh(self):
+        loader = AssetLoader(max_workers=1)
+        try:
+            pending = self.registry.acquire_async(self.app, self.obj_path, loader=loader)
+            mesh = self.registry.acquire(self.app, self.obj_path)
+            self.assertIs(mesh, pending)
+            self.assertEqual(self.registry.refcount(self.obj_path), 2)
+            self.assertTrue(loader.wait_all(timeout=5))
+            self.assertTrue(mesh.is_loaded)
+        finally:
+            loader.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
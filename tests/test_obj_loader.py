@@ -0,0 +1,159 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import meshes.obj_loader as obj_loader
+from meshes.obj_loader import (load_obj_file, load_obj_file_indexed, load_obj_file_streaming, load_obj_file_parallel,
+                               iter_obj_triangle_chunks)
+from tests.obj_loader_legacy import load_obj_file_legacy
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+
+
+class TestVectorizedObjLoader(unittest.TestCase):
+    def setUp(self):
+        # parse_mtl ищет .mtl относительно рабочей директории ('assets/...')
+        self._old_cwd = os.getcwd()
+        os.chdir(os.path.dirname(ASSETS_DIR))
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        os.chdir(self._old_cwd)
+        self.tmp_dir.cleanup()
+
+    def _write_obj(self, text, name='test.obj'):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_matches_legacy_loader_on_assets(self):
+        for name in ('cube.obj', 'cube2.obj', 'pawn.obj', 'de_dust2_2.obj'):
+            path = os.path.join('assets', name)
+            expected = load_obj_file_legacy(path, default_color=(0.8, 0.8, 0.8))
+            actual = load_obj_file(path, default_color=(0.8, 0.8, 0.8))
+            self.assertEqual(actual.dtype, np.float32)
+            np.testing.assert_array_equal(actual, expected, err_msg=name)
+
+    def test_polygons_materials_and_missing_normals(self):
+        mtl = "newmtl Red\nKd 1.0 0.0 0.0\nnewmtl NoKd\n"
+        with open(os.path.join(self.tmp_dir.name, 'mixed.mtl'), 'w') as f:
+            f.write(mtl)
+        path = self._write_obj(
+            "mtllib mixed.mtl\n"
+            "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\n"
+            "vn 0 0 -1\n"
+            "f 1 2 3\n"
+            "usemtl Red\n"
+            "  f 1//1 2//1 3//1 4//1\n"
+            "usemtl NoKd\n"
+            "f 4/7/1 3/7/1 2/7/1\n",
+            name='mixed.obj')
+        actual = load_obj_file(path, default_color=(0.1, 0.2, 0.3))
+        self.assertEqual(actual.size, 4 * 3 * 9)
+        data = actual.reshape(-1, 9)
+        np.testing.assert_allclose(data[0, 3:6], (0.1, 0.2, 0.3), rtol=1e-6)
+        np.testing.assert_allclose(data[0, 6:9], (0.0, 0.0, 1.0))
+        np.testing.assert_allclose(data[3:9, 3:6], np.tile((1.0, 0.0, 0.0), (6, 1)))
+        np.testing.assert_allclose(data[9:12, 3:6], np.tile((0.1, 0.2, 0.3), (3, 1)), rtol=1e-6)
+        np.testing.assert_array_equal(data[3:9, 0:3], [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 0, 0], [1, 1, 0], [0, 1, 0]])
+
+    def test_relative_indices(self):
+        path = self._write_obj("v 0 0 0\nv 1 0 0\nv 0 1 0\nf -3 -2 -1\n")
+        data = load_obj_file(path).reshape(-1, 9)
+        np.testing.assert_array_equal(data[:, 0:3], [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+
+    def test_missing_file_and_empty_geometry(self):
+        self.assertEqual(load_obj_file(os.path.join(self.tmp_dir.name, 'nope.obj')).size, 0)
+        self.assertEqual(load_obj_file(self._write_obj("# only a comment\nv 0 0 0\n")).size, 0)
+        vertices, indices = load_obj_file_indexed(os.path.join(self.tmp_dir.name, 'nope.obj'))
+        self.assertEqual((vertices.size, indices.size), (0, 0))
+
+    def test_indexed_expands_to_triangle_soup(self):
+        for name in ('cube2.obj', 'pawn.obj', 'de_dust2_2.obj'):
+            path = os.path.join('assets', name)
+            soup = load_obj_file(path, default_color=(0.8, 0.8, 0.8))
+            vertices, indices = load_obj_file_indexed(path, default_color=(0.8, 0.8, 0.8))
+            self.assertEqual(indices.dtype, np.uint32)
+            self.assertLess(vertices.size, soup.size, msg=name)
+            np.testing.assert_array_equal(vertices.reshape(-1, 9)[indices].ravel(), soup, err_msg=name)
+
+    def test_indexed_keeps_corners_with_different_attributes_apart(self):
+        path = self._write_obj(
+            "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\n"
+            "vn 0 0 1\nvn 1 0 0\n"
+            "f 1//1 2//1 3//1 4//1\n"
+            "f 1//2 3//2 4//2\n")
+        vertices, indices = load_obj_file_indexed(path)
+        # Квад делит 4 вершины; второй треугольник с другой нормалью получает свои 3.
+        self.assertEqual(vertices.size // 9, 7)
+        np.testing.assert_array_equal(indices, [0, 1, 2, 0, 2, 3, 4, 5, 6])
+
+    def test_streaming_matches_whole_file_loader(self):
+        for name in ('pawn.obj', 'de_dust2_2.obj'):
+            path = os.path.join('assets', name)
+            expected = load_obj_file(path, default_color=(0.8, 0.8, 0.8))
+            # Маленькие куски, чтобы грани, usemtl и нормали гарантированно разъезжались по разным кускам.
+            streamed = load_obj_file_streaming(path, default_color=(0.8, 0.8, 0.8), chunk_bytes=4096)
+            np.testing.assert_array_equal(streamed, expected, err_msg=name)
+
+    def test_streaming_carries_state_across_chunks(self):
+        with open(os.path.join(self.tmp_dir.name, 'red.mtl'), 'w') as f:
+            f.write("newmtl Red\nKd 1.0 0.0 0.0\n")
+        path = self._write_obj(
+            "mtllib red.mtl\nusemtl Red\n"
+            "v 0 0 0\nv 1 0 0\nv 0 1 0\nvn 0 1 0\n"
+            + "# padding\n" * 20 +
+            "f -3//-1 -2//-1 -1//-1\n", name='red.obj')
+        expected = load_obj_file(path)
+        np.testing.assert_array_equal(load_obj_file_streaming(path, chunk_bytes=16), expected)
+        np.testing.assert_allclose(expected.reshape(-1, 9)[:, 3:9], np.tile((1, 0, 0, 0, 1, 0), (3, 1)))
+
+    def test_iter_triangle_chunks_block_size(self):
+        path = os.path.join('assets', 'pawn.obj')
+        blocks = list(iter_obj_triangle_chunks(path, default_color=(0.8, 0.8, 0.8), chunk_triangles=100, chunk_bytes=8192))
+        self.assertTrue(all(block.shape[1] == 9 and block.shape[0] <= 300 for block in blocks))
+        np.testing.assert_array_equal(np.concatenate(blocks).ravel(), load_obj_file(path, default_color=(0.8, 0.8, 0.8)))
+
+    def test_parallel_matches_serial_loader(self):
+        path = os.path.join('assets', 'de_dust2_2.obj')
+        expected = load_obj_file(path, default_color=(0.8, 0.8, 0.8))
+        parallel = load_obj_file_parallel(path, default_color=(0.8, 0.8, 0.8), workers=2, chunk_bytes=64 * 1024)
+        np.testing.assert_array_equal(parallel, expected)
+
+    def test_parallel_handles_crlf_and_relative_indices(self):
+        lines = []
+        for i in range(200):
+            lines += [f"v {i} 0 0", f"v {i} 1 0", f"v {i} 0 1", "vn 0 0 1", "f -3//-1 -2//-1 -1//-1"]
+        path = os.path.join(self.tmp_dir.name, 'crlf.obj')
+        with open(path, 'wb') as f:
+            f.write(('\r\n'.join(lines) + '\r\n').encode('ascii'))
+        expected = load_obj_file(path)
+        self.assertEqual(expected.size, 200 * 27)
+        np.testing.assert_array_equal(load_obj_file_parallel(path, workers=2, chunk_bytes=512), expected)
+
+    def test_native_loader_is_preferred_and_falls_back_on_error(self):
+        path = os.path.join('assets', 'cube2.obj')
+        expected = load_obj_file_streaming(path)
+        native_result = np.arange(27, dtype=np.float32)
+        with patch.object(obj_loader, '_load_obj_cpp', return_value=native_result) as native:
+            self.assertIs(load_obj_file(path), native_result)
+        native.assert_called_once()
+        with patch.object(obj_loader, '_load_obj_cpp', side_effect=RuntimeError("boom")):
+            np.testing.assert_array_equal(load_obj_file(path), expected)
+
+    @unittest.skipIf(obj_loader._load_obj_cpp is None, "cpp_renderer_core не собран")
+    def test_native_loader_matches_numpy_loader(self):
+        for name in ('cube2.obj', 'pawn.obj', 'de_dust2_2.obj'):
+            path = os.path.join('assets', name)
+            expected = load_obj_file_streaming(path, default_color=(0.8, 0.8, 0.8))
+            np.testing.assert_array_equal(obj_loader._load_obj_cpp(path, [0.8, 0.8, 0.8], True, False), expected, err_msg=name)
+            vertices, indices = obj_loader._load_obj_cpp(path, [0.8, 0.8, 0.8], True, True)
+            np.testing.assert_array_equal(vertices.reshape(-1, 9)[indices].ravel(), expected, err_msg=name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import os
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+from meshes.mesh_bvh import build_mesh_bvh
+from meshes.mesh_clusters import build_mesh_clusters
+
+STRIDE = 9
+ASPECT = 16 / 9
+PROJECTION = np.array(glm.perspective(glm.radians(60), ASPECT, 0.1, 100.0), dtype=np.float32)
+BEHIND = (-10.0, -9.0) # z бокса за стеной на z = -5
+
+
+def to_clip(points) -> np.ndarray:
+    """Точки пространства камеры (N, 3) в пространство отсечения (N, 4)."""
+    points = np.asarray(points, dtype=np.float32)
+    return np.hstack((points, np.ones((len(points), 1), dtype=np.float32))) @ PROJECTION.T
+
+
+def wall(xs, ys, z: float = -5.0, skip=()) -> np.ndarray:
+    """Стена из квадратов сетки xs x ys на глубине z с общими вершинами; skip - (столбец, строка) дыр. (T, 3, 4)."""
+    clip = to_clip([(x, y, z) for y in ys for x in xs]).reshape(len(ys), len(xs), 4)
+    triangles = []
+    for row in range(len(ys) - 1):
+        for col in range(len(xs) - 1):
+            if (col, row) in skip:
+                continue
+            a, b, c, d = clip[row, col], clip[row, col + 1], clip[row + 1, col + 1], clip[row + 1, col]
+            triangles += [(a, b, c), (a, c, d)]
+    return np.array(triangles, dtype=np.float32).reshape(-1, 3, 4)
+
+
+def box(x0, y0, x1, y1, z0=BEHIND[0], z1=BEHIND[1]) -> list:
+    return [x0, y0, z0, x1, y1, z1]
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestOcclusionBuffer(unittest.TestCase):
+    def occluded(self, occluders, boxes) -> list:
+        return cpp_renderer_core.occlusion_test_cpp(occluders, np.array(boxes, dtype=np.float32),
+                                                    PROJECTION.flatten(order='F')).tolist()
+
+    def test_occluder_hides_box_behind(self):
+        occluder = wall([-3.0, 3.0], [-2.0, 2.0])
+        self.assertEqual(self.occluded(occluder, [
+            box(-0.5, -0.5, 0.5, 0.5),               # За стеной (и за ее диагональю)
+            box(-0.5, -0.5, 0.5, 0.5, -4.0, -3.0),   # Перед стеной
+            box(-0.5, -0.5, 0.5, 0.5, -6.0, -4.0),   # Ближняя грань перед стеной
+            box(8.0, -0.5, 9.0, 0.5),                # За краем стены на экране
+            box(-0.5, -0.5, 0.5, 0.5, -10.0, 1.0),   # Пересекает ближнюю плоскость
+        ]), [True, False, False, False, False])
+
+    def test_seams_between_shared_edges_are_filled(self):
+        # Швы между треугольниками с общими ребрами не оставляют дыр ни на одном уровне иерархии.
+        occluder = wall(np.linspace(-3.0, 3.0, 9), np.linspace(-2.0, 2.0, 7))
+        self.assertEqual(self.occluded(occluder, [box(-1.0, -1.0, 1.0, 1.0), box(-0.01, -0.01, 0.01, 0.01),
+                                                  box(-1.5, -0.8, 1.5, 0.8)]), [True, True, True])
+
+    def test_subpixel_gap_is_not_filled(self):
+        # Пиксель буфера на глубине стены - около 0.04; щель 0.01 (четверть пикселя) между стенами без общих вершин.
+        gap = 0.005
+        occluder = np.concatenate((wall([-3.0, -gap], [-2.0, 2.0]), wall([gap, 3.0], [-2.0, 2.0])))
+        thin = box(-0.001, -0.5, 0.001, 0.5)
+        self.assertEqual(self.occluded(occluder, [thin, box(-4.0, -0.5, -3.0, 0.5)]), [False, True])
+        self.assertEqual(self.occluded(wall([-3.0, 0.0, 3.0], [-2.0, 2.0]), [thin]), [True]) # Та же стена без щели
+
+    def test_box_behind_hole_is_visible(self):
+        xs, ys = np.linspace(-3.0, 3.0, 13), np.linspace(-2.0, 2.0, 9)
+        rng = np.random.default_rng(15)
+        holes = {(int(col), int(row)) for col, row in zip(rng.integers(0, 12, 6), rng.integers(0, 8, 6))}
+        occluder = wall(xs, ys, skip=holes)
+        boxes = []
+        for col, row in holes: # Тонкий бокс за серединой дыры, дальше на экране меньше нее
+            x, y = (xs[col] + xs[col + 1]) / 2, (ys[row] + ys[row + 1]) / 2
+            boxes.append(box(x * 2 - 0.01, y * 2 - 0.01, x * 2 + 0.01, y * 2 + 0.01))
+        self.assertEqual(self.occluded(occluder, boxes), [False] * len(holes))
+        # За сплошными ячейками не у края стены (ближняя грань бокса на экране больше) и не рядом с дырами.
+        solid = [(col, row) for col in range(1, 11) for row in range(1, 7)
+                 if all(abs(c - col) > 1 or abs(r - row) > 1 for c, r in holes)]
+        self.assertGreater(len(solid), 20)
+        boxes = [box(xs[col] * 2 + 0.4, ys[row] * 2 + 0.4, xs[col + 1] * 2 - 0.4, ys[row + 1] * 2 - 0.4)
+                 for col, row in solid]
+        self.assertEqual(self.occluded(occluder, boxes), [True] * len(boxes))
+
+
+def indexed_grid(size: int, half: float, z: float, color, skip=()) -> tuple:
+    """Сетка size x size квадратов [-half, half]^2 на глубине z, нормали +z; skip - (столбец, строка) дыр."""
+    coords = np.linspace(-half, half, size + 1)
+    vertices = np.zeros(((size + 1) ** 2, STRIDE), dtype=np.float32)
+    vertices[:, 0] = np.tile(coords, size + 1)
+    vertices[:, 1] = np.repeat(coords, size + 1)
+    vertices[:, 2] = z
+    vertices[:, 3:6] = color
+    vertices[:, 8] = 1.0
+    indices = []
+    for row in range(size):
+        for col in range(size):
+            if (col, row) in skip:
+                continue
+            a = row * (size + 1) + col
+            b, c, d = a + 1, a + size + 2, a + size + 1
+            indices += [a, b, c, a, c, d]
+    return vertices.ravel(), np.array(indices, dtype=np.uint32)
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestOcclusionFrames(unittest.TestCase):
+    """Карта-стена с дырой перед объектами: кадры с отсечением окклюзией и без совпадают."""
+    WIDTH, HEIGHT = 160, 90
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        cpp_renderer_core.initialize_cpp_renderer(cls.WIDTH, cls.HEIGHT, False, "test_occlusion", 1 << 24, 1 << 24,
+                                                  np.zeros(3, dtype=np.uint8))
+        cls.handles = []
+        wall_vertices, wall_indices = indexed_grid(8, 4.0, 0.0, (0.5, 0.5, 0.5), skip={(5, 4)})
+        bvh = build_mesh_bvh(wall_vertices, wall_indices, STRIDE, leaf_size=8)
+        clusters = build_mesh_clusters(wall_vertices, wall_indices, bvh, STRIDE, False, max_triangles=16)
+        cls.wall = cls.register(wall_vertices, wall_indices, *bvh, *clusters)
+        object_vertices, object_indices = indexed_grid(4, 0.5, 0.0, (0.9, 0.3, 0.1))
+        cls.object = cls.register(object_vertices, object_indices,
+                                  *build_mesh_bvh(object_vertices, object_indices, STRIDE, leaf_size=4))
+
+    @classmethod
+    def register(cls, vertices, indices, *bvh) -> int:
+        handle = cpp_renderer_core.register_mesh_cpp(vertices, indices, STRIDE, False, *bvh)
+        cls.handles.append(handle)
+        return handle
+
+    @classmethod
+    def tearDownClass(cls):
+        cpp_renderer_core.set_occlusion_parameters_cpp(False)
+        cpp_renderer_core.set_software_rasterizer_cpp(False)
+        for handle in cls.handles:
+            cpp_renderer_core.unregister_mesh_cpp(handle)
+        cpp_renderer_core.cleanup_cpp_renderer()
+
+    def render(self, occlusion: bool, camera_x: float) -> tuple:
+        cpp_renderer_core.set_occlusion_parameters_cpp(occlusion, 64, 36)
+        cpp_renderer_core.set_software_rasterizer_cpp(True, 32, 2)
+        camera = glm.vec3(camera_x, 0.0, 6.0)
+        view = glm.lookAt(camera, glm.vec3(camera_x, 0.0, 0.0), glm.vec3(0, 1, 0))
+        projection = glm.perspective(glm.radians(60), self.WIDTH / self.HEIGHT, 0.1, 100.0)
+        cpp_renderer_core.set_frame_parameters_cpp(
+            np.array(view, dtype=np.float32).flatten(order='F'),
+            np.array(projection, dtype=np.float32).flatten(order='F'),
+            np.array(camera, dtype=np.float32), False, False, True, False, np.array([255, 0, 255], dtype=np.uint8),
+            False, 0.0)
+        # Объекты за стеной: за сплошной частью, за дырой (столбец 5, строка 4) и сбоку от стены.
+        positions = [(x, y, -3.0) for x in (-2.5, -1.0, 0.5) for y in (-2.0, -0.5, 1.5)] + [(1.5, 0.5, -1.0),
+                                                                                           (6.5, 0.0, -3.0)]
+        transforms = np.array([[x, y, z, 0, 0, 0, 1, 1, 1] for x, y, z in [(0, 0, 0)] + positions], dtype=np.float32)
+        handles = np.array([self.wall] + [self.object] * len(positions), dtype=np.int64)
+        cpp_renderer_core.submit_batch_cpp(np.arange(1, len(handles) + 1, dtype=np.uint64), transforms, handles)
+        cpp_renderer_core.render_accumulated_triangles_cpp()
+        return cpp_renderer_core.get_software_framebuffer_cpp(), cpp_renderer_core.get_software_raster_stats_cpp()['triangles']
+
+    def test_same_frame_with_occlusion(self):
+        for camera_x in (0.0, 0.8, 2.5):
+            frame, triangles = self.render(False, camera_x)
+            frame_occluded, triangles_occluded = self.render(True, camera_x)
+            np.testing.assert_array_equal(frame_occluded, frame, err_msg=str(camera_x))
+            self.assertLess(triangles_occluded, triangles, camera_x)
+        object_color = 0xFF000000 | (229 << 16) | (76 << 8) | 25
+        self.assertIn(object_color, np.unique(frame)) # Объекты за дырой и сбоку видны
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+LEVELS = ('scalar', 'sse2', 'avx2')
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestSimdTransform(unittest.TestCase):
+    def supported_levels(self) -> list:
+        supported = cpp_renderer_core.get_simd_transform_info_cpp()['supported']
+        return list(LEVELS[:LEVELS.index(supported) + 1])
+
+    def test_levels_match_numpy(self):
+        rng = np.random.default_rng(5)
+        matrix = (glm.perspective(glm.radians(60.0), 16 / 9, 0.1, 1000.0)
+                  * glm.lookAt(glm.vec3(3, 2, 10), glm.vec3(0, 0, 0), glm.vec3(0, 1, 0)))
+        matrix_np = np.array(matrix, dtype=np.float32).flatten(order='F')
+        for count in (0, 1, 7, 8, 9, 1001): # Хвосты короче 4 и 8 вершин считаются скалярно
+            points = rng.normal(0.0, 10.0, (count, 9)).astype(np.float32)
+            homogeneous = np.hstack((points[:, :3].astype(np.float64), np.ones((count, 1))))
+            expected = homogeneous @ matrix_np.reshape(4, 4).astype(np.float64)
+            for level in self.supported_levels():
+                result = cpp_renderer_core.transform_points_cpp(points, matrix_np, level)
+                self.assertEqual(result.shape, (count, 4))
+                np.testing.assert_allclose(result, expected, rtol=1e-5, atol=1e-4, err_msg=f"{level}, {count}")
+
+    def test_level_selection(self):
+        try:
+            self.assertEqual(cpp_renderer_core.set_simd_transform_cpp('scalar'), 'scalar')
+            self.assertEqual(cpp_renderer_core.get_simd_transform_info_cpp()['level'], 'scalar')
+            # Уровень выше поддерживаемого заменяется лучшим доступным.
+            self.assertEqual(cpp_renderer_core.set_simd_transform_cpp('avx2'), self.supported_levels()[-1])
+            with self.assertRaises(RuntimeError):
+                cpp_renderer_core.set_simd_transform_cpp('neon')
+        finally:
+            cpp_renderer_core.set_simd_transform_cpp('auto')
+
+
+if __name__ == '__main__':
+    unittest.main()
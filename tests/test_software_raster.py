@@ -0,0 +1,95 @@
+import os
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+STRIDE = 9
+WIDTH, HEIGHT = 97, 61 # Не кратны размерам тайлов: неполные тайлы на краях
+TRANSFORM = np.array([[0, 0, 0, 0, 0, 0, 1, 1, 1]], dtype=np.float32)
+BACKGROUND = np.array([10, 20, 30], dtype=np.uint8)
+
+
+def triangle_soup(corners: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """Вершины без индексов: corners (T, 3, 3), colors (T, 3) в [0, 1]; нормали +z."""
+    vertices = np.zeros((len(corners), 3, STRIDE), dtype=np.float32)
+    vertices[:, :, :3] = corners
+    vertices[:, :, 3:6] = colors[:, None, :]
+    vertices[:, :, 8] = 1.0
+    return vertices.ravel()
+
+
+def argb(color) -> int:
+    r, g, b = (int(round(c * 255)) for c in color)
+    return 0xFF000000 | (r << 16) | (g << 8) | b
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestSoftwareRaster(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        cpp_renderer_core.initialize_cpp_renderer(WIDTH, HEIGHT, False, "test_software_raster", 1 << 20, 1 << 20,
+                                                  BACKGROUND)
+        cls.handles = []
+
+    @classmethod
+    def tearDownClass(cls):
+        cpp_renderer_core.set_software_rasterizer_cpp(False)
+        for handle in cls.handles:
+            cpp_renderer_core.unregister_mesh_cpp(handle)
+        cpp_renderer_core.cleanup_cpp_renderer()
+
+    def register(self, corners, colors) -> int:
+        handle = cpp_renderer_core.register_mesh_cpp(triangle_soup(np.asarray(corners, dtype=np.float32),
+                                                                   np.asarray(colors, dtype=np.float32)),
+                                                     None, STRIDE, True)
+        self.handles.append(handle)
+        return handle
+
+    def render(self, handle: int, tile_size: int = 64, num_threads: int = 1) -> np.ndarray:
+        """Кадр с камерой в (0, 0, 5), смотрящей на начало координат; без освещения и отсечения задних граней."""
+        cpp_renderer_core.set_software_rasterizer_cpp(True, tile_size, num_threads)
+        view = glm.lookAt(glm.vec3(0, 0, 5), glm.vec3(0), glm.vec3(0, 1, 0))
+        projection = glm.perspective(glm.radians(60), WIDTH / HEIGHT, 0.1, 100.0)
+        cpp_renderer_core.set_frame_parameters_cpp(
+            np.array(view, dtype=np.float32).flatten(order='F'),
+            np.array(projection, dtype=np.float32).flatten(order='F'),
+            np.array([0, 0, 5], dtype=np.float32), False, False, True, False, np.array([255, 0, 255], dtype=np.uint8),
+            False, 0.0)
+        cpp_renderer_core.submit_batch_cpp(np.array([handle], dtype=np.uint64), TRANSFORM,
+                                           np.array([handle], dtype=np.int64))
+        cpp_renderer_core.render_accumulated_triangles_cpp()
+        return cpp_renderer_core.get_software_framebuffer_cpp()
+
+    def test_same_frame_for_threads_and_tiles(self):
+        rng = np.random.default_rng(17)
+        centers = rng.uniform([-2.5, -1.5, -3.0], [2.5, 1.5, 1.5], (150, 1, 3))
+        corners = centers + rng.uniform(-1.0, 1.0, (150, 3, 3)) # Треугольники пересекаются и выходят за экран
+        handle = self.register(corners, rng.uniform(0.0, 1.0, (150, 3)))
+        reference = self.render(handle, 64, 1)
+        self.assertEqual(reference.shape, (HEIGHT, WIDTH))
+        self.assertGreater(len(np.unique(reference)), 20)
+        for tile_size, num_threads in ((8, 1), (16, 4), (13, 3), (32, 2), (1024, 4), (64, 0)):
+            np.testing.assert_array_equal(self.render(handle, tile_size, num_threads), reference,
+                                          err_msg=f"tile {tile_size}, threads {num_threads}")
+
+    def test_nearer_triangle_wins(self):
+        far = [[-3, -3, -1], [3, -3, -1], [0, 3, -1]]
+        near = [[-1, -1, 1], [1, -1, 1], [0, 1, 1]]
+        red, green = [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]
+        for corners, colors in (([far, near], [red, green]), ([near, far], [green, red])): # Порядок отправки не важен
+            for num_threads in (1, 4):
+                frame = self.render(self.register(corners, colors), 16, num_threads)
+                self.assertEqual(frame[HEIGHT // 2, WIDTH // 2], argb(green))
+                self.assertEqual(frame[HEIGHT * 3 // 4, WIDTH // 2], argb(red)) # Ниже ближнего: только дальний
+                self.assertEqual(frame[2, 2], argb(BACKGROUND / 255))
+
+
+if __name__ == '__main__':
+    unittest.main()
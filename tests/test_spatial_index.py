@@ -0,0 +1,92 @@
+import unittest
+
+import glm
+import numpy as np
+
+from classes.spatial_index import SceneSpatialIndex, classify_aabbs, frustum_planes, transform_aabbs
+from classes.transform_store import TransformStore
+
+UNIT_BOX = np.array([-0.5, -0.5, -0.5, 0.5, 0.5, 0.5], dtype=np.float32)
+
+
+class _Mesh:
+    def __init__(self, local_bounds=UNIT_BOX):
+        self.local_bounds = local_bounds
+
+
+class _Object:
+    def __init__(self, store, position, mesh=None):
+        self.mesh = mesh or _Mesh()
+        self.transform_row = store.allocate(self, position, (0, 0, 0), (1, 1, 1))
+
+
+def _view_projection(eye=(0, 0, 0), target=(0, 0, -1)):
+    projection = glm.perspective(glm.radians(60.0), 16 / 9, 0.1, 100.0)
+    return projection * glm.lookAt(glm.vec3(*eye), glm.vec3(*target), glm.vec3(0, 1, 0))
+
+
+class TestTransformAabbs(unittest.TestCase):
+    def test_matches_transformed_corners(self):
+        rng = np.random.default_rng(1)
+        transforms = np.hstack((rng.uniform(-10, 10, (20, 3)), rng.uniform(0, 360, (20, 3)),
+                                rng.uniform(0.5, 3, (20, 3)))).astype(np.float32)
+        local = np.array([[-1, 0, -2, 3, 1, 2]] * 20, dtype=np.float32)
+        world = transform_aabbs(local, transforms)
+        corners = np.array([[x, y, z] for x in (-1, 3) for y in (0, 1) for z in (-2, 2)], dtype=np.float32)
+        for (px, py, pz, rx, ry, rz, sx, sy, sz), bounds in zip(transforms, world):
+            m = glm.translate(glm.mat4(1.0), glm.vec3(px, py, pz))
+            m = glm.rotate(m, glm.radians(ry), glm.vec3(0, 1, 0))
+            m = glm.rotate(m, glm.radians(rx), glm.vec3(1, 0, 0))
+            m = glm.rotate(m, glm.radians(rz), glm.vec3(0, 0, 1))
+            m = glm.scale(m, glm.vec3(sx, sy, sz))
+            points = np.array([tuple(m * glm.vec4(*c, 1.0))[:3] for c in corners])
+            np.testing.assert_allclose(bounds[:3], points.min(axis=0), atol=1e-4)
+            np.testing.assert_allclose(bounds[3:], points.max(axis=0), atol=1e-4)
+
+
+class TestSceneSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.store = TransformStore()
+        self.index = SceneSpatialIndex(self.store, cell_size=8.0)
+
+    def _brute_force(self, view_projection):
+        bounds = transform_aabbs(np.tile(UNIT_BOX, (len(self.store), 1)), self.store.array)
+        outside, _ = classify_aabbs(bounds, frustum_planes(view_projection))
+        return np.flatnonzero(~outside)
+
+    def test_query_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for position in rng.uniform(-60, 60, (500, 3)):
+            _Object(self.store, position)
+        self.index.sync()
+        for target in [(0, 0, -1), (1, 0, 0), (0.3, 0.2, 1)]:
+            view_projection = _view_projection(target=target)
+            rows = self.index.query_frustum(view_projection)
+            np.testing.assert_array_equal(rows, self._brute_force(view_projection))
+            self.assertLess(self.index.last_query_stats['visible'], 500)
+
+    def test_incremental_updates(self):
+        view_projection = _view_projection()
+        front = _Object(self.store, (0, 0, -10))
+        behind = _Object(self.store, (0, 0, 10))
+        self.index.sync()
+        np.testing.assert_array_equal(self.index.query_frustum(view_projection), [front.transform_row])
+        self.store.set_vec3(behind.transform_row, 0, (1, 0, -20))
+        self.index.sync()
+        np.testing.assert_array_equal(self.index.query_frustum(view_projection), [0, 1])
+        self.store.free(front.transform_row)
+        self.index.sync()
+        self.assertEqual(len(self.index), 1)
+        np.testing.assert_array_equal(self.index.query_frustum(view_projection), [behind.transform_row])
+
+    def test_pending_mesh_appears_after_load(self):
+        pending = _Object(self.store, (0, 0, -10), mesh=_Mesh(local_bounds=None))
+        self.index.sync()
+        self.assertEqual(self.index.query_frustum(_view_projection()).size, 0)
+        pending.mesh.local_bounds = UNIT_BOX
+        self.index.sync()
+        np.testing.assert_array_equal(self.index.query_frustum(_view_projection()), [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import unittest
+
+import glm
+import numpy as np
+
+try:
+    import cpp_renderer_core
+except ImportError:
+    cpp_renderer_core = None
+
+from tests.test_cpp_caches import quad_grid_vertices
+
+STRIDE = 9
+
+
+def frame_view(camera_pos, turn_deg: float = 0.0) -> np.ndarray:
+    view = glm.rotate(glm.mat4(1.0), glm.radians(turn_deg), glm.vec3(0, 1, 0))
+    return np.array(glm.translate(view, -glm.vec3(*camera_pos)), dtype=np.float32).flatten(order='F')
+
+
+@unittest.skipIf(cpp_renderer_core is None, "cpp_renderer_core не собран")
+class TestTemporalDepthSort(unittest.TestCase):
+    """Временная сортировка на последовательности кадров дает порядок radix sort с нуля (depth_sort_order_cpp)."""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        cpp_renderer_core.initialize_cpp_renderer(160, 120, False, "test_temporal_sort", 1 << 24, 1 << 24,
+                                                  np.zeros(3, dtype=np.uint8))
+        cls.handle = cpp_renderer_core.register_mesh_cpp(quad_grid_vertices(6), None, STRIDE, False)
+        cls.projection = np.array(glm.perspective(glm.radians(60), 160 / 120, 0.1, 100.0),
+                                  dtype=np.float32).flatten(order='F')
+
+    @classmethod
+    def tearDownClass(cls):
+        cpp_renderer_core.set_temporal_depth_sort_cpp(False)
+        cpp_renderer_core.set_depth_sort_capture_cpp(False)
+        cpp_renderer_core.unregister_mesh_cpp(cls.handle)
+        cpp_renderer_core.cleanup_cpp_renderer()
+
+    def setUp(self):
+        cpp_renderer_core.set_temporal_depth_sort_cpp(True)
+        cpp_renderer_core.set_depth_sort_capture_cpp(True)
+
+    def render(self, object_ids, transforms, camera_pos=(0.0, 0.0, 0.0), turn_deg: float = 0.0) -> dict:
+        """Кадр со всеми объектами; проверяет порядок и возвращает статистику сортировки."""
+        cpp_renderer_core.set_frame_parameters_cpp(
+            frame_view(camera_pos, turn_deg), self.projection, np.array(camera_pos, dtype=np.float32),
+            False, False, True, False, np.array([255, 0, 255], dtype=np.uint8), True, 0.0)
+        cpp_renderer_core.submit_batch_cpp(np.array(object_ids, dtype=np.uint64), np.array(transforms, dtype=np.float32),
+                                           np.full(len(object_ids), self.handle, dtype=np.int64))
+        cpp_renderer_core.render_accumulated_triangles_cpp()
+        depths, order = cpp_renderer_core.get_captured_depth_sort_cpp()
+        self.assertGreater(len(depths), 0)
+        np.testing.assert_array_equal(order, cpp_renderer_core.depth_sort_order_cpp(depths))
+        return cpp_renderer_core.get_depth_sort_stats_cpp()
+
+    def test_frame_sequence_matches_radix_sort(self):
+        # Объекты 1 и 2 совпадают: их треугольники на равных глубинах упорядочены по индексу в кадре.
+        transforms = {object_id: [x, y, z, 20.0, yaw, 0.0, 2.0, 2.0, 2.0] for object_id, (x, y, z, yaw) in zip(
+            range(1, 7), [(0, 0, -6, 0), (0, 0, -6, 0), (-2, 1, -8, 30), (2, -1, -5, -40), (1, 1, -9, 70), (-1, -1, -7, 10)])}
+        ids = list(transforms)
+
+        def frame(object_ids, camera_pos=(0.0, 0.0, 0.0), turn_deg: float = 0.0) -> dict:
+            return self.render(object_ids, [transforms[i] for i in object_ids], camera_pos, turn_deg)
+
+        frame(ids)
+        stats = frame(ids) # Неподвижная сцена: прошлый порядок как есть
+        self.assertEqual(stats['reused'], stats['triangles'])
+        stats = frame([2, 1, 6, 5, 4, 3]) # Те же треугольники, другой порядок отправки
+        self.assertEqual(stats['reused'], stats['triangles'])
+        transforms[3] = [-2, 1, -7, 20, 50, 0, 2, 2, 2] # Объект передвинулся
+        stats = frame([2, 1, 6, 5, 4, 3])
+        self.assertGreater(stats['fresh'], 0)
+        self.assertGreater(stats['reused'], 0)
+        stats = frame([2, 1, 6, 5, 4, 3], camera_pos=(0.05, 0.0, -0.1)) # Камера идет: глубины пересчитаны
+        self.assertGreater(stats['rekeyed'], 0)
+        stats = frame(ids, camera_pos=(0.1, 0.0, -0.2)) # Камера идет, порядок отправки другой
+        self.assertGreater(stats['rekeyed'], 0)
+        frame(ids, camera_pos=(0.1, 0.0, -0.2), turn_deg=3.0) # Камера поворачивается
+        frame(ids, camera_pos=(0.1, 0.0, -0.2), turn_deg=3.0)
+        frame([1, 2, 6, 4, 5]) # Объект 3 удален, последний встал на его место (TransformStore.free)
+        stats = frame([1, 2, 6, 4, 5])
+        self.assertEqual(stats['reused'], stats['triangles'])
+        frame([6, 4, 5, 1, 2], camera_pos=(0.0, 0.1, 0.1))
+        frame([3, 6, 4, 5, 1, 2], camera_pos=(0.0, 0.1, 0.1)) # Объект вернулся
+
+    def test_disabled_sorts_from_scratch(self):
+        cpp_renderer_core.set_temporal_depth_sort_cpp(False)
+        ids = [1, 2]
+        transforms = [[0, 0, -6, 0, 0, 0, 2, 2, 2], [1, 0, -7, 0, 30, 0, 2, 2, 2]]
+        self.render(ids, transforms)
+        stats = self.render(ids, transforms)
+        self.assertEqual((stats['reused'], stats['fresh']), (0, stats['triangles']))
+
+
+if __name__ == '__main__':
+    unittest.main()
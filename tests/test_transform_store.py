@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import Mock, patch
+
+import glm
+import numpy as np
+
+from classes.GameObject import GameObject
+from classes.transform_store import TransformStore
+
+
+class _Owner:
+    transform_row = None
+
+
+class TestTransformStore(unittest.TestCase):
+    def setUp(self):
+        self.store = TransformStore(capacity=1)
+
+    def _add(self, x):
+        owner = _Owner()
+        owner.transform_row = self.store.allocate(owner, (x, 0, 0), (0, 0, 0), (1, 1, 1))
+        return owner
+
+    def test_grows_and_keeps_rows(self):
+        owners = [self._add(float(i)) for i in range(5)]
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual(self.store.array.shape, (5, 9))
+        self.assertEqual(self.store.array.dtype, np.float32)
+        np.testing.assert_array_equal(self.store.positions[:, 0], np.arange(5))
+        self.assertEqual([o.transform_row for o in owners], list(range(5)))
+        self.assertEqual(self.store.object_ids[2], id(owners[2]))
+
+    def test_free_moves_last_row_into_hole(self):
+        a, b, c = self._add(1.0), self._add(2.0), self._add(3.0)
+        self.store.lod_levels[c.transform_row] = 2
+        self.store.clear_dirty()
+        self.store.free(a.transform_row)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(c.transform_row, 0)
+        self.assertEqual(self.store.objects, [c, b])
+        np.testing.assert_array_equal(self.store.positions[:, 0], [3.0, 2.0])
+        self.assertEqual(self.store.object_ids[0], id(c))
+        np.testing.assert_array_equal(self.store.lod_levels, [2, 0])
+        np.testing.assert_array_equal(self.store.dirty_rows(), [0])
+
+    def test_translate_is_vectorized_and_marks_dirty(self):
+        for i in range(4):
+            self._add(float(i))
+        self.store.clear_dirty()
+        self.store.translate((0.0, 1.0, 0.0), rows=[1, 3])
+        np.testing.assert_array_equal(self.store.positions[:, 1], [0.0, 1.0, 0.0, 1.0])
+        np.testing.assert_array_equal(self.store.dirty_rows(), [1, 3])
+        self.store.translate((0.0, 0.0, 2.0))
+        np.testing.assert_array_equal(self.store.positions[:, 2], [2.0] * 4)
+        self.assertEqual(len(self.store.dirty_rows()), 4)
+
+
+class TestGameObjectTransformView(unittest.TestCase):
+    def setUp(self):
+        self.store = TransformStore()
+        registry = Mock()
+        registry.acquire.return_value = Mock()
+        self.registry_patch = patch('classes.GameObject.get_mesh_registry', return_value=registry)
+        self.registry_patch.start()
+
+    def tearDown(self):
+        self.registry_patch.stop()
+
+    def _make(self, **kwargs):
+        return GameObject(Mock(), 'unused.obj', transform_store=self.store, **kwargs)
+
+    def test_fields_are_views_into_store_row(self):
+        obj = self._make(position=glm.vec3(1, 2, 3), scale=glm.vec3(2, 2, 2))
+        self.assertFalse(hasattr(obj, '__dict__'))
+        np.testing.assert_array_equal(obj.transform_params, [1, 2, 3, 0, 0, 0, 2, 2, 2])
+        self.store.clear_dirty()
+        obj.position.z += 1.0
+        obj.rotate_degrees(90, 0, 0)
+        obj.scale = glm.vec3(3, 3, 3)
+        np.testing.assert_array_equal(self.store.array[obj.transform_row], [1, 2, 4, 90, 0, 0, 3, 3, 3])
+        np.testing.assert_array_equal(self.store.dirty_rows(), [obj.transform_row])
+        self.assertEqual(obj.position - glm.vec3(1, 2, 4), glm.vec3(0, 0, 0))
+
+    def test_destroy_frees_row_and_keeps_other_views_valid(self):
+        first = self._make(position=glm.vec3(1, 0, 0))
+        second = self._make(position=glm.vec3(2, 0, 0))
+        first.destroy()
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(second.transform_row, 0)
+        self.assertEqual(second.position.x, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
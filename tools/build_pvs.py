@@ -0,0 +1,74 @@
+# tools/build_pvs.py
+# Заранее строит PVS кластеров карты (meshes/mesh_pvs.py) и сохраняет его в кэш мешей:
+# при следующей загрузке карты Mesh подхватит PVS, и C++ будет отправлять только кластеры, видимые из ячейки камеры.
+# Запуск из корня проекта: python -m tools.build_pvs <карта.obj> [--rays N] [--samples N] [--dilate N]
+# Размер ячейки - MESH_PVS_CELL_SIZE (входит в ключ кэша). Число лучей в ключ не входит: чтобы перестроить
+# PVS с другими параметрами, очистите кэш (meshes.mesh_cache.clear_mesh_cache).
+
+import sys
+import time
+
+import numpy as np
+
+from meshes.mesh import load_mesh_buffers, load_mesh_buffers_pvs
+from meshes.mesh_pvs import build_mesh_pvs
+from settings import (VERTEX_DATA_STRIDE, USE_VERTEX_NORMALS, MESH_CLUSTERS_ENABLED, MESH_CACHE_ENABLED,
+                      MESH_PVS_CELL_SIZE, MESH_PVS_RAYS_PER_CELL, MESH_PVS_SAMPLES_PER_CLUSTER, MESH_PVS_DILATE_CELLS)
+
+DEFAULT_COLOR = (0.8, 0.8, 0.8)  # Цвет по умолчанию GameObject: входит в ключ кэша меша
+
+
+def run(obj_filename: str, rays_per_cell: int, samples_per_cluster: int, dilate_cells: int):
+    if not (MESH_CLUSTERS_ENABLED and MESH_CACHE_ENABLED):
+        print("PVS требует MESH_CLUSTERS_ENABLED и MESH_CACHE_ENABLED (PVS хранится только в кэше мешей).")
+        return
+    format_info = {'VERTEX_DATA_STRIDE': VERTEX_DATA_STRIDE, 'USE_VERTEX_NORMALS': USE_VERTEX_NORMALS}
+    start = time.perf_counter()
+    vertex_data_np, index_data_np, bvh, _ = load_mesh_buffers(obj_filename, DEFAULT_COLOR, format_info)
+    if bvh is None or len(bvh) < 5 or len(bvh[3]) == 0:
+        print(f"'{obj_filename}': нет BVH с кластерами - PVS строить не из чего.")
+        return
+    num_clusters = len(bvh[3])
+    print(f"'{obj_filename}': {len(bvh[2])} треугольников, {num_clusters} кластеров, "
+          f"загрузка {time.perf_counter() - start:.2f} с")
+
+    built = []
+
+    def progress(done: int, total: int):
+        if done == total or done % max(1, total // 20) == 0:
+            elapsed = time.perf_counter() - start
+            print(f"  ячеек {done}/{total}, {elapsed:.0f} с, осталось ~{elapsed / done * (total - done):.0f} с")
+
+    def build():
+        built.append(True)
+        return build_mesh_pvs(vertex_data_np, index_data_np, bvh[:5], cell_size=MESH_PVS_CELL_SIZE,
+                              rays_per_cell=rays_per_cell, samples_per_cluster=samples_per_cluster,
+                              dilate_cells=dilate_cells, progress=progress)
+
+    start = time.perf_counter()
+    grid, visibility = load_mesh_buffers_pvs(obj_filename, DEFAULT_COLOR, format_info,
+                                             indexed=index_data_np is not None, build=build)
+    if built:
+        print(f"PVS построен за {time.perf_counter() - start:.1f} с и сохранен в кэш.")
+    else:
+        print("PVS уже есть в кэше (для перестроения очистите кэш мешей).")
+
+    visible = np.unpackbits(visibility, axis=3, count=num_clusters, bitorder='little').sum(axis=3)
+    print(f"Сетка {'x'.join(map(str, visibility.shape[:3]))}, ячейка {grid[3]:g}, "
+          f"видимо кластеров из ячейки: в среднем {visible.mean():.1f} ({visible.mean() / num_clusters * 100:.1f}%), "
+          f"минимум {visible.min()}, максимум {visible.max()} из {num_clusters}")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--rays': MESH_PVS_RAYS_PER_CELL, '--samples': MESH_PVS_SAMPLES_PER_CLUSTER,
+               '--dilate': MESH_PVS_DILATE_CELLS}
+    for name in options:
+        if name in args:
+            position = args.index(name)
+            options[name] = int(args[position + 1])
+            del args[position:position + 2]
+    if len(args) != 1:
+        print("Использование: python -m tools.build_pvs <карта.obj> [--rays N] [--samples N] [--dilate N]")
+        sys.exit(1)
+    run(args[0], options['--rays'], options['--samples'], options['--dilate'])
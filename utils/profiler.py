@@ -143,10 +143,29 @@ def clear_stats() -> None:
     with _LOCK:
         _STATS.clear()
 
-def report(sort_by: str = "time", target_stats: Dict[str, Dict[str, List[Union[float, int]]]] = _STATS) -> None:
+def _print_cpp_cache_stats() -> None:
+    """Печатает статистику кэшей L1/L2 cpp_renderer_core (get_cache_stats_cpp), если модуль собран."""
+    try:
+        import cpp_renderer_core
+    except ImportError:
+        return
+    if not hasattr(cpp_renderer_core, 'get_cache_stats_cpp'):
+        return
+    print("\n[cpp_renderer_core caches]")
+    for name, cache in cpp_renderer_core.get_cache_stats_cpp().items():
+        lookups = cache['hits'] + cache['misses']
+        hit_rate = cache['hits'] / lookups * 100 if lookups else 0.0
+        print(f"  {name.upper():3s}: {cache['hits']:8d} hits / {lookups:8d} lookups ({hit_rate:5.1f}%) | "
+              f"{cache['insertions']:7d} inserted | {cache['evictions']:7d} evicted | "
+              f"{cache['entries']:6d} entries, {cache['bytes'] / 2**20:7.1f} / {cache['budget_bytes'] / 2**20:.0f} MiB | "
+              f"saved {cache['saved_ms_per_hit']:.3f} ms/hit, {cache['saved_ms'] / 1000:.3f} s total")
+
+def report(sort_by: str = "time", target_stats: Dict[str, Dict[str, List[Union[float, int]]]] = _STATS,
+           cpp_cache_stats: bool = True) -> None:
     """
     Выводит сводку из target_stats (по умолчанию из глобального _STATS).
     sort_by = 'time' | 'calls'
+    cpp_cache_stats: добавить попадания, вытеснения и сэкономленное время кэшей L1/L2 C++ рендерера.
     """
     if not is_profiling_enabled():
         print("\n─── MiniProfiler report (profiling disabled) ───")
@@ -158,6 +177,8 @@ def report(sort_by: str = "time", target_stats: Dict[str, Dict[str, List[Union[f
         print("\n─── MiniProfiler report ───")
         if not target_stats:
             print("  No profiling data collected.")
+            if cpp_cache_stats:
+                _print_cpp_cache_stats()
             print("─────────────────────────────\n")
             return
 
@@ -197,4 +218,6 @@ def report(sort_by: str = "time", target_stats: Dict[str, Dict[str, List[Union[f
             for name, (tt, n) in rows:
                 perc: float = (tt / total_for_perc) * 100 if total_for_perc != 0 else 0 # Проверка деления на ноль
                 print(f"  {name:30s}: {tt:7.3f}s  | {perc:5.1f}% | {n:7d}×")
+        if cpp_cache_stats:
+            _print_cpp_cache_stats()
         print("─────────────────────────────\n")
\ No newline at end of file
@@ -5,6 +5,8 @@ from settings import * # Загружаем все настройки (FOV_DEG,
 import glm
 import sys 
 import atexit # Для вызова cleanup_cpp_renderer при выходе
+from classes.spatial_index import transform_aabbs
+from meshes.mesh_lod import LOD_OBJECT_ID_SHIFT, projected_sizes, select_lod_levels
 # import time # time не используется напрямую в этом файле
 
 # --- Попытка импорта C++ модуля ---
@@ -61,12 +63,14 @@ class Renderer:
             int(bg_color_glm.z * 255)
         ], dtype=np.uint8)
 
-        self.sort_in_cpp = SORT # из settings.py
+        # Буферу глубины программного растеризатора сортировка не нужна
+        self.software_rasterizer = SOFTWARE_RASTERIZER and hasattr(cpp_renderer_core, 'set_software_rasterizer_cpp')
+        self.sort_in_cpp = SORT and not self.software_rasterizer # из settings.py
         self.small_feature_culling_enabled = SMALL_TRIANGLE_CULLING_ENABLED
         self.small_triangle_min_area = SMALL_TRIANGLE_MIN_AREA if self.small_feature_culling_enabled else 0.0
 
-        self.max_l1_cache_size_for_cpp = MAX_L1_CACHE_SIZE_CPP
-        self.max_l2_cache_size_for_cpp = MAX_L2_CACHE_SIZE_CPP
+        self.l1_cache_bytes_for_cpp = L1_CACHE_BYTES
+        self.l2_cache_bytes_for_cpp = L2_CACHE_BYTES
         
         self.actual_window_width = 0
         self.actual_window_height = 0
@@ -79,8 +83,8 @@ class Renderer:
                 initial_height,
                 fullscreen_flag,
                 window_title,
-                self.max_l1_cache_size_for_cpp,
-                self.max_l2_cache_size_for_cpp,
+                self.l1_cache_bytes_for_cpp,
+                self.l2_cache_bytes_for_cpp,
                 self.bg_clear_color_tuple_uint8
             )
             self.actual_window_width = returned_dimensions[0]
@@ -93,6 +97,17 @@ class Renderer:
             else:
                 print("Warning: app instance does not have 'update_resolution_dependent_settings' method.")
             
+            if hasattr(cpp_renderer_core, 'set_occlusion_parameters_cpp'):
+                cpp_renderer_core.set_occlusion_parameters_cpp(OCCLUSION_CULLING_ENABLED, OCCLUSION_BUFFER_WIDTH,
+                                                               OCCLUSION_BUFFER_HEIGHT, OCCLUSION_MAX_OCCLUDER_TRIANGLES)
+            if hasattr(cpp_renderer_core, 'set_temporal_depth_sort_cpp'):
+                cpp_renderer_core.set_temporal_depth_sort_cpp(SORT_TEMPORAL)
+            if hasattr(cpp_renderer_core, 'set_guard_band_clipping_cpp'):
+                cpp_renderer_core.set_guard_band_clipping_cpp(GUARD_BAND_CLIPPING, GUARD_BAND)
+            if hasattr(cpp_renderer_core, 'set_software_rasterizer_cpp'):
+                cpp_renderer_core.set_software_rasterizer_cpp(self.software_rasterizer, SOFTWARE_RASTER_TILE_SIZE)
+            elif SOFTWARE_RASTERIZER:
+                self._warn_cpp_function_missing("set_software_rasterizer_cpp")
             print("--- C++ Renderer (SDL) initialized successfully with its own window. ---")
             # Регистрируем функцию очистки C++ ресурсов при выходе из Python
             atexit.register(self.cleanup_on_exit)
@@ -162,8 +177,13 @@ class Renderer:
                     vertex_data_format_info: dict, 
                     position: glm.vec3 = glm.vec3(0,0,0),
                     rotation: glm.vec3 = glm.vec3(0,0,0), 
-                    scale: glm.vec3 = glm.vec3(1,1,1)):
-        """Передает данные объекта в C++ для обработки и накопления треугольников."""
+                    scale: glm.vec3 = glm.vec3(1,1,1),
+                    index_data_np: np.ndarray = None):
+        """
+        Передает данные объекта в C++ для обработки и накопления треугольников.
+        Если задан index_data_np (uint32, по 3 индекса на треугольник), vertex_data_np содержит
+        только уникальные вершины и используется индексированный путь C++.
+        """
         if not CPP_MODULE_LOADED: return
         if vertex_data_np.size == 0: return 
 
@@ -177,6 +197,28 @@ class Renderer:
         use_vertex_normals_setting = vertex_data_format_info.get('USE_VERTEX_NORMALS', USE_VERTEX_NORMALS) # Fallback to settings
         vertex_stride = vertex_data_format_info.get('VERTEX_DATA_STRIDE', VERTEX_DATA_STRIDE) # Fallback to settings
 
+        if index_data_np is not None:
+            if hasattr(cpp_renderer_core, 'process_and_accumulate_indexed_object_cpp'):
+                try:
+                    cpp_renderer_core.process_and_accumulate_indexed_object_cpp(
+                        object_id,
+                        transform_params_np,
+                        vertex_data_np,
+                        index_data_np,
+                        vertex_stride,
+                        use_vertex_normals_setting
+                    )
+                except RuntimeError as e_cpp_process:
+                    print(f"КРИТИЧЕСКАЯ ОШИБКА Runtime в C++ (process_and_accumulate_indexed) для объекта {object_id}: {e_cpp_process}")
+                except Exception as e_cpp_general_process:
+                    print(f"ОБЩАЯ ОШИБКА при вызове C++ (process_and_accumulate_indexed) для объекта {object_id}: {e_cpp_general_process}")
+                return
+            # Старая сборка модуля: разворачиваем индексы обратно в "суп" треугольников.
+            if not getattr(self, '_indexed_fallback_warned', False):
+                self._warn_cpp_function_missing("process_and_accumulate_indexed_object_cpp")
+                self._indexed_fallback_warned = True
+            vertex_data_np = vertex_data_np.reshape(-1, vertex_stride)[index_data_np].ravel()
+
         try:
             # GIL будет отпущен внутри этой C++ функции, если там используется py::gil_scoped_release
             cpp_renderer_core.process_and_accumulate_object_cpp(
@@ -191,6 +233,144 @@ class Renderer:
         except Exception as e_cpp_general_process:
             print(f"ОБЩАЯ ОШИБКА при вызове C++ (process_and_accumulate) для объекта {object_id}: {e_cpp_general_process}")
 
+    def get_mesh_handle(self, mesh) -> int:
+        """Возвращает хэндл буферов меша в C++ (регистрирует их при первом обращении)."""
+        if mesh.native_handle is None:
+            mesh.native_handle = cpp_renderer_core.register_mesh_cpp(
+                mesh.vertex_data_np,
+                mesh.index_data_np,
+                mesh.vertex_data_format_info.get('VERTEX_DATA_STRIDE', VERTEX_DATA_STRIDE),
+                mesh.vertex_data_format_info.get('USE_VERTEX_NORMALS', USE_VERTEX_NORMALS),
+                *(mesh.bvh or ())
+            )
+        return mesh.native_handle
+
+    def release_mesh_handle(self, handle: int):
+        if CPP_MODULE_LOADED and hasattr(cpp_renderer_core, 'unregister_mesh_cpp'):
+            cpp_renderer_core.unregister_mesh_cpp(handle)
+
+    @profiler
+    def render_game_objects(self, game_objects):
+        """
+        Отправляет объекты в C++ одним вызовом submit_batch_cpp: строки трансформаций собираются
+        в один массив (N, 9), меши передаются хэндлами. Если пакетная отправка выключена
+        (USE_BATCH_SUBMISSION) или модуль старый, объекты рендерятся по одному.
+        """
+        if not CPP_MODULE_LOADED: return
+        if not self._batch_submission_available():
+            for game_object in game_objects:
+                game_object.render()
+            return
+
+        ready_objects, meshes = [], []
+        for game_object in game_objects:
+            mesh = game_object.mesh
+            if mesh is None or mesh.vertex_data_np.size == 0:
+                continue
+            ready_objects.append(game_object)
+            meshes.append(mesh)
+        if not ready_objects: return
+        object_ids = np.array([game_object.game_object_id for game_object in ready_objects], dtype=np.uint64)
+        transforms = np.array([game_object.transform_params for game_object in ready_objects], dtype=np.float32)
+        levels = None
+        if LOD_ENABLED:
+            current_levels = np.array([game_object.transform_store.lod_levels[game_object.transform_row]
+                                       for game_object in ready_objects], dtype=np.int64)
+            levels = self._select_lod_levels(meshes, transforms, current_levels)
+            for game_object, level in zip(ready_objects, levels.tolist()):
+                game_object.transform_store.lod_levels[game_object.transform_row] = level
+        self._submit_lod_batch(object_ids, transforms, meshes, levels)
+
+    @profiler
+    def render_transform_store(self, transform_store, rows=None):
+        """
+        Как render_game_objects, но для объектов TransformStore (всех или только строк rows, например
+        видимых по SceneSpatialIndex): массив трансформаций и id объектов передаются в C++ как есть
+        (без упаковки), если рендерятся все объекты хранилища.
+        """
+        if not CPP_MODULE_LOADED: return
+        game_objects = transform_store.objects
+        candidate_rows = range(len(game_objects)) if rows is None else rows
+        if not self._batch_submission_available():
+            for row in candidate_rows:
+                game_objects[row].render()
+            return
+
+        ready_rows, meshes = [], []
+        for row in candidate_rows:
+            mesh = game_objects[row].mesh
+            if mesh is None or mesh.vertex_data_np.size == 0:
+                continue
+            ready_rows.append(row)
+            meshes.append(mesh)
+        if not ready_rows: return
+        if len(ready_rows) == len(game_objects):
+            object_ids, transforms = transform_store.object_ids, transform_store.array
+        else: # Часть объектов отсечена, пуста или еще грузится - берем только готовые строки
+            object_ids, transforms = transform_store.object_ids[ready_rows], transform_store.array[ready_rows]
+        levels = None
+        if LOD_ENABLED:
+            levels = self._select_lod_levels(meshes, transforms, transform_store.lod_levels[ready_rows])
+            transform_store.lod_levels[ready_rows] = levels
+        self._submit_lod_batch(object_ids, transforms, meshes, levels)
+
+    def _select_lod_levels(self, meshes: list, transforms: np.ndarray, current_levels: np.ndarray) -> np.ndarray:
+        """
+        Уровни детализации объектов (K,) по доле экрана, которую занимают их ограничивающие сферы
+        (см. meshes.mesh_lod.select_lod_levels); current_levels - уровни прошлого кадра для гистерезиса.
+        """
+        max_levels = np.array([len(mesh.lods) for mesh in meshes], dtype=np.int64)
+        levels = np.zeros(len(meshes), dtype=np.int64)
+        with_lods = np.flatnonzero(max_levels)
+        projection_matrix = getattr(self.app, 'projection_matrix', None)
+        if with_lods.size == 0 or projection_matrix is None:
+            return levels
+        local_bounds = np.array([meshes[k].local_bounds for k in with_lods], dtype=np.float64)
+        lod_transforms = np.asarray(transforms, dtype=np.float64)[with_lods]
+        world_bounds = transform_aabbs(local_bounds, lod_transforms)
+        centers = (world_bounds[:, :3] + world_bounds[:, 3:]) * 0.5
+        # Радиус сферы вокруг локального AABB не зависит от поворота, только от наибольшего масштаба.
+        radii = (np.linalg.norm(local_bounds[:, 3:] - local_bounds[:, :3], axis=1) * 0.5
+                 * np.abs(lod_transforms[:, 6:9]).max(axis=1))
+        camera_position = (self.camera.position.x, self.camera.position.y, self.camera.position.z)
+        sizes = projected_sizes(centers, radii, camera_position, projection_matrix[1][1])
+        levels[with_lods] = select_lod_levels(np.asarray(current_levels)[with_lods], sizes,
+                                              max_levels=max_levels[with_lods])
+        return levels
+
+    def _submit_lod_batch(self, object_ids: np.ndarray, transforms: np.ndarray, meshes: list, levels: np.ndarray):
+        """
+        Отправляет объекты с мешами выбранных уровней детализации. Уровень записывается в старший байт id
+        объекта: кэши L1/L2 в C++ хранят треугольники каждого уровня отдельно.
+        """
+        if levels is None or not levels.any():
+            level_meshes = meshes
+        else:
+            level_meshes = [mesh.lod(level) for mesh, level in zip(meshes, levels.tolist())]
+            object_ids = object_ids ^ (levels.astype(np.uint64) << np.uint64(LOD_OBJECT_ID_SHIFT))
+        mesh_handles, submitted = [], []
+        for k, mesh in enumerate(level_meshes):
+            try:
+                mesh_handles.append(self.get_mesh_handle(mesh))
+                submitted.append(k)
+            except RuntimeError as e_cpp_register: # Некорректные буферы (индекс вне диапазона, неверный stride)
+                print(f"КРИТИЧЕСКАЯ ОШИБКА Runtime в C++ (register_mesh_cpp) для объекта {int(object_ids[k])}: {e_cpp_register}")
+        if not submitted: return
+        if len(submitted) < len(level_meshes):
+            object_ids, transforms = object_ids[submitted], transforms[submitted]
+        self._submit_batch(object_ids, transforms, np.array(mesh_handles, dtype=np.int64))
+
+    def _batch_submission_available(self) -> bool:
+        return USE_BATCH_SUBMISSION and hasattr(cpp_renderer_core, 'submit_batch_cpp')
+
+    def _submit_batch(self, object_ids: np.ndarray, transforms: np.ndarray, mesh_handles: np.ndarray):
+        try:
+            cpp_renderer_core.submit_batch_cpp(object_ids, transforms, mesh_handles)
+        except RuntimeError as e_cpp_batch:
+            print(f"КРИТИЧЕСКАЯ ОШИБКА Runtime в C++ (submit_batch_cpp) для {len(object_ids)} объектов: {e_cpp_batch}")
+        except Exception as e_cpp_general_batch:
+            print(f"ОБЩАЯ ОШИБКА при вызове C++ (submit_batch_cpp): {e_cpp_general_batch}")
+
     @profiler
     def render(self): 
         """Вызывает C++ функцию для рендеринга всех накопленных треугольников с использованием SDL."""